@@ -0,0 +1,449 @@
+"""
+Admission Control
+
+This module limits how many SQL (Trino) and graph (PuppyGraph) queries run at
+once, so a single user can't occupy every threadpool worker and Trino slot.
+
+- ADMISSION_MAX_CONCURRENT queries run at once in this backend process
+- ADMISSION_USER_LIMIT caps the queries one user runs at once
+- ADMISSION_ROLE_LIMITS caps all running queries of users with a role
+  (JSON, e.g. {"restricted_user": 2})
+- Waiting queries are admitted by weighted fair queuing across users: a user's
+  queries are spaced out by 1 / weight in virtual time, so a user with twenty
+  queued queries doesn't starve a user with one. ADMISSION_ROLE_WEIGHTS gives
+  roles a higher weight (JSON, e.g. {"aml_manager": 4}); the highest weight of
+  a user's roles applies.
+- When ADMISSION_MAX_QUEUE queries are already waiting, or a query waited
+  ADMISSION_QUEUE_TIMEOUT_SECS, the request is rejected with AdmissionRejected,
+  which the API turns into 429 with a Retry-After estimate.
+- Background work is queued with submit(), which calls back when the query is
+  admitted instead of holding a thread while it waits.
+"""
+import os
+import json
+import math
+import time
+import asyncio
+import logging
+import itertools
+import threading
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+ADMISSION_MAX_CONCURRENT = int(os.getenv("ADMISSION_MAX_CONCURRENT", "16"))
+ADMISSION_USER_LIMIT = int(os.getenv("ADMISSION_USER_LIMIT", "4"))
+ADMISSION_MAX_QUEUE = int(os.getenv("ADMISSION_MAX_QUEUE", "64"))
+ADMISSION_QUEUE_TIMEOUT_SECONDS = float(os.getenv("ADMISSION_QUEUE_TIMEOUT_SECS", "30"))
+
+DEFAULT_ROLE_WEIGHTS = {"aml_manager": 4, "admin": 2}
+
+
+def _json_env(name: str, default: Dict[str, Any]) -> Dict[str, Any]:
+    raw = os.getenv(name)
+    if not raw:
+        return dict(default)
+    try:
+        return json.loads(raw)
+    except ValueError as e:
+        logger.error(f"Ignoring invalid {name}: {e}")
+        return dict(default)
+
+
+ADMISSION_ROLE_LIMITS = {role: int(v) for role, v in _json_env("ADMISSION_ROLE_LIMITS", {}).items()}
+ADMISSION_ROLE_WEIGHTS = {role: float(v) for role, v in _json_env("ADMISSION_ROLE_WEIGHTS", DEFAULT_ROLE_WEIGHTS).items()}
+
+
+class AdmissionRejected(Exception):
+    """The query was not admitted; retry after retry_after seconds."""
+
+    def __init__(self, message: str, retry_after: int, queue_length: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+        self.queue_length = queue_length
+
+
+class Ticket:
+    """One query waiting for, or holding, an admission slot."""
+
+    __slots__ = ("user", "roles", "weight", "label", "tag", "seq", "event", "enqueued_at", "started_at", "released",
+                 "on_admit", "on_timeout", "deadline", "waiter")
+
+    def __init__(self, user: str, roles: List[str], weight: float, label: Optional[str], tag: float, seq: int):
+        self.user = user
+        self.roles = roles
+        self.weight = weight
+        self.label = label
+        self.tag = tag
+        self.seq = seq
+        self.event = threading.Event()
+        self.enqueued_at = time.monotonic()
+        self.started_at: Optional[float] = None
+        self.released = False
+        # Set for tickets queued with submit(); nobody waits on their event
+        self.on_admit: Optional[Callable[["Ticket"], None]] = None
+        self.on_timeout: Optional[Callable[["Ticket"], None]] = None
+        self.deadline: Optional[float] = None
+        # (event loop, future) of a wait_async() call, resolved on admission
+        self.waiter: Optional[tuple] = None
+
+    @property
+    def admitted(self) -> bool:
+        return self.event.is_set()
+
+
+class AdmissionController:
+    """Per-user / per-role concurrency caps with a weighted fair queue."""
+
+    def __init__(
+        self,
+        max_concurrent: int = ADMISSION_MAX_CONCURRENT,
+        user_limit: int = ADMISSION_USER_LIMIT,
+        role_limits: Optional[Dict[str, int]] = None,
+        role_weights: Optional[Dict[str, float]] = None,
+        max_queue: int = ADMISSION_MAX_QUEUE,
+        queue_timeout_seconds: float = ADMISSION_QUEUE_TIMEOUT_SECONDS
+    ):
+        self.max_concurrent = max_concurrent
+        self.user_limit = user_limit
+        self.role_limits = ADMISSION_ROLE_LIMITS if role_limits is None else role_limits
+        self.role_weights = ADMISSION_ROLE_WEIGHTS if role_weights is None else role_weights
+        self.max_queue = max_queue
+        self.queue_timeout_seconds = queue_timeout_seconds
+        self._lock = threading.Lock()
+        self._seq = itertools.count()
+        self._queue: List[Ticket] = []
+        self._running = 0
+        self._running_by_user: Dict[str, int] = {}
+        self._running_by_role: Dict[str, int] = {}
+        self._last_tag: Dict[str, float] = {}
+        self._virtual_time = 0.0
+        self._avg_hold_seconds = 1.0
+        self._admitted = 0
+        self._queued = 0
+        self._rejected = 0
+        self._timeouts = 0
+
+    def weight(self, roles: List[str]) -> float:
+        """Highest fair-share weight of the roles (1 for roles without a weight)."""
+        return max([self.role_weights.get(role, 1.0) for role in roles] + [1.0])
+
+    def enqueue(self, user: str, roles: List[str], label: Optional[str] = None) -> Ticket:
+        """
+        Queue a query for admission; it is admitted right away if capacity allows.
+
+        Raises:
+            AdmissionRejected: If the queue is full
+        """
+        return self._enqueue(user, roles, label)
+
+    def submit(self, user: str, roles: List[str], on_admit: Callable[[Ticket], None], label: Optional[str] = None,
+               on_timeout: Optional[Callable[[Ticket], None]] = None, timeout: Optional[float] = None) -> Ticket:
+        """
+        Queue a query without waiting for it; on_admit(ticket) is called once it is admitted.
+
+        The callbacks run in the thread that frees the slot (or in this one if the
+        query is admitted right away), so they must only hand the work off. A ticket
+        still queued after the timeout is dropped and on_timeout(ticket) is called.
+        The admitted ticket must be released like one returned by acquire().
+
+        Raises:
+            AdmissionRejected: If the queue is full
+        """
+        timeout = self.queue_timeout_seconds if timeout is None else timeout
+        return self._enqueue(user, roles, label, on_admit, on_timeout, time.monotonic() + timeout)
+
+    def _enqueue(self, user: str, roles: List[str], label: Optional[str], on_admit=None, on_timeout=None,
+                 deadline: Optional[float] = None) -> Ticket:
+        callbacks = []
+        try:
+            with self._lock:
+                # Expired background tickets must not count against the queue limit
+                callbacks += self._expire()
+                self._reject_if_full()
+                weight = self.weight(roles)
+                tag = max(self._virtual_time, self._last_tag.get(user, 0.0)) + 1.0 / weight
+                self._last_tag[user] = tag
+                ticket = Ticket(user, list(roles), weight, label, tag, next(self._seq))
+                ticket.on_admit, ticket.on_timeout, ticket.deadline = on_admit, on_timeout, deadline
+                self._queue.append(ticket)
+                callbacks += self._dispatch()
+                if not ticket.admitted:
+                    self._queued += 1
+                return ticket
+        finally:
+            self._run_callbacks(callbacks)
+
+    def wait(self, ticket: Ticket, timeout: Optional[float] = None) -> None:
+        """
+        Block until the ticket is admitted.
+
+        Raises:
+            AdmissionRejected: If it is not admitted within the timeout
+        """
+        timeout = self.queue_timeout_seconds if timeout is None else timeout
+        if not ticket.event.wait(timeout):
+            self._time_out(ticket)
+
+    async def wait_async(self, ticket: Ticket, timeout: Optional[float] = None) -> None:
+        """Like wait(), without holding a thread while queued."""
+        timeout = self.queue_timeout_seconds if timeout is None else timeout
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        with self._lock:
+            if ticket.admitted:
+                return
+            ticket.waiter = (loop, future)
+        try:
+            await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            self._time_out(ticket)
+        finally:
+            ticket.waiter = None
+
+    def _time_out(self, ticket: Ticket) -> None:
+        with self._lock:
+            if ticket.admitted:
+                # Admitted just as the wait timed out
+                return
+            self._unqueue(ticket)
+            self._timeouts += 1
+            raise AdmissionRejected("Timed out waiting in the query queue", self._retry_after(), len(self._queue))
+
+    def acquire(self, user: str, roles: List[str], label: Optional[str] = None, timeout: Optional[float] = None) -> Ticket:
+        """
+        Queue a query and block until it is admitted; release() the ticket when done.
+
+        Raises:
+            AdmissionRejected: If the queue is full or the wait times out
+        """
+        ticket = self.enqueue(user, roles, label)
+        try:
+            self.wait(ticket, timeout)
+        except BaseException:
+            self.discard(ticket)
+            raise
+        return ticket
+
+    async def acquire_async(self, user: str, roles: List[str], label: Optional[str] = None,
+                            timeout: Optional[float] = None) -> Ticket:
+        """Async version of acquire() for endpoints running on the event loop."""
+        ticket = self.enqueue(user, roles, label)
+        try:
+            await self.wait_async(ticket, timeout)
+        except BaseException:
+            # Includes the request being cancelled while queued
+            self.discard(ticket)
+            raise
+        return ticket
+
+    def discard(self, ticket: Ticket) -> None:
+        """Drop a ticket whether it is still queued or already admitted."""
+        with self._lock:
+            if ticket in self._queue:
+                self._unqueue(ticket)
+                return
+        if ticket.admitted:
+            self.release(ticket)
+
+    def discard_queued(self, label: str) -> int:
+        """
+        Drop the still-queued tickets with a label (e.g. a cancelled background query).
+
+        Admitted tickets are left alone; their holder releases them.
+
+        Returns:
+            The number of tickets dropped
+        """
+        with self._lock:
+            dropped = [ticket for ticket in self._queue if ticket.label == label]
+            for ticket in dropped:
+                self._unqueue(ticket)
+            return len(dropped)
+
+    def _unqueue(self, ticket: Ticket) -> None:
+        # Called with the lock held: remove a waiting ticket and give back the
+        # virtual time it took from its user's later queries
+        self._queue.remove(ticket)
+        share = 1.0 / ticket.weight
+        for other in self._queue:
+            if other.user == ticket.user and other.seq > ticket.seq:
+                other.tag -= share
+        if ticket.user in self._last_tag:
+            self._last_tag[ticket.user] -= share
+
+    def release(self, ticket: Ticket) -> None:
+        """Give back the slot of an admitted ticket and admit waiting queries."""
+        with self._lock:
+            if ticket.released:
+                return
+            ticket.released = True
+            if ticket.started_at is not None:
+                held = time.monotonic() - ticket.started_at
+                self._avg_hold_seconds = 0.8 * self._avg_hold_seconds + 0.2 * held
+            self._running -= 1
+            self._running_by_user[ticket.user] -= 1
+            if not self._running_by_user[ticket.user]:
+                del self._running_by_user[ticket.user]
+            for role in self._capped_roles(ticket):
+                self._running_by_role[role] -= 1
+            callbacks = self._expire() + self._dispatch()
+        self._run_callbacks(callbacks)
+
+    @contextmanager
+    def admit(self, user: str, roles: List[str], label: Optional[str] = None, timeout: Optional[float] = None):
+        """Hold an admission slot for the duration of the block."""
+        ticket = self.acquire(user, roles, label, timeout)
+        try:
+            yield ticket
+        finally:
+            self.release(ticket)
+
+    @asynccontextmanager
+    async def admit_async(self, user: str, roles: List[str], label: Optional[str] = None):
+        """Async version of admit()."""
+        ticket = await self.acquire_async(user, roles, label)
+        try:
+            yield ticket
+        finally:
+            self.release(ticket)
+
+    def _capped_roles(self, ticket: Ticket) -> List[str]:
+        return [role for role in ticket.roles if role in self.role_limits]
+
+    def _eligible(self, ticket: Ticket) -> bool:
+        if self._running_by_user.get(ticket.user, 0) >= self.user_limit:
+            return False
+        return all(self._running_by_role.get(role, 0) < self.role_limits[role] for role in self._capped_roles(ticket))
+
+    def _dispatch(self) -> list:
+        # Called with the lock held: admit the eligible waiters with the smallest tags.
+        # Returns the on_admit callbacks to run once the lock is released.
+        callbacks = []
+        while self._running < self.max_concurrent:
+            eligible = [ticket for ticket in self._queue if self._eligible(ticket)]
+            if not eligible:
+                break
+            ticket = min(eligible, key=lambda t: (t.tag, t.seq))
+            self._queue.remove(ticket)
+            self._running += 1
+            self._running_by_user[ticket.user] = self._running_by_user.get(ticket.user, 0) + 1
+            for role in self._capped_roles(ticket):
+                self._running_by_role[role] = self._running_by_role.get(role, 0) + 1
+            self._virtual_time = max(self._virtual_time, ticket.tag - 1.0 / ticket.weight)
+            self._admitted += 1
+            ticket.started_at = time.monotonic()
+            ticket.event.set()
+            if ticket.waiter is not None:
+                self._wake(*ticket.waiter)
+            if ticket.on_admit is not None:
+                callbacks.append((ticket.on_admit, ticket))
+        return callbacks
+
+    @staticmethod
+    def _wake(loop: asyncio.AbstractEventLoop, future: asyncio.Future) -> None:
+        # Resolve a wait_async() future from whichever thread admitted the ticket
+        def resolve():
+            if not future.done():
+                future.set_result(None)
+        try:
+            loop.call_soon_threadsafe(resolve)
+        except RuntimeError:
+            # The loop is closed; nobody is waiting any more
+            pass
+
+    def _expire(self) -> list:
+        # Called with the lock held: drop background tickets queued past their deadline
+        now = time.monotonic()
+        expired = [ticket for ticket in self._queue if ticket.deadline is not None and ticket.deadline <= now]
+        for ticket in expired:
+            self._unqueue(ticket)
+            self._timeouts += 1
+        return [(ticket.on_timeout, ticket) for ticket in expired if ticket.on_timeout is not None]
+
+    def _run_callbacks(self, callbacks: list) -> None:
+        for callback, ticket in callbacks:
+            try:
+                callback(ticket)
+            except Exception as e:
+                logger.error(f"Admission callback for {ticket.label} failed: {e}", exc_info=True)
+                if ticket.admitted:
+                    # Nothing took over the slot
+                    self.release(ticket)
+
+    def _retry_after(self) -> int:
+        # Rough wait until a slot frees up for a new arrival
+        slots = max(self.max_concurrent, 1)
+        return max(1, math.ceil(self._avg_hold_seconds * (len(self._queue) + 1) / slots))
+
+    def _ordered_queue(self) -> List[Ticket]:
+        return sorted(self._queue, key=lambda t: (t.tag, t.seq))
+
+    def position(self, label: str) -> Optional[int]:
+        """1-based position of a queued query (by label), or None if it isn't waiting."""
+        with self._lock:
+            for position, ticket in enumerate(self._ordered_queue(), start=1):
+                if ticket.label == label:
+                    return position
+        return None
+
+    def user_status(self, user: str) -> Dict[str, Any]:
+        """A user's running queries and the queue positions of their waiting ones."""
+        with self._lock:
+            ordered = self._ordered_queue()
+            return {
+                "running": self._running_by_user.get(user, 0),
+                "queued": [
+                    {"position": position, "label": ticket.label, "waiting_seconds": round(time.monotonic() - ticket.enqueued_at, 1)}
+                    for position, ticket in enumerate(ordered, start=1) if ticket.user == user
+                ],
+                "queue_length": len(ordered),
+                "user_limit": self.user_limit,
+            }
+
+    def check_capacity(self) -> None:
+        """
+        Raise if a new query would be rejected right now (used before queuing background work).
+
+        Raises:
+            AdmissionRejected: If the queue is full
+        """
+        with self._lock:
+            self._reject_if_full()
+
+    def _reject_if_full(self) -> None:
+        if len(self._queue) >= self.max_queue:
+            self._rejected += 1
+            raise AdmissionRejected("Query queue is full", self._retry_after(), len(self._queue))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "max_concurrent": self.max_concurrent,
+                "user_limit": self.user_limit,
+                "role_limits": dict(self.role_limits),
+                "role_weights": dict(self.role_weights),
+                "max_queue": self.max_queue,
+                "running": self._running,
+                "running_by_role": dict(self._running_by_role),
+                "queue_length": len(self._queue),
+                "users_running": len(self._running_by_user),
+                "admitted": self._admitted,
+                "queued": self._queued,
+                "rejected": self._rejected,
+                "timeouts": self._timeouts,
+                "avg_hold_seconds": round(self._avg_hold_seconds, 3),
+            }
+
+
+# Global instance (will be initialized on first use)
+_admission_controller: Optional[AdmissionController] = None
+
+
+def get_admission_controller() -> AdmissionController:
+    """Get or create the global admission controller."""
+    global _admission_controller
+    if _admission_controller is None:
+        _admission_controller = AdmissionController()
+    return _admission_controller
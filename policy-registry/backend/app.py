@@ -1,8 +1,12 @@
 import io, os, tarfile, time, yaml
 import logging
+from contextlib import asynccontextmanager
 from datetime import datetime
 from typing import List, Optional
-from fastapi import FastAPI, Depends, HTTPException, status, Response
+from fastapi import FastAPI, Depends, HTTPException, status, Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi.concurrency import run_in_threadpool
+from starlette.background import BackgroundTask
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
@@ -12,24 +16,44 @@ from models import Policy
 from auth_models import User, Role, Permission, Base
 from auth_utils import (
     authenticate_user, create_access_token, verify_token, 
-    get_password_hash, check_permission, is_admin, get_user_roles, get_user_attributes
+    get_password_hash, check_permission, is_admin, get_user_roles,
+    get_user_attributes_versioned
 )
 from auth_models import (
     UserCreate, UserUpdate, UserResponse, RoleCreate, RoleResponse,
     PermissionCreate, PermissionResponse, LoginRequest, LoginResponse,
     UserAttributesCreate, UserAttributesUpdate, UserAttributesResponse
 )
-from query_models import Query, QueryColumn, QueryResult, QueryStat, QueryCreate, QueryResponse, QueryResultResponse
+from query_models import Query, QueryStat, QueryCreate, QueryResponse, QueryResultResponse
 from query_db import get_query_db, get_query_db_sync, init_query_database
+from result_store import (
+    write_results, read_columns, read_rows, has_results, delete_results, page_bounds, page_info,
+    stored_row_count
+)
+from admission import AdmissionRejected, get_admission_controller
+from result_persister import get_result_persister
 try:
-    from cerbos_client import get_cerbos_client
+    from cerbos_client import (
+        get_cerbos_client, get_async_cerbos_client, close_async_cerbos_client,
+        notify_policy_change, resilience_stats, query_text_attribute
+    )
     CERBOS_CLIENT_AVAILABLE = True
 except ImportError as e:
     print(f"WARNING: Could not import cerbos_client: {e}")
     CERBOS_CLIENT_AVAILABLE = False
-    # Create a dummy function to prevent errors
+    # Create dummy functions to prevent errors
     def get_cerbos_client():
         raise RuntimeError("Cerbos client not available")
+    def get_async_cerbos_client():
+        raise RuntimeError("Cerbos client not available")
+    def notify_policy_change():
+        return 0
+    async def close_async_cerbos_client():
+        pass
+    def resilience_stats():
+        raise RuntimeError("Cerbos client not available")
+    def query_text_attribute(query):
+        return query
 
 # AML imports
 try:
@@ -52,6 +76,9 @@ logging.basicConfig(level=logging.INFO)
 _authorization_decisions = []
 _MAX_DECISIONS = 500
 
+# Streaming queries running in this process (query id -> owning user id), for cancellation
+_streaming_queries = {}
+
 
 def log_authorization_decision(
     user_id: str,
@@ -102,6 +129,32 @@ API.add_middleware(
     allow_credentials=True, allow_methods=["*"], allow_headers=["*"]
 )
 
+@API.exception_handler(AdmissionRejected)
+async def admission_rejected_handler(request: Request, exc: AdmissionRejected):
+    """Turn a query the admission controller could not queue into 429 with Retry-After."""
+    return JSONResponse(
+        status_code=429,
+        content={"detail": str(exc), "queue_length": exc.queue_length, "retry_after": exc.retry_after},
+        headers={"Retry-After": str(exc.retry_after)}
+    )
+
+@API.on_event("shutdown")
+async def shutdown_cerbos_client():
+    """Close the async Cerbos gRPC channel on shutdown."""
+    await close_async_cerbos_client()
+
+@API.on_event("shutdown")
+def shutdown_query_executor():
+    """Stop the background query workers on shutdown."""
+    from query_executor import shutdown_query_executor as shutdown_executor
+    shutdown_executor()
+
+@API.on_event("shutdown")
+def shutdown_result_persister():
+    """Write the results still queued for persistence before shutting down."""
+    from result_persister import shutdown_result_persister as shutdown_persister
+    shutdown_persister(timeout=30)
+
 # Security
 security = HTTPBearer()
 
@@ -270,9 +323,12 @@ def delete_query(query_id: str, current_user: User = Depends(get_current_user)):
         if not query:
             raise HTTPException(status_code=404, detail="Query not found or access denied")
         
+        # A queued background query must not keep its place in the admission queue
+        if query.status == "QUEUED":
+            get_admission_controller().discard_queued(query_id)
+        
         # Delete associated data (cascade should handle this, but being explicit)
-        query_db.query(QueryResult).filter(QueryResult.query_id == query_id).delete()
-        query_db.query(QueryColumn).filter(QueryColumn.query_id == query_id).delete()
+        delete_results(query_db, query_id)
         query_db.query(QueryStat).filter(QueryStat.query_id == query_id).delete()
         
         # Delete the query itself
@@ -301,8 +357,9 @@ def clear_user_queries(current_user: User = Depends(get_current_user)):
         
         # Delete all associated data for user's queries
         for query in user_queries:
-            query_db.query(QueryResult).filter(QueryResult.query_id == query.id).delete()
-            query_db.query(QueryColumn).filter(QueryColumn.query_id == query.id).delete()
+            if query.status == "QUEUED":
+                get_admission_controller().discard_queued(query.id)
+            delete_results(query_db, query.id)
             query_db.query(QueryStat).filter(QueryStat.query_id == query.id).delete()
         
         # Delete all user's queries
@@ -744,7 +801,7 @@ def get_graph_schema(current_user: User = Depends(get_current_user)):
 
 # Natural language to Cypher: analyze query, generate Cypher, optionally execute
 @API.post("/query/graph/natural-language")
-def natural_language_graph_query(
+async def natural_language_graph_query(
     body: dict,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
@@ -771,13 +828,13 @@ def natural_language_graph_query(
 
     try:
         puppygraph = get_puppygraph_client()
-        schema = puppygraph.get_schema()
+        schema = await run_in_threadpool(puppygraph.get_schema)
     except Exception as e:
         logger.error(f"Failed to get schema: {e}", exc_info=True)
         raise HTTPException(status_code=502, detail=f"Failed to retrieve schema: {str(e)}")
 
     try:
-        result = nl_to_cypher(query_text, schema)
+        result = await run_in_threadpool(nl_to_cypher, query_text, schema)
     except Exception as e:
         logger.error(f"NL to Cypher failed: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Could not generate Cypher: {str(e)}")
@@ -802,8 +859,12 @@ def natural_language_graph_query(
     # Optional: validate that PuppyGraph accepts the Cypher (dry run)
     validate_with_puppygraph = body.get("validate_with_puppygraph", False)
     if validate_with_puppygraph and result.get("cypher"):
+        # The dry run executes the full query, so it takes an admission slot like any graph query
+        admission = get_admission_controller()
+        validation_roles = await run_in_threadpool(get_user_roles, db, current_user.id)
+        ticket = await admission.acquire_async(str(current_user.id), validation_roles)
         try:
-            puppygraph.execute_cypher(result["cypher"])
+            await run_in_threadpool(puppygraph.execute_cypher, result["cypher"])
         except Exception as e:
             exec_err = str(e)
             logger.warning("PuppyGraph validation run failed: %s", exec_err)
@@ -815,6 +876,8 @@ def natural_language_graph_query(
                 "validation_errors": result.get("validation_errors", []) + [f"PuppyGraph execution: {exec_err}"],
                 "executed": False,
             }
+        finally:
+            admission.release(ticket)
 
     if not execute:
         return {
@@ -854,16 +917,16 @@ def natural_language_graph_query(
     if "query_pattern" not in cypher_metadata:
         cypher_metadata["query_pattern"] = "simple"
 
-    cerbos_client = get_cerbos_client()
-    user_roles = get_user_roles(db, current_user.id)
-    user_attributes = get_user_attributes(db, current_user.id)
+    cerbos_client = get_async_cerbos_client()
+    user_roles = await run_in_threadpool(get_user_roles, db, current_user.id)
+    user_attributes, attributes_version = await run_in_threadpool(get_user_attributes_versioned, db, current_user.id)
     cerbos_attributes = {
         "query_type": query_type,
-        "query": query,
+        "query": query_text_attribute(query),
         **cypher_metadata,
         **resource_attributes,
     }
-    allowed, reason, policy = cerbos_client.check_resource_access(
+    allowed, reason, policy = await cerbos_client.check_resource_access(
         user_id=str(current_user.id),
         user_email=current_user.email,
         user_roles=user_roles,
@@ -872,6 +935,7 @@ def natural_language_graph_query(
         action="execute",
         attributes=cerbos_attributes,
         principal_attributes=user_attributes,
+        principal_version=attributes_version,
     )
     log_authorization_decision(
         user_id=str(current_user.id),
@@ -887,11 +951,13 @@ def natural_language_graph_query(
     if not allowed:
         raise HTTPException(status_code=403, detail=reason or "Not authorized to execute this graph query.")
 
+    admission = get_admission_controller()
+    ticket = await admission.acquire_async(str(current_user.id), user_roles)
     try:
         import time
         start = time.time()
         pg = get_puppygraph_client()
-        data = pg.execute_cypher(query)
+        data = await run_in_threadpool(pg.execute_cypher, query)
         elapsed_ms = (time.time() - start) * 1000
         return {
             "success": True,
@@ -906,11 +972,13 @@ def natural_language_graph_query(
     except Exception as e:
         logger.error(f"NL graph query execution failed: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Query execution failed: {str(e)}")
+    finally:
+        admission.release(ticket)
 
 
 # Graph Query endpoint: Execute Cypher/Gremlin queries via PuppyGraph with Cerbos authorization
 @API.post("/query/graph")
-def execute_graph_query(
+async def execute_graph_query(
     query_data: dict,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
@@ -974,16 +1042,16 @@ def execute_graph_query(
             cypher_metadata["query_pattern"] = "simple"
     
     # Check authorization with Cerbos
-    cerbos_client = get_cerbos_client()
-    user_roles = get_user_roles(db, current_user.id)
+    cerbos_client = get_async_cerbos_client()
+    user_roles = await run_in_threadpool(get_user_roles, db, current_user.id)
     
     # Get user attributes for ABAC (Phase 3)
-    user_attributes = get_user_attributes(db, current_user.id)
+    user_attributes, attributes_version = await run_in_threadpool(get_user_attributes_versioned, db, current_user.id)
     
     # Build resource attributes for Cerbos
     cerbos_attributes = {
         "query_type": query_type,
-        "query": query,
+        "query": query_text_attribute(query),
         **cypher_metadata,
         **resource_attributes
     }
@@ -993,7 +1061,7 @@ def execute_graph_query(
     action = "execute" if query_type == "cypher" else "graph_expand"
     
     # Check if user can execute graph queries
-    allowed, reason, policy = cerbos_client.check_resource_access(
+    allowed, reason, policy = await cerbos_client.check_resource_access(
         user_id=str(current_user.id),
         user_email=current_user.email,
         user_roles=user_roles,
@@ -1001,7 +1069,8 @@ def execute_graph_query(
         resource_id="graph-query",
         action=action,
         attributes=cerbos_attributes,
-        principal_attributes=user_attributes  # Phase 3: Pass user attributes for ABAC
+        principal_attributes=user_attributes,  # Phase 3: Pass user attributes for ABAC
+        principal_version=attributes_version
     )
     
     # Log authorization decision (both allowed and denied)
@@ -1020,16 +1089,18 @@ def execute_graph_query(
     if not allowed:
         raise HTTPException(status_code=403, detail=reason or "Not authorized to execute graph queries")
     
-    # Execute graph query via PuppyGraph
+    # Execute graph query via PuppyGraph once admitted (429 when the query queue is full)
+    admission = get_admission_controller()
+    ticket = await admission.acquire_async(str(current_user.id), user_roles)
     try:
         puppygraph = get_puppygraph_client()
         import time
         start_time = time.time()
         
         if query_type == "cypher":
-            result = puppygraph.execute_cypher(query)
+            result = await run_in_threadpool(puppygraph.execute_cypher, query)
         else:  # gremlin
-            result = puppygraph.execute_gremlin(query)
+            result = await run_in_threadpool(puppygraph.execute_gremlin, query)
         
         execution_time = (time.time() - start_time) * 1000
         
@@ -1045,28 +1116,19 @@ def execute_graph_query(
     except Exception as e:
         logger.error(f"Graph query failed: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Graph query failed: {str(e)}")
+    finally:
+        admission.release(ticket)
 
-# SQL Query endpoint: Execute queries with Cerbos authorization
-@API.post("/query")
-def execute_sql_query(query_data: dict, current_user: User = Depends(get_current_user), db: Session = Depends(get_db), query_db: Session = Depends(get_query_db)):
-    """Execute SQL query through Trino with Cerbos authorization."""
-    import json
-    
-    print(f"DEBUG: /query endpoint called with data: {query_data}")
-    print(f"DEBUG: Current user: {current_user.email}, ID: {current_user.id}")
-    
-    # Extract query from request
-    if "query" not in query_data:
-        print("DEBUG: Missing query field in request")
-        raise HTTPException(status_code=400, detail="Query field is required")
-    
-    sql_query = query_data["query"]
-    catalog = query_data.get("catalog", "postgres")
-    schema = query_data.get("schema", "public")
-    
-    print(f"DEBUG: SQL Query: {sql_query}")
-    print(f"DEBUG: Catalog: {catalog}, Schema: {schema}")
+def _authorize_sql_query(sql_query: str, current_user: User, db: Session) -> List[str]:
+    """
+    Check a SQL query with Cerbos and log the decision.
     
+    Returns:
+        The user's roles
+        
+    Raises:
+        HTTPException: 403 if the query is denied, 503 if Cerbos is unavailable
+    """
     # Get user roles
     user_roles = get_user_roles(db, current_user.id)
     print(f"DEBUG: User roles: {user_roles}")
@@ -1117,20 +1179,165 @@ def execute_sql_query(query_data: dict, current_user: User = Depends(get_current
             detail=f"Authorization service unavailable: {str(e)}"
         )
     
-    # Execute the query through Trino using the official Python client
+    return user_roles
+
+
+# SQL Query endpoint: Execute queries with Cerbos authorization
+@API.post("/query")
+async def execute_sql_query(query_data: dict, request: Request, mode: str = "sync", current_user: User = Depends(get_current_user), db: Session = Depends(get_db), query_db: Session = Depends(get_query_db)):
+    """
+    Execute SQL query through Trino with Cerbos authorization.
+    
+    With mode=async the query is authorized, queued for a background worker and
+    its query_id returned immediately; poll /query/{query_id}/results-immediate
+    for status, progress and results.
+    
+    Results are bounded by the caller's role-based row and byte budget; a result
+    cut short by it is returned with truncated: true and the counts under "governor".
+    
+    Synchronous results are returned as an Arrow IPC stream or a Parquet file when
+    the Accept header asks for application/vnd.apache.arrow.stream or
+    application/vnd.apache.parquet (errors are still JSON).
+    """
+    response, plan = await run_in_threadpool(
+        _prepare_sql_query, query_data, request.headers.get("accept"), mode, current_user, db, query_db
+    )
+    if plan is None:
+        return response
+    
+    # Wait for an admission slot on the event loop, not in a worker thread
+    # (fair share across users; 429 when the queue is full)
+    admission = get_admission_controller()
+    ticket = await admission.acquire_async(str(current_user.id), plan["user_roles"])
+    try:
+        return await run_in_threadpool(_run_sql_query, plan, current_user, query_db)
+    finally:
+        admission.release(ticket)
+
+
+def _prepare_sql_query(query_data: dict, accept: Optional[str], mode: str, current_user: User, db: Session, query_db: Session) -> tuple:
+    """
+    Validate and authorize a /query request; queue async queries and answer result cache hits.
+    
+    Returns:
+        Tuple of (response, plan): plan is None when the response is final, otherwise
+        it holds what _run_sql_query needs once an admission slot is held
+    """
+    import json
+    from arrow_results import negotiate_format, ARROW_AVAILABLE
+    
+    if mode not in ("sync", "async"):
+        raise HTTPException(status_code=400, detail="mode must be 'sync' or 'async'")
+    result_format = negotiate_format(accept) if mode == "sync" else "json"
+    if result_format != "json" and not ARROW_AVAILABLE:
+        raise HTTPException(status_code=406, detail="Arrow and Parquet output require pyarrow on the server")
+    
+    print(f"DEBUG: /query endpoint called with data: {query_data}")
+    print(f"DEBUG: Current user: {current_user.email}, ID: {current_user.id}")
+    
+    # Extract query from request
+    if "query" not in query_data:
+        print("DEBUG: Missing query field in request")
+        raise HTTPException(status_code=400, detail="Query field is required")
+    
+    sql_query = query_data["query"]
+    catalog = query_data.get("catalog", "postgres")
+    schema = query_data.get("schema", "public")
+    
+    print(f"DEBUG: SQL Query: {sql_query}")
+    print(f"DEBUG: Catalog: {catalog}, Schema: {schema}")
+    
+    # Check authorization with Cerbos
+    user_roles = _authorize_sql_query(sql_query, current_user, db)
+    
+    if mode == "async":
+        from datetime import datetime
+        import uuid
+        from query_executor import get_query_executor
+        from result_governor import budget_for_roles
+        
+        # Background queries wait in the admission queue; refuse them up front if it is full
+        get_admission_controller().check_capacity()
+        query_id = str(uuid.uuid4())
+        new_query = Query(
+            id=query_id,
+            user_id=current_user.id,
+            user_email=current_user.email,
+            sql_query=sql_query,
+            catalog=catalog,
+            schema=schema,
+            status="QUEUED",
+            submitted_at=datetime.now(),
+            progress=0
+        )
+        query_db.add(new_query)
+        query_db.commit()
+        
+        try:
+            get_query_executor().submit(
+                query_id, current_user.email.split("@")[0], catalog, schema, sql_query,
+                budget=budget_for_roles(user_roles), admission_user=str(current_user.id), roles=user_roles
+            )
+        except AdmissionRejected:
+            # The queue filled up since the capacity check; don't leave a query that never runs
+            query_db.delete(new_query)
+            query_db.commit()
+            raise
+        print(f"DEBUG: Query {query_id} queued for background execution")
+        return {
+            "success": True,
+            "query_id": query_id,
+            "status": "QUEUED",
+            "next_uri": None,
+            "info_uri": None,
+            "message": "Query queued; poll /query/{query_id}/results-immediate for status and results"
+        }, None
+    
+    # Identical authorized queries are answered from the result cache
+    from result_cache import get_result_cache
+    
+    username = current_user.email.split("@")[0]
+    cache_lookup = get_result_cache().lookup(sql_query, catalog, schema, user_roles, username)
+    if cache_lookup and cache_lookup.entry:
+        print(f"DEBUG: Result cache hit for query: {sql_query}")
+        return _encode_query_response(_cached_result_response(cache_lookup.entry, current_user), result_format), None
+    
+    return None, {
+        "sql_query": sql_query,
+        "catalog": catalog,
+        "schema": schema,
+        "user_roles": user_roles,
+        "username": username,
+        "cache_lookup": cache_lookup,
+        "result_format": result_format
+    }
+
+
+def _run_sql_query(plan: dict, current_user: User, query_db: Session):
+    """Execute a prepared /query request in Trino and store the results; the caller holds the admission slot."""
+    from result_cache import get_result_cache
     from trino_client import get_trino_client
+    from result_governor import governor_for_roles
+    from query_stats import record_execution_stats
     
+    sql_query, catalog, schema = plan["sql_query"], plan["catalog"], plan["schema"]
+    user_roles, username = plan["user_roles"], plan["username"]
+    cache_lookup, result_format = plan["cache_lookup"], plan["result_format"]
     try:
         # Get Trino client and execute query
         trino_client = get_trino_client()
-        username = current_user.email.split("@")[0]
         
         print(f"DEBUG: Executing query with Trino client for user: {username}")
         print(f"DEBUG: Query: {sql_query}")
         print(f"DEBUG: Catalog: {catalog}, Schema: {schema}")
         
-        # Execute query with automatic result handling
-        with trino_client.execute_query(username, catalog, schema, sql_query) as (success, data, columns, error):
+        # Execute query with automatic result handling, bounded by the caller's result budget
+        governor = governor_for_roles(user_roles)
+        execution = {}
+        started = time.monotonic()
+        with trino_client.execute_query(
+            username, catalog, schema, sql_query, governor=governor, on_stats=execution.update
+        ) as (success, data, columns, error):
             if success:
                 # Query executed successfully - store results immediately
                 from datetime import datetime
@@ -1150,42 +1357,25 @@ def execute_sql_query(query_data: dict, current_user: User = Depends(get_current
                     status="FINISHED",
                     submitted_at=datetime.now(),
                     completed_at=datetime.now(),
-                    trino_query_id=query_id,
+                    rows_returned=len(data),
+                    persist_status="PENDING" if data and columns else "PERSISTED",
+                    trino_query_id=execution.get("trino_query_id") or query_id,
                     trino_next_uri=None,  # Not needed with client approach
                     trino_info_uri=None    # Not needed with client approach
                 )
                 query_db.add(new_query)
+                record_execution_stats(query_db, new_query, execution.get("trino_stats"), (time.monotonic() - started) * 1000)
                 query_db.commit()
                 
-                # Store the results immediately
+                # Results are written behind the response (persist_status tracks it)
                 if data and columns:
-                    from query_models import QueryColumn, QueryResult
-                    
-                    # Store columns
-                    for i, col in enumerate(columns):
-                        column = QueryColumn(
-                            query_id=new_query.id,
-                            column_name=col.get("name", f"col_{i}"),
-                            column_type=col.get("type", "unknown"),
-                            column_position=i
-                        )
-                        query_db.add(column)
-                    
-                    # Store results
-                    for row_num, row in enumerate(data):
-                        for col_pos, cell_value in enumerate(row):
-                            result = QueryResult(
-                                query_id=new_query.id,
-                                row_number=row_num,
-                                column_position=col_pos,
-                                cell_value=str(cell_value) if cell_value is not None else None
-                            )
-                            query_db.add(result)
-                    
-                    query_db.commit()
-                    print(f"DEBUG: Results stored immediately for query {new_query.id}")
+                    get_result_persister().submit(new_query.id, columns, data)
                 
-                return {
+                # Truncated results depend on the budget, not just the query; don't share them
+                if cache_lookup and not governor.truncated:
+                    get_result_cache().store(cache_lookup, columns, data, new_query.id, current_user.id)
+                
+                return _encode_query_response({
                     "success": True,
                     "query_id": new_query.id,
                     "status": "FINISHED",
@@ -1193,8 +1383,10 @@ def execute_sql_query(query_data: dict, current_user: User = Depends(get_current
                     "info_uri": None,   # Not needed with client approach
                     "message": "Query executed successfully using Trino client",
                     "data": data,
-                    "columns": columns
-                }
+                    "columns": columns,
+                    "truncated": governor.truncated,
+                    "governor": governor.to_dict()
+                }, result_format)
             else:
                 # Query failed
                 return {
@@ -1212,6 +1404,236 @@ def execute_sql_query(query_data: dict, current_user: User = Depends(get_current
         }
 
 
+def _cached_result_response(entry, current_user: User) -> dict:
+    """Build the /query response for a result cache hit (nothing is run or stored)."""
+    return {
+        "success": True,
+        # Another user's query id would not resolve for this user, so only the owner gets it
+        "query_id": entry.query_id if entry.user_id == current_user.id else None,
+        "status": "FINISHED",
+        "next_uri": None,
+        "info_uri": None,
+        "message": "Query results served from cache",
+        "cached": True,
+        "data": entry.data,
+        "columns": entry.columns
+    }
+
+
+def _encode_query_response(response: dict, result_format: str):
+    """Return a successful /query response as JSON, or as Arrow IPC / Parquet with the metadata in headers."""
+    if result_format == "json":
+        return response
+    from arrow_results import encode_arrow_stream, encode_parquet, ARROW_STREAM_MEDIA_TYPE, PARQUET_MEDIA_TYPE
+    
+    query_id = response.get("query_id") or ""
+    metadata = {
+        "query_id": query_id,
+        "truncated": "true" if response.get("truncated") else "false",
+        "cached": "true" if response.get("cached") else "false"
+    }
+    headers = {"X-Query-Id": query_id, "X-Result-Truncated": metadata["truncated"], "X-Result-Cached": metadata["cached"]}
+    if result_format == "parquet":
+        headers["Content-Disposition"] = f'attachment; filename="query-{query_id or "result"}.parquet"'
+        body = encode_parquet(response["columns"], response["data"], metadata)
+        return Response(content=body, media_type=PARQUET_MEDIA_TYPE, headers=headers)
+    body = encode_arrow_stream(response["columns"], response["data"], metadata)
+    return Response(content=body, media_type=ARROW_STREAM_MEDIA_TYPE, headers=headers)
+
+
+def _ndjson_stream(events):
+    """Encode stream_query events as newline-delimited JSON, one object per event."""
+    import json
+    
+    for event, payload in events:
+        if event == "columns":
+            message = {"type": "columns", "columns": payload}
+        elif event == "rows":
+            message = {"type": "rows", "rows": payload}
+        elif event == "stats":
+            message = {"type": "stats", **payload}
+        elif event == "cancelled":
+            message = {"type": "error", "error": payload, "code": "cancelled"}
+        else:
+            message = {"type": "error", "error": payload, "code": "trino_error"}
+        yield json.dumps(message, default=str) + "\n"
+
+
+def _json_array_stream(events):
+    """Encode stream_query events as one JSON document whose data array is written in chunks."""
+    import json
+    
+    started = False
+    first_row = True
+    for event, payload in events:
+        if event == "columns":
+            started = True
+            yield '{"columns": ' + json.dumps(payload, default=str) + ', "data": ['
+        elif event == "rows":
+            chunk = ",".join(json.dumps(row, default=str) for row in payload)
+            yield chunk if first_row else "," + chunk
+            first_row = False
+        elif event == "stats":
+            yield '], "stats": ' + json.dumps(payload, default=str) + ', "success": true}'
+        else:
+            error = json.dumps(payload, default=str)
+            code = '"cancelled"' if event == "cancelled" else '"trino_error"'
+            if started:
+                # Rows already sent cannot be retracted; close the array and report the error
+                yield '], "success": false, "error": ' + error + ', "code": ' + code + '}'
+            else:
+                yield '{"success": false, "error": ' + error + ', "code": ' + code + '}'
+
+
+def _finish_stream(query_id: str, ticket=None):
+    """Forget a streaming query and give back its admission slot; safe to call twice."""
+    _streaming_queries.pop(query_id, None)
+    if ticket is not None:
+        get_admission_controller().release(ticket)
+
+
+async def _cancel_on_disconnect(chunks, query_id: str, ticket=None):
+    """Relay a streaming body; if the client goes away mid-stream, cancel the Trino query."""
+    import anyio
+    from starlette.concurrency import iterate_in_threadpool
+    from trino_client import get_trino_client
+    
+    completed = False
+    try:
+        async for chunk in iterate_in_threadpool(chunks):
+            yield chunk
+        completed = True
+    finally:
+        # The admission slot is held for as long as the stream runs
+        _finish_stream(query_id, ticket)
+        if not completed:
+            logger.info(f"Client disconnected from streaming query {query_id}, cancelling it")
+            with anyio.CancelScope(shield=True):
+                await run_in_threadpool(get_trino_client().cancel_query, query_id)
+
+
+@API.post("/query/stream")
+async def stream_sql_query(query_data: dict, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+    """
+    Execute a SQL query with Cerbos authorization and stream the results.
+    
+    Rows are fetched from Trino in batches and written to the response as they
+    arrive, so backend memory stays flat regardless of result size. Streamed
+    results are not stored in the query results database. The X-Query-Id response
+    header can be passed to DELETE /query/{query_id}/execution to cancel the query;
+    it is also cancelled if the client disconnects.
+    
+    Request fields: query, catalog, schema, format ("ndjson" (default), "json" or
+    "arrow" for an Arrow IPC stream with one record batch per fetch) and
+    batch_size (rows per fetch). The stream stops at the caller's result budget;
+    the final stats report the truncation under "governor".
+    """
+    if "query" not in query_data:
+        raise HTTPException(status_code=400, detail="Query field is required")
+    
+    sql_query = query_data["query"]
+    catalog = query_data.get("catalog", "postgres")
+    schema = query_data.get("schema", "public")
+    output_format = query_data.get("format", "ndjson")
+    if output_format not in ("ndjson", "json", "arrow"):
+        raise HTTPException(status_code=400, detail="format must be 'ndjson', 'json' or 'arrow'")
+    if output_format == "arrow":
+        from arrow_results import ARROW_AVAILABLE
+        if not ARROW_AVAILABLE:
+            raise HTTPException(status_code=406, detail="Arrow output requires pyarrow on the server")
+    try:
+        batch_size = int(query_data["batch_size"]) if query_data.get("batch_size") else None
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="batch_size must be an integer")
+    
+    # Authorization happens before the response starts, so denials are plain 403s
+    user_roles = await run_in_threadpool(_authorize_sql_query, sql_query, current_user, db)
+    
+    from trino_client import get_trino_client
+    from result_governor import governor_for_roles
+    import uuid
+    
+    query_id = str(uuid.uuid4())
+    username = current_user.email.split("@")[0]
+    # Queued on the event loop, so waiting queries don't hold threadpool workers
+    ticket = await get_admission_controller().acquire_async(str(current_user.id), user_roles, label=query_id)
+    _streaming_queries[query_id] = current_user.id
+    try:
+        events = get_trino_client().stream_query(
+            username, catalog, schema, sql_query, batch_size, query_id=query_id, governor=governor_for_roles(user_roles)
+        )
+        if output_format == "json":
+            chunks, media_type = _json_array_stream(events), "application/json"
+        elif output_format == "arrow":
+            from arrow_results import arrow_stream, ARROW_STREAM_MEDIA_TYPE
+            
+            chunks, media_type = arrow_stream(events), ARROW_STREAM_MEDIA_TYPE
+        else:
+            chunks, media_type = _ndjson_stream(events), "application/x-ndjson"
+    except BaseException:
+        _finish_stream(query_id, ticket)
+        raise
+    # The body generator releases the slot when it ends, but it never starts if the
+    # client disconnects before the first chunk; the background task covers that
+    return StreamingResponse(
+        _cancel_on_disconnect(chunks, query_id, ticket), media_type=media_type,
+        headers={"X-Query-Id": query_id}, background=BackgroundTask(_finish_stream, query_id, ticket)
+    )
+
+
+@API.delete("/query/{query_id}/execution")
+def cancel_query_execution(query_id: str, current_user: User = Depends(get_current_user), query_db: Session = Depends(get_query_db)):
+    """
+    Cancel a queued or running query.
+    
+    Async queries are marked CANCELLED and stopped in Trino (through the running
+    cursor, or through Trino's REST API if another backend process runs the query).
+    Streaming queries are identified by their X-Query-Id header.
+    """
+    from datetime import datetime
+    from trino_client import get_trino_client
+    
+    trino_client = get_trino_client()
+    stored_query = query_db.query(Query).filter(
+        Query.id == query_id,
+        Query.user_id == current_user.id
+    ).first()
+    
+    if stored_query is None:
+        if _streaming_queries.get(query_id) == current_user.id and trino_client.cancel_query(query_id):
+            return {"success": True, "query_id": query_id, "status": "CANCELLED", "message": "Streaming query cancelled"}
+        raise HTTPException(status_code=404, detail="Query not found or access denied")
+    
+    if stored_query.status not in ("QUEUED", "RUNNING"):
+        raise HTTPException(status_code=409, detail=f"Query is not running (status: {stored_query.status})")
+    
+    # Mark first, so a worker that has not started yet skips the query
+    was_running = stored_query.status == "RUNNING"
+    stored_query.status = "CANCELLED"
+    stored_query.error_message = "Cancelled by user"
+    stored_query.completed_at = datetime.now()
+    query_db.commit()
+    if not was_running:
+        # Free its place in the admission queue (queue length and the user's fair share)
+        get_admission_controller().discard_queued(query_id)
+    
+    stopped = trino_client.cancel_query(query_id)
+    if not stopped and was_running:
+        stopped = trino_client.cancel_trino_query(
+            current_user.email.split("@")[0],
+            trino_query_id=stored_query.trino_query_id,
+            next_uri=stored_query.trino_next_uri
+        )
+    logger.info(f"Query {query_id} cancelled by {current_user.email} (trino cancel sent: {stopped})")
+    
+    return {
+        "success": True,
+        "query_id": query_id,
+        "status": "CANCELLED",
+        "message": "Query cancelled"
+    }
+
+
 def _get_results_from_uri_with_session(uri: str, username: str, catalog: str, schema: str) -> dict:
     """Helper function to get results from a specific URI with proper Trino session management."""
     import requests
@@ -1268,28 +1690,9 @@ def _get_results_from_uri_with_session(uri: str, username: str, catalog: str, sc
 def _store_query_results(query: Query, trino_data: dict, query_db: Session):
     """Helper function to store query results in the database."""
     try:
-        # Store columns
+        # Store columns and results
         if "columns" in trino_data:
-            for i, col in enumerate(trino_data["columns"]):
-                column = QueryColumn(
-                    query_id=query.id,
-                    column_name=col.get("name", f"col_{i}"),
-                    column_type=col.get("type", "unknown"),
-                    column_position=i
-                )
-                query_db.add(column)
-        
-        # Store results
-        if "data" in trino_data:
-            for row_num, row in enumerate(trino_data["data"]):
-                for col_pos, cell_value in enumerate(row):
-                    result = QueryResult(
-                        query_id=query.id,
-                        row_number=row_num,
-                        column_position=col_pos,
-                        cell_value=str(cell_value) if cell_value is not None else None
-                    )
-                    query_db.add(result)
+            write_results(query_db, query.id, trino_data["columns"], trino_data.get("data") or [])
         
         # Store stats
         if "stats" in trino_data:
@@ -1339,9 +1742,40 @@ def list_user_queries(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to fetch queries: {str(e)}")
 
+def _stored_result_page(query_db: Session, stored_query: Query, page: Optional[tuple]):
+    """
+    Read a stored result: all rows, or only the row window of a page (see result_store.page_bounds).
+    
+    Returns:
+        (columns, data, pagination); pagination is None for the whole result
+    """
+    columns = read_columns(query_db, stored_query.id)
+    if page is None:
+        return columns, read_rows(query_db, stored_query.id), None
+    offset, limit = page
+    data = read_rows(query_db, stored_query.id, offset, limit)
+    # The total comes from chunk metadata, not from counting stored rows
+    return columns, data, page_info(stored_query.id, offset, limit, len(data), stored_row_count(query_db, stored_query.id))
+
 @API.get("/query/{query_id}/results")
-def get_query_results(query_id: str, current_user: User = Depends(get_current_user)):
-    """Get results for a submitted query from stored results."""
+def get_query_results(
+    query_id: str,
+    offset: Optional[int] = None,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Get results for a submitted query from stored results.
+    
+    Without offset/limit/cursor the whole result is returned; with them only
+    that row window is read, and the response's pagination holds the total row
+    count and the cursors of the neighbouring pages.
+    """
+    try:
+        page = page_bounds(query_id, offset, limit, cursor)
+    except ValueError as e:
+        return {"success": False, "error": str(e), "code": "invalid_page"}
     
     # Use synchronous database session
     query_db = get_query_db_sync()
@@ -1365,36 +1799,14 @@ def get_query_results(query_id: str, current_user: User = Depends(get_current_us
         print(f"DEBUG: Query found: {stored_query.id}, status={stored_query.status}")
         
         # Get stored columns and results
-        columns = query_db.query(QueryColumn).filter(
-            QueryColumn.query_id == query_id
-        ).order_by(QueryColumn.column_position).all()
-        
-        results = query_db.query(QueryResult).filter(
-            QueryResult.query_id == query_id
-        ).order_by(QueryResult.row_number, QueryResult.column_position).all()
+        columns, data, pagination = _stored_result_page(query_db, stored_query, page)
         
         # Get stored stats
         stats = query_db.query(QueryStat).filter(
             QueryStat.query_id == query_id
         ).all()
         
-        # Reconstruct data matrix
-        if columns and results:
-            # Group results by row
-            data_matrix = {}
-            for result in results:
-                if result.row_number not in data_matrix:
-                    data_matrix[result.row_number] = {}
-                data_matrix[result.row_number][result.column_position] = result.cell_value
-            
-            # Convert to list format
-            data = []
-            for row_num in sorted(data_matrix.keys()):
-                row_data = []
-                for col_pos in range(len(columns)):
-                    row_data.append(data_matrix[row_num].get(col_pos, None))
-                data.append(row_data)
-            
+        if columns and (data or pagination):
             # Convert stats to dict
             stats_dict = {stat.stat_name: stat.stat_value for stat in stats}
             
@@ -1402,10 +1814,21 @@ def get_query_results(query_id: str, current_user: User = Depends(get_current_us
                 "success": True,
                 "status": stored_query.status,
                 "data": data,
-                "columns": [{"name": col.column_name, "type": col.column_type} for col in columns],
+                "columns": columns,
                 "stats": stats_dict,
+                "pagination": pagination,
                 "message": "Query results retrieved from storage"
             }
+        elif stored_query.persist_status == "PENDING":
+            return {
+                "success": True,
+                "status": stored_query.status,
+                "persist_status": "PENDING",
+                "data": [],
+                "columns": [],
+                "stats": {},
+                "message": "Query results are still being persisted"
+            }
         else:
             return {
                 "success": False,
@@ -1422,8 +1845,18 @@ def get_query_results(query_id: str, current_user: User = Depends(get_current_us
         }
 
 @API.get("/query/{query_id}/results-immediate")
-def get_query_results_immediate(query_id: str, current_user: User = Depends(get_current_user)):
-    """Get results immediately from stored database results (no HTTP API calls)."""
+def get_query_results_immediate(
+    query_id: str,
+    offset: Optional[int] = None,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    current_user: User = Depends(get_current_user)
+):
+    """Get results immediately from stored database results (no HTTP API calls); paged like /query/{id}/results."""
+    try:
+        page = page_bounds(query_id, offset, limit, cursor)
+    except ValueError as e:
+        return {"success": False, "error": str(e), "code": "invalid_page"}
     
     # Use synchronous database session
     query_db = get_query_db_sync()
@@ -1447,36 +1880,14 @@ def get_query_results_immediate(query_id: str, current_user: User = Depends(get_
         # Just return the current status and any available results
         if stored_query.status == "FINISHED":
             # Get stored columns and results
-            columns = query_db.query(QueryColumn).filter(
-                QueryColumn.query_id == query_id
-            ).order_by(QueryColumn.column_position).all()
-            
-            results = query_db.query(QueryResult).filter(
-                QueryResult.query_id == query_id
-            ).order_by(QueryResult.row_number, QueryResult.column_position).all()
+            columns, data, pagination = _stored_result_page(query_db, stored_query, page)
             
             # Get stored stats
             stats = query_db.query(QueryStat).filter(
                 QueryStat.query_id == query_id
             ).all()
             
-            # Reconstruct data matrix
-            if columns and results:
-                # Group results by row
-                data_matrix = {}
-                for result in results:
-                    if result.row_number not in data_matrix:
-                        data_matrix[result.row_number] = {}
-                    data_matrix[result.row_number][result.column_position] = result.cell_value
-                
-                # Convert to list format
-                data = []
-                for row_num in sorted(data_matrix.keys()):
-                    row_data = []
-                    for col_pos in range(len(columns)):
-                        row_data.append(data_matrix[row_num].get(col_pos, None))
-                    data.append(row_data)
-                
+            if columns and (data or pagination):
                 # Convert stats to dict
                 stats_dict = {stat.stat_name: stat.stat_value for stat in stats}
                 
@@ -1484,7 +1895,8 @@ def get_query_results_immediate(query_id: str, current_user: User = Depends(get_
                     "success": True,
                     "status": "FINISHED",
                     "data": data,
-                    "columns": [{"name": col.column_name, "type": col.column_type} for col in columns],
+                    "columns": columns,
+                    "pagination": pagination,
                     "stats": stats_dict,
                     "message": "Query results retrieved from storage (Trino client mode)"
                 }
@@ -1492,16 +1904,26 @@ def get_query_results_immediate(query_id: str, current_user: User = Depends(get_
                 return {
                     "success": True,
                     "status": "FINISHED",
+                    "persist_status": stored_query.persist_status,
                     "message": "Query completed but no results stored yet",
                     "data": [],
                     "columns": [],
                     "stats": {}
                 }
+        elif stored_query.status == "FAILED":
+            return {
+                "success": False,
+                "status": "FAILED",
+                "error": stored_query.error_message or "Query failed",
+                "code": "trino_error"
+            }
         else:
-            # Query not finished yet
+            # Query not finished yet; queued queries report their place in the admission queue
             return {
                 "success": True,
                 "status": stored_query.status,
+                "progress": stored_query.progress or 0,
+                "queue_position": get_admission_controller().position(query_id) if stored_query.status == "QUEUED" else None,
                 "message": f"Query is {stored_query.status.lower()}",
                 "data": [],
                 "columns": [],
@@ -1538,11 +1960,7 @@ def store_query_results(query_id: str, current_user: User = Depends(get_current_
         # Just verify the current status and return appropriate message
         if stored_query.status == "FINISHED":
             # Check if results are already stored
-            existing_results = query_db.query(QueryResult).filter(
-                QueryResult.query_id == query_id
-            ).first()
-            
-            if existing_results:
+            if has_results(query_db, query_id):
                 return {
                     "success": True,
                     "message": "Query results already stored (Trino client mode)",
@@ -1564,37 +1982,104 @@ def store_query_results(query_id: str, current_user: User = Depends(get_current_
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to check query results: {str(e)}")
 
+@API.get("/query/templates")
+def list_query_templates(current_user: User = Depends(get_current_user)):
+    """List the registered query templates."""
+    from query_templates import get_template_registry
+    
+    registry = get_template_registry()
+    return {
+        "templates": [template.to_dict() for template in registry.list()],
+        "stats": registry.stats()
+    }
+
+@API.post("/query/templates")
+def register_query_template(template_data: dict, current_user: User = Depends(get_current_admin_user)):
+    """Register (or replace) a query template that clients can execute by template_id."""
+    from query_templates import get_template_registry, TemplateError
+    
+    if not template_data.get("template_id") or not template_data.get("template"):
+        raise HTTPException(status_code=400, detail="template_id and template fields are required")
+    try:
+        template = get_template_registry().register(
+            template_data["template_id"],
+            template_data["template"],
+            catalog=template_data.get("catalog", "postgres"),
+            schema=template_data.get("schema", "public"),
+            description=template_data.get("description")
+        )
+    except TemplateError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    logger.info(f"Query template {template.template_id} registered by {current_user.email}")
+    return template.to_dict()
+
+@API.delete("/query/templates/{template_id}")
+def delete_query_template(template_id: str, current_user: User = Depends(get_current_admin_user)):
+    """Remove a registered query template."""
+    from query_templates import get_template_registry
+    
+    if not get_template_registry().unregister(template_id):
+        raise HTTPException(status_code=404, detail="Template not found")
+    return {"message": f"Template {template_id} deleted"}
+
 @API.post("/query/template")
-def execute_query_template(template_data: dict, current_user: User = Depends(get_current_user), db: Session = Depends(get_db), query_db: Session = Depends(get_query_db)):
-    """Execute a parameterized query template with validation and Cerbos authorization."""
-    import re
+async def execute_query_template(template_data: dict, current_user: User = Depends(get_current_user), db: Session = Depends(get_db), query_db: Session = Depends(get_query_db)):
+    """
+    Execute a parameterized query template with validation and Cerbos authorization.
     
-    # Extract template and parameters
-    if "template" not in template_data:
-        raise HTTPException(status_code=400, detail="Template field is required")
+    The template is either a registered one (template_id) or sent inline (template).
+    Authorization is cached per template, role set and policy version.
+    """
+    response, plan = await run_in_threadpool(_prepare_query_template, template_data, current_user, db)
+    if plan is None:
+        return response
     
-    template = template_data["template"]
-    parameters = template_data.get("parameters", {})
+    # Wait for an admission slot on the event loop, not in a worker thread
+    admission = get_admission_controller()
+    ticket = await admission.acquire_async(str(current_user.id), plan["user_roles"])
+    try:
+        return await run_in_threadpool(_run_query_template, plan, current_user, query_db)
+    finally:
+        admission.release(ticket)
+
+
+def _prepare_query_template(template_data: dict, current_user: User, db: Session) -> tuple:
+    """
+    Render and authorize a /query/template request; answer result cache hits.
     
-    # Validate template format (prevent SQL injection)
-    if not re.match(r'^[A-Za-z\s\*\(\)\.,\-\+\/\%\<\>\=\!\?\_\[\]\{\}\|\&\^~`@#$]+$', template):
-        raise HTTPException(status_code=400, detail="Invalid template format")
+    Returns:
+        Tuple of (response, plan): plan is None when the response is final, otherwise
+        it holds what _run_query_template needs once an admission slot is held
+    """
+    from query_templates import get_template_registry, TemplateError
+    from cerbos_client import get_policy_version
     
-    # Validate parameters (only allow alphanumeric and basic punctuation)
-    for key, value in parameters.items():
-        if not re.match(r'^[A-Za-z0-9\s\.,\-\_\?]+$', str(value)):
-            raise HTTPException(status_code=400, detail=f"Invalid parameter value for {key}")
+    registry = get_template_registry()
+    parameters = template_data.get("parameters", {})
     
-    # Build the final query by replacing parameters
-    sql_query = template
-    for key, value in parameters.items():
-        placeholder = f"{{{key}}}"
-        if placeholder in sql_query:
-            sql_query = sql_query.replace(placeholder, str(value))
+    # Resolve the template (validated once, when registered or first seen)
+    try:
+        if template_data.get("template_id"):
+            compiled = registry.get(template_data["template_id"])
+            if compiled is None:
+                raise HTTPException(status_code=404, detail="Template not found")
+        elif "template" in template_data:
+            compiled = registry.adhoc(
+                template_data["template"],
+                catalog=template_data.get("catalog", "postgres"),
+                schema=template_data.get("schema", "public")
+            )
+        else:
+            raise HTTPException(status_code=400, detail="Template field is required")
+        
+        # Build the final query by replacing parameters (values are validated)
+        sql_query = compiled.render(parameters)
+    except TemplateError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
-    # Extract catalog and schema from template or use defaults
-    catalog = template_data.get("catalog", "postgres")
-    schema = template_data.get("schema", "public")
+    template = compiled.sql
+    catalog = compiled.catalog
+    schema = compiled.schema
     
     # Get user roles
     user_roles = get_user_roles(db, current_user.id)
@@ -1602,14 +2087,22 @@ def execute_query_template(template_data: dict, current_user: User = Depends(get
     # Check authorization with Cerbos
     try:
         cerbos_client = get_cerbos_client()
-        allowed, reason, policy = cerbos_client.check_query_permission(
-            user_id=str(current_user.id),
-            user_email=current_user.email,
-            user_roles=user_roles,
-            method="POST",
-            path="/query/template",
-            query_body=sql_query
+        allowed, reason, policy, cached = registry.authorize(
+            compiled,
+            sql_query,
+            user_roles,
+            get_policy_version(),
+            lambda query_body: cerbos_client.check_query_permission(
+                user_id=str(current_user.id),
+                user_email=current_user.email,
+                user_roles=user_roles,
+                method="POST",
+                path="/query/template",
+                query_body=query_body
+            )
         )
+        if cached:
+            logger.debug(f"Template authorization cache hit for {compiled.template_id}")
         
         # Log authorization decision (both allowed and denied)
         log_authorization_decision(
@@ -1638,16 +2131,52 @@ def execute_query_template(template_data: dict, current_user: User = Depends(get
             detail=f"Authorization service unavailable: {str(e)}"
         )
     
-    # Execute the query through Trino using the official Python client
+    from result_cache import get_result_cache
+    
+    username = current_user.email.split("@")[0]
+    cache_lookup = get_result_cache().lookup(sql_query, catalog, schema, user_roles, username)
+    if cache_lookup and cache_lookup.entry:
+        logger.debug(f"Result cache hit for template {compiled.template_id}")
+        return {
+            **_cached_result_response(cache_lookup.entry, current_user),
+            "template_used": template,
+            "parameters_applied": parameters,
+            "final_query": sql_query
+        }, None
+    
+    return None, {
+        "template": template,
+        "parameters": parameters,
+        "sql_query": sql_query,
+        "catalog": catalog,
+        "schema": schema,
+        "user_roles": user_roles,
+        "username": username,
+        "cache_lookup": cache_lookup
+    }
+
+
+def _run_query_template(plan: dict, current_user: User, query_db: Session) -> dict:
+    """Execute a prepared /query/template request in Trino and store the results; the caller holds the admission slot."""
+    from result_cache import get_result_cache
     from trino_client import get_trino_client
+    from result_governor import governor_for_roles
+    from query_stats import record_execution_stats
     
+    template, parameters, sql_query = plan["template"], plan["parameters"], plan["sql_query"]
+    catalog, schema = plan["catalog"], plan["schema"]
+    user_roles, username, cache_lookup = plan["user_roles"], plan["username"], plan["cache_lookup"]
     try:
         # Get Trino client and execute query
         trino_client = get_trino_client()
-        username = current_user.email.split("@")[0]
         
-        # Execute query with automatic result handling
-        with trino_client.execute_query(username, catalog, schema, sql_query) as (success, data, columns, error):
+        # Execute query with automatic result handling, bounded by the caller's result budget
+        governor = governor_for_roles(user_roles)
+        execution = {}
+        started = time.monotonic()
+        with trino_client.execute_query(
+            username, catalog, schema, sql_query, governor=governor, on_stats=execution.update
+        ) as (success, data, columns, error):
             if success:
                 # Query executed successfully - store results immediately
                 from datetime import datetime
@@ -1658,47 +2187,32 @@ def execute_query_template(template_data: dict, current_user: User = Depends(get
                 
                 # Store the query and results in the database
                 new_query = Query(
+                    id=query_id,
                     user_id=current_user.id,
+                    user_email=current_user.email,
                     sql_query=sql_query,
                     catalog=catalog,
                     schema=schema,
                     status="FINISHED",
                     submitted_at=datetime.now(),
                     completed_at=datetime.now(),
-                    trino_query_id=query_id,
+                    rows_returned=len(data),
+                    persist_status="PENDING" if data and columns else "PERSISTED",
+                    trino_query_id=execution.get("trino_query_id") or query_id,
                     trino_next_uri=None,  # Not needed with client approach
                     trino_info_uri=None    # Not needed with client approach
                 )
                 query_db.add(new_query)
+                record_execution_stats(query_db, new_query, execution.get("trino_stats"), (time.monotonic() - started) * 1000)
                 query_db.commit()
                 
-                # Store the results immediately
+                # Results are written behind the response (persist_status tracks it)
                 if data and columns:
-                    from query_models import QueryColumn, QueryResult
-                    
-                    # Store columns
-                    for i, col in enumerate(columns):
-                        column = QueryColumn(
-                            query_id=new_query.id,
-                            column_name=col.get("name", f"col_{i}"),
-                            column_type=col.get("type", "unknown"),
-                            column_position=i
-                        )
-                        query_db.add(column)
-                    
-                    # Store results
-                    for row_num, row in enumerate(data):
-                        for col_pos, cell_value in enumerate(row):
-                            result = QueryResult(
-                                query_id=new_query.id,
-                                row_number=row_num,
-                                column_position=col_pos,
-                                cell_value=str(cell_value) if cell_value is not None else None
-                            )
-                            query_db.add(result)
-                    
-                    query_db.commit()
-                    logger.info(f"Results stored immediately for query {new_query.id}")
+                    get_result_persister().submit(new_query.id, columns, data)
+                
+                # Truncated results depend on the budget, not just the query; don't share them
+                if cache_lookup and not governor.truncated:
+                    get_result_cache().store(cache_lookup, columns, data, new_query.id, current_user.id)
                 
                 return {
                     "success": True,
@@ -1711,7 +2225,9 @@ def execute_query_template(template_data: dict, current_user: User = Depends(get
                     "final_query": sql_query,
                     "message": "Query executed successfully using Trino client",
                     "data": data,
-                    "columns": columns
+                    "columns": columns,
+                    "truncated": governor.truncated,
+                    "governor": governor.to_dict()
                 }
             else:
                 # Query failed
@@ -1854,6 +2370,8 @@ def create_cerbos_policy(policy_data: dict, current_user: User = Depends(get_cur
         
         # Note: In production, you'd want to trigger Cerbos to reload policies
         # For now, Cerbos watches the directory, so it should auto-reload
+        # Cached decisions were computed against the old policies, so drop them
+        notify_policy_change()
         
         return {
             "path": policy_path,
@@ -1898,6 +2416,7 @@ def update_cerbos_policy(policy_path: str, policy_data: dict, current_user: User
     try:
         with open(full_path, 'w') as f:
             f.write(content)
+        notify_policy_change()
         
         return {
             "path": policy_path,
@@ -1930,6 +2449,7 @@ def delete_cerbos_policy(policy_path: str, current_user: User = Depends(get_curr
     
     try:
         os.remove(full_path)
+        notify_policy_change()
         return {
             "path": policy_path,
             "message": "Policy deleted successfully",
@@ -1969,6 +2489,179 @@ def validate_cerbos_policy(policy_data: dict, current_user: User = Depends(get_c
         }
 
 
+@API.get("/cerbos/cache/stats")
+def get_cerbos_cache_stats(current_user: User = Depends(get_current_admin_user)):
+    """Get hit/miss statistics for the Cerbos decision cache."""
+    try:
+        return get_cerbos_client().cache_stats()
+    except Exception as e:
+        raise HTTPException(status_code=503, detail=f"Cerbos client unavailable: {str(e)}")
+
+
+@API.get("/cerbos/client/stats")
+def get_cerbos_client_stats(current_user: User = Depends(get_current_admin_user)):
+    """Get circuit breaker state and call latency percentiles for Cerbos calls."""
+    try:
+        return resilience_stats()
+    except Exception as e:
+        raise HTTPException(status_code=503, detail=f"Cerbos client unavailable: {str(e)}")
+
+
+@API.get("/trino/pool/stats")
+def get_trino_pool_stats(current_user: User = Depends(get_current_admin_user)):
+    """Get Trino connection pool size, hit, wait and eviction counters."""
+    from trino_client import get_trino_client
+    
+    return get_trino_client().pool_stats()
+
+
+@API.get("/query-stats/aggregates")
+def get_query_stats_aggregates(
+    group_by: str = "user",
+    since_hours: Optional[float] = 24,
+    limit: int = 100,
+    current_user: User = Depends(get_current_admin_user),
+    query_db: Session = Depends(get_query_db)
+):
+    """
+    Aggregate Trino execution statistics (time, CPU, bytes, rows, memory) per user or catalog.
+    
+    Results are ordered by total CPU time; since_hours limits the window (omit or 0 for all time).
+    """
+    from datetime import datetime, timedelta
+    from query_stats import aggregate_stats
+    
+    since = datetime.now() - timedelta(hours=since_hours) if since_hours else None
+    try:
+        aggregates = aggregate_stats(query_db, group_by, since, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"group_by": group_by, "since": since.isoformat() if since else None, "aggregates": aggregates}
+
+
+@API.get("/admission/status")
+def get_admission_status(current_user: User = Depends(get_current_user)):
+    """Get the current user's running queries and the queue positions of their waiting ones."""
+    return get_admission_controller().user_status(str(current_user.id))
+
+
+@API.get("/admission/stats")
+def get_admission_stats(current_user: User = Depends(get_current_admin_user)):
+    """Get admission control limits, queue length and admitted/rejected counters."""
+    return get_admission_controller().stats()
+
+
+@API.get("/results-cache/stats")
+def get_result_cache_stats(current_user: User = Depends(get_current_admin_user)):
+    """Get hit/miss, snapshot invalidation and size statistics for the SQL result cache."""
+    from result_cache import get_result_cache
+    
+    return get_result_cache().stats()
+
+
+@API.delete("/results-cache")
+def clear_result_cache(current_user: User = Depends(get_current_admin_user)):
+    """Flush the SQL result cache."""
+    from result_cache import get_result_cache
+    
+    return {"message": "Result cache cleared", "removed": get_result_cache().clear()}
+
+
+@API.get("/results-store/stats")
+def get_result_store_stats(current_user: User = Depends(get_current_admin_user), query_db: Session = Depends(get_query_db)):
+    """Get how much storage sharing identical results (content-addressed result sets) saves."""
+    from result_store import result_store_stats
+    
+    return result_store_stats(query_db)
+
+
+@API.get("/results-persistence/stats")
+def get_result_persistence_stats(current_user: User = Depends(get_current_admin_user)):
+    """Get queue depth, retry and failure counts of write-behind result persistence."""
+    return get_result_persister().stats()
+
+
+@API.get("/trino/metadata")
+def get_trino_metadata(
+    catalog: Optional[str] = None,
+    schema: Optional[str] = None,
+    table: Optional[str] = None,
+    current_user: User = Depends(get_current_user)
+):
+    """
+    List Trino metadata one level at a time from the metadata cache.
+    
+    No parameters lists catalogs; catalog lists its schemas; catalog and schema list
+    tables; catalog, schema and table list the table's columns with their types.
+    """
+    from trino_metadata import get_metadata_cache
+    
+    index = get_metadata_cache().get(current_user.email.split("@")[0])
+    if catalog is None:
+        return {"catalogs": index.catalogs()}
+    if schema is None:
+        items, level = index.schemas(catalog), "schemas"
+    elif table is None:
+        items, level = index.tables(catalog, schema), "tables"
+    else:
+        items, level = index.columns(catalog, schema, table), "columns"
+    if items is None:
+        raise HTTPException(status_code=404, detail="Catalog, schema or table not found")
+    return {"catalog": catalog, "schema": schema, "table": table, level: items}
+
+
+@API.get("/trino/metadata/autocomplete")
+def autocomplete_trino_metadata(
+    prefix: str,
+    kinds: Optional[str] = None,
+    limit: int = 20,
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Prefix-search catalogs, schemas, tables and columns for the query editor.
+    
+    A prefix with a dot matches qualified names (e.g. "iceberg.demo.or"); kinds is a
+    comma-separated filter (catalog, schema, table, column).
+    """
+    from trino_metadata import get_metadata_cache, KINDS
+    
+    kind_filter = [kind.strip() for kind in kinds.split(",") if kind.strip()] if kinds else None
+    if kind_filter and not set(kind_filter) <= set(KINDS):
+        raise HTTPException(status_code=400, detail=f"kinds must be a subset of: {', '.join(KINDS)}")
+    index = get_metadata_cache().get(current_user.email.split("@")[0])
+    return {"prefix": prefix, "suggestions": index.search(prefix, kind_filter, max(1, min(limit, 200)))}
+
+
+@API.post("/trino/metadata/refresh")
+def refresh_trino_metadata(current_user: User = Depends(get_current_user)):
+    """Reload the current user's Trino metadata now (e.g. after creating tables)."""
+    from trino_metadata import get_metadata_cache
+    
+    index = get_metadata_cache().refresh(current_user.email.split("@")[0])
+    return {"message": "Metadata refreshed", "counts": index.counts()}
+
+
+@API.get("/trino/metadata/stats")
+def get_trino_metadata_stats(current_user: User = Depends(get_current_admin_user)):
+    """Get hit, stale-hit and load counters for the Trino metadata cache."""
+    from trino_metadata import get_metadata_cache
+    
+    return get_metadata_cache().stats()
+
+
+@API.delete("/cerbos/cache")
+def clear_cerbos_cache(current_user: User = Depends(get_current_admin_user)):
+    """Flush the Cerbos decision cache."""
+    try:
+        from query_templates import get_template_registry
+        
+        removed = get_cerbos_client().clear_cache()
+        removed += get_template_registry().decisions.clear()
+        return {"message": "Cerbos decision cache cleared", "removed": removed}
+    except Exception as e:
+        raise HTTPException(status_code=503, detail=f"Cerbos client unavailable: {str(e)}")
+
+
 @API.get("/cerbos/logs")
 def get_cerbos_logs(current_user: User = Depends(get_current_admin_user), lines: int = 200):
     """Get Cerbos container logs to demonstrate authorization as a service."""
@@ -2112,39 +2805,182 @@ def get_backend_authz_logs(lines: int = 100):
 
 if AML_AVAILABLE:
     from trino_client import get_trino_client
+    from plan_to_sql import plan_to_sql, UnsupportedPlanError, ALWAYS_DENIED
     
-    @API.get("/aml/alerts", response_model=List[AlertResponse])
-    def list_alerts(
-        status: Optional[str] = None,
-        severity: Optional[str] = None,
-        current_user: User = Depends(get_current_user),
-        db: Session = Depends(get_db)
-    ):
-        """List AML alerts with optional filtering."""
-        # Check authorization
-        cerbos_client = get_cerbos_client()
-        user_roles = get_user_roles(db, current_user.id)
-        allowed, reason, policy = cerbos_client.check_resource_access(
+    # Push Cerbos PlanResources filters into AML list queries (falls back to per-row checks)
+    AML_PLAN_PUSHDOWN = os.getenv("AML_PLAN_PUSHDOWN", "true").lower() == "true"
+    
+    # Resource attribute -> column mappings used when translating query plans to SQL
+    ALERT_PLAN_COLUMNS = {
+        "request.resource.id": "CAST(alert_id AS VARCHAR)",
+        "status": "status",
+        "severity": "severity",
+    }
+    CASE_PLAN_COLUMNS = {
+        "request.resource.id": "CAST(case_id AS VARCHAR)",
+        "owner_user_id": "owner_user_id",
+        "team": "team",
+        "status": "status",
+        "priority": "priority",
+    }
+    SAR_PLAN_COLUMNS = {
+        "request.resource.id": "CAST(sar_id AS VARCHAR)",
+        "case_id": "CAST(case_id AS VARCHAR)",
+        "status": "status",
+    }
+    
+    @asynccontextmanager
+    async def _trino_query(current_user: User, query: str):
+        """
+        Run a query against the AML schema without blocking the event loop.
+        
+        The Trino client is synchronous, so the query runs in the threadpool;
+        the yielded tuple matches TrinoClientManager.execute_query.
+        
+        Yields:
+            Tuple of (success: bool, data: List, columns: List, error: str)
+        """
+        def run():
+            with get_trino_client().execute_query(str(current_user.id), "postgres", "demo_data", query) as result:
+                return result
+        yield await run_in_threadpool(run)
+    
+    async def _filter_authorized_rows(
+        current_user: User,
+        db: Session,
+        user_roles: List[str],
+        resource_kind: str,
+        rows: list,
+        to_resource,
+        action: str = "view"
+    ) -> list:
+        """
+        Keep only the rows the user may perform action on.
+        
+        Every row is authorized with its own attributes (owner, team, status, ...)
+        in one batched Cerbos CheckResources call instead of one call per row.
+        to_resource maps a row to {"id": ..., "attributes": {...}}.
+        """
+        if not rows:
+            return rows
+        resources = [to_resource(row) for row in rows]
+        user_attributes, attributes_version = await run_in_threadpool(get_user_attributes_versioned, db, current_user.id)
+        matrix = await get_async_cerbos_client().check_many(
             user_id=str(current_user.id),
             user_email=current_user.email,
             user_roles=user_roles,
-            resource_kind="alert",
-            resource_id="*",
-            action="view"
+            resource_kind=resource_kind,
+            resources=resources,
+            actions=[action],
+            principal_attributes=user_attributes,
+            principal_version=attributes_version
         )
-        # Log authorization decision (both allowed and denied)
+        allowed_rows = [
+            row for row, resource in zip(rows, resources)
+            if matrix.get(str(resource["id"]), {}).get(action, False)
+        ]
         log_authorization_decision(
             user_id=str(current_user.id),
             user_email=current_user.email,
             user_roles=user_roles,
-            resource_kind="alert",
-            action="view",
+            resource_kind=resource_kind,
+            action=action,
+            allowed=bool(allowed_rows),
+            reason=f"{len(allowed_rows)} of {len(rows)} {resource_kind} rows authorized",
+            policy=resource_kind
+        )
+        return allowed_rows
+    
+    async def _plan_where_clause(
+        current_user: User,
+        db: Session,
+        user_roles: List[str],
+        resource_kind: str,
+        column_map: dict,
+        action: str = "view"
+    ) -> Optional[str]:
+        """
+        Translate a Cerbos PlanResources filter into a SQL fragment for a list query.
+        
+        Returns:
+            A fragment to AND into the WHERE clause ("" when every row is visible),
+            or None when pushdown is disabled or the plan cannot be translated,
+            in which case the caller must authorize rows individually.
+            
+        Raises:
+            HTTPException: 403 when the plan denies every row
+        """
+        if not AML_PLAN_PUSHDOWN:
+            return None
+        try:
+            user_attributes, attributes_version = await run_in_threadpool(get_user_attributes_versioned, db, current_user.id)
+            plan_filter = await get_async_cerbos_client().plan_resources(
+                user_id=str(current_user.id),
+                user_email=current_user.email,
+                user_roles=user_roles,
+                resource_kind=resource_kind,
+                action=action,
+                principal_attributes=user_attributes,
+                principal_version=attributes_version
+            )
+            kind, fragment = plan_to_sql(plan_filter, column_map)
+        except UnsupportedPlanError as e:
+            logger.info(f"Cerbos plan for {resource_kind}:{action} not translatable, checking rows instead: {e}")
+            return None
+        except Exception as e:
+            logger.warning(f"Cerbos PlanResources failed for {resource_kind}:{action}, checking rows instead: {e}")
+            return None
+        
+        allowed = kind != ALWAYS_DENIED
+        log_authorization_decision(
+            user_id=str(current_user.id),
+            user_email=current_user.email,
+            user_roles=user_roles,
+            resource_kind=resource_kind,
+            action=action,
             allowed=allowed,
-            reason=reason,
-            policy=policy
+            reason=f"Query plan: {kind}" + (f" ({fragment})" if fragment else ""),
+            policy=resource_kind
         )
         if not allowed:
-            raise HTTPException(status_code=403, detail=reason or "Not authorized to view alerts")
+            raise HTTPException(status_code=403, detail=f"Not authorized to {action} {resource_kind} resources")
+        return fragment or ""
+    
+    @API.get("/aml/alerts", response_model=List[AlertResponse])
+    async def list_alerts(
+        status: Optional[str] = None,
+        severity: Optional[str] = None,
+        current_user: User = Depends(get_current_user),
+        db: Session = Depends(get_db)
+    ):
+        """List AML alerts with optional filtering."""
+        # Check authorization: push the Cerbos query plan into SQL when possible
+        user_roles = await run_in_threadpool(get_user_roles, db, current_user.id)
+        plan_where = await _plan_where_clause(current_user, db, user_roles, "alert", ALERT_PLAN_COLUMNS)
+        if plan_where is None:
+            # Fall back to a coarse check here and per-row checks after the query
+            cerbos_client = get_async_cerbos_client()
+            allowed, reason, policy = await cerbos_client.check_resource_access(
+                user_id=str(current_user.id),
+                user_email=current_user.email,
+                user_roles=user_roles,
+                resource_kind="alert",
+                resource_id="*",
+                action="view"
+            )
+            # Log authorization decision (both allowed and denied)
+            log_authorization_decision(
+                user_id=str(current_user.id),
+                user_email=current_user.email,
+                user_roles=user_roles,
+                resource_kind="alert",
+                action="view",
+                allowed=allowed,
+                reason=reason,
+                policy=policy
+            )
+            if not allowed:
+                raise HTTPException(status_code=403, detail=reason or "Not authorized to view alerts")
         
         # Build query
         query = "SELECT * FROM postgres.demo_data.aml.alert WHERE 1=1"
@@ -2155,14 +2991,22 @@ if AML_AVAILABLE:
         if severity:
             query += " AND severity = %s"
             params.append(severity)
+        if plan_where:
+            query += f" AND {plan_where}"
         query += " ORDER BY created_at DESC LIMIT 100"
         
         # Execute via Trino
-        trino = get_trino_client()
-        with trino.execute_query(str(current_user.id), "postgres", "demo_data", query) as (success, data, columns, error):
+        async with _trino_query(current_user, query) as (success, data, columns, error):
             if not success:
                 raise HTTPException(status_code=500, detail=error or "Failed to fetch alerts")
             
+            if plan_where is None:
+                # Authorize each alert with its own attributes (single batched call)
+                data = await _filter_authorized_rows(
+                    current_user, db, user_roles, "alert", data,
+                    lambda row: {"id": row[0], "attributes": {"status": row[4], "severity": row[3]}}
+                )
+            
             # Convert to response models
             alerts = []
             for row in data:
@@ -2178,16 +3022,16 @@ if AML_AVAILABLE:
             return alerts
     
     @API.get("/aml/alerts/{alert_id}", response_model=AlertResponse)
-    def get_alert(
+    async def get_alert(
         alert_id: int,
         current_user: User = Depends(get_current_user),
         db: Session = Depends(get_db)
     ):
         """Get a specific alert by ID."""
         # Check authorization
-        cerbos_client = get_cerbos_client()
-        user_roles = get_user_roles(db, current_user.id)
-        allowed, reason, policy = cerbos_client.check_resource_access(
+        cerbos_client = get_async_cerbos_client()
+        user_roles = await run_in_threadpool(get_user_roles, db, current_user.id)
+        allowed, reason, policy = await cerbos_client.check_resource_access(
             user_id=str(current_user.id),
             user_email=current_user.email,
             user_roles=user_roles,
@@ -2210,9 +3054,8 @@ if AML_AVAILABLE:
             raise HTTPException(status_code=403, detail=reason or "Not authorized to view this alert")
         
         # Fetch alert
-        trino = get_trino_client()
         query = f"SELECT * FROM postgres.demo_data.aml.alert WHERE alert_id = {alert_id}"
-        with trino.execute_query(str(current_user.id), "postgres", "demo_data", query) as (success, data, columns, error):
+        async with _trino_query(current_user, query) as (success, data, columns, error):
             if not success or not data:
                 raise HTTPException(status_code=404, detail="Alert not found")
             
@@ -2228,16 +3071,16 @@ if AML_AVAILABLE:
             )
     
     @API.post("/aml/alerts/{alert_id}/escalate", response_model=CaseResponse)
-    def escalate_alert(
+    async def escalate_alert(
         alert_id: int,
         current_user: User = Depends(get_current_user),
         db: Session = Depends(get_db)
     ):
         """Escalate an alert to create a case."""
         # Check authorization
-        cerbos_client = get_cerbos_client()
-        user_roles = get_user_roles(db, current_user.id)
-        allowed, reason, policy = cerbos_client.check_resource_access(
+        cerbos_client = get_async_cerbos_client()
+        user_roles = await run_in_threadpool(get_user_roles, db, current_user.id)
+        allowed, reason, policy = await cerbos_client.check_resource_access(
             user_id=str(current_user.id),
             user_email=current_user.email,
             user_roles=user_roles,
@@ -2260,9 +3103,8 @@ if AML_AVAILABLE:
             raise HTTPException(status_code=403, detail=reason or "Not authorized to escalate this alert")
         
         # Get alert first
-        trino = get_trino_client()
         query = f"SELECT * FROM postgres.demo_data.aml.alert WHERE alert_id = {alert_id}"
-        with trino.execute_query(str(current_user.id), "postgres", "demo_data", query) as (success, data, columns, error):
+        async with _trino_query(current_user, query) as (success, data, columns, error):
             if not success or not data:
                 raise HTTPException(status_code=404, detail="Alert not found")
         
@@ -2273,7 +3115,7 @@ if AML_AVAILABLE:
             VALUES ('open', 'medium', '{current_user.id}', NULL, {alert_id}, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)
             RETURNING case_id, status, priority, created_at, updated_at, owner_user_id, team, source_alert_id
         """
-        with trino.execute_query(str(current_user.id), "postgres", "demo_data", insert_query) as (success, data, columns, error):
+        async with _trino_query(current_user, insert_query) as (success, data, columns, error):
             if not success or not data:
                 raise HTTPException(status_code=500, detail=error or "Failed to create case")
             
@@ -2290,37 +3132,40 @@ if AML_AVAILABLE:
             )
     
     @API.get("/aml/cases", response_model=List[CaseResponse])
-    def list_cases(
+    async def list_cases(
         status: Optional[str] = None,
         owner_user_id: Optional[str] = None,
         current_user: User = Depends(get_current_user),
         db: Session = Depends(get_db)
     ):
         """List AML cases with optional filtering."""
-        # Check authorization
-        cerbos_client = get_cerbos_client()
-        user_roles = get_user_roles(db, current_user.id)
-        allowed, reason, policy = cerbos_client.check_resource_access(
-            user_id=str(current_user.id),
-            user_email=current_user.email,
-            user_roles=user_roles,
-            resource_kind="case",
-            resource_id="*",
-            action="view"
-        )
-        # Log authorization decision (both allowed and denied)
-        log_authorization_decision(
-            user_id=str(current_user.id),
-            user_email=current_user.email,
-            user_roles=user_roles,
-            resource_kind="case",
-            action="view",
-            allowed=allowed,
-            reason=reason,
-            policy=policy
-        )
-        if not allowed:
-            raise HTTPException(status_code=403, detail=reason or "Not authorized to view cases")
+        # Check authorization: push the Cerbos query plan into SQL when possible
+        user_roles = await run_in_threadpool(get_user_roles, db, current_user.id)
+        plan_where = await _plan_where_clause(current_user, db, user_roles, "case", CASE_PLAN_COLUMNS)
+        if plan_where is None:
+            # Fall back to a coarse check here and per-row checks after the query
+            cerbos_client = get_async_cerbos_client()
+            allowed, reason, policy = await cerbos_client.check_resource_access(
+                user_id=str(current_user.id),
+                user_email=current_user.email,
+                user_roles=user_roles,
+                resource_kind="case",
+                resource_id="*",
+                action="view"
+            )
+            # Log authorization decision (both allowed and denied)
+            log_authorization_decision(
+                user_id=str(current_user.id),
+                user_email=current_user.email,
+                user_roles=user_roles,
+                resource_kind="case",
+                action="view",
+                allowed=allowed,
+                reason=reason,
+                policy=policy
+            )
+            if not allowed:
+                raise HTTPException(status_code=403, detail=reason or "Not authorized to view cases")
         
         # Build query
         query = "SELECT * FROM postgres.demo_data.aml.case WHERE 1=1"
@@ -2328,14 +3173,24 @@ if AML_AVAILABLE:
             query += f" AND status = '{status}'"
         if owner_user_id:
             query += f" AND owner_user_id = '{owner_user_id}'"
+        if plan_where:
+            query += f" AND {plan_where}"
         query += " ORDER BY created_at DESC LIMIT 100"
         
         # Execute via Trino
-        trino = get_trino_client()
-        with trino.execute_query(str(current_user.id), "postgres", "demo_data", query) as (success, data, columns, error):
+        async with _trino_query(current_user, query) as (success, data, columns, error):
             if not success:
                 raise HTTPException(status_code=500, detail=error or "Failed to fetch cases")
             
+            if plan_where is None:
+                # Authorize each case with its own owner/team attributes (single batched call)
+                data = await _filter_authorized_rows(
+                    current_user, db, user_roles, "case", data,
+                    lambda row: {"id": row[0], "attributes": {
+                        "owner_user_id": row[5], "team": row[6], "status": row[1], "priority": row[2]
+                    }}
+                )
+            
             cases = []
             for row in data:
                 cases.append(CaseResponse(
@@ -2351,18 +3206,17 @@ if AML_AVAILABLE:
             return cases
     
     @API.get("/aml/cases/{case_id}", response_model=CaseResponse)
-    def get_case(
+    async def get_case(
         case_id: int,
         current_user: User = Depends(get_current_user),
         db: Session = Depends(get_db)
     ):
         """Get a specific case by ID."""
         # Check authorization
-        cerbos_client = get_cerbos_client()
+        cerbos_client = get_async_cerbos_client()
         # First get case to check ownership
-        trino = get_trino_client()
         query = f"SELECT * FROM postgres.demo_data.aml.case WHERE case_id = {case_id}"
-        with trino.execute_query(str(current_user.id), "postgres", "demo_data", query) as (success, data, columns, error):
+        async with _trino_query(current_user, query) as (success, data, columns, error):
             if not success or not data:
                 raise HTTPException(status_code=404, detail="Case not found")
             
@@ -2370,8 +3224,8 @@ if AML_AVAILABLE:
             case_owner = row[5]  # owner_user_id
             
             # Check authorization with case attributes
-            user_roles = get_user_roles(db, current_user.id)
-            allowed, reason, policy = cerbos_client.check_resource_access(
+            user_roles = await run_in_threadpool(get_user_roles, db, current_user.id)
+            allowed, reason, policy = await cerbos_client.check_resource_access(
                 user_id=str(current_user.id),
                 user_email=current_user.email,
                 user_roles=user_roles,
@@ -2406,7 +3260,7 @@ if AML_AVAILABLE:
             )
     
     @API.post("/aml/cases/{case_id}/notes", response_model=CaseNoteResponse)
-    def add_case_note(
+    async def add_case_note(
         case_id: int,
         note_data: CaseNoteCreate,
         current_user: User = Depends(get_current_user),
@@ -2414,11 +3268,10 @@ if AML_AVAILABLE:
     ):
         """Add a note to a case."""
         # Check authorization
-        cerbos_client = get_cerbos_client()
+        cerbos_client = get_async_cerbos_client()
         # Get case first to check ownership
-        trino = get_trino_client()
         query = f"SELECT * FROM postgres.demo_data.aml.case WHERE case_id = {case_id}"
-        with trino.execute_query(str(current_user.id), "postgres", "demo_data", query) as (success, data, columns, error):
+        async with _trino_query(current_user, query) as (success, data, columns, error):
             if not success or not data:
                 raise HTTPException(status_code=404, detail="Case not found")
             
@@ -2426,8 +3279,8 @@ if AML_AVAILABLE:
             case_owner = row[5]
             
             # Check authorization
-            user_roles = get_user_roles(db, current_user.id)
-            allowed, reason, policy = cerbos_client.check_resource_access(
+            user_roles = await run_in_threadpool(get_user_roles, db, current_user.id)
+            allowed, reason, policy = await cerbos_client.check_resource_access(
                 user_id=str(current_user.id),
                 user_email=current_user.email,
                 user_roles=user_roles,
@@ -2458,7 +3311,7 @@ if AML_AVAILABLE:
             VALUES ({case_id}, '{current_user.id}', '{text_escaped}', CURRENT_TIMESTAMP)
             RETURNING note_id, case_id, author_user_id, created_at, text
         """
-        with trino.execute_query(str(current_user.id), "postgres", "demo_data", insert_query) as (success, data, columns, error):
+        async with _trino_query(current_user, insert_query) as (success, data, columns, error):
             if not success or not data:
                 raise HTTPException(status_code=500, detail=error or "Failed to create note")
             
@@ -2472,7 +3325,7 @@ if AML_AVAILABLE:
             )
     
     @API.post("/aml/cases/{case_id}/graph-expand", response_model=GraphResponse)
-    def expand_case_graph(
+    async def expand_case_graph(
         case_id: int,
         expand_request: GraphExpandRequest,
         current_user: User = Depends(get_current_user),
@@ -2480,11 +3333,10 @@ if AML_AVAILABLE:
     ):
         """Expand transaction network from a case using PuppyGraph."""
         # Check authorization
-        cerbos_client = get_cerbos_client()
+        cerbos_client = get_async_cerbos_client()
         # Get case first
-        trino = get_trino_client()
         query = f"SELECT * FROM postgres.demo_data.aml.case WHERE case_id = {case_id}"
-        with trino.execute_query(str(current_user.id), "postgres", "demo_data", query) as (success, data, columns, error):
+        async with _trino_query(current_user, query) as (success, data, columns, error):
             if not success or not data:
                 raise HTTPException(status_code=404, detail="Case not found")
             
@@ -2492,8 +3344,8 @@ if AML_AVAILABLE:
             case_owner = row[5]
             
             # Check authorization for graph expansion
-            user_roles = get_user_roles(db, current_user.id)
-            allowed, reason, policy = cerbos_client.check_resource_access(
+            user_roles = await run_in_threadpool(get_user_roles, db, current_user.id)
+            allowed, reason, policy = await cerbos_client.check_resource_access(
                 user_id=str(current_user.id),
                 user_email=current_user.email,
                 user_roles=user_roles,
@@ -2516,7 +3368,9 @@ if AML_AVAILABLE:
             if not allowed:
                 raise HTTPException(status_code=403, detail=reason or "Not authorized to expand graph for this case")
         
-        # Execute graph query via PuppyGraph
+        # Execute graph query via PuppyGraph once admitted
+        admission = get_admission_controller()
+        ticket = await admission.acquire_async(str(current_user.id), user_roles)
         try:
             puppygraph = get_puppygraph_client()
             
@@ -2530,7 +3384,7 @@ if AML_AVAILABLE:
             
             import time
             start_time = time.time()
-            result = puppygraph.execute_cypher(cypher_query)
+            result = await run_in_threadpool(puppygraph.execute_cypher, cypher_query)
             execution_time = (time.time() - start_time) * 1000
             
             # Parse PuppyGraph response and convert to GraphResponse
@@ -2592,9 +3446,11 @@ if AML_AVAILABLE:
         except Exception as e:
             logger.error(f"PuppyGraph query failed: {e}", exc_info=True)
             raise HTTPException(status_code=500, detail=f"Graph expansion failed: {str(e)}")
+        finally:
+            admission.release(ticket)
     
     @API.post("/aml/cases/{case_id}/assign", response_model=CaseResponse)
-    def assign_case(
+    async def assign_case(
         case_id: int,
         assign_data: CaseAssignRequest,
         current_user: User = Depends(get_current_user),
@@ -2602,12 +3458,12 @@ if AML_AVAILABLE:
     ):
         """Assign a case to an analyst (manager only)."""
         # Check authorization - only managers can assign
-        cerbos_client = get_cerbos_client()
-        user_roles = get_user_roles(db, current_user.id)
+        cerbos_client = get_async_cerbos_client()
+        user_roles = await run_in_threadpool(get_user_roles, db, current_user.id)
         if "aml_manager" not in user_roles:
             raise HTTPException(status_code=403, detail="Only managers can assign cases")
         
-        allowed, reason, policy = cerbos_client.check_resource_access(
+        allowed, reason, policy = await cerbos_client.check_resource_access(
             user_id=str(current_user.id),
             user_email=current_user.email,
             user_roles=user_roles,
@@ -2630,7 +3486,6 @@ if AML_AVAILABLE:
             raise HTTPException(status_code=403, detail=reason or "Not authorized to assign this case")
         
         # Update case
-        trino = get_trino_client()
         team_val = f"'{assign_data.team}'" if assign_data.team else "NULL"
         update_query = f"""
             UPDATE postgres.demo_data.aml.case 
@@ -2640,7 +3495,7 @@ if AML_AVAILABLE:
             WHERE case_id = {case_id}
             RETURNING case_id, status, priority, created_at, updated_at, owner_user_id, team, source_alert_id
         """
-        with trino.execute_query(str(current_user.id), "postgres", "demo_data", update_query) as (success, data, columns, error):
+        async with _trino_query(current_user, update_query) as (success, data, columns, error):
             if not success or not data:
                 raise HTTPException(status_code=500, detail=error or "Failed to assign case")
             
@@ -2657,16 +3512,15 @@ if AML_AVAILABLE:
             )
     
     @API.post("/aml/cases/{case_id}/close", response_model=CaseResponse)
-    def close_case(
+    async def close_case(
         case_id: int,
         current_user: User = Depends(get_current_user),
         db: Session = Depends(get_db)
     ):
         """Close a case (analyst if assigned, manager always)."""
         # Get case first
-        trino = get_trino_client()
         query = f"SELECT * FROM postgres.demo_data.aml.case WHERE case_id = {case_id}"
-        with trino.execute_query(str(current_user.id), "postgres", "demo_data", query) as (success, data, columns, error):
+        async with _trino_query(current_user, query) as (success, data, columns, error):
             if not success or not data:
                 raise HTTPException(status_code=404, detail="Case not found")
             
@@ -2674,9 +3528,9 @@ if AML_AVAILABLE:
             case_owner = row[5]
             
             # Check authorization
-            cerbos_client = get_cerbos_client()
-            user_roles = get_user_roles(db, current_user.id)
-            allowed, reason, policy = cerbos_client.check_resource_access(
+            cerbos_client = get_async_cerbos_client()
+            user_roles = await run_in_threadpool(get_user_roles, db, current_user.id)
+            allowed, reason, policy = await cerbos_client.check_resource_access(
                 user_id=str(current_user.id),
                 user_email=current_user.email,
                 user_roles=user_roles,
@@ -2706,7 +3560,7 @@ if AML_AVAILABLE:
             WHERE case_id = {case_id}
             RETURNING case_id, status, priority, created_at, updated_at, owner_user_id, team, source_alert_id
         """
-        with trino.execute_query(str(current_user.id), "postgres", "demo_data", update_query) as (success, data, columns, error):
+        async with _trino_query(current_user, update_query) as (success, data, columns, error):
             if not success or not data:
                 raise HTTPException(status_code=500, detail=error or "Failed to close case")
             
@@ -2723,16 +3577,15 @@ if AML_AVAILABLE:
             )
     
     @API.get("/aml/cases/{case_id}/notes", response_model=List[CaseNoteResponse])
-    def list_case_notes(
+    async def list_case_notes(
         case_id: int,
         current_user: User = Depends(get_current_user),
         db: Session = Depends(get_db)
     ):
         """List all notes for a case."""
         # Check case exists and user can view it
-        trino = get_trino_client()
         query = f"SELECT * FROM postgres.demo_data.aml.case WHERE case_id = {case_id}"
-        with trino.execute_query(str(current_user.id), "postgres", "demo_data", query) as (success, data, columns, error):
+        async with _trino_query(current_user, query) as (success, data, columns, error):
             if not success or not data:
                 raise HTTPException(status_code=404, detail="Case not found")
             
@@ -2740,9 +3593,9 @@ if AML_AVAILABLE:
             case_owner = row[5]
             
             # Check authorization
-            cerbos_client = get_cerbos_client()
-            user_roles = get_user_roles(db, current_user.id)
-            allowed, reason, policy = cerbos_client.check_resource_access(
+            cerbos_client = get_async_cerbos_client()
+            user_roles = await run_in_threadpool(get_user_roles, db, current_user.id)
+            allowed, reason, policy = await cerbos_client.check_resource_access(
                 user_id=str(current_user.id),
                 user_email=current_user.email,
                 user_roles=user_roles,
@@ -2772,7 +3625,7 @@ if AML_AVAILABLE:
             WHERE case_id = {case_id}
             ORDER BY created_at ASC
         """
-        with trino.execute_query(str(current_user.id), "postgres", "demo_data", notes_query) as (success, data, columns, error):
+        async with _trino_query(current_user, notes_query) as (success, data, columns, error):
             if not success:
                 raise HTTPException(status_code=500, detail=error or "Failed to fetch notes")
             
@@ -2788,37 +3641,40 @@ if AML_AVAILABLE:
             return notes
     
     @API.get("/aml/sars", response_model=List[SARResponse])
-    def list_sars(
+    async def list_sars(
         status: Optional[str] = None,
         case_id: Optional[int] = None,
         current_user: User = Depends(get_current_user),
         db: Session = Depends(get_db)
     ):
         """List SARs with optional filtering."""
-        # Check authorization
-        cerbos_client = get_cerbos_client()
-        user_roles = get_user_roles(db, current_user.id)
-        allowed, reason, policy = cerbos_client.check_resource_access(
-            user_id=str(current_user.id),
-            user_email=current_user.email,
-            user_roles=user_roles,
-            resource_kind="sar",
-            resource_id="*",
-            action="view"
-        )
-        # Log authorization decision (both allowed and denied)
-        log_authorization_decision(
-            user_id=str(current_user.id),
-            user_email=current_user.email,
-            user_roles=user_roles,
-            resource_kind="sar",
-            action="view",
-            allowed=allowed,
-            reason=reason,
-            policy=policy
-        )
-        if not allowed:
-            raise HTTPException(status_code=403, detail=reason or "Not authorized to view SARs")
+        # Check authorization: push the Cerbos query plan into SQL when possible
+        user_roles = await run_in_threadpool(get_user_roles, db, current_user.id)
+        plan_where = await _plan_where_clause(current_user, db, user_roles, "sar", SAR_PLAN_COLUMNS)
+        if plan_where is None:
+            # Fall back to a coarse check here and per-row checks after the query
+            cerbos_client = get_async_cerbos_client()
+            allowed, reason, policy = await cerbos_client.check_resource_access(
+                user_id=str(current_user.id),
+                user_email=current_user.email,
+                user_roles=user_roles,
+                resource_kind="sar",
+                resource_id="*",
+                action="view"
+            )
+            # Log authorization decision (both allowed and denied)
+            log_authorization_decision(
+                user_id=str(current_user.id),
+                user_email=current_user.email,
+                user_roles=user_roles,
+                resource_kind="sar",
+                action="view",
+                allowed=allowed,
+                reason=reason,
+                policy=policy
+            )
+            if not allowed:
+                raise HTTPException(status_code=403, detail=reason or "Not authorized to view SARs")
         
         # Build query
         query = "SELECT * FROM postgres.demo_data.aml.sar WHERE 1=1"
@@ -2826,14 +3682,22 @@ if AML_AVAILABLE:
             query += f" AND status = '{status}'"
         if case_id:
             query += f" AND case_id = {case_id}"
+        if plan_where:
+            query += f" AND {plan_where}"
         query += " ORDER BY created_at DESC LIMIT 100"
         
         # Execute via Trino
-        trino = get_trino_client()
-        with trino.execute_query(str(current_user.id), "postgres", "demo_data", query) as (success, data, columns, error):
+        async with _trino_query(current_user, query) as (success, data, columns, error):
             if not success:
                 raise HTTPException(status_code=500, detail=error or "Failed to fetch SARs")
             
+            if plan_where is None:
+                # Authorize each SAR with its own attributes (single batched call)
+                data = await _filter_authorized_rows(
+                    current_user, db, user_roles, "sar", data,
+                    lambda row: {"id": row[0], "attributes": {"case_id": str(row[1]), "status": row[2]}}
+                )
+            
             sars = []
             for row in data:
                 sars.append(SARResponse(
@@ -2846,16 +3710,16 @@ if AML_AVAILABLE:
             return sars
     
     @API.get("/aml/sars/{sar_id}", response_model=SARResponse)
-    def get_sar(
+    async def get_sar(
         sar_id: int,
         current_user: User = Depends(get_current_user),
         db: Session = Depends(get_db)
     ):
         """Get a specific SAR by ID."""
         # Check authorization
-        cerbos_client = get_cerbos_client()
-        user_roles = get_user_roles(db, current_user.id)
-        allowed, reason, policy = cerbos_client.check_resource_access(
+        cerbos_client = get_async_cerbos_client()
+        user_roles = await run_in_threadpool(get_user_roles, db, current_user.id)
+        allowed, reason, policy = await cerbos_client.check_resource_access(
             user_id=str(current_user.id),
             user_email=current_user.email,
             user_roles=user_roles,
@@ -2878,9 +3742,8 @@ if AML_AVAILABLE:
             raise HTTPException(status_code=403, detail=reason or "Not authorized to view this SAR")
         
         # Fetch SAR
-        trino = get_trino_client()
         query = f"SELECT * FROM postgres.demo_data.aml.sar WHERE sar_id = {sar_id}"
-        with trino.execute_query(str(current_user.id), "postgres", "demo_data", query) as (success, data, columns, error):
+        async with _trino_query(current_user, query) as (success, data, columns, error):
             if not success or not data:
                 raise HTTPException(status_code=404, detail="SAR not found")
             
@@ -2894,19 +3757,19 @@ if AML_AVAILABLE:
             )
     
     @API.post("/aml/sars", response_model=SARResponse)
-    def create_sar(
+    async def create_sar(
         sar_data: SARCreate,
         current_user: User = Depends(get_current_user),
         db: Session = Depends(get_db)
     ):
         """Create a SAR draft (manager only)."""
         # Check authorization - only managers can create SARs
-        cerbos_client = get_cerbos_client()
-        user_roles = get_user_roles(db, current_user.id)
+        cerbos_client = get_async_cerbos_client()
+        user_roles = await run_in_threadpool(get_user_roles, db, current_user.id)
         if "aml_manager" not in user_roles:
             raise HTTPException(status_code=403, detail="Only managers can create SARs")
         
-        allowed, reason, policy = cerbos_client.check_resource_access(
+        allowed, reason, policy = await cerbos_client.check_resource_access(
             user_id=str(current_user.id),
             user_email=current_user.email,
             user_roles=user_roles,
@@ -2929,9 +3792,8 @@ if AML_AVAILABLE:
             raise HTTPException(status_code=403, detail=reason or "Not authorized to create SARs")
         
         # Verify case exists
-        trino = get_trino_client()
         case_query = f"SELECT * FROM postgres.demo_data.aml.case WHERE case_id = {sar_data.case_id}"
-        with trino.execute_query(str(current_user.id), "postgres", "demo_data", case_query) as (success, data, columns, error):
+        async with _trino_query(current_user, case_query) as (success, data, columns, error):
             if not success or not data:
                 raise HTTPException(status_code=404, detail="Case not found")
         
@@ -2942,7 +3804,7 @@ if AML_AVAILABLE:
             VALUES ({sar_data.case_id}, 'draft', CURRENT_TIMESTAMP)
             RETURNING sar_id, case_id, status, created_at, submitted_at
         """
-        with trino.execute_query(str(current_user.id), "postgres", "demo_data", insert_query) as (success, data, columns, error):
+        async with _trino_query(current_user, insert_query) as (success, data, columns, error):
             if not success or not data:
                 raise HTTPException(status_code=500, detail=error or "Failed to create SAR")
             
@@ -2956,19 +3818,19 @@ if AML_AVAILABLE:
             )
     
     @API.post("/aml/sars/{sar_id}/submit", response_model=SARResponse)
-    def submit_sar(
+    async def submit_sar(
         sar_id: int,
         current_user: User = Depends(get_current_user),
         db: Session = Depends(get_db)
     ):
         """Submit a SAR (manager only)."""
         # Check authorization - only managers can submit SARs
-        cerbos_client = get_cerbos_client()
-        user_roles = get_user_roles(db, current_user.id)
+        cerbos_client = get_async_cerbos_client()
+        user_roles = await run_in_threadpool(get_user_roles, db, current_user.id)
         if "aml_manager" not in user_roles:
             raise HTTPException(status_code=403, detail="Only managers can submit SARs")
         
-        allowed, reason, policy = cerbos_client.check_resource_access(
+        allowed, reason, policy = await cerbos_client.check_resource_access(
             user_id=str(current_user.id),
             user_email=current_user.email,
             user_roles=user_roles,
@@ -2991,9 +3853,8 @@ if AML_AVAILABLE:
             raise HTTPException(status_code=403, detail=reason or "Not authorized to submit this SAR")
         
         # Get SAR first
-        trino = get_trino_client()
         query = f"SELECT * FROM postgres.demo_data.aml.sar WHERE sar_id = {sar_id}"
-        with trino.execute_query(str(current_user.id), "postgres", "demo_data", query) as (success, data, columns, error):
+        async with _trino_query(current_user, query) as (success, data, columns, error):
             if not success or not data:
                 raise HTTPException(status_code=404, detail="SAR not found")
             
@@ -3007,7 +3868,7 @@ if AML_AVAILABLE:
             WHERE sar_id = {sar_id}
             RETURNING sar_id, case_id, status, created_at, submitted_at
         """
-        with trino.execute_query(str(current_user.id), "postgres", "demo_data", update_query) as (success, data, columns, error):
+        async with _trino_query(current_user, update_query) as (success, data, columns, error):
             if not success or not data:
                 raise HTTPException(status_code=500, detail=error or "Failed to submit SAR")
             
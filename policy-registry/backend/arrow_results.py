@@ -0,0 +1,162 @@
+"""
+Arrow Result Encoding
+
+This module encodes query results as Apache Arrow IPC streams (and Parquet
+files for downloads) instead of JSON lists of lists. Column types come from the
+Trino types TrinoClientManager reports in `columns`, so numbers, decimals,
+dates and timestamps arrive typed and notebooks / BI tools can load the data
+without parsing it. Types with no direct Arrow equivalent (map, row, json, ...)
+are sent as strings; maps and rows as JSON.
+
+pyarrow is optional; without it ARROW_AVAILABLE is False and the endpoints only
+offer JSON.
+"""
+import io
+import re
+import json
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    ARROW_AVAILABLE = True
+except ImportError:
+    pa = None
+    pq = None
+    ARROW_AVAILABLE = False
+
+ARROW_STREAM_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+PARQUET_MEDIA_TYPE = "application/vnd.apache.parquet"
+
+_TYPE_PATTERN = re.compile(r"^\s*([a-z ]+?)\s*(?:\((.*)\))?\s*(with time zone)?\s*$", re.IGNORECASE | re.DOTALL)
+
+_SIMPLE_TYPES = {
+    "boolean": lambda: pa.bool_(),
+    "tinyint": lambda: pa.int8(),
+    "smallint": lambda: pa.int16(),
+    "integer": lambda: pa.int32(),
+    "int": lambda: pa.int32(),
+    "bigint": lambda: pa.int64(),
+    "real": lambda: pa.float32(),
+    "double": lambda: pa.float64(),
+    "varchar": lambda: pa.string(),
+    "char": lambda: pa.string(),
+    "varbinary": lambda: pa.binary(),
+    "date": lambda: pa.date32(),
+}
+
+
+def negotiate_format(accept: Optional[str]) -> str:
+    """Pick "arrow", "parquet" or "json" from an Accept header."""
+    accept = (accept or "").lower()
+    if ARROW_STREAM_MEDIA_TYPE in accept:
+        return "arrow"
+    if PARQUET_MEDIA_TYPE in accept:
+        return "parquet"
+    return "json"
+
+
+def arrow_type(trino_type: str):
+    """
+    Map a Trino type name (as reported in cursor.description) to an Arrow type.
+
+    Returns:
+        The Arrow type; pa.string() for types without a lossless Arrow mapping
+    """
+    match = _TYPE_PATTERN.match(trino_type)
+    if not match:
+        return pa.string()
+    name, args, with_time_zone = match.group(1).lower(), match.group(2), match.group(3)
+    if name in _SIMPLE_TYPES:
+        return _SIMPLE_TYPES[name]()
+    if name == "decimal":
+        precision, _, scale = (args or "38,0").partition(",")
+        return pa.decimal128(int(precision), int(scale or 0))
+    if name == "timestamp":
+        return pa.timestamp("us", tz="UTC" if with_time_zone else None)
+    if name == "time" and not with_time_zone:
+        return pa.time64("us")
+    if name == "array" and args:
+        element = arrow_type(args)
+        # Arrays of maps/rows/... are sent as JSON text as a whole
+        if pa.types.is_string(element) and not args.strip().lower().startswith(("varchar", "char")):
+            return pa.string()
+        return pa.list_(element)
+    return pa.string()
+
+
+def arrow_schema(columns: List[Dict[str, str]], metadata: Optional[Dict[str, str]] = None):
+    """Build the Arrow schema for the columns of a query result."""
+    fields = [pa.field(col.get("name", f"col_{i}"), arrow_type(col.get("type", "varchar"))) for i, col in enumerate(columns)]
+    return pa.schema(fields, metadata=metadata)
+
+
+def _as_text(value: Any) -> Optional[str]:
+    if value is None or isinstance(value, str):
+        return value
+    if isinstance(value, (dict, list, tuple)):
+        return json.dumps(value, default=str)
+    return str(value)
+
+
+def record_batch(schema, rows: List[list]):
+    """Convert a batch of Trino rows into an Arrow record batch (transposed to columns)."""
+    arrays = []
+    for position, field in enumerate(schema):
+        values = [row[position] for row in rows]
+        if pa.types.is_string(field.type):
+            values = [_as_text(value) for value in values]
+        arrays.append(pa.array(values, type=field.type))
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def encode_arrow_stream(columns: List[Dict[str, str]], data: List[list], metadata: Optional[Dict[str, str]] = None) -> bytes:
+    """Encode a complete result as an Arrow IPC stream."""
+    schema = arrow_schema(columns, metadata)
+    sink = io.BytesIO()
+    with pa.ipc.new_stream(sink, schema) as writer:
+        if data:
+            writer.write_batch(record_batch(schema, data))
+    return sink.getvalue()
+
+
+def encode_parquet(columns: List[Dict[str, str]], data: List[list], metadata: Optional[Dict[str, str]] = None) -> bytes:
+    """Encode a complete result as a Parquet file."""
+    schema = arrow_schema(columns, metadata)
+    table = pa.Table.from_batches([record_batch(schema, data)], schema=schema)
+    sink = io.BytesIO()
+    pq.write_table(table, sink)
+    return sink.getvalue()
+
+
+def arrow_stream(events: Iterator[Tuple[str, Any]]) -> Iterator[bytes]:
+    """
+    Encode stream_query events as an Arrow IPC stream, one record batch per Trino batch.
+
+    Arrow streams have no place for an error, so an error or cancellation after
+    the schema was sent aborts the response; clients see a stream without its
+    end-of-stream marker.
+    """
+    sink = io.BytesIO()
+    writer = None
+    schema = None
+
+    def drain() -> bytes:
+        chunk = sink.getvalue()
+        sink.seek(0)
+        sink.truncate()
+        return chunk
+
+    for event, payload in events:
+        if event == "columns":
+            schema = arrow_schema(payload)
+            writer = pa.ipc.new_stream(sink, schema)
+            yield drain()
+        elif event == "rows":
+            writer.write_batch(record_batch(schema, payload))
+            yield drain()
+        elif event == "stats":
+            writer.close()
+            yield drain()
+        else:
+            raise RuntimeError(f"Arrow stream aborted: {payload}")
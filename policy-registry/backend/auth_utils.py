@@ -147,6 +147,25 @@ def get_user_attributes(db: Session, user_id: int) -> dict:
         Dictionary of user attributes (team, region, clearance_level, department, is_active)
         Returns dict with defaults if user has no attributes record
     """
+    attributes, _ = get_user_attributes_versioned(db, user_id)
+    return attributes
+
+def get_user_attributes_versioned(db: Session, user_id: int) -> tuple[dict, str]:
+    """
+    Get user attributes for Cerbos principal together with their version.
+    
+    The version is the attributes row's updated_at (maintained by a database
+    trigger), so callers can cache anything derived from the attributes until
+    the row changes.
+    
+    Args:
+        db: Database session
+        user_id: User ID
+        
+    Returns:
+        Tuple of (attributes dict as returned by get_user_attributes, version string).
+        The version is "default" if user has no attributes record
+    """
     user_attrs = db.query(UserAttributes).filter(UserAttributes.user_id == user_id).first()
     
     if user_attrs:
@@ -156,7 +175,7 @@ def get_user_attributes(db: Session, user_id: int) -> dict:
             "clearance_level": user_attrs.clearance_level or 1,
             "department": user_attrs.department,
             "is_active": True  # Can be derived from User model if needed
-        }
+        }, str(user_attrs.updated_at)
     else:
         # Return defaults if no attributes record exists
         return {
@@ -165,4 +184,4 @@ def get_user_attributes(db: Session, user_id: int) -> dict:
             "clearance_level": 1,
             "department": None,
             "is_active": True
-        }
\ No newline at end of file
+        }, "default"
\ No newline at end of file
@@ -0,0 +1,84 @@
+"""
+Bulk Inserts for the Query Results Database
+
+This module writes many rows into a table without creating an ORM object per
+row. On PostgreSQL (psycopg2) rows are streamed with COPY ... FROM STDIN in
+batches of BULK_COPY_BATCH_ROWS; on other databases (SQLite in tests) the same
+batches go through one executemany INSERT each. Rows are written on the
+session's connection, so they commit or roll back with the session.
+"""
+import io
+import os
+from itertools import islice
+from typing import Any, Dict, Iterable, List, Optional
+
+# Rows per COPY / executemany round trip
+BULK_COPY_BATCH_ROWS = int(os.getenv("BULK_COPY_BATCH_ROWS", "5000"))
+
+_COPY_ESCAPES = str.maketrans({"\\": "\\\\", "\t": "\\t", "\n": "\\n", "\r": "\\r"})
+
+
+def copy_value(value: Any) -> str:
+    """Format one value for COPY's text format."""
+    if value is None:
+        return "\\N"
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        # bytea hex input; the backslash itself is escaped for COPY
+        return "\\\\x" + bytes(value).hex()
+    return str(value).translate(_COPY_ESCAPES)
+
+
+def copy_supported(query_db) -> bool:
+    """Whether the session's database accepts COPY FROM STDIN through psycopg2."""
+    dialect = query_db.get_bind().dialect
+    return dialect.name == "postgresql" and dialect.driver == "psycopg2"
+
+
+def _batches(rows: Iterable[Dict[str, Any]], size: int) -> Iterable[List[Dict[str, Any]]]:
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, size))
+        if not batch:
+            return
+        yield batch
+
+
+def bulk_insert(query_db, table, rows: Iterable[Dict[str, Any]], batch_rows: int = BULK_COPY_BATCH_ROWS,
+                use_copy: Optional[bool] = None) -> int:
+    """
+    Insert rows (dicts keyed by column name) into a table in bounded batches (the caller commits).
+
+    Args:
+        table: The SQLAlchemy Table (e.g. QueryColumn.__table__)
+        rows: Rows to insert; consumed lazily, one batch at a time
+        use_copy: Force COPY on or off (defaults to copy_supported)
+
+    Returns:
+        The number of rows inserted
+    """
+    if use_copy is None:
+        use_copy = copy_supported(query_db)
+    # Pending ORM rows (e.g. the parent Query) must reach the database first
+    query_db.flush()
+    connection = query_db.connection()
+    inserted = 0
+    for batch in _batches(rows, max(1, batch_rows)):
+        if use_copy:
+            names = list(batch[0])
+            column_list = ", ".join(f'"{name}"' for name in names)
+            buffer = io.StringIO()
+            for row in batch:
+                buffer.write("\t".join(copy_value(row[name]) for name in names))
+                buffer.write("\n")
+            buffer.seek(0)
+            cursor = connection.connection.cursor()
+            try:
+                cursor.copy_expert(f"COPY {table.name} ({column_list}) FROM STDIN", buffer)
+            finally:
+                cursor.close()
+        else:
+            connection.execute(table.insert(), batch)
+        inserted += len(batch)
+    return inserted
@@ -5,19 +5,522 @@ This module provides a client wrapper for Cerbos authorization checks.
 It integrates Cerbos as the core policy decision point for query authorization.
 """
 import os
+import re
+import json
+import asyncio
+import hashlib
 import logging
-from typing import List, Optional
-from cerbos.sdk.grpc.client import CerbosClient
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Dict, List, Optional
+from cerbos.sdk.grpc.client import CerbosClient, AsyncCerbosClient
 from cerbos.engine.v1 import engine_pb2
+from cerbos.request.v1 import request_pb2
+from cerbos.effect.v1.effect_pb2 import EFFECT_ALLOW
 from google.protobuf.struct_pb2 import Value, ListValue
+from ttl_cache import TTLCache
+from cerbos_resilience import CircuitBreaker, CircuitOpenError, LatencyTracker
+from cerbos_pool import ClientPool, ROUND_ROBIN, channel_options, parse_endpoints
+from policy_table import POLICY_TABLE_MODE, MODE_ON, MODE_SHADOW, MODE_OFF, get_policy_table, reload_policy_table
 
 logger = logging.getLogger(__name__)
 
-# Cerbos uses gRPC, so URL should be host:port format (no http://)
+# Cerbos uses gRPC, so URL should be host:port format (no http://) or unix:/path/to/socket
 CERBOS_URL = os.getenv("CERBOS_URL", "cerbos:3593")
 
+# Calls are spread over a pool of channels to every endpoint in CERBOS_URLS
+# (comma-separated, defaults to CERBOS_URL) using round_robin or least_outstanding
+CERBOS_URLS = parse_endpoints(os.getenv("CERBOS_URLS", CERBOS_URL))
+CHANNELS_PER_ENDPOINT = int(os.getenv("CERBOS_CHANNELS_PER_ENDPOINT", "2"))
+LB_POLICY = os.getenv("CERBOS_LB_POLICY", ROUND_ROBIN).lower()
 
-class CerbosAuthz:
+# Decision cache settings (set either to 0 to disable caching)
+DECISION_CACHE_TTL_SECONDS = float(os.getenv("CERBOS_DECISION_CACHE_TTL", "30"))
+DECISION_CACHE_MAX_SIZE = int(os.getenv("CERBOS_DECISION_CACHE_SIZE", "10000"))
+
+# Cerbos reloads /policies asynchronously (watchForChanges), so for a short while
+# after a policy write it may still answer from the old policies; decisions made
+# in that window are not cached
+POLICY_RELOAD_GRACE_SECONDS = float(os.getenv("CERBOS_POLICY_RELOAD_GRACE_SECS", "5"))
+
+# Query plans depend only on the principal and policies, so they can live longer
+PLAN_CACHE_TTL_SECONDS = float(os.getenv("CERBOS_PLAN_CACHE_TTL", "300"))
+PLAN_CACHE_MAX_SIZE = int(os.getenv("CERBOS_PLAN_CACHE_SIZE", "2000"))
+
+# Built principals are keyed by user, roles and attribute version, so the TTL only bounds memory
+PRINCIPAL_CACHE_TTL_SECONDS = float(os.getenv("CERBOS_PRINCIPAL_CACHE_TTL", "600"))
+PRINCIPAL_CACHE_MAX_SIZE = int(os.getenv("CERBOS_PRINCIPAL_CACHE_SIZE", "5000"))
+
+# Cerbos rejects CheckResources requests above maxResourcesPerRequest (default 50)
+MAX_RESOURCES_PER_REQUEST = int(os.getenv("CERBOS_MAX_RESOURCES_PER_REQUEST", "50"))
+
+# Per-call gRPC deadline, so a slow PDP fails closed quickly instead of tying up workers
+CERBOS_TIMEOUT_SECS = float(os.getenv("CERBOS_TIMEOUT_SECS", "2.0"))
+
+# Circuit breaker: open after N consecutive failed calls, probe again after the reset timeout
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("CERBOS_BREAKER_FAILURES", "5"))
+BREAKER_RESET_SECONDS = float(os.getenv("CERBOS_BREAKER_RESET_SECS", "30"))
+
+# Optional hedged requests: comma-separated extra Cerbos endpoints, tried in order when
+# the previous endpoint has not answered within the hedge delay (or has failed)
+HEDGE_URLS = parse_endpoints(os.getenv("CERBOS_HEDGE_URLS", ""))
+HEDGE_DELAY_SECONDS = float(os.getenv("CERBOS_HEDGE_DELAY_MS", "50")) / 1000
+
+# full: send the SQL body and Cypher text to Cerbos; digest: send pre-computed SQL
+# features (evaluated by the "digest" postgres/iceberg policy versions) and only a
+# sha256 of the Cypher text, which no policy inspects
+PAYLOAD_MODE = os.getenv("CERBOS_PAYLOAD_MODE", "full").lower()
+PAYLOAD_FULL = "full"
+PAYLOAD_DIGEST = "digest"
+DIGEST_POLICY_VERSION = "digest"
+
+# Same pattern as the SSN rules in the postgres/iceberg policies
+_SSN_PATTERN = re.compile(r"\b(ssn|social_security|social_security_number|ssn_number)\b", re.IGNORECASE)
+_TABLE_PATTERN = re.compile(r"\b(?:from|join)\s+([\w\".]+)", re.IGNORECASE)
+
+# Shared by the sync and async clients, since both talk to the same PDP
+_breaker = CircuitBreaker(BREAKER_FAILURE_THRESHOLD, BREAKER_RESET_SECONDS, name="cerbos")
+_latency = LatencyTracker()
+
+# Bumped every time the backend writes to the policy directory
+_policy_version = 0
+_policy_changed_at: Optional[float] = None
+_policy_version_lock = threading.Lock()
+
+
+def _canonical_attr(val):
+    """Normalize an attribute value so equal inputs always serialize identically."""
+    if isinstance(val, (set, frozenset)):
+        return sorted(str(v) for v in val)
+    if isinstance(val, (list, tuple)):
+        return [str(v) for v in val]
+    return val
+
+
+def decision_cache_key(
+    principal_id: str,
+    roles: List[str],
+    principal_attr: Optional[dict],
+    resource_kind: str,
+    resource_id: str,
+    resource_attr: Optional[dict],
+    action: str,
+    policy_version: int = 0
+) -> str:
+    """
+    Build a canonical digest identifying one authorization decision.
+    
+    None-valued attributes are dropped because they are never sent to Cerbos,
+    and role order is irrelevant, so both are normalized before hashing. The
+    policy version (read before the decision was requested) is part of the key,
+    so a decision that arrives after a policy write is never served under the
+    new version.
+    """
+    payload = {
+        "p": principal_id,
+        "r": sorted(set(roles)),
+        "pa": {k: _canonical_attr(v) for k, v in (principal_attr or {}).items() if v is not None},
+        "k": resource_kind,
+        "id": resource_id,
+        "ra": {k: _canonical_attr(v) for k, v in (resource_attr or {}).items() if v is not None},
+        "a": action,
+        "v": policy_version,
+    }
+    encoded = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+def _to_value(val) -> Value:
+    """Convert a Python attribute value into a protobuf Value for Cerbos."""
+    if isinstance(val, str):
+        return Value(string_value=val)
+    elif isinstance(val, bool):
+        return Value(bool_value=val)
+    elif isinstance(val, (int, float)):
+        return Value(number_value=float(val))
+    elif isinstance(val, (set, list, tuple)):
+        # Use list_value for proper array support in Cerbos CEL expressions
+        list_vals = [Value(string_value=str(v)) for v in val]
+        return Value(list_value=ListValue(values=list_vals))
+    return Value(string_value=str(val))
+
+
+def _string_value(val) -> Value:
+    return Value(string_value=val)
+
+
+def _number_value(val) -> Value:
+    return Value(number_value=val)
+
+
+def _bool_value(val) -> Value:
+    return Value(bool_value=val)
+
+
+def _string_list_value(val) -> Value:
+    return Value(list_value=ListValue(values=[Value(string_value=str(v)) for v in val]))
+
+
+# Converters for the fixed attribute keys sent with every graph query (see
+# cypher_parser.parse_cypher_query), so marshalling skips the type dispatch
+_ATTR_CONVERTERS = {
+    "query_type": _string_value,
+    "query": _string_value,
+    "query_pattern": _string_value,
+    "node_labels": _string_list_value,
+    "relationship_types": _string_list_value,
+    "path_variables": _string_list_value,
+    "max_depth": _number_value,
+    "estimated_nodes": _number_value,
+    "estimated_edges": _number_value,
+    "has_aggregations": _bool_value,
+    "has_where_clause": _bool_value,
+    "has_order_by": _bool_value,
+    "has_limit": _bool_value,
+    "method": _string_value,
+    "path": _string_value,
+    "catalog": _string_value,
+    "references_iceberg": _bool_value,
+    "references_ssn": _bool_value,
+    "tables": _string_list_value,
+}
+
+
+def build_principal(
+    user_id: str,
+    user_email: str,
+    user_roles: List[str],
+    principal_attributes: Optional[dict] = None
+) -> engine_pb2.Principal:
+    """
+    Build a Cerbos principal from user identity, roles and ABAC attributes.
+    
+    None values are skipped so that CEL expressions such as P.attr.team == null
+    evaluate as expected.
+    """
+    principal_attr = {
+        "email": Value(string_value=user_email)
+    }
+    for key, val in (principal_attributes or {}).items():
+        if val is None:
+            continue
+        principal_attr[key] = _to_value(val)
+    return engine_pb2.Principal(
+        id=user_id,
+        roles=set(user_roles),
+        attr=principal_attr
+    )
+
+
+def build_resource_attr(attributes: Optional[dict]) -> dict:
+    """
+    Convert resource attributes to protobuf Values.
+    
+    None values are skipped so that CEL expressions such as
+    R.attr.customer_team == null evaluate as expected.
+    """
+    resource_attr = {}
+    for key, val in (attributes or {}).items():
+        if val is None:
+            continue
+        converter = _ATTR_CONVERTERS.get(key)
+        if converter is not None:
+            try:
+                resource_attr[key] = converter(val)
+                continue
+            except (TypeError, ValueError):
+                # Unexpected type for a known key, use the generic conversion
+                pass
+        resource_attr[key] = _to_value(val)
+    return resource_attr
+
+
+def sql_features(query_body: str) -> dict:
+    """
+    Derive the facts the postgres/iceberg digest policies check from a SQL query.
+    
+    Returns:
+        Dict with references_iceberg, references_ssn and the sorted tables read
+    """
+    tables = {name.replace('"', '').lower() for name in _TABLE_PATTERN.findall(query_body)}
+    return {
+        "references_iceberg": "iceberg." in query_body,
+        "references_ssn": _SSN_PATTERN.search(query_body) is not None,
+        "tables": sorted(tables),
+    }
+
+
+def query_text_attribute(query: str) -> str:
+    """Return the graph query text to send to Cerbos (a sha256 digest in digest mode)."""
+    if PAYLOAD_MODE == PAYLOAD_DIGEST:
+        return "sha256:" + hashlib.sha256(query.encode("utf-8")).hexdigest()
+    return query
+
+
+def _query_resource(user_id: str, method: str, path: str, query_body: str) -> tuple[str, str, dict, str]:
+    """
+    Describe a SQL query as a Cerbos resource.
+    
+    Returns:
+        Tuple of (resource_kind, resource_id, attributes, policy_version)
+    """
+    # Determine resource kind from query content
+    resource_kind = "iceberg" if "iceberg." in query_body.lower() else "postgres"
+    attributes = {
+        "method": method,
+        "path": path,
+        "catalog": resource_kind
+    }
+    if PAYLOAD_MODE == PAYLOAD_DIGEST:
+        attributes.update(sql_features(query_body))
+        return resource_kind, f"query-{user_id}", attributes, DIGEST_POLICY_VERSION
+    attributes["body"] = query_body
+    return resource_kind, f"query-{user_id}", attributes, "default"
+
+
+class _CerbosAuthzBase:
+    """
+    Shared state and bookkeeping for the sync and async Cerbos wrappers.
+    
+    Subclasses only perform the RPCs; cache lookups, request building and
+    result formatting live here so both paths make identical decisions.
+    """
+    
+    def __init__(self, cerbos_url: Optional[str] = None):
+        # Endpoints served by the channel pool (a comma-separated cerbos_url overrides CERBOS_URLS)
+        self.pool_endpoints = parse_endpoints(cerbos_url) if cerbos_url else CERBOS_URLS
+        self.cerbos_url = self.pool_endpoints[0]
+        # Hedge endpoints, in the order they are tried after the pooled call
+        self.hedge_endpoints = [url for url in HEDGE_URLS if url not in self.pool_endpoints]
+        
+        # In-process cache of recent decisions, flushed on policy changes
+        self.decision_cache = TTLCache(
+            max_size=DECISION_CACHE_MAX_SIZE,
+            ttl_seconds=DECISION_CACHE_TTL_SECONDS,
+            name="cerbos_decisions"
+        )
+        # Query plans keyed by principal attribute version, flushed on policy changes
+        self.plan_cache = TTLCache(
+            max_size=PLAN_CACHE_MAX_SIZE,
+            ttl_seconds=PLAN_CACHE_TTL_SECONDS,
+            name="cerbos_plans"
+        )
+        # Built principal protobufs, reused while the user's roles and attributes are unchanged
+        self.principal_cache = TTLCache(
+            max_size=PRINCIPAL_CACHE_MAX_SIZE,
+            ttl_seconds=PRINCIPAL_CACHE_TTL_SECONDS,
+            name="cerbos_principals"
+        )
+    
+    def clear_cache(self) -> int:
+        """Drop all cached authorization decisions, plans and principals. Returns the number removed."""
+        removed = self.decision_cache.clear() + self.plan_cache.clear() + self.principal_cache.clear()
+        logger.info(f"Cleared {removed} cached Cerbos decisions, plans and principals")
+        return removed
+    
+    def cache_stats(self) -> dict:
+        """Return decision, plan and principal cache statistics."""
+        return {
+            **self.decision_cache.stats(),
+            "plans": self.plan_cache.stats(),
+            "principals": self.principal_cache.stats(),
+            "local_table": get_policy_table().stats() if POLICY_TABLE_MODE != MODE_OFF else {"mode": MODE_OFF},
+            "policy_version": get_policy_version()
+        }
+    
+    def _principal(
+        self,
+        user_id: str,
+        user_email: str,
+        user_roles: List[str],
+        principal_attributes: Optional[dict] = None,
+        principal_version: Optional[str] = None
+    ) -> engine_pb2.Principal:
+        """
+        Return the principal protobuf, reusing a cached one when possible.
+        
+        Args:
+            principal_version: Version of principal_attributes (e.g. the
+                user_attributes updated_at). Principals with attributes but
+                no version are always rebuilt, since the attributes may have changed.
+        """
+        if principal_attributes and principal_version is None:
+            return build_principal(user_id, user_email, user_roles, principal_attributes)
+        key = (user_id, user_email, tuple(sorted(user_roles)), principal_version)
+        principal = self.principal_cache.get(key)
+        if principal is None:
+            principal = build_principal(user_id, user_email, user_roles, principal_attributes)
+            self.principal_cache.set(key, principal)
+        return principal
+    
+    @staticmethod
+    def _before_call():
+        # Fail fast (and therefore closed) while the PDP is known to be unhealthy
+        if not _breaker.allow_request():
+            raise CircuitOpenError("Cerbos circuit breaker is open")
+    
+    @staticmethod
+    def _after_call(started: float, success: bool):
+        _latency.record((time.monotonic() - started) * 1000, success)
+        if success:
+            _breaker.record_success()
+        else:
+            _breaker.record_failure()
+    
+    @staticmethod
+    def _abort_call():
+        # Cancelled or interrupted: no outcome to record, but a half-open probe must be released
+        _breaker.release_probe()
+    
+    @staticmethod
+    def _local_decision(resource_kind: str, action: str, user_roles: List[str],
+                        policy_version: str = "default") -> Optional[bool]:
+        """Answer from the local policy table (mode "on" only). None means ask Cerbos."""
+        if POLICY_TABLE_MODE != MODE_ON:
+            return None
+        table = get_policy_table()
+        decision = table.decide(resource_kind, action, user_roles, policy_version)
+        table.record(decision)
+        return decision
+    
+    @staticmethod
+    def _shadow_compare(resource_kind: str, action: str, user_roles: List[str], remote: bool,
+                        policy_version: str = "default") -> None:
+        """In shadow mode, compare a fresh Cerbos decision with the local table."""
+        if POLICY_TABLE_MODE != MODE_SHADOW:
+            return
+        table = get_policy_table()
+        local = table.decide(resource_kind, action, user_roles, policy_version)
+        if local is not None:
+            table.record_shadow(resource_kind, action, user_roles, local, remote)
+    
+    @staticmethod
+    def _local_plan(resource_kind: str, action: str, user_roles: List[str]) -> Optional[engine_pb2.PlanResourcesFilter]:
+        """Build an always-allowed/always-denied plan when the local table can decide."""
+        local = _CerbosAuthzBase._local_decision(resource_kind, action, user_roles)
+        if local is None:
+            return None
+        kind = engine_pb2.PlanResourcesFilter.KIND_ALWAYS_ALLOWED if local else engine_pb2.PlanResourcesFilter.KIND_ALWAYS_DENIED
+        return engine_pb2.PlanResourcesFilter(kind=kind)
+    
+    @staticmethod
+    def _access_result(allowed: bool, action: str, resource_kind: str, resource_id: str) -> tuple[bool, Optional[str], str]:
+        if allowed:
+            return True, None, resource_kind
+        return False, f"{action} not authorized on {resource_kind}:{resource_id}", resource_kind
+    
+    @staticmethod
+    def _query_result(allowed: bool, resource_kind: str) -> tuple[bool, Optional[str], str]:
+        if allowed:
+            return True, None, resource_kind
+        return False, "Query not authorized by Cerbos policy", resource_kind
+    
+    @staticmethod
+    def _log_query_decision(allowed: bool, user_id: str, user_roles: List[str], resource_kind: str, query_body: str, source: Optional[str] = None):
+        # Log authorization decision for audit trail
+        decision = "ALLOW" if allowed else "DENY"
+        logger.info(
+            f"Cerbos authorization decision{f' ({source})' if source else ''}: {decision} | "
+            f"user={user_id} | roles={user_roles} | "
+            f"resource={resource_kind} | action=query | "
+            f"query_preview={query_body[:100]}..."
+        )
+    
+    def _plan_key(self, user_id, user_email, user_roles, resource_kind, action, principal_attributes, policy_version) -> str:
+        return decision_cache_key(
+            user_id, user_roles, {"email": user_email, **(principal_attributes or {})},
+            resource_kind, "*plan*", None, action, policy_version
+        )
+    
+    def _pending_many(
+        self,
+        user_id: str,
+        user_email: str,
+        user_roles: List[str],
+        resource_kind: str,
+        resources: List[dict],
+        actions: List[str],
+        principal_attributes: Optional[dict],
+        policy_version: int
+    ) -> tuple[Dict[str, Dict[str, bool]], list]:
+        """
+        Split a batch check into cached decisions and pending resource entries.
+        
+        Returns:
+            Tuple of (matrix of cached decisions, list of pending
+            (resource_id, attributes, [missing actions], {action: cache_key}))
+        """
+        principal_key_attr = {"email": user_email, **(principal_attributes or {})}
+        matrix: Dict[str, Dict[str, bool]] = {}
+        pending = []
+        # Role-only decisions hold for every resource of the kind
+        local = {action: self._local_decision(resource_kind, action, user_roles) for action in actions}
+        
+        for entry in resources:
+            resource_id = str(entry["id"])
+            attributes = entry.get("attributes")
+            decisions = matrix.setdefault(resource_id, {})
+            missing = []
+            keys = {}
+            for action in actions:
+                if local[action] is not None:
+                    decisions[action] = local[action]
+                    continue
+                key = decision_cache_key(
+                    user_id, user_roles, principal_key_attr,
+                    resource_kind, resource_id, attributes, action, policy_version
+                )
+                cached = self.decision_cache.get(key)
+                if cached is None:
+                    missing.append(action)
+                    keys[action] = key
+                else:
+                    decisions[action] = cached
+            if missing:
+                pending.append((resource_id, attributes, missing, keys))
+        return matrix, pending
+    
+    @staticmethod
+    def _batches(resource_kind: str, pending: list):
+        """Yield (batch, resource entries) chunks of at most MAX_RESOURCES_PER_REQUEST."""
+        for start in range(0, len(pending), MAX_RESOURCES_PER_REQUEST):
+            batch = pending[start:start + MAX_RESOURCES_PER_REQUEST]
+            entries = [
+                request_pb2.CheckResourcesRequest.ResourceEntry(
+                    actions=missing,
+                    resource=engine_pb2.Resource(
+                        id=resource_id,
+                        kind=resource_kind,
+                        attr=build_resource_attr(attributes)
+                    )
+                )
+                for resource_id, attributes, missing, _ in batch
+            ]
+            yield batch, entries
+    
+    def _apply_batch(self, matrix: Dict[str, Dict[str, bool]], batch: list, response, resource_kind: str,
+                     user_roles: List[str], policy_version: int) -> None:
+        # Results are returned in request order
+        cacheable = decisions_cacheable(policy_version)
+        for (resource_id, _, missing, keys), result in zip(batch, response.results):
+            for action in missing:
+                allowed = result.actions.get(action) == EFFECT_ALLOW
+                matrix[resource_id][action] = allowed
+                if cacheable:
+                    self.decision_cache.set(keys[action], allowed)
+                self._shadow_compare(resource_kind, action, user_roles, allowed)
+    
+    @staticmethod
+    def _deny_undecided(matrix: Dict[str, Dict[str, bool]], pending: list) -> Dict[str, Dict[str, bool]]:
+        # Anything still undecided (errors, short responses) is denied
+        for resource_id, _, missing, _ in pending:
+            for action in missing:
+                matrix[resource_id].setdefault(action, False)
+        return matrix
+
+
+class CerbosAuthz(_CerbosAuthzBase):
     """Cerbos authorization client wrapper."""
     
     def __init__(self, cerbos_url: Optional[str] = None):
@@ -27,22 +530,83 @@ class CerbosAuthz:
         Args:
             cerbos_url: Optional Cerbos service URL. Defaults to CERBOS_URL env var or http://cerbos:3593
         """
-        raw_url = cerbos_url or CERBOS_URL
-        # Strip http:// or https:// prefix if present (gRPC uses host:port format)
-        if raw_url.startswith("http://"):
-            self.cerbos_url = raw_url[7:]  # Remove "http://"
-        elif raw_url.startswith("https://"):
-            self.cerbos_url = raw_url[8:]  # Remove "https://"
-        else:
-            self.cerbos_url = raw_url
+        super().__init__(cerbos_url)
         
         try:
-            # Initialize gRPC client (tls_verify=False for development)
-            self.client = CerbosClient(self.cerbos_url, tls_verify=False)
-            logger.info(f"Cerbos gRPC client initialized with URL: {self.cerbos_url}")
+            # Initialize gRPC clients (tls_verify=False for development)
+            self.pool = ClientPool(
+                self.pool_endpoints,
+                lambda url, options: CerbosClient(
+                    url, tls_verify=False, timeout_secs=CERBOS_TIMEOUT_SECS, channel_options=options
+                ),
+                channels_per_endpoint=CHANNELS_PER_ENDPOINT,
+                policy=LB_POLICY
+            )
+            self.hedge_clients = [
+                CerbosClient(url, tls_verify=False, timeout_secs=CERBOS_TIMEOUT_SECS, channel_options=channel_options())
+                for url in self.hedge_endpoints
+            ]
+            self.client = self.pool.clients[0]
+            logger.info(
+                f"Cerbos gRPC client initialized with URLs: {self.pool_endpoints} "
+                f"({len(self.pool.clients)} channels, {LB_POLICY})"
+            )
         except Exception as e:
             logger.error(f"Failed to initialize Cerbos client: {e}")
             raise
+        # Runs hedged calls; idle unless CERBOS_HEDGE_URLS is set
+        self._hedge_executor = ThreadPoolExecutor(
+            max_workers=4 * (len(self.hedge_clients) + 1), thread_name_prefix="cerbos-hedge"
+        ) if self.hedge_clients else None
+    
+    def _call(self, method: str, *args):
+        """
+        Call a Cerbos SDK method with the circuit breaker, deadline and hedging applied.
+        
+        Raises:
+            CircuitOpenError: If the breaker is open
+            Exception: The SDK error if every endpoint failed
+        """
+        self._before_call()
+        started = time.monotonic()
+        try:
+            result = self._hedged_call(method, *args)
+        except Exception:
+            self._after_call(started, False)
+            raise
+        except BaseException:
+            self._abort_call()
+            raise
+        self._after_call(started, True)
+        return result
+    
+    def _pooled_call(self, method: str, *args):
+        with self.pool.lease() as client:
+            return getattr(client, method)(*args)
+    
+    def _hedged_call(self, method: str, *args):
+        if self._hedge_executor is None:
+            return self._pooled_call(method, *args)
+        attempts = [self._pooled_call] + [
+            lambda method, *args, client=client: getattr(client, method)(*args)
+            for client in self.hedge_clients
+        ]
+        pending = set()
+        last_error = None
+        next_attempt = 0
+        while True:
+            if next_attempt < len(attempts):
+                pending.add(self._hedge_executor.submit(attempts[next_attempt], method, *args))
+                next_attempt += 1
+            elif not pending:
+                raise last_error
+            # Wait for an answer, or until it is time to hedge to the next endpoint
+            timeout = HEDGE_DELAY_SECONDS if next_attempt < len(attempts) else None
+            done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    return future.result()
+                last_error = future.exception()
     
     def check_query_permission(
         self,
@@ -70,33 +634,31 @@ class CerbosAuthz:
             - reason: Optional denial reason if not allowed
             - policy: Policy name that was evaluated (e.g., "postgres", "iceberg")
         """
+        resource_kind, resource_id, resource_attr, policy_version = _query_resource(user_id, method, path, query_body)
         try:
-            # Determine resource kind from query content
-            query_lower = query_body.lower()
-            if "iceberg." in query_lower:
-                resource_kind = "iceberg"
-            else:
-                resource_kind = "postgres"
-            
-            # Create principal using gRPC protobuf format
-            principal = engine_pb2.Principal(
-                id=user_id,
-                roles=set(user_roles),
-                attr={
-                    "email": Value(string_value=user_email)
-                }
+            # Digest-mode checks are answered from the digest policy variants
+            local = self._local_decision(resource_kind, "query", user_roles, policy_version)
+            if local is not None:
+                self._log_query_decision(local, user_id, user_roles, resource_kind, query_body, source="local")
+                return self._query_result(local, resource_kind)
+            
+            version = get_policy_version()
+            cache_key = decision_cache_key(
+                user_id, user_roles, {"email": user_email},
+                resource_kind, resource_id, resource_attr, "query", version
             )
+            cached = self.decision_cache.get(cache_key)
+            if cached is not None:
+                self._log_query_decision(cached, user_id, user_roles, resource_kind, query_body, source="cached")
+                return self._query_result(cached, resource_kind)
             
-            # Create resource using gRPC protobuf format
+            # Create principal and resource using gRPC protobuf format
+            principal = self._principal(user_id, user_email, user_roles)
             resource = engine_pb2.Resource(
-                id=f"query-{user_id}",
+                id=resource_id,
                 kind=resource_kind,
-                attr={
-                    "method": Value(string_value=method),
-                    "path": Value(string_value=path),
-                    "body": Value(string_value=query_body),
-                    "catalog": Value(string_value=resource_kind)
-                }
+                policy_version=policy_version,
+                attr=build_resource_attr(resource_attr)
             )
             
             # Execute check using Cerbos SDK
@@ -105,27 +667,17 @@ class CerbosAuthz:
             
             # Use is_allowed for single action check (simpler API)
             try:
-                allowed = self.client.is_allowed("query", principal, resource)
+                allowed = self._call("is_allowed", "query", principal, resource)
             except Exception as sdk_error:
                 logger.error(f"Cerbos SDK error during is_allowed call: {sdk_error}", exc_info=True)
                 # Re-raise to be caught by outer exception handler
                 raise
+            if decisions_cacheable(version):
+                self.decision_cache.set(cache_key, allowed)
+            self._shadow_compare(resource_kind, "query", user_roles, allowed, policy_version)
             
-            # Log authorization decision for audit trail
-            decision = "ALLOW" if allowed else "DENY"
-            logger.info(
-                f"Cerbos authorization decision: {decision} | "
-                f"user={user_id} | roles={user_roles} | "
-                f"resource={resource_kind} | action=query | "
-                f"query_preview={query_body[:100]}..."
-            )
-            
-            if allowed:
-                logger.info(f"Cerbos authorized query for user {user_id}, resource {resource_kind}")
-                return True, None, resource_kind
-            else:
-                logger.info(f"Cerbos denied query for user {user_id}, resource {resource_kind}")
-                return False, "Query not authorized by Cerbos policy", resource_kind
+            self._log_query_decision(allowed, user_id, user_roles, resource_kind, query_body)
+            return self._query_result(allowed, resource_kind)
                 
         except Exception as e:
             logger.error(f"Error checking Cerbos authorization: {e}", exc_info=True)
@@ -141,7 +693,8 @@ class CerbosAuthz:
         resource_id: str,
         action: str,
         attributes: Optional[dict] = None,
-        principal_attributes: Optional[dict] = None
+        principal_attributes: Optional[dict] = None,
+        principal_version: Optional[str] = None
     ) -> tuple[bool, Optional[str], str]:
         """
         Generic resource access check.
@@ -155,6 +708,8 @@ class CerbosAuthz:
             action: Action to check (e.g., "query", "read", "write", "execute")
             attributes: Optional additional resource attributes
             principal_attributes: Optional additional principal attributes (e.g., team, region, clearance_level)
+            principal_version: Optional version of principal_attributes; when given the
+                built principal is cached and reused until the version changes
             
         Returns:
             Tuple of (allowed: bool, reason: Optional[str], policy: str)
@@ -163,83 +718,398 @@ class CerbosAuthz:
             - policy: Policy name that was evaluated (resource_kind)
         """
         try:
-            # Build principal attributes
-            principal_attr = {
-                "email": Value(string_value=user_email)
-            }
-            
-            # Add additional principal attributes if provided
-            # Skip None values - they should not be included in attributes
-            # This allows CEL expressions to properly check for null using == null
-            if principal_attributes:
-                for key, val in principal_attributes.items():
-                    if val is None:
-                        # Skip None values - don't include in attributes
-                        # This allows CEL to properly evaluate P.attr.team == null
-                        continue
-                    elif isinstance(val, str):
-                        principal_attr[key] = Value(string_value=val)
-                    elif isinstance(val, bool):
-                        principal_attr[key] = Value(bool_value=val)
-                    elif isinstance(val, (int, float)):
-                        principal_attr[key] = Value(number_value=float(val))
-                    else:
-                        principal_attr[key] = Value(string_value=str(val))
-            
-            # Create principal using gRPC protobuf format
-            principal = engine_pb2.Principal(
-                id=user_id,
-                roles=set(user_roles),
-                attr=principal_attr
+            local = self._local_decision(resource_kind, action, user_roles)
+            if local is not None:
+                logger.debug(f"Local policy table decided {action} on {resource_kind}:{resource_id}")
+                return self._access_result(local, action, resource_kind, resource_id)
+            
+            version = get_policy_version()
+            cache_key = decision_cache_key(
+                user_id, user_roles, {"email": user_email, **(principal_attributes or {})},
+                resource_kind, resource_id, attributes, action, version
             )
+            cached = self.decision_cache.get(cache_key)
+            if cached is not None:
+                logger.debug(f"Cerbos decision cache hit for {action} on {resource_kind}:{resource_id}")
+                return self._access_result(cached, action, resource_kind, resource_id)
             
-            # Create resource using gRPC protobuf format
-            # Skip None values - they should not be included in attributes
-            # This allows CEL expressions to properly check for null using == null
-            resource_attr = attributes or {}
-            resource_dict = {}
-            for key, val in resource_attr.items():
-                if val is None:
-                    # Skip None values - don't include in attributes
-                    # This allows CEL to properly evaluate R.attr.customer_team == null
-                    continue
-                elif isinstance(val, str):
-                    resource_dict[key] = Value(string_value=val)
-                elif isinstance(val, bool):
-                    resource_dict[key] = Value(bool_value=val)
-                elif isinstance(val, (int, float)):
-                    resource_dict[key] = Value(number_value=float(val))
-                elif isinstance(val, (set, list)):
-                    # Convert sets/lists to list_value for Cerbos (supports array operations in CEL)
-                    val_list = list(val) if isinstance(val, set) else val
-                    # Use list_value for proper array support in Cerbos CEL expressions
-                    list_vals = [Value(string_value=str(v)) for v in val_list]
-                    resource_dict[key] = Value(list_value=ListValue(values=list_vals))
-                else:
-                    resource_dict[key] = Value(string_value=str(val))
+            principal = self._principal(user_id, user_email, user_roles, principal_attributes, principal_version)
             
             resource = engine_pb2.Resource(
                 id=resource_id,
                 kind=resource_kind,
-                attr=resource_dict
+                attr=build_resource_attr(attributes)
             )
             
             logger.debug(f"Checking Cerbos authorization for {action} on {resource_kind}:{resource_id}")
             # Use is_allowed for single action check (simpler API)
-            allowed = self.client.is_allowed(action, principal, resource)
+            allowed = self._call("is_allowed", action, principal, resource)
+            if decisions_cacheable(version):
+                self.decision_cache.set(cache_key, allowed)
+            self._shadow_compare(resource_kind, action, user_roles, allowed)
             
-            if allowed:
-                return True, None, resource_kind
-            else:
-                return False, f"{action} not authorized on {resource_kind}:{resource_id}", resource_kind
+            return self._access_result(allowed, action, resource_kind, resource_id)
                 
         except Exception as e:
             logger.error(f"Error checking Cerbos authorization: {e}", exc_info=True)
             return False, f"Authorization check failed: {str(e)}", resource_kind
+    
+    def check_many(
+        self,
+        user_id: str,
+        user_email: str,
+        user_roles: List[str],
+        resource_kind: str,
+        resources: List[dict],
+        actions: List[str],
+        principal_attributes: Optional[dict] = None,
+        principal_version: Optional[str] = None
+    ) -> Dict[str, Dict[str, bool]]:
+        """
+        Check several actions on several resources of one kind in a single request.
+        
+        Decisions already in the decision cache are not re-sent; the remaining
+        resources are sent in one CheckResources call (split into chunks of
+        MAX_RESOURCES_PER_REQUEST if necessary).
+        
+        Args:
+            user_id: User identifier
+            user_email: User email address
+            user_roles: List of user roles
+            resource_kind: Type of resource (e.g., "case", "alert", "sar")
+            resources: List of {"id": str, "attributes": dict} entries
+            actions: Actions to check on every resource
+            principal_attributes: Optional additional principal attributes
+            principal_version: Optional version of principal_attributes (enables principal reuse)
+            
+        Returns:
+            Decision matrix {resource_id: {action: allowed}}. On error every
+            pending decision is False (fail closed).
+        """
+        version = get_policy_version()
+        matrix, pending = self._pending_many(
+            user_id, user_email, user_roles, resource_kind, resources, actions, principal_attributes, version
+        )
+        if not pending:
+            return matrix
+        
+        try:
+            principal = self._principal(user_id, user_email, user_roles, principal_attributes, principal_version)
+            for batch, entries in self._batches(resource_kind, pending):
+                logger.debug(
+                    f"Checking Cerbos authorization for {len(entries)} {resource_kind} resources, actions={actions}"
+                )
+                response = self._call("check_resources", principal, entries)
+                self._apply_batch(matrix, batch, response, resource_kind, user_roles, version)
+        except Exception as e:
+            logger.error(f"Error checking Cerbos authorization for {resource_kind} batch: {e}", exc_info=True)
+        
+        return self._deny_undecided(matrix, pending)
+    
+    def plan_resources(
+        self,
+        user_id: str,
+        user_email: str,
+        user_roles: List[str],
+        resource_kind: str,
+        action: str,
+        principal_attributes: Optional[dict] = None,
+        principal_version: Optional[str] = None
+    ) -> engine_pb2.PlanResourcesFilter:
+        """
+        Ask Cerbos which resources of a kind the principal may perform action on.
+        
+        Plans are cached per (principal, roles, principal attribute version,
+        kind, action) so repeat listings skip the PlanResources RPC entirely.
+        Errors propagate to the caller, which should fall back to per-row checks.
+        
+        Args:
+            user_id: User identifier
+            user_email: User email address
+            user_roles: List of user roles
+            resource_kind: Type of resource (e.g., "case", "alert", "sar")
+            action: Action to plan for (e.g., "view")
+            principal_attributes: Optional additional principal attributes
+            principal_version: Optional version of principal_attributes (enables principal reuse)
+            
+        Returns:
+            The PlanResourcesFilter (always allowed, always denied or conditional)
+        """
+        local_plan = self._local_plan(resource_kind, action, user_roles)
+        if local_plan is not None:
+            return local_plan
+        
+        version = get_policy_version()
+        cache_key = self._plan_key(user_id, user_email, user_roles, resource_kind, action, principal_attributes, version)
+        cached = self.plan_cache.get(cache_key)
+        if cached is not None:
+            logger.debug(f"Cerbos plan cache hit for {action} on {resource_kind}")
+            return cached
+        
+        principal = self._principal(user_id, user_email, user_roles, principal_attributes, principal_version)
+        resource = engine_pb2.PlanResourcesInput.Resource(kind=resource_kind)
+        logger.debug(f"Planning Cerbos resources for {action} on {resource_kind}, user {user_id}")
+        response = self._call("plan_resources", action, principal, resource)
+        if decisions_cacheable(version):
+            self.plan_cache.set(cache_key, response.filter)
+        return response.filter
+
+
+class AsyncCerbosAuthz(_CerbosAuthzBase):
+    """
+    Asyncio Cerbos authorization client wrapper.
+    
+    Same surface as CerbosAuthz, but every check is a coroutine on top of the
+    async gRPC client, so an event loop can keep many checks in flight without
+    holding a threadpool worker per request.
+    """
+    
+    def __init__(self, cerbos_url: Optional[str] = None):
+        """
+        Initialize async Cerbos client. Must be called from a running event loop.
+        
+        Args:
+            cerbos_url: Optional Cerbos service URL. Defaults to CERBOS_URL env var
+        """
+        super().__init__(cerbos_url)
+        
+        try:
+            self.pool = ClientPool(
+                self.pool_endpoints,
+                lambda url, options: AsyncCerbosClient(
+                    url, tls_verify=False, timeout_secs=CERBOS_TIMEOUT_SECS, channel_options=options
+                ),
+                channels_per_endpoint=CHANNELS_PER_ENDPOINT,
+                policy=LB_POLICY
+            )
+            self.hedge_clients = [
+                AsyncCerbosClient(url, tls_verify=False, timeout_secs=CERBOS_TIMEOUT_SECS, channel_options=channel_options())
+                for url in self.hedge_endpoints
+            ]
+            self.client = self.pool.clients[0]
+            logger.info(
+                f"Cerbos async gRPC client initialized with URLs: {self.pool_endpoints} "
+                f"({len(self.pool.clients)} channels, {LB_POLICY})"
+            )
+        except Exception as e:
+            logger.error(f"Failed to initialize async Cerbos client: {e}")
+            raise
+    
+    async def close(self):
+        """Close the underlying gRPC channels."""
+        for client in self.pool.clients + self.hedge_clients:
+            await client.close()
+    
+    async def _call(self, method: str, *args):
+        """Async variant of CerbosAuthz._call."""
+        self._before_call()
+        started = time.monotonic()
+        try:
+            result = await self._hedged_call(method, *args)
+        except Exception:
+            self._after_call(started, False)
+            raise
+        except BaseException:
+            # asyncio.CancelledError is not an Exception
+            self._abort_call()
+            raise
+        self._after_call(started, True)
+        return result
+    
+    async def _pooled_call(self, method: str, *args):
+        with self.pool.lease() as client:
+            return await getattr(client, method)(*args)
+    
+    async def _hedged_call(self, method: str, *args):
+        if not self.hedge_clients:
+            return await self._pooled_call(method, *args)
+        attempts = [self._pooled_call] + [
+            lambda method, *args, client=client: getattr(client, method)(*args)
+            for client in self.hedge_clients
+        ]
+        pending = set()
+        last_error = None
+        next_attempt = 0
+        try:
+            while True:
+                if next_attempt < len(attempts):
+                    pending.add(asyncio.ensure_future(attempts[next_attempt](method, *args)))
+                    next_attempt += 1
+                elif not pending:
+                    raise last_error
+                # Wait for an answer, or until it is time to hedge to the next endpoint
+                timeout = HEDGE_DELAY_SECONDS if next_attempt < len(attempts) else None
+                done, pending = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    last_error = task.exception()
+        finally:
+            # Drop the slower hedged calls once one has answered
+            for task in pending:
+                task.cancel()
+    
+    async def check_query_permission(
+        self,
+        user_id: str,
+        user_email: str,
+        user_roles: List[str],
+        method: str,
+        path: str,
+        query_body: str
+    ) -> tuple[bool, Optional[str], str]:
+        """Async variant of CerbosAuthz.check_query_permission."""
+        resource_kind, resource_id, resource_attr, policy_version = _query_resource(user_id, method, path, query_body)
+        try:
+            # Digest-mode checks are answered from the digest policy variants
+            local = self._local_decision(resource_kind, "query", user_roles, policy_version)
+            if local is not None:
+                self._log_query_decision(local, user_id, user_roles, resource_kind, query_body, source="local")
+                return self._query_result(local, resource_kind)
+            
+            version = get_policy_version()
+            cache_key = decision_cache_key(
+                user_id, user_roles, {"email": user_email},
+                resource_kind, resource_id, resource_attr, "query", version
+            )
+            cached = self.decision_cache.get(cache_key)
+            if cached is not None:
+                self._log_query_decision(cached, user_id, user_roles, resource_kind, query_body, source="cached")
+                return self._query_result(cached, resource_kind)
+            
+            principal = self._principal(user_id, user_email, user_roles)
+            resource = engine_pb2.Resource(
+                id=resource_id,
+                kind=resource_kind,
+                policy_version=policy_version,
+                attr=build_resource_attr(resource_attr)
+            )
+            allowed = await self._call("is_allowed", "query", principal, resource)
+            if decisions_cacheable(version):
+                self.decision_cache.set(cache_key, allowed)
+            self._shadow_compare(resource_kind, "query", user_roles, allowed, policy_version)
+            
+            self._log_query_decision(allowed, user_id, user_roles, resource_kind, query_body)
+            return self._query_result(allowed, resource_kind)
+        
+        except Exception as e:
+            logger.error(f"Error checking Cerbos authorization: {e}", exc_info=True)
+            # Fail closed - deny access on error
+            return False, f"Authorization check failed: {str(e)}", resource_kind
+    
+    async def check_resource_access(
+        self,
+        user_id: str,
+        user_email: str,
+        user_roles: List[str],
+        resource_kind: str,
+        resource_id: str,
+        action: str,
+        attributes: Optional[dict] = None,
+        principal_attributes: Optional[dict] = None,
+        principal_version: Optional[str] = None
+    ) -> tuple[bool, Optional[str], str]:
+        """Async variant of CerbosAuthz.check_resource_access."""
+        try:
+            local = self._local_decision(resource_kind, action, user_roles)
+            if local is not None:
+                logger.debug(f"Local policy table decided {action} on {resource_kind}:{resource_id}")
+                return self._access_result(local, action, resource_kind, resource_id)
+            
+            version = get_policy_version()
+            cache_key = decision_cache_key(
+                user_id, user_roles, {"email": user_email, **(principal_attributes or {})},
+                resource_kind, resource_id, attributes, action, version
+            )
+            cached = self.decision_cache.get(cache_key)
+            if cached is not None:
+                logger.debug(f"Cerbos decision cache hit for {action} on {resource_kind}:{resource_id}")
+                return self._access_result(cached, action, resource_kind, resource_id)
+            
+            principal = self._principal(user_id, user_email, user_roles, principal_attributes, principal_version)
+            resource = engine_pb2.Resource(
+                id=resource_id,
+                kind=resource_kind,
+                attr=build_resource_attr(attributes)
+            )
+            
+            logger.debug(f"Checking Cerbos authorization for {action} on {resource_kind}:{resource_id}")
+            allowed = await self._call("is_allowed", action, principal, resource)
+            if decisions_cacheable(version):
+                self.decision_cache.set(cache_key, allowed)
+            self._shadow_compare(resource_kind, action, user_roles, allowed)
+            
+            return self._access_result(allowed, action, resource_kind, resource_id)
+        
+        except Exception as e:
+            logger.error(f"Error checking Cerbos authorization: {e}", exc_info=True)
+            return False, f"Authorization check failed: {str(e)}", resource_kind
+    
+    async def check_many(
+        self,
+        user_id: str,
+        user_email: str,
+        user_roles: List[str],
+        resource_kind: str,
+        resources: List[dict],
+        actions: List[str],
+        principal_attributes: Optional[dict] = None,
+        principal_version: Optional[str] = None
+    ) -> Dict[str, Dict[str, bool]]:
+        """Async variant of CerbosAuthz.check_many. Batches are sent concurrently."""
+        version = get_policy_version()
+        matrix, pending = self._pending_many(
+            user_id, user_email, user_roles, resource_kind, resources, actions, principal_attributes, version
+        )
+        if not pending:
+            return matrix
+        
+        try:
+            principal = self._principal(user_id, user_email, user_roles, principal_attributes, principal_version)
+            batches = list(self._batches(resource_kind, pending))
+            responses = await asyncio.gather(
+                *(self._call("check_resources", principal, entries) for _, entries in batches)
+            )
+            for (batch, _), response in zip(batches, responses):
+                self._apply_batch(matrix, batch, response, resource_kind, user_roles, version)
+        except Exception as e:
+            logger.error(f"Error checking Cerbos authorization for {resource_kind} batch: {e}", exc_info=True)
+        
+        return self._deny_undecided(matrix, pending)
+    
+    async def plan_resources(
+        self,
+        user_id: str,
+        user_email: str,
+        user_roles: List[str],
+        resource_kind: str,
+        action: str,
+        principal_attributes: Optional[dict] = None,
+        principal_version: Optional[str] = None
+    ) -> engine_pb2.PlanResourcesFilter:
+        """Async variant of CerbosAuthz.plan_resources."""
+        local_plan = self._local_plan(resource_kind, action, user_roles)
+        if local_plan is not None:
+            return local_plan
+        
+        version = get_policy_version()
+        cache_key = self._plan_key(user_id, user_email, user_roles, resource_kind, action, principal_attributes, version)
+        cached = self.plan_cache.get(cache_key)
+        if cached is not None:
+            logger.debug(f"Cerbos plan cache hit for {action} on {resource_kind}")
+            return cached
+        
+        principal = self._principal(user_id, user_email, user_roles, principal_attributes, principal_version)
+        resource = engine_pb2.PlanResourcesInput.Resource(kind=resource_kind)
+        response = await self._call("plan_resources", action, principal, resource)
+        if decisions_cacheable(version):
+            self.plan_cache.set(cache_key, response.filter)
+        return response.filter
 
 
-# Global instance (will be initialized on first use)
+# Global instances (will be initialized on first use)
 _cerbos_authz: Optional[CerbosAuthz] = None
+_async_cerbos_authz: Optional[AsyncCerbosAuthz] = None
 
 
 def get_cerbos_client() -> CerbosAuthz:
@@ -248,3 +1118,76 @@ def get_cerbos_client() -> CerbosAuthz:
     if _cerbos_authz is None:
         _cerbos_authz = CerbosAuthz()
     return _cerbos_authz
+
+
+def get_async_cerbos_client() -> AsyncCerbosAuthz:
+    """Get or create the global async Cerbos client instance (call from the event loop)."""
+    global _async_cerbos_authz
+    if _async_cerbos_authz is None:
+        _async_cerbos_authz = AsyncCerbosAuthz()
+    return _async_cerbos_authz
+
+
+async def close_async_cerbos_client():
+    """Close the global async Cerbos client's gRPC channel, if one was created."""
+    global _async_cerbos_authz
+    if _async_cerbos_authz is not None:
+        await _async_cerbos_authz.close()
+        _async_cerbos_authz = None
+
+
+def resilience_stats() -> dict:
+    """Return circuit breaker state, call latency percentiles, endpoints and channel pool usage."""
+    return {
+        "breaker": _breaker.stats(),
+        "latency": _latency.stats(),
+        "endpoints": CERBOS_URLS,
+        "hedge_endpoints": HEDGE_URLS,
+        "pool": _cerbos_authz.pool.stats() if _cerbos_authz is not None else None,
+        "async_pool": _async_cerbos_authz.pool.stats() if _async_cerbos_authz is not None else None,
+        "timeout_secs": CERBOS_TIMEOUT_SECS,
+        "hedge_delay_ms": HEDGE_DELAY_SECONDS * 1000,
+    }
+
+
+def get_policy_version() -> int:
+    """Return the local policy version counter (incremented on every policy write)."""
+    return _policy_version
+
+
+def decisions_cacheable(policy_version: int) -> bool:
+    """
+    True if a decision requested under policy_version may be cached.
+    
+    False if the policies changed while the decision was in flight, or changed
+    so recently that Cerbos may not have reloaded them yet.
+    """
+    if policy_version != _policy_version:
+        return False
+    changed_at = _policy_changed_at
+    return changed_at is None or time.monotonic() - changed_at >= POLICY_RELOAD_GRACE_SECONDS
+
+
+def notify_policy_change() -> int:
+    """
+    Record that the policy directory was modified.
+    
+    Bumps the policy version, recompiles the local decision table and flushes
+    cached decisions so that no decision computed against the old policies is
+    served after the write.
+    
+    Returns:
+        The new policy version
+    """
+    global _policy_version, _policy_changed_at
+    with _policy_version_lock:
+        _policy_version += 1
+        _policy_changed_at = time.monotonic()
+        version = _policy_version
+    if POLICY_TABLE_MODE != MODE_OFF:
+        reload_policy_table()
+    for authz in (_cerbos_authz, _async_cerbos_authz):
+        if authz is not None:
+            authz.clear_cache()
+    logger.info(f"Cerbos policies changed, policy version is now {version}")
+    return version
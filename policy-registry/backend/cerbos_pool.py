@@ -0,0 +1,128 @@
+"""
+Cerbos Client Pool
+
+This module spreads Cerbos calls over several gRPC channels, possibly to
+several Cerbos endpoints, so a single HTTP/2 connection does not cap
+authorization throughput. Endpoints may be host:port addresses or Unix domain
+sockets (unix:/path/to/cerbos.sock) when Cerbos runs as a sidecar.
+"""
+import itertools
+import os
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List
+
+ROUND_ROBIN = "round_robin"
+LEAST_OUTSTANDING = "least_outstanding"
+
+# Keepalive pings keep idle pooled connections warm and detect dead peers early
+KEEPALIVE_TIME_MS = int(os.getenv("CERBOS_KEEPALIVE_MS", "30000"))
+KEEPALIVE_TIMEOUT_MS = int(os.getenv("CERBOS_KEEPALIVE_TIMEOUT_MS", "10000"))
+
+
+def channel_options(separate_connection: bool = False) -> Dict[str, Any]:
+    """
+    gRPC channel options for pooled Cerbos channels.
+
+    Args:
+        separate_connection: Give the channel its own subchannel pool. Without
+            this, channels to the same target share one TCP connection and
+            pooling them gains nothing.
+    """
+    options = {
+        "grpc.keepalive_time_ms": KEEPALIVE_TIME_MS,
+        "grpc.keepalive_timeout_ms": KEEPALIVE_TIMEOUT_MS,
+        "grpc.keepalive_permit_without_calls": 1,
+        "grpc.http2.max_pings_without_data": 0,
+    }
+    if separate_connection:
+        options["grpc.use_local_subchannel_pool"] = 1
+    return options
+
+
+def parse_endpoints(raw: str) -> List[str]:
+    """
+    Parse a comma-separated endpoint list.
+
+    http(s):// prefixes are stripped (gRPC uses host:port); unix: targets are
+    passed through unchanged.
+    """
+    endpoints = []
+    for url in raw.split(","):
+        url = url.strip()
+        if not url:
+            continue
+        if url.startswith("http://"):
+            url = url[7:]
+        elif url.startswith("https://"):
+            url = url[8:]
+        if url not in endpoints:
+            endpoints.append(url)
+    return endpoints
+
+
+class ClientPool:
+    """Thread-safe pool of Cerbos clients with round-robin or least-outstanding selection."""
+
+    def __init__(self, endpoints: List[str], factory: Callable[[str, Dict[str, Any]], Any],
+                 channels_per_endpoint: int = 1, policy: str = ROUND_ROBIN):
+        """
+        Create the pool.
+
+        Args:
+            endpoints: Cerbos addresses (host:port or unix:/path)
+            factory: Called as factory(endpoint, channel_options) to build one client
+            channels_per_endpoint: Channels (connections) opened to each endpoint
+            policy: ROUND_ROBIN or LEAST_OUTSTANDING
+        """
+        if not endpoints:
+            raise ValueError("At least one Cerbos endpoint is required")
+        if policy not in (ROUND_ROBIN, LEAST_OUTSTANDING):
+            raise ValueError(f"Unknown Cerbos load balancing policy: {policy}")
+        channels_per_endpoint = max(1, channels_per_endpoint)
+        self.policy = policy
+        # Interleave endpoints so round-robin alternates between them
+        self.endpoints = [
+            endpoint for _ in range(channels_per_endpoint) for endpoint in endpoints
+        ]
+        self.clients = [
+            factory(endpoint, channel_options(separate_connection=channels_per_endpoint > 1))
+            for endpoint in self.endpoints
+        ]
+        self._lock = threading.Lock()
+        self._counter = itertools.count()
+        self._outstanding = [0] * len(self.clients)
+        self._calls = [0] * len(self.clients)
+
+    def _pick(self) -> int:
+        # Caller holds the lock
+        if self.policy == LEAST_OUTSTANDING:
+            # Ties are broken round-robin so idle channels share the load
+            start = next(self._counter) % len(self.clients)
+            order = self._outstanding[start:] + self._outstanding[:start]
+            return (start + order.index(min(order))) % len(self.clients)
+        return next(self._counter) % len(self.clients)
+
+    @contextmanager
+    def lease(self):
+        """Yield a client and count it as busy until the block exits."""
+        with self._lock:
+            index = self._pick()
+            self._outstanding[index] += 1
+            self._calls[index] += 1
+        try:
+            yield self.clients[index]
+        finally:
+            with self._lock:
+                self._outstanding[index] -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Return per-channel call counts and in-flight calls."""
+        with self._lock:
+            return {
+                "policy": self.policy,
+                "channels": [
+                    {"endpoint": endpoint, "calls": calls, "outstanding": outstanding}
+                    for endpoint, calls, outstanding in zip(self.endpoints, self._calls, self._outstanding)
+                ],
+            }
@@ -0,0 +1,163 @@
+"""
+Cerbos Call Resilience Utilities
+
+This module provides a circuit breaker and a rolling latency tracker used by
+the Cerbos client. When the PDP is slow or down, the breaker opens after a run
+of consecutive failures so callers fail closed immediately instead of each
+waiting for a deadline, and probes the PDP again after a cool-down period.
+"""
+import math
+import threading
+import time
+from collections import deque
+from typing import Any, Dict
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised when a call is rejected because the circuit breaker is open."""
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker (closed -> open -> half-open -> closed)."""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout_seconds: float = 30.0, name: str = "breaker"):
+        """
+        Initialize the breaker.
+
+        Args:
+            failure_threshold: Consecutive failures that open the breaker. 0 or less disables it.
+            reset_timeout_seconds: Time the breaker stays open before a probe call is let through.
+            name: Name reported in stats.
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout_seconds = reset_timeout_seconds
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._consecutive_failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._probe_started_at = 0.0
+        self._times_opened = 0
+        self._rejected = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state(time.monotonic())
+
+    def _current_state(self, now: float) -> str:
+        # Caller holds the lock
+        if self._state == self.OPEN and now - self._opened_at >= self.reset_timeout_seconds:
+            self._state = self.HALF_OPEN
+            self._probe_in_flight = False
+        elif (self._state == self.HALF_OPEN and self._probe_in_flight
+              and now - self._probe_started_at >= self.reset_timeout_seconds):
+            # A probe that never reported back must not keep the breaker shut for good
+            self._probe_in_flight = False
+        return self._state
+
+    def allow_request(self) -> bool:
+        """
+        Return whether a call may be attempted now.
+
+        While half-open only a single probe call is let through; its outcome
+        closes or re-opens the breaker.
+        """
+        if self.failure_threshold <= 0:
+            return True
+        with self._lock:
+            now = time.monotonic()
+            state = self._current_state(now)
+            if state == self.CLOSED:
+                return True
+            if state == self.HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                self._probe_started_at = now
+                return True
+            self._rejected += 1
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._state = self.CLOSED
+            self._consecutive_failures = 0
+            self._probe_in_flight = False
+
+    def release_probe(self) -> None:
+        """
+        End a call without an outcome (e.g. it was cancelled).
+
+        A half-open probe is handed back so the next call probes again; the
+        failure count is left alone, since the PDP did not fail.
+        """
+        with self._lock:
+            self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        if self.failure_threshold <= 0:
+            return
+        with self._lock:
+            self._consecutive_failures += 1
+            if self._state == self.HALF_OPEN or self._consecutive_failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    self._times_opened += 1
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+                self._probe_in_flight = False
+
+    def stats(self) -> Dict[str, Any]:
+        """Return breaker state and counters for monitoring endpoints."""
+        with self._lock:
+            return {
+                "name": self.name,
+                "state": self._current_state(time.monotonic()),
+                "consecutive_failures": self._consecutive_failures,
+                "failure_threshold": self.failure_threshold,
+                "reset_timeout_seconds": self.reset_timeout_seconds,
+                "times_opened": self._times_opened,
+                "rejected": self._rejected,
+            }
+
+
+class LatencyTracker:
+    """Rolling window of call latencies with nearest-rank percentiles."""
+
+    def __init__(self, window: int = 1000):
+        self._samples: "deque[float]" = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self._count = 0
+        self._errors = 0
+
+    def record(self, latency_ms: float, success: bool = True) -> None:
+        with self._lock:
+            self._samples.append(latency_ms)
+            self._count += 1
+            if not success:
+                self._errors += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Return call counts and p50/p90/p99/max latency (ms) over the window."""
+        with self._lock:
+            samples = sorted(self._samples)
+            count, errors = self._count, self._errors
+
+        def percentile(p: float) -> float:
+            if not samples:
+                return 0.0
+            rank = max(1, math.ceil(p / 100 * len(samples)))
+            return round(samples[rank - 1], 2)
+
+        return {
+            "calls": count,
+            "errors": errors,
+            "window": len(samples),
+            "p50_ms": percentile(50),
+            "p90_ms": percentile(90),
+            "p99_ms": percentile(99),
+            "max_ms": round(samples[-1], 2) if samples else 0.0,
+        }
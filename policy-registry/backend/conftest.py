@@ -0,0 +1,33 @@
+"""
+Shared fixtures for tests that run against an in-memory SQLite query results database.
+"""
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from query_models import Base, Query
+
+
+@pytest.fixture
+def session_factory():
+    # One shared connection, so sessions opened from worker threads see the same database
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    return sessionmaker(bind=engine)
+
+
+@pytest.fixture
+def session(session_factory):
+    session = session_factory()
+    yield session
+    session.close()
+
+
+def add_query(session, query_id="q1", **fields) -> Query:
+    """Store a query (FINISHED, user 1, SELECT 1 unless overridden) and commit it."""
+    values = {"user_id": 1, "user_email": "a@example.com", "sql_query": "SELECT 1", "status": "FINISHED"}
+    values.update(fields)
+    query = Query(id=query_id, **values)
+    session.add(query)
+    session.commit()
+    return query
@@ -0,0 +1,158 @@
+"""
+Cerbos Query Plan to SQL Translator
+
+This module converts the filter returned by Cerbos PlanResources into a SQL
+WHERE fragment, so list endpoints can push authorization down into the query
+and only scan and ship rows the principal is allowed to see.
+
+Only resource attributes that are explicitly mapped to columns can appear in the
+generated SQL; anything else raises UnsupportedPlanError so the caller can fall
+back to checking rows individually.
+"""
+from typing import Dict, Optional, Tuple
+from cerbos.engine.v1 import engine_pb2
+from google.protobuf.struct_pb2 import Value
+
+PlanFilter = engine_pb2.PlanResourcesFilter
+
+ALWAYS_ALLOWED = "always_allowed"
+ALWAYS_DENIED = "always_denied"
+CONDITIONAL = "conditional"
+
+_RESOURCE_ATTR_PREFIX = "request.resource.attr."
+_RESOURCE_ID_VARIABLE = "request.resource.id"
+
+_COMPARISON_OPERATORS = {
+    "eq": "=",
+    "ne": "<>",
+    "lt": "<",
+    "le": "<=",
+    "gt": ">",
+    "ge": ">=",
+}
+
+
+class UnsupportedPlanError(ValueError):
+    """Raised when a plan contains an operator or attribute that cannot be translated."""
+
+
+def _escape_like(text: str) -> str:
+    """Escape LIKE wildcards in a literal (ESCAPE '\\' is added by the caller)."""
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def sql_literal(value: Value) -> str:
+    """Render a protobuf Value as a SQL literal."""
+    kind = value.WhichOneof("kind")
+    if kind == "null_value" or kind is None:
+        return "NULL"
+    if kind == "bool_value":
+        return "TRUE" if value.bool_value else "FALSE"
+    if kind == "number_value":
+        number = value.number_value
+        return str(int(number)) if number.is_integer() else repr(number)
+    if kind == "string_value":
+        return "'" + value.string_value.replace("'", "''") + "'"
+    if kind == "list_value":
+        return "(" + ", ".join(sql_literal(v) for v in value.list_value.values) + ")"
+    raise UnsupportedPlanError(f"Unsupported literal type in plan: {kind}")
+
+
+def _column(variable: str, column_map: Dict[str, str]) -> str:
+    """Map a plan variable to a SQL column expression."""
+    if variable == _RESOURCE_ID_VARIABLE and _RESOURCE_ID_VARIABLE in column_map:
+        return column_map[_RESOURCE_ID_VARIABLE]
+    if variable.startswith(_RESOURCE_ATTR_PREFIX):
+        attr = variable[len(_RESOURCE_ATTR_PREFIX):]
+        if attr in column_map:
+            return column_map[attr]
+    raise UnsupportedPlanError(f"Plan references unmapped variable: {variable}")
+
+
+def _is_null(operand) -> bool:
+    return operand.WhichOneof("node") == "value" and operand.value.WhichOneof("kind") in (None, "null_value")
+
+
+def _operand_to_sql(operand, column_map: Dict[str, str]) -> str:
+    node = operand.WhichOneof("node")
+    if node == "variable":
+        return _column(operand.variable, column_map)
+    if node == "value":
+        return sql_literal(operand.value)
+    if node == "expression":
+        return _expression_to_sql(operand.expression, column_map)
+    raise UnsupportedPlanError("Empty operand in plan")
+
+
+def _expression_to_sql(expression, column_map: Dict[str, str]) -> str:
+    op = expression.operator
+    operands = list(expression.operands)
+
+    if op in ("and", "or"):
+        if not operands:
+            raise UnsupportedPlanError(f"'{op}' without operands")
+        joiner = " AND " if op == "and" else " OR "
+        return "(" + joiner.join(_operand_to_sql(o, column_map) for o in operands) + ")"
+
+    if op == "not":
+        if len(operands) != 1:
+            raise UnsupportedPlanError("'not' expects one operand")
+        return f"(NOT {_operand_to_sql(operands[0], column_map)})"
+
+    if len(operands) != 2:
+        raise UnsupportedPlanError(f"'{op}' expects two operands")
+    left, right = operands
+
+    if op in ("eq", "ne") and (_is_null(left) or _is_null(right)):
+        other = right if _is_null(left) else left
+        null_check = "IS NULL" if op == "eq" else "IS NOT NULL"
+        return f"({_operand_to_sql(other, column_map)} {null_check})"
+
+    if op in _COMPARISON_OPERATORS:
+        return (
+            f"({_operand_to_sql(left, column_map)} {_COMPARISON_OPERATORS[op]} "
+            f"{_operand_to_sql(right, column_map)})"
+        )
+
+    if op == "in":
+        if right.WhichOneof("node") != "value" or right.value.WhichOneof("kind") != "list_value":
+            raise UnsupportedPlanError("'in' expects a literal list")
+        if not right.value.list_value.values:
+            return "(1 = 0)"
+        return f"({_operand_to_sql(left, column_map)} IN {sql_literal(right.value)})"
+
+    if op in ("startsWith", "endsWith", "contains"):
+        if right.WhichOneof("node") != "value" or right.value.WhichOneof("kind") != "string_value":
+            raise UnsupportedPlanError(f"'{op}' expects a string literal")
+        text = _escape_like(right.value.string_value).replace("'", "''")
+        pattern = {"startsWith": f"{text}%", "endsWith": f"%{text}", "contains": f"%{text}%"}[op]
+        return f"({_operand_to_sql(left, column_map)} LIKE '{pattern}' ESCAPE '\\')"
+
+    raise UnsupportedPlanError(f"Unsupported plan operator: {op}")
+
+
+def plan_to_sql(plan_filter: PlanFilter, column_map: Dict[str, str]) -> Tuple[str, Optional[str]]:
+    """
+    Translate a PlanResources filter into a SQL WHERE fragment.
+
+    Args:
+        plan_filter: The filter from a PlanResourcesResponse
+        column_map: Resource attribute name -> SQL column expression. The key
+            "request.resource.id" may map the resource id as well.
+
+    Returns:
+        Tuple of (kind, fragment):
+        - (ALWAYS_ALLOWED, None): no filter needed
+        - (ALWAYS_DENIED, None): no row is visible
+        - (CONDITIONAL, sql): rows matching sql are visible
+
+    Raises:
+        UnsupportedPlanError: If the condition cannot be expressed in SQL
+    """
+    if plan_filter.kind == PlanFilter.KIND_ALWAYS_ALLOWED:
+        return ALWAYS_ALLOWED, None
+    if plan_filter.kind == PlanFilter.KIND_ALWAYS_DENIED:
+        return ALWAYS_DENIED, None
+    if plan_filter.kind == PlanFilter.KIND_CONDITIONAL:
+        return CONDITIONAL, _operand_to_sql(plan_filter.condition, column_map)
+    raise UnsupportedPlanError(f"Unknown plan filter kind: {plan_filter.kind}")
@@ -0,0 +1,277 @@
+"""
+Local Cerbos Decision Table
+
+This module compiles the Cerbos policy files into an in-memory table that can
+answer (resource kind, action, roles) checks whose outcome does not depend on
+any attribute, e.g. admin and aml_manager rules without a condition. Everything
+else is still sent to Cerbos.
+
+The compilation is deliberately conservative. A decision is only answered
+locally when:
+- an unconditional DENY rule matches the roles (deny), or
+- an unconditional ALLOW rule matches and no DENY rule (conditional or not)
+  could match the roles (allow).
+Derived roles only count as unconditional when their condition is absent or
+the literal "true". Each policy version is compiled separately (e.g. the
+"digest" variants used with CERBOS_PAYLOAD_MODE=digest) and looked up with the
+version the check targets. Policies with a scope are ignored, and the table
+disables itself entirely if principal or role policies exist, since those can
+override resource policies.
+"""
+import os
+import threading
+import logging
+from fnmatch import fnmatchcase
+from typing import Dict, Iterable, List, Optional
+import yaml
+
+logger = logging.getLogger(__name__)
+
+# off: always ask Cerbos; on: answer unconditional decisions locally;
+# shadow: ask Cerbos and compare with the local answer (for verification)
+POLICY_TABLE_MODE = os.getenv("CERBOS_LOCAL_TABLE", "on").lower()
+
+MODE_OFF = "off"
+MODE_ON = "on"
+MODE_SHADOW = "shadow"
+
+_CERTAIN = 2
+_POSSIBLE = 1
+_NO_MATCH = 0
+
+
+def resolve_policies_dir() -> str:
+    """Return the Cerbos policy directory (same lookup as the policy endpoints)."""
+    policies_dir = os.getenv("CERBOS_POLICIES_DIR", "/policies")
+    if not os.path.exists(policies_dir):
+        policies_dir = os.path.join(os.path.dirname(__file__), "../../cerbos/policies")
+    return policies_dir
+
+
+def _is_unconditional(condition) -> bool:
+    """True if a rule or derived role condition always holds."""
+    if not condition:
+        return True
+    match = condition.get("match") if isinstance(condition, dict) else None
+    if isinstance(match, dict) and set(match) == {"expr"}:
+        return str(match["expr"]).strip().lower() == "true"
+    return False
+
+
+class _Rule:
+    """A compiled resource policy rule."""
+
+    __slots__ = ("actions", "allow", "roles", "derived_roles", "unconditional")
+
+    def __init__(self, rule: dict, derived_roles: Dict[str, List[tuple]]):
+        self.actions = [str(a) for a in rule.get("actions") or []]
+        self.allow = rule.get("effect") == "EFFECT_ALLOW"
+        self.roles = set(rule.get("roles") or [])
+        # name -> [(parent roles, unconditional)], unknown names never activate
+        self.derived_roles = {
+            name: derived_roles.get(name, []) for name in rule.get("derivedRoles") or []
+        }
+        self.unconditional = _is_unconditional(rule.get("condition"))
+
+    def matches_action(self, action: str) -> bool:
+        return any(pattern == action or fnmatchcase(action, pattern) for pattern in self.actions)
+
+    def role_match(self, roles: frozenset) -> int:
+        """Return _CERTAIN, _POSSIBLE or _NO_MATCH for the principal roles."""
+        if "*" in self.roles or self.roles & roles:
+            best = _CERTAIN
+        else:
+            best = _NO_MATCH
+            for definitions in self.derived_roles.values():
+                for parent_roles, unconditional in definitions:
+                    if "*" in parent_roles or parent_roles & roles:
+                        best = max(best, _CERTAIN if unconditional else _POSSIBLE)
+        if best == _CERTAIN and not self.unconditional:
+            best = _POSSIBLE
+        return best
+
+
+class PolicyTable:
+    """Decision table for unconditional (kind, action, roles) outcomes."""
+
+    def __init__(self, rules_by_policy: Optional[Dict[tuple, List[_Rule]]] = None, source: str = ""):
+        # (policy version, resource kind) -> rules
+        self.rules_by_policy = rules_by_policy or {}
+        self.source = source
+        self._memo: Dict[tuple, Optional[bool]] = {}
+        self._lock = threading.Lock()
+        self._local_allows = 0
+        self._local_denies = 0
+        self._fallbacks = 0
+        self._shadow_matches = 0
+        self._shadow_mismatches = 0
+
+    @classmethod
+    def from_documents(cls, documents: Iterable[dict], source: str = "") -> "PolicyTable":
+        """
+        Compile parsed policy documents.
+
+        Returns:
+            A PolicyTable; empty (everything goes to Cerbos) if the documents
+            contain policy types this table cannot reason about.
+        """
+        documents = [d for d in documents if isinstance(d, dict)]
+        if any("principalPolicy" in d or "rolePolicy" in d for d in documents):
+            logger.info("Principal or role policies present, local Cerbos decision table disabled")
+            return cls(source=source)
+
+        derived_role_sets: Dict[str, Dict[str, List[tuple]]] = {}
+        for doc in documents:
+            derived = doc.get("derivedRoles")
+            if not isinstance(derived, dict):
+                continue
+            definitions = derived_role_sets.setdefault(derived.get("name", ""), {})
+            for definition in derived.get("definitions") or []:
+                definitions.setdefault(definition.get("name"), []).append((
+                    set(definition.get("parentRoles") or []),
+                    _is_unconditional(definition.get("condition"))
+                ))
+
+        rules_by_policy: Dict[tuple, List[_Rule]] = {}
+        for doc in documents:
+            policy = doc.get("resourcePolicy")
+            if not isinstance(policy, dict) or policy.get("scope"):
+                continue
+            version = str(policy.get("version", "default"))
+            kind = policy.get("resource")
+            if (version, kind) in rules_by_policy:
+                # Duplicate definitions are a Cerbos error; don't guess which one wins
+                logger.warning(f"Duplicate resource policy for {kind} (version {version}), not compiling it locally")
+                rules_by_policy[(version, kind)] = None
+                continue
+            imported: Dict[str, List[tuple]] = {}
+            for set_name in policy.get("importDerivedRoles") or []:
+                for name, definitions in derived_role_sets.get(set_name, {}).items():
+                    imported.setdefault(name, []).extend(definitions)
+            rules_by_policy[(version, kind)] = [_Rule(rule, imported) for rule in policy.get("rules") or []]
+
+        return cls({k: v for k, v in rules_by_policy.items() if v is not None}, source=source)
+
+    @classmethod
+    def from_directory(cls, policies_dir: str) -> "PolicyTable":
+        """Load and compile every policy file under policies_dir (tests are skipped)."""
+        documents = []
+        for root, dirs, files in os.walk(policies_dir):
+            dirs[:] = [d for d in dirs if not d.startswith(('.', '_'))]
+            for file in files:
+                if not file.endswith(('.yaml', '.yml')) or file.endswith(('_test.yaml', '_test.yml')):
+                    continue
+                with open(os.path.join(root, file), 'r') as f:
+                    documents.extend(yaml.safe_load_all(f))
+        return cls.from_documents(documents, source=policies_dir)
+
+    def decide(self, resource_kind: str, action: str, roles: Iterable[str],
+               policy_version: str = "default") -> Optional[bool]:
+        """
+        Return the decision if it holds for every principal with these roles.
+
+        Args:
+            policy_version: The resource policy version the check targets
+
+        Returns:
+            True (allow), False (deny) or None when Cerbos must be asked
+        """
+        rules = self.rules_by_policy.get((policy_version, resource_kind))
+        if rules is None:
+            return None
+        roles = frozenset(roles)
+        key = (policy_version, resource_kind, action, roles)
+        if key in self._memo:
+            return self._memo[key]
+
+        certain_allow = possible_deny = certain_deny = False
+        for rule in rules:
+            if not rule.matches_action(action):
+                continue
+            match = rule.role_match(roles)
+            if match == _NO_MATCH:
+                continue
+            if not rule.allow:
+                certain_deny = certain_deny or match == _CERTAIN
+                possible_deny = True
+            elif match == _CERTAIN:
+                certain_allow = True
+
+        if certain_deny:
+            decision = False
+        elif possible_deny:
+            decision = None
+        elif certain_allow:
+            decision = True
+        else:
+            decision = None
+        self._memo[key] = decision
+        return decision
+
+    def record(self, decision: Optional[bool]) -> None:
+        """Count a lookup answered locally (or not) for stats."""
+        with self._lock:
+            if decision is None:
+                self._fallbacks += 1
+            elif decision:
+                self._local_allows += 1
+            else:
+                self._local_denies += 1
+
+    def record_shadow(self, resource_kind: str, action: str, roles: Iterable[str], local: bool, remote: bool) -> None:
+        """Compare a local decision with the Cerbos decision (shadow mode)."""
+        with self._lock:
+            if local == remote:
+                self._shadow_matches += 1
+                return
+            self._shadow_mismatches += 1
+        logger.warning(
+            f"Local Cerbos decision table mismatch: {resource_kind}:{action} roles={sorted(roles)} "
+            f"local={'ALLOW' if local else 'DENY'} cerbos={'ALLOW' if remote else 'DENY'}"
+        )
+
+    def kinds(self) -> List[str]:
+        """Compiled resource kinds; kinds of non-default policy versions as kind@version."""
+        return sorted(kind if version == "default" else f"{kind}@{version}" for version, kind in self.rules_by_policy)
+
+    def stats(self) -> dict:
+        """Return table size and local/shadow counters."""
+        with self._lock:
+            return {
+                "mode": POLICY_TABLE_MODE,
+                "source": self.source,
+                "kinds": self.kinds(),
+                "local_allows": self._local_allows,
+                "local_denies": self._local_denies,
+                "fallbacks": self._fallbacks,
+                "shadow_matches": self._shadow_matches,
+                "shadow_mismatches": self._shadow_mismatches,
+            }
+
+
+# Global instance (built on first use, rebuilt on policy changes)
+_policy_table: Optional[PolicyTable] = None
+_policy_table_lock = threading.Lock()
+
+
+def reload_policy_table() -> PolicyTable:
+    """Recompile the policy directory. On errors the table is empty (all checks go to Cerbos)."""
+    global _policy_table
+    policies_dir = resolve_policies_dir()
+    try:
+        table = PolicyTable.from_directory(policies_dir)
+        logger.info(f"Compiled local Cerbos decision table for {table.kinds()} from {policies_dir}")
+    except Exception as e:
+        logger.error(f"Failed to compile local Cerbos decision table from {policies_dir}: {e}")
+        table = PolicyTable(source=policies_dir)
+    with _policy_table_lock:
+        _policy_table = table
+    return table
+
+
+def get_policy_table() -> PolicyTable:
+    """Get or build the global policy table."""
+    table = _policy_table
+    if table is None:
+        table = reload_policy_table()
+    return table
@@ -0,0 +1,228 @@
+"""
+Background Query Executor
+
+This module runs queries submitted with /query?mode=async on a worker pool
+instead of inside the HTTP request. A worker streams the results from Trino,
+writes them to the query results database chunk by chunk (see result_store),
+and keeps the query's status (QUEUED -> RUNNING -> FINISHED/FAILED) and
+progress up to date so clients can poll /query/{id}/results-immediate.
+Queries can be cancelled while queued or running (DELETE /query/{id}/execution).
+
+A query waits for its admission slot in the admission controller's fair queue,
+not in a worker thread; it is handed to the pool only once admitted.
+"""
+import os
+import time
+import logging
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from query_db import get_query_db_sync
+from query_models import Query, QueryStat
+from result_store import ResultWriter, delete_results
+from query_stats import record_execution_stats
+from result_governor import ResultBudget, ResultGovernor, budget_for_roles
+from admission import ADMISSION_MAX_CONCURRENT, Ticket, get_admission_controller
+
+logger = logging.getLogger(__name__)
+
+# Worker threads for admitted background queries; by default one per admission
+# slot, so an admitted query never waits behind another in the pool
+ASYNC_QUERY_WORKERS = int(os.getenv("ASYNC_QUERY_WORKERS", str(ADMISSION_MAX_CONCURRENT)))
+
+# How long a background query may wait for an admission slot before it fails
+ADMISSION_WAIT_SECONDS = float(os.getenv("ASYNC_QUERY_ADMISSION_WAIT_SECS", "600"))
+
+# Minimum time between progress writes to the query results database
+PROGRESS_UPDATE_INTERVAL_SECONDS = float(os.getenv("ASYNC_QUERY_PROGRESS_INTERVAL_SECS", "1.0"))
+
+
+def progress_percent(stats: Dict[str, Any]) -> Optional[float]:
+    """Return Trino's progress percentage, or None if Trino has not reported one yet."""
+    progress = stats.get("progressPercentage")
+    if progress is None:
+        return None
+    return round(max(0.0, min(float(progress), 100.0)), 1)
+
+
+class QueryExecutor:
+    """Worker pool that executes queued queries and persists their results."""
+
+    def __init__(self, max_workers: int = ASYNC_QUERY_WORKERS):
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="async-query")
+
+    def submit(self, query_id: str, username: str, catalog: str, schema: str, sql_query: str,
+               budget: Optional[ResultBudget] = None, admission_user: Optional[str] = None,
+               roles: Optional[List[str]] = None) -> Future:
+        """
+        Queue a query that is already stored with status QUEUED.
+        
+        Args:
+            budget: Result row/byte budget (defaults to the budget of a user without roles)
+            admission_user: Identity the query is admitted under (defaults to username)
+            roles: The user's roles, for admission caps and fair-share weight
+        
+        Returns:
+            A future that completes when the query has finished, failed or timed out in the queue
+            (it never completes if the query is cancelled while queued, see discard_queued)
+            
+        Raises:
+            AdmissionRejected: If the admission queue is full
+        """
+        governor = ResultGovernor(budget or budget_for_roles([]))
+        done: Future = Future()
+        
+        def start(ticket: Ticket) -> None:
+            self._chain(self._executor.submit(self._run, query_id, username, catalog, schema, sql_query, governor, ticket), done)
+        
+        def expire(ticket: Ticket) -> None:
+            self._chain(self._executor.submit(self._expire, query_id), done)
+        
+        # Stays QUEUED (with a queue position) until admitted
+        get_admission_controller().submit(
+            admission_user or username, roles or [], start, label=query_id, on_timeout=expire, timeout=ADMISSION_WAIT_SECONDS
+        )
+        return done
+
+    def shutdown(self) -> None:
+        """Stop accepting work; running queries are left to finish in their threads."""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    @staticmethod
+    def _chain(future: Future, done: Future) -> None:
+        def copy(finished: Future) -> None:
+            if finished.cancelled():
+                done.cancel()
+            elif finished.exception() is not None:
+                done.set_exception(finished.exception())
+            else:
+                done.set_result(finished.result())
+        future.add_done_callback(copy)
+
+    def _run(self, query_id: str, username: str, catalog: str, schema: str, sql_query: str,
+             governor: ResultGovernor, ticket: Ticket) -> None:
+        from trino_client import get_trino_client
+
+        query_db = get_query_db_sync()
+        started = time.monotonic()
+        last_progress_write = 0.0
+        try:
+            query = query_db.get(Query, query_id)
+            if query is None:
+                logger.warning(f"Async query {query_id} no longer exists, skipping")
+                return
+            if query.status == "CANCELLED":
+                logger.info(f"Async query {query_id} was cancelled before it started")
+                return
+            query.status = "RUNNING"
+            query.progress = 0
+            query_db.commit()
+
+            def on_progress(stats: Dict[str, Any]) -> None:
+                nonlocal last_progress_write
+                progress = progress_percent(stats)
+                now = time.monotonic()
+                if progress is None or now - last_progress_write < PROGRESS_UPDATE_INTERVAL_SECONDS:
+                    return
+                last_progress_write = now
+                query.progress = progress
+                query_db.commit()
+
+            def on_start(trino_query_id: str) -> None:
+                # Recorded early so the query can be cancelled from any backend process
+                query.trino_query_id = trino_query_id
+                query_db.commit()
+
+            writer: Optional[ResultWriter] = None
+            error = None
+            cancelled = False
+            final_stats: Dict[str, Any] = {}
+            for event, payload in get_trino_client().stream_query(
+                username, catalog, schema, sql_query,
+                on_progress=on_progress, query_id=query_id, on_start=on_start, governor=governor
+            ):
+                if event == "columns":
+                    writer = ResultWriter(query_db, query_id, payload)
+                    query_db.commit()
+                elif event == "rows":
+                    # Each full chunk is committed on its own, so memory stays bounded by one chunk
+                    if writer.append(payload):
+                        query_db.commit()
+                elif event == "stats":
+                    final_stats = payload
+                elif event == "cancelled":
+                    cancelled = True
+                else:
+                    error = payload
+
+            # The cancel endpoint may have marked the query while the last batches arrived
+            query_db.refresh(query)
+            if cancelled or query.status == "CANCELLED":
+                self._finish(query_db, query, "CANCELLED", query.error_message or "Query was cancelled")
+                return
+            if error is not None:
+                self._finish(query_db, query, "FAILED", error)
+                return
+
+            rows = writer.close() if writer is not None else 0
+            record_execution_stats(query_db, query, final_stats.get("trino_stats"), (time.monotonic() - started) * 1000)
+            if governor.truncated:
+                query_db.add(QueryStat(query_id=query_id, stat_name="truncated", stat_value="true", stat_type="boolean"))
+            query.status = "FINISHED"
+            query.progress = 100
+            query.rows_returned = rows
+            query.persist_status = "PERSISTED"
+            query.completed_at = datetime.now()
+            if final_stats.get("trino_query_id"):
+                query.trino_query_id = final_stats["trino_query_id"]
+            query_db.commit()
+            logger.info(f"Async query {query_id} finished with {rows} rows")
+
+        except Exception as e:
+            logger.error(f"Async query {query_id} failed: {e}", exc_info=True)
+            query_db.rollback()
+            query = query_db.get(Query, query_id)
+            if query is not None and query.status != "CANCELLED":
+                self._finish(query_db, query, "FAILED", f"Failed to execute query: {str(e)}")
+        finally:
+            get_admission_controller().release(ticket)
+            query_db.close()
+
+    def _expire(self, query_id: str) -> None:
+        # The query was never admitted; fail it unless it was cancelled meanwhile
+        query_db = get_query_db_sync()
+        try:
+            query = query_db.get(Query, query_id)
+            if query is not None and query.status == "QUEUED":
+                self._finish(query_db, query, "FAILED", "Timed out waiting for an admission slot")
+        finally:
+            query_db.close()
+
+    @staticmethod
+    def _finish(query_db, query: Query, status: str, error: str) -> None:
+        # Drop partially stored results so a failed or cancelled query never looks complete
+        delete_results(query_db, query.id)
+        query.status = status
+        query.error_message = error
+        query.completed_at = query.completed_at or datetime.now()
+        query_db.commit()
+        logger.warning(f"Async query {query.id} ended with {status}: {error}")
+
+
+# Global executor instance (will be initialized on first use)
+_query_executor: Optional[QueryExecutor] = None
+
+
+def get_query_executor() -> QueryExecutor:
+    """Get or create the global background query executor."""
+    global _query_executor
+    if _query_executor is None:
+        _query_executor = QueryExecutor()
+    return _query_executor
+
+
+def shutdown_query_executor() -> None:
+    """Shut down the global executor if it was started."""
+    if _query_executor is not None:
+        _query_executor.shutdown()
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, BigInteger, ForeignKey, Boolean
+from sqlalchemy import Column, Integer, String, Text, DateTime, BigInteger, ForeignKey, Boolean, Float, LargeBinary, UniqueConstraint, Index
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -28,10 +28,21 @@ class Query(Base):
     trino_next_uri = Column(Text)
     trino_info_uri = Column(Text)
     trino_query_id = Column(String(100))  # Store Trino's query ID separately
+    progress = Column(Float, default=0)  # Percent complete while RUNNING (async mode)
+    # Trino execution statistics (see query_stats.record_execution_stats)
+    processed_rows = Column(BigInteger)
+    cpu_time_ms = Column(BigInteger)
+    queued_time_ms = Column(BigInteger)
+    peak_memory_bytes = Column(BigInteger)
+    # Write-behind result persistence: PENDING, PERSISTED or FAILED (see result_persister)
+    persist_status = Column(String(20))
+    # Content hash of the stored result when it is shared (see result_store); not exposed in to_dict
+    result_hash = Column(String(64))
     
     # Relationships
     columns = relationship("QueryColumn", back_populates="query", cascade="all, delete-orphan")
     results = relationship("QueryResult", back_populates="query", cascade="all, delete-orphan")
+    chunks = relationship("QueryResultChunk", back_populates="query", cascade="all, delete-orphan")
     stats = relationship("QueryStat", back_populates="query", cascade="all, delete-orphan")
     
     def to_dict(self) -> Dict[str, Any]:
@@ -52,7 +63,13 @@ class Query(Base):
             "bytes_processed": self.bytes_processed,
             "trino_next_uri": self.trino_next_uri,
             "trino_info_uri": self.trino_info_uri,
-            "trino_query_id": self.trino_query_id
+            "trino_query_id": self.trino_query_id,
+            "progress": self.progress,
+            "processed_rows": self.processed_rows,
+            "cpu_time_ms": self.cpu_time_ms,
+            "queued_time_ms": self.queued_time_ms,
+            "peak_memory_bytes": self.peak_memory_bytes,
+            "persist_status": self.persist_status
         }
 
 class QueryColumn(Base):
@@ -101,6 +118,65 @@ class QueryResult(Base):
             "cell_value": self.cell_value
         }
 
+class ResultSet(Base):
+    """Model for a content-addressed result stored once and referenced by queries with the same result"""
+    __tablename__ = "result_sets"
+    
+    content_hash = Column(String(64), primary_key=True)  # SHA-256 of the normalized columns and rows
+    row_count = Column(Integer, nullable=False)
+    byte_size = Column(BigInteger, nullable=False)  # Total size of its stored chunks
+    ref_count = Column(Integer, nullable=False, default=1)  # Queries referencing it
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert result set to dictionary"""
+        return {
+            "content_hash": self.content_hash,
+            "row_count": self.row_count,
+            "byte_size": self.byte_size,
+            "ref_count": self.ref_count,
+            "created_at": self.created_at.isoformat() if self.created_at else None
+        }
+
+class QueryResultChunk(Base):
+    """Model for storing a compressed columnar segment of query results (see result_store)"""
+    __tablename__ = "query_result_chunks"
+    __table_args__ = (
+        UniqueConstraint("query_id", "chunk_index"),
+        UniqueConstraint("result_hash", "chunk_index"),
+        Index("idx_query_result_chunks_rows", "query_id", "first_row"),
+        Index("idx_query_result_chunks_result_rows", "result_hash", "first_row"),
+    )
+    
+    id = Column(Integer, primary_key=True)
+    # A chunk belongs to one query while it is written, then to a shared ResultSet
+    query_id = Column(String(100), ForeignKey("queries.id"))
+    result_hash = Column(String(64), ForeignKey("result_sets.content_hash", ondelete="CASCADE"))
+    chunk_index = Column(Integer, nullable=False)
+    first_row = Column(Integer, nullable=False)  # Row number of the chunk's first row
+    row_count = Column(Integer, nullable=False)
+    format = Column(String(20), nullable=False)  # "arrow" (IPC stream) or "json"
+    codec = Column(String(20))  # Compression codec of the payload
+    byte_size = Column(Integer, nullable=False)  # Size of the stored (compressed) payload
+    data = Column(LargeBinary, nullable=False)
+    
+    # Relationships
+    query = relationship("Query", back_populates="chunks")
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert chunk metadata (without the payload) to dictionary"""
+        return {
+            "id": self.id,
+            "query_id": self.query_id,
+            "result_hash": self.result_hash,
+            "chunk_index": self.chunk_index,
+            "first_row": self.first_row,
+            "row_count": self.row_count,
+            "format": self.format,
+            "codec": self.codec,
+            "byte_size": self.byte_size
+        }
+
 class QueryStat(Base):
     """Model for storing query statistics"""
     __tablename__ = "query_stats"
@@ -0,0 +1,101 @@
+"""
+Query Execution Statistics
+
+This module records Trino's execution statistics for every query the backend
+runs (wall, CPU and queued time, processed rows and bytes, peak memory) on the
+Query row and as QueryStat entries, and aggregates them per user or catalog so
+expensive workloads can be found and the cluster sized.
+"""
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from sqlalchemy import case, func
+from query_models import Query, QueryStat
+
+# Trino cursor stats persisted as QueryStat rows, with their stat_type
+PERSISTED_STATS = {
+    "state": "string",
+    "elapsedTimeMillis": "number",
+    "wallTimeMillis": "number",
+    "cpuTimeMillis": "number",
+    "queuedTimeMillis": "number",
+    "processedRows": "number",
+    "processedBytes": "number",
+    "physicalInputBytes": "number",
+    "peakMemoryBytes": "number",
+    "spilledBytes": "number",
+}
+
+AGGREGATE_GROUPS = {
+    "user": Query.user_email,
+    "catalog": Query.catalog,
+}
+
+
+def record_execution_stats(query_db, query: Query, trino_stats: Optional[Dict[str, Any]], elapsed_ms: float) -> None:
+    """
+    Store a finished query's execution statistics (the caller commits).
+
+    Args:
+        query: The query row; its id must be set
+        trino_stats: Trino's cursor stats (may be None if Trino reported none)
+        elapsed_ms: End-to-end time measured by the backend, including fetching
+    """
+    trino_stats = trino_stats or {}
+    query.execution_time_ms = int(elapsed_ms)
+    query.bytes_processed = int(trino_stats.get("processedBytes") or 0)
+    query.processed_rows = trino_stats.get("processedRows")
+    query.cpu_time_ms = trino_stats.get("cpuTimeMillis")
+    query.queued_time_ms = trino_stats.get("queuedTimeMillis")
+    query.peak_memory_bytes = trino_stats.get("peakMemoryBytes")
+    query_db.add_all([
+        QueryStat(query_id=query.id, stat_name=name, stat_value=str(trino_stats[name]), stat_type=stat_type)
+        for name, stat_type in PERSISTED_STATS.items()
+        if trino_stats.get(name) is not None
+    ])
+
+
+def aggregate_stats(query_db, group_by: str = "user", since: Optional[datetime] = None, limit: int = 100) -> List[Dict[str, Any]]:
+    """
+    Aggregate execution statistics per user or per catalog, most CPU-hungry first.
+
+    Raises:
+        ValueError: If group_by is not "user" or "catalog"
+    """
+    if group_by not in AGGREGATE_GROUPS:
+        raise ValueError(f"group_by must be one of: {', '.join(AGGREGATE_GROUPS)}")
+    key = AGGREGATE_GROUPS[group_by]
+    total_cpu = func.coalesce(func.sum(Query.cpu_time_ms), 0)
+    rows = query_db.query(
+        key.label("key"),
+        func.count(Query.id).label("queries"),
+        func.sum(case((Query.status == "FAILED", 1), else_=0)).label("failed"),
+        func.coalesce(func.sum(Query.execution_time_ms), 0).label("total_execution_time_ms"),
+        func.avg(Query.execution_time_ms).label("avg_execution_time_ms"),
+        func.max(Query.execution_time_ms).label("max_execution_time_ms"),
+        total_cpu.label("total_cpu_time_ms"),
+        func.coalesce(func.sum(Query.queued_time_ms), 0).label("total_queued_time_ms"),
+        func.coalesce(func.sum(Query.bytes_processed), 0).label("total_bytes_processed"),
+        func.coalesce(func.sum(Query.processed_rows), 0).label("total_processed_rows"),
+        func.coalesce(func.sum(Query.rows_returned), 0).label("total_rows_returned"),
+        func.max(Query.peak_memory_bytes).label("max_peak_memory_bytes"),
+    )
+    if since is not None:
+        rows = rows.filter(Query.submitted_at >= since)
+    rows = rows.group_by(key).order_by(total_cpu.desc()).limit(limit).all()
+    return [
+        {
+            group_by: row.key,
+            "queries": row.queries,
+            "failed": int(row.failed or 0),
+            "total_execution_time_ms": int(row.total_execution_time_ms),
+            "avg_execution_time_ms": round(float(row.avg_execution_time_ms), 1) if row.avg_execution_time_ms is not None else None,
+            "max_execution_time_ms": row.max_execution_time_ms,
+            "total_cpu_time_ms": int(row.total_cpu_time_ms),
+            "total_queued_time_ms": int(row.total_queued_time_ms),
+            "total_bytes_processed": int(row.total_bytes_processed),
+            "total_processed_rows": int(row.total_processed_rows),
+            "total_rows_returned": int(row.total_rows_returned),
+            "max_peak_memory_bytes": row.max_peak_memory_bytes,
+        }
+        for row in rows
+    ]
@@ -0,0 +1,206 @@
+"""
+Query Template Registry
+
+This module holds the parameterized SQL templates served by /query/template.
+Templates are validated and parsed once when they are registered, and the
+Cerbos decision for a template is cached per (template id and text, role set,
+policy version), so repeated calls with different parameter values do not go back
+to Cerbos.
+
+A cached template decision is only reused when the expanded query has the
+same policy-relevant features as the template (resource kind, iceberg and
+SSN references, tables read). Parameter values that change any of these,
+e.g. a value of "ssn", are checked against Cerbos with the expanded SQL.
+"""
+import os
+import re
+import hashlib
+import threading
+from typing import Callable, Dict, Iterable, List, Optional
+from ttl_cache import TTLCache
+from cerbos_client import sql_features
+
+# Allowed characters in a template and in parameter values (prevents SQL injection)
+TEMPLATE_PATTERN = re.compile(r'^[A-Za-z\s\*\(\)\.,\-\+\/\%\<\>\=\!\?\_\[\]\{\}\|\&\^~`@#$]+$')
+PARAMETER_PATTERN = re.compile(r'^[A-Za-z0-9\s\.,\-\_\?]+$')
+PLACEHOLDER_PATTERN = re.compile(r'\{(\w+)\}')
+
+# Template decisions are keyed by policy version, so the TTL only bounds how long
+# out-of-band policy edits (not made through the backend) can go unnoticed
+TEMPLATE_AUTH_CACHE_TTL_SECONDS = float(os.getenv("QUERY_TEMPLATE_AUTH_CACHE_TTL", "300"))
+TEMPLATE_AUTH_CACHE_MAX_SIZE = int(os.getenv("QUERY_TEMPLATE_AUTH_CACHE_SIZE", "5000"))
+
+# Templates sent inline (without a template_id) are compiled once and kept here
+ADHOC_TEMPLATE_CACHE_SIZE = int(os.getenv("QUERY_TEMPLATE_ADHOC_CACHE_SIZE", "1000"))
+ADHOC_TEMPLATE_CACHE_TTL_SECONDS = float(os.getenv("QUERY_TEMPLATE_ADHOC_CACHE_TTL", "3600"))
+
+
+class TemplateError(ValueError):
+    """Raised for invalid templates or parameter values."""
+
+
+def policy_features(sql: str) -> tuple:
+    """Return the parts of a SQL query the postgres/iceberg policies depend on."""
+    features = sql_features(sql)
+    return (
+        "iceberg" if "iceberg." in sql.lower() else "postgres",
+        features["references_iceberg"],
+        features["references_ssn"],
+        tuple(features["tables"]),
+    )
+
+
+class QueryTemplate:
+    """A validated SQL template with {name} placeholders."""
+
+    __slots__ = ("template_id", "sql", "catalog", "schema", "description", "placeholders", "features",
+                 "fingerprint")
+
+    def __init__(self, template_id: str, sql: str, catalog: str = "postgres", schema: str = "public",
+                 description: Optional[str] = None):
+        if not TEMPLATE_PATTERN.match(sql):
+            raise TemplateError("Invalid template format")
+        self.template_id = template_id
+        self.sql = sql
+        self.catalog = catalog
+        self.schema = schema
+        self.description = description
+        self.placeholders = frozenset(PLACEHOLDER_PATTERN.findall(sql))
+        self.features = policy_features(sql)
+        # Part of the decision cache key, so re-registering an id with new SQL
+        # never reuses a decision made for the old text
+        self.fingerprint = hashlib.sha256(f"{catalog}\0{schema}\0{sql}".encode("utf-8")).hexdigest()
+
+    def render(self, parameters: dict) -> str:
+        """
+        Substitute parameter values into the template.
+
+        Parameters without a matching placeholder are ignored.
+
+        Raises:
+            TemplateError: If a parameter value contains disallowed characters
+        """
+        for key, value in parameters.items():
+            if not PARAMETER_PATTERN.match(str(value)):
+                raise TemplateError(f"Invalid parameter value for {key}")
+        sql_query = self.sql
+        for key, value in parameters.items():
+            if key in self.placeholders:
+                sql_query = sql_query.replace(f"{{{key}}}", str(value))
+        return sql_query
+
+    def to_dict(self) -> dict:
+        return {
+            "template_id": self.template_id,
+            "template": self.sql,
+            "catalog": self.catalog,
+            "schema": self.schema,
+            "description": self.description,
+            "parameters": sorted(self.placeholders),
+        }
+
+
+class TemplateRegistry:
+    """Registered templates plus the per-template authorization cache."""
+
+    def __init__(self):
+        self._templates: Dict[str, QueryTemplate] = {}
+        self._lock = threading.Lock()
+        self._adhoc = TTLCache(
+            max_size=ADHOC_TEMPLATE_CACHE_SIZE,
+            ttl_seconds=ADHOC_TEMPLATE_CACHE_TTL_SECONDS,
+            name="adhoc_templates"
+        )
+        self.decisions = TTLCache(
+            max_size=TEMPLATE_AUTH_CACHE_MAX_SIZE,
+            ttl_seconds=TEMPLATE_AUTH_CACHE_TTL_SECONDS,
+            name="template_decisions"
+        )
+
+    def register(self, template_id: str, sql: str, catalog: str = "postgres", schema: str = "public",
+                 description: Optional[str] = None) -> QueryTemplate:
+        """
+        Validate and register (or replace) a template.
+
+        Raises:
+            TemplateError: If the template is invalid
+        """
+        template = QueryTemplate(template_id, sql, catalog, schema, description)
+        with self._lock:
+            self._templates[template_id] = template
+        return template
+
+    def unregister(self, template_id: str) -> bool:
+        with self._lock:
+            return self._templates.pop(template_id, None) is not None
+
+    def get(self, template_id: str) -> Optional[QueryTemplate]:
+        return self._templates.get(template_id)
+
+    def list(self) -> List[QueryTemplate]:
+        with self._lock:
+            return sorted(self._templates.values(), key=lambda t: t.template_id)
+
+    def adhoc(self, sql: str, catalog: str = "postgres", schema: str = "public") -> QueryTemplate:
+        """
+        Compile an inline template, reusing an earlier compilation of the same text.
+
+        Raises:
+            TemplateError: If the template is invalid
+        """
+        template_id = "adhoc:" + hashlib.sha256(f"{catalog}\0{schema}\0{sql}".encode("utf-8")).hexdigest()
+        template = self._adhoc.get(template_id)
+        if template is None:
+            template = QueryTemplate(template_id, sql, catalog, schema)
+            self._adhoc.set(template_id, template)
+        return template
+
+    def authorize(self, template: QueryTemplate, sql_query: str, roles: Iterable[str], policy_version: int,
+                  check: Callable[[str], tuple]) -> tuple:
+        """
+        Authorize an expanded template query.
+
+        Args:
+            template: The template the query was rendered from
+            sql_query: The expanded SQL
+            roles: Caller roles
+            policy_version: Current policy version (see cerbos_client.get_policy_version)
+            check: Called with the SQL to send to Cerbos; returns (allowed, reason, policy)
+
+        Returns:
+            Tuple of (allowed, reason, policy, cached)
+        """
+        if policy_features(sql_query) != template.features:
+            # Parameter values changed what the policies look at; check the real query
+            return (*check(sql_query), False)
+        key = (template.template_id, template.fingerprint, frozenset(roles), policy_version)
+        result = self.decisions.get(key)
+        if result is not None:
+            return (*result, True)
+        result = check(template.sql)
+        allowed, reason, policy = result
+        if allowed or not (reason or "").startswith("Authorization check failed"):
+            # Never cache fail-closed denials caused by Cerbos being unavailable
+            self.decisions.set(key, result)
+        return (*result, False)
+
+    def stats(self) -> dict:
+        with self._lock:
+            registered = len(self._templates)
+        return {
+            "registered": registered,
+            "adhoc": self._adhoc.stats(),
+            "decisions": self.decisions.stats(),
+        }
+
+
+# Global instance (will be initialized on first use)
+_template_registry: Optional[TemplateRegistry] = None
+
+
+def get_template_registry() -> TemplateRegistry:
+    """Get or create the global template registry."""
+    global _template_registry
+    if _template_registry is None:
+        _template_registry = TemplateRegistry()
+    return _template_registry
@@ -0,0 +1,232 @@
+"""
+SQL Result Cache
+
+This module caches the results of read-only SQL queries run through /query and
+/query/template, so repeated identical queries skip Trino and the results
+database. Entries are keyed by the normalized SQL, catalog, schema and the
+caller's authorization context (role set, Cerbos policy version and the column
+masking rules), so callers only share results they would be allowed to see
+anyway.
+
+Queries that read Iceberg tables record each table's current snapshot id when
+they run. Every lookup re-reads the current snapshot ids and drops the entry if
+any table has changed, so cached Iceberg reads are never stale. Queries using
+non-deterministic functions (now(), random(), current_user, ...) are not cached.
+"""
+import os
+import re
+import time
+import hashlib
+import logging
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+from ttl_cache import TTLCache
+from cerbos_client import get_policy_version, sql_features
+
+logger = logging.getLogger(__name__)
+
+# Set RESULT_CACHE_MAX_ENTRIES or RESULT_CACHE_TTL to 0 to disable the cache
+RESULT_CACHE_MAX_ENTRIES = int(os.getenv("RESULT_CACHE_MAX_ENTRIES", "200"))
+RESULT_CACHE_TTL_SECONDS = float(os.getenv("RESULT_CACHE_TTL", "300"))
+# Larger results are not cached, so the cache's memory use stays bounded
+RESULT_CACHE_MAX_ROWS = int(os.getenv("RESULT_CACHE_MAX_ROWS", "10000"))
+
+# Optional Trino column mask definitions; their content is part of every cache key
+COLUMN_MASKS_FILE = os.getenv("TRINO_COLUMN_MASKS_FILE", "")
+
+_READ_ONLY_PATTERN = re.compile(r"^\s*(select|with|values|table)\b", re.IGNORECASE)
+_NON_DETERMINISTIC_PATTERN = re.compile(
+    r"\b(now|current_timestamp|current_time|current_date|localtime|localtimestamp|"
+    r"random|rand|uuid|shuffle|current_user|current_catalog|current_schema)\b",
+    re.IGNORECASE
+)
+_IDENTIFIER_PATTERN = re.compile(r"^\w+$")
+_TOKEN_PATTERN = re.compile(r"'(?:[^']|'')*'|\"(?:[^\"]|\"\")*\"|\s+|[^'\"\s]+")
+
+
+def normalize_sql(sql: str) -> str:
+    """Collapse whitespace outside quoted literals and drop trailing semicolons."""
+    tokens = [" " if token.isspace() else token for token in _TOKEN_PATTERN.findall(sql)]
+    return "".join(tokens).strip().rstrip(";").strip()
+
+
+def is_cacheable(sql: str) -> bool:
+    """True for read-only queries whose result only depends on the data they read."""
+    return bool(_READ_ONLY_PATTERN.match(sql)) and not _NON_DETERMINISTIC_PATTERN.search(sql)
+
+
+def iceberg_tables(sql: str, catalog: str, schema: str) -> Optional[List[Tuple[str, str]]]:
+    """
+    Return the (schema, table) pairs of the Iceberg tables a query reads.
+
+    Returns:
+        The tables, or None if the query references Iceberg in a way that can't
+        be resolved to plain table names (such queries are not cached)
+    """
+    tables = set()
+    for name in sql_features(sql)["tables"]:
+        parts = name.split(".")
+        if len(parts) == 3:
+            table_catalog, table_schema, table = parts
+        elif len(parts) == 2:
+            table_catalog, (table_schema, table) = catalog, parts
+        else:
+            table_catalog, table_schema, table = catalog, schema, parts[0]
+        if table_catalog != "iceberg":
+            continue
+        if not (_IDENTIFIER_PATTERN.match(table_schema) and _IDENTIFIER_PATTERN.match(table)):
+            return None
+        tables.add((table_schema, table))
+    if not tables and (catalog == "iceberg" or "iceberg." in sql.lower()):
+        return None
+    if tables and '"' in sql:
+        # Quoted identifiers may contain spaces or dots the table pattern can't follow
+        return None
+    return sorted(tables)
+
+
+def _masking_fingerprint() -> str:
+    if not COLUMN_MASKS_FILE:
+        return ""
+    try:
+        with open(COLUMN_MASKS_FILE, "rb") as f:
+            return hashlib.sha256(f.read()).hexdigest()
+    except OSError as e:
+        logger.warning(f"Could not read column masks file {COLUMN_MASKS_FILE}: {e}")
+        return "unreadable"
+
+
+def current_snapshot_id(username: str, schema: str, table: str) -> Optional[str]:
+    """
+    Read the current snapshot id of an Iceberg table through Trino.
+
+    Raises:
+        RuntimeError: If the snapshot history can't be read
+    """
+    from trino_client import get_trino_client
+
+    query = (
+        f'SELECT snapshot_id FROM iceberg.{schema}."{table}$history" '
+        f'WHERE is_current_ancestor ORDER BY made_current_at DESC LIMIT 1'
+    )
+    with get_trino_client().execute_query(username, "iceberg", schema, query) as (success, data, columns, error):
+        if not success:
+            raise RuntimeError(error)
+        return str(data[0][0]) if data else None
+
+
+class CachedResult:
+    """A cached query result."""
+
+    __slots__ = ("columns", "data", "query_id", "user_id", "snapshots", "created_at")
+
+    def __init__(self, columns: List[dict], data: List[list], query_id: str, user_id: int, snapshots: Dict[str, Optional[str]]):
+        self.columns = columns
+        self.data = data
+        self.query_id = query_id
+        self.user_id = user_id
+        self.snapshots = snapshots
+        self.created_at = time.time()
+
+
+class CacheLookup:
+    """Outcome of a cache lookup; pass it to ResultCache.store() after a miss."""
+
+    __slots__ = ("key", "entry", "snapshots")
+
+    def __init__(self, key: str, entry: Optional[CachedResult], snapshots: Dict[str, Optional[str]]):
+        self.key = key
+        self.entry = entry
+        self.snapshots = snapshots
+
+
+class ResultCache:
+    """Role-aware query result cache with Iceberg snapshot validation."""
+
+    def __init__(self, max_entries: int = RESULT_CACHE_MAX_ENTRIES, ttl_seconds: float = RESULT_CACHE_TTL_SECONDS,
+                 max_rows: int = RESULT_CACHE_MAX_ROWS, snapshot_reader=current_snapshot_id):
+        self.entries = TTLCache(max_size=max_entries, ttl_seconds=ttl_seconds, name="query_results")
+        self.max_rows = max_rows
+        self.snapshot_reader = snapshot_reader
+        self.masking_fingerprint = _masking_fingerprint()
+        self._lock = threading.Lock()
+        self._invalidations = 0
+        self._uncacheable = 0
+        self._too_large = 0
+
+    def cache_key(self, sql: str, catalog: str, schema: str, roles: List[str]) -> str:
+        """Digest of the normalized query and the caller's authorization context."""
+        parts = [
+            normalize_sql(sql), catalog, schema,
+            ",".join(sorted(set(roles))), str(get_policy_version()), self.masking_fingerprint
+        ]
+        return hashlib.sha256("\0".join(parts).encode("utf-8")).hexdigest()
+
+    def lookup(self, sql: str, catalog: str, schema: str, roles: List[str], username: str) -> Optional[CacheLookup]:
+        """
+        Look up a query. Call only after the query has been authorized.
+
+        Returns:
+            None if the query can't be cached, otherwise a CacheLookup whose
+            entry is the cached result (or None on a miss)
+        """
+        if not self.entries.enabled:
+            return None
+        tables = iceberg_tables(sql, catalog, schema) if is_cacheable(sql) else None
+        if tables is None:
+            self._count("_uncacheable")
+            return None
+        try:
+            # Read before the query runs, so a write racing with it invalidates the entry
+            snapshots = {f"{s}.{t}": self.snapshot_reader(username, s, t) for s, t in tables}
+        except Exception as e:
+            logger.warning(f"Could not read Iceberg snapshots, not caching query: {e}")
+            self._count("_uncacheable")
+            return None
+
+        key = self.cache_key(sql, catalog, schema, roles)
+        entry = self.entries.get(key)
+        if entry is not None and entry.snapshots != snapshots:
+            logger.info(f"Iceberg snapshot changed, dropping cached result {key[:12]}")
+            self.entries.pop(key)
+            self._count("_invalidations")
+            entry = None
+        return CacheLookup(key, entry, snapshots)
+
+    def store(self, lookup: CacheLookup, columns: List[dict], data: List[list], query_id: str, user_id: int) -> bool:
+        """Cache a result obtained after a miss. Returns False if it is too large."""
+        if len(data) > self.max_rows:
+            self._count("_too_large")
+            return False
+        self.entries.set(lookup.key, CachedResult(columns, data, query_id, user_id, lookup.snapshots))
+        return True
+
+    def clear(self) -> int:
+        return self.entries.clear()
+
+    def _count(self, counter: str) -> None:
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters plus snapshot invalidations and skipped queries."""
+        with self._lock:
+            return {
+                **self.entries.stats(),
+                "max_rows": self.max_rows,
+                "snapshot_invalidations": self._invalidations,
+                "uncacheable": self._uncacheable,
+                "too_large": self._too_large,
+            }
+
+
+# Global instance (will be initialized on first use)
+_result_cache: Optional[ResultCache] = None
+
+
+def get_result_cache() -> ResultCache:
+    """Get or create the global result cache."""
+    global _result_cache
+    if _result_cache is None:
+        _result_cache = ResultCache()
+    return _result_cache
@@ -0,0 +1,209 @@
+"""
+Result Size Governor
+
+This module bounds how much of a query result the backend fetches from Trino.
+Every caller gets a row and byte budget derived from their roles (the most
+generous budget of any role applies). Queries without a LIMIT get one injected,
+fetching stops as soon as the budget is used up, and the response reports
+truncated: true together with the row and byte counts, so an unbounded
+SELECT * never pulls millions of rows into the backend or the results database.
+
+Budgets are configured with RESULT_MAX_ROWS / RESULT_MAX_BYTES (the default for
+every role) and RESULT_ROLE_BUDGETS, a JSON object such as
+{"admin": {"max_rows": 1000000, "max_bytes": 1073741824}}.
+"""
+import os
+import re
+import json
+import logging
+from typing import Any, Dict, List, NamedTuple, Optional
+
+logger = logging.getLogger(__name__)
+
+RESULT_MAX_ROWS = int(os.getenv("RESULT_MAX_ROWS", "10000"))
+RESULT_MAX_BYTES = int(os.getenv("RESULT_MAX_BYTES", str(64 * 1024 * 1024)))
+
+DEFAULT_ROLE_BUDGETS = {
+    "admin": {"max_rows": 1000000, "max_bytes": 1024 * 1024 * 1024},
+    "full_access_user": {"max_rows": 100000, "max_bytes": 256 * 1024 * 1024},
+}
+
+_LIMITABLE_PATTERN = re.compile(r"^\s*(select|with|values|table)\b", re.IGNORECASE)
+# A LIMIT / FETCH FIRST / OFFSET clause at the end of the statement
+_TRAILING_LIMIT_PATTERN = re.compile(
+    r"\b(limit\s+(\d+|all)|fetch\s+(first|next)\s+.*\s+(only|with\s+ties)|offset\s+\d+\s+rows?)\s*$",
+    re.IGNORECASE | re.DOTALL
+)
+
+
+class ResultBudget(NamedTuple):
+    max_rows: int
+    max_bytes: int
+
+
+def _load_role_budgets() -> Dict[str, ResultBudget]:
+    budgets = dict(DEFAULT_ROLE_BUDGETS)
+    raw = os.getenv("RESULT_ROLE_BUDGETS")
+    if raw:
+        try:
+            budgets.update(json.loads(raw))
+        except ValueError as e:
+            logger.error(f"Ignoring invalid RESULT_ROLE_BUDGETS: {e}")
+    return {
+        role: ResultBudget(
+            int(budget.get("max_rows", RESULT_MAX_ROWS)),
+            int(budget.get("max_bytes", RESULT_MAX_BYTES))
+        )
+        for role, budget in budgets.items()
+    }
+
+
+ROLE_BUDGETS = _load_role_budgets()
+
+
+def budget_for_roles(roles: List[str], role_budgets: Optional[Dict[str, ResultBudget]] = None) -> ResultBudget:
+    """Return the largest row and byte budget granted by any of the roles."""
+    role_budgets = ROLE_BUDGETS if role_budgets is None else role_budgets
+    budgets = [role_budgets[role] for role in roles if role in role_budgets]
+    budgets.append(ResultBudget(RESULT_MAX_ROWS, RESULT_MAX_BYTES))
+    return ResultBudget(max(b.max_rows for b in budgets), max(b.max_bytes for b in budgets))
+
+
+def _strip_trailing_comments(statement: str) -> Optional[str]:
+    """
+    Cut -- and /* */ comments (and whitespace) off the end of a statement.
+
+    Quoted strings and identifiers are skipped, so a "--" inside a literal is
+    left alone. Returns None if a comment or quote is never closed.
+    """
+    code_end = 0
+    i, length = 0, len(statement)
+    while i < length:
+        char = statement[i]
+        if statement.startswith("--", i):
+            newline = statement.find("\n", i)
+            i = length if newline < 0 else newline
+        elif statement.startswith("/*", i):
+            close = statement.find("*/", i + 2)
+            if close < 0:
+                return None
+            i = close + 2
+        elif char in ("'", '"'):
+            # A doubled quote inside the literal is an escaped quote
+            i += 1
+            while True:
+                close = statement.find(char, i)
+                if close < 0:
+                    return None
+                i = close + 1
+                if not statement.startswith(char, i):
+                    break
+                i += 1
+            code_end = i
+        else:
+            if not char.isspace():
+                code_end = i + 1
+            i += 1
+    return statement[:code_end]
+
+
+def _strip_leading_comments(statement: str) -> Optional[str]:
+    """Cut -- and /* */ comments (and whitespace) off the start of a statement; None if a comment is never closed."""
+    i, length = 0, len(statement)
+    while i < length:
+        if statement[i].isspace():
+            i += 1
+        elif statement.startswith("--", i):
+            newline = statement.find("\n", i)
+            i = length if newline < 0 else newline
+        elif statement.startswith("/*", i):
+            close = statement.find("*/", i + 2)
+            if close < 0:
+                return None
+            i = close + 2
+        else:
+            break
+    return statement[i:]
+
+
+def inject_limit(sql: str, max_rows: int) -> Optional[str]:
+    """
+    Add a LIMIT to a query that has none.
+
+    One row more than the budget is requested, so a result that exactly fits is
+    not reported as truncated.
+
+    Returns:
+        The limited query, or None if the query already limits itself or isn't a query
+    """
+    statement = _strip_trailing_comments(sql)
+    if statement is None:
+        return None
+    statement = statement.rstrip(";").rstrip()
+    # Leading comments stay in the query sent to Trino, they just don't hide the SELECT
+    body = _strip_leading_comments(statement)
+    if not body or not _LIMITABLE_PATTERN.match(body) or _TRAILING_LIMIT_PATTERN.search(body):
+        return None
+    return f"{statement}\nLIMIT {max_rows + 1}"
+
+
+def estimate_row_bytes(row) -> int:
+    """Approximate size of a row as stored in the results database (its text form)."""
+    return sum(len(str(value)) for value in row if value is not None)
+
+
+class ResultGovernor:
+    """Tracks one query's rows and bytes against its budget."""
+
+    def __init__(self, budget: ResultBudget):
+        self.budget = budget
+        self.rows = 0
+        self.bytes = 0
+        self.truncated = False
+        self.limit_injected = False
+
+    def prepare(self, sql: str) -> str:
+        """Return the query to send to Trino (with a LIMIT if it had none)."""
+        limited = inject_limit(sql, self.budget.max_rows)
+        if limited is None:
+            return sql
+        self.limit_injected = True
+        return limited
+
+    def admit(self, batch: List[list]) -> List[list]:
+        """Return the leading rows of a batch that still fit the budget."""
+        if self.truncated:
+            return []
+        for i, row in enumerate(batch):
+            size = estimate_row_bytes(row)
+            if self.rows >= self.budget.max_rows or self.bytes + size > self.budget.max_bytes:
+                self.truncated = True
+                return batch[:i]
+            self.rows += 1
+            self.bytes += size
+        return batch
+
+    def fetch(self, cursor, batch_size: int) -> List[list]:
+        """Fetch rows from a cursor until the result or the budget runs out."""
+        data: List[list] = []
+        while not self.truncated:
+            batch = cursor.fetchmany(batch_size)
+            if not batch:
+                break
+            data.extend(self.admit(batch))
+        return data
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "truncated": self.truncated,
+            "rows": self.rows,
+            "bytes": self.bytes,
+            "max_rows": self.budget.max_rows,
+            "max_bytes": self.budget.max_bytes,
+            "limit_injected": self.limit_injected,
+        }
+
+
+def governor_for_roles(roles: List[str]) -> ResultGovernor:
+    """Create a governor with the budget of the given roles."""
+    return ResultGovernor(budget_for_roles(roles))
@@ -0,0 +1,201 @@
+"""
+Write-Behind Result Persistence
+
+Synchronous /query requests already hold the complete result when Trino
+finishes, so this module takes writing it to the query results database off the
+request path: the endpoint stores the Query row (persist_status PENDING),
+submits the rows here and returns them to the client right away. A small pool
+of worker threads writes the results (see result_store), retrying failed writes
+with exponential backoff, and sets persist_status to PERSISTED or FAILED.
+
+The queue is bounded. When it stays full for RESULT_PERSIST_SUBMIT_TIMEOUT
+seconds, the request writes its result itself, so a slow database slows
+/query down instead of piling results up in memory.
+"""
+import os
+import time
+import queue
+import logging
+import threading
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+from query_models import Query
+from result_store import delete_results, write_results
+
+logger = logging.getLogger(__name__)
+
+RESULT_PERSIST_WORKERS = int(os.getenv("RESULT_PERSIST_WORKERS", "2"))
+RESULT_PERSIST_MAX_PENDING = int(os.getenv("RESULT_PERSIST_MAX_PENDING", "32"))
+RESULT_PERSIST_SUBMIT_TIMEOUT_SECONDS = float(os.getenv("RESULT_PERSIST_SUBMIT_TIMEOUT", "2"))
+RESULT_PERSIST_MAX_ATTEMPTS = int(os.getenv("RESULT_PERSIST_MAX_ATTEMPTS", "3"))
+RESULT_PERSIST_RETRY_DELAY_SECONDS = float(os.getenv("RESULT_PERSIST_RETRY_DELAY", "0.5"))
+
+PERSIST_PENDING = "PENDING"
+PERSIST_DONE = "PERSISTED"
+PERSIST_FAILED = "FAILED"
+
+
+class PersistJob(NamedTuple):
+    query_id: str
+    columns: List[Dict[str, str]]
+    data: List[list]
+
+
+class ResultPersister:
+    """Bounded queue of result writes drained by background worker threads."""
+
+    def __init__(
+        self,
+        session_factory: Optional[Callable] = None,
+        workers: int = RESULT_PERSIST_WORKERS,
+        max_pending: int = RESULT_PERSIST_MAX_PENDING,
+        submit_timeout_seconds: float = RESULT_PERSIST_SUBMIT_TIMEOUT_SECONDS,
+        max_attempts: int = RESULT_PERSIST_MAX_ATTEMPTS,
+        retry_delay_seconds: float = RESULT_PERSIST_RETRY_DELAY_SECONDS
+    ):
+        """
+        Args:
+            session_factory: Creates query results database sessions (defaults to get_query_db_sync)
+            max_pending: Jobs queued before submit blocks (backpressure)
+            submit_timeout_seconds: How long submit waits for room before writing inline
+            max_attempts: Write attempts per job before it is marked FAILED
+        """
+        if session_factory is None:
+            from query_db import get_query_db_sync
+            session_factory = get_query_db_sync
+        self.session_factory = session_factory
+        self.workers = workers
+        self.submit_timeout_seconds = submit_timeout_seconds
+        self.max_attempts = max(1, max_attempts)
+        self.retry_delay_seconds = retry_delay_seconds
+        self._queue: "queue.Queue[Optional[PersistJob]]" = queue.Queue(maxsize=max_pending)
+        self._threads: List[threading.Thread] = []
+        self._lock = threading.Lock()
+        self._persisted = 0
+        self._failed = 0
+        self._retries = 0
+        self._inline = 0
+
+    def submit(self, query_id: str, columns: List[Dict[str, str]], data: List[list]) -> bool:
+        """
+        Queue a result for writing; the query row must already be committed.
+
+        Returns:
+            True if queued, False if the queue stayed full and the result was written inline
+        """
+        self._ensure_workers()
+        job = PersistJob(query_id, columns, data)
+        try:
+            self._queue.put(job, timeout=self.submit_timeout_seconds)
+            return True
+        except queue.Full:
+            logger.warning(f"Result persistence queue full, writing results for {query_id} inline")
+            with self._lock:
+                self._inline += 1
+            self._persist(job)
+            return False
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until every queued job has been written (or has failed); returns False on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def shutdown(self, timeout: Optional[float] = None) -> None:
+        """Write what is queued (up to timeout), then stop the workers."""
+        self.flush(timeout)
+        with self._lock:
+            threads, self._threads = self._threads, []
+        for _ in threads:
+            self._queue.put(None)
+
+    def _ensure_workers(self) -> None:
+        with self._lock:
+            while len(self._threads) < self.workers:
+                thread = threading.Thread(target=self._work, daemon=True, name=f"result-persist-{len(self._threads)}")
+                thread.start()
+                self._threads.append(thread)
+
+    def _work(self) -> None:
+        while True:
+            job = self._queue.get()
+            try:
+                if job is None:
+                    return
+                self._persist(job)
+            finally:
+                self._queue.task_done()
+
+    def _persist(self, job: PersistJob) -> None:
+        for attempt in range(1, self.max_attempts + 1):
+            query_db = self.session_factory()
+            try:
+                query = query_db.get(Query, job.query_id)
+                if query is None:
+                    # Deleted by its owner before the write happened
+                    logger.info(f"Query {job.query_id} no longer exists, dropping its results")
+                    return
+                write_results(query_db, job.query_id, job.columns, job.data)
+                query.persist_status = PERSIST_DONE
+                query_db.commit()
+                with self._lock:
+                    self._persisted += 1
+                return
+            except Exception as e:
+                query_db.rollback()
+                if attempt < self.max_attempts:
+                    logger.warning(f"Persisting results for {job.query_id} failed (attempt {attempt}), retrying: {e}")
+                    with self._lock:
+                        self._retries += 1
+                    time.sleep(self.retry_delay_seconds * 2 ** (attempt - 1))
+                else:
+                    logger.error(f"Persisting results for {job.query_id} failed after {attempt} attempts: {e}")
+                    self._mark_failed(query_db, job.query_id)
+            finally:
+                query_db.close()
+
+    def _mark_failed(self, query_db, query_id: str) -> None:
+        with self._lock:
+            self._failed += 1
+        try:
+            # Nothing partial may remain, so a FAILED result never looks complete
+            delete_results(query_db, query_id)
+            query = query_db.get(Query, query_id)
+            if query is not None:
+                query.persist_status = PERSIST_FAILED
+            query_db.commit()
+        except Exception as e:
+            query_db.rollback()
+            logger.error(f"Could not mark results of {query_id} as failed: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "workers": len(self._threads),
+                "pending": self._queue.qsize(),
+                "max_pending": self._queue.maxsize,
+                "persisted": self._persisted,
+                "failed": self._failed,
+                "retries": self._retries,
+                "inline": self._inline,
+            }
+
+
+# Global instance (will be initialized on first use)
+_result_persister: Optional[ResultPersister] = None
+
+
+def get_result_persister() -> ResultPersister:
+    """Get or create the global result persister."""
+    global _result_persister
+    if _result_persister is None:
+        _result_persister = ResultPersister()
+    return _result_persister
+
+
+def shutdown_result_persister(timeout: Optional[float] = None) -> None:
+    """Drain and stop the global persister if it was started."""
+    if _result_persister is not None:
+        _result_persister.shutdown(timeout)
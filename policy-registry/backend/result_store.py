@@ -0,0 +1,534 @@
+"""
+Columnar Result Store
+
+This module persists query results in the query results database as
+compressed columnar chunks (QueryResultChunk) instead of one QueryResult row
+per cell. Every RESULT_STORE_CHUNK_ROWS rows become one chunk: an Arrow IPC
+stream, compressed with RESULT_STORE_CODEC and typed from the Trino column
+types (see arrow_results), with the row range it covers. A 100k x 20 result is
+ten rows instead of two million, values keep their types, and a row range
+can be read back without decoding the chunks outside it. Columns and chunks are
+written with bulk_copy (COPY on PostgreSQL), not as ORM objects.
+
+Results are content-addressed: the SHA-256 of the normalized columns and rows
+names a ResultSet whose chunks are stored once and shared, reference-counted,
+by every query (Query.result_hash) that returned the same result. Reruns and
+identical queries from different users add a reference instead of a copy; the
+chunks go when the last referencing query is deleted. Access is still checked
+per query, since chunks are only reachable through a query the caller owns.
+
+Without pyarrow (or for a batch Arrow cannot represent) a chunk is stored as
+zlib-compressed JSON instead; the format is recorded per chunk, so readers
+handle both. Results written by the old per-cell store are still readable and
+can be converted with migrate_legacy_results (scripts/migrate_cell_results.py).
+"""
+import io
+import os
+import json
+import zlib
+import base64
+import hashlib
+import binascii
+import logging
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+from query_models import Query, QueryColumn, QueryResult, QueryResultChunk, ResultSet
+from bulk_copy import bulk_insert
+from arrow_results import ARROW_AVAILABLE, arrow_schema, record_batch, pa
+
+logger = logging.getLogger(__name__)
+
+# Rows per stored chunk
+RESULT_STORE_CHUNK_ROWS = int(os.getenv("RESULT_STORE_CHUNK_ROWS", "10000"))
+
+# Arrow IPC compression codec ("zstd", "lz4" or "none")
+RESULT_STORE_CODEC = os.getenv("RESULT_STORE_CODEC", "zstd").lower()
+
+# Page size when a page is requested without a limit, and the largest allowed limit
+RESULT_PAGE_DEFAULT_ROWS = int(os.getenv("RESULT_PAGE_DEFAULT_ROWS", "100"))
+RESULT_PAGE_MAX_ROWS = int(os.getenv("RESULT_PAGE_MAX_ROWS", "10000"))
+
+_ARROW_ERRORS = (pa.ArrowException, TypeError, ValueError, OverflowError) if ARROW_AVAILABLE else (TypeError, ValueError)
+
+
+def _arrow_codec(codec: str) -> Optional[str]:
+    if codec in ("", "none") or not pa.Codec.is_available(codec):
+        return None
+    return codec
+
+
+def _text_batch(schema, rows: List[list]):
+    """Build a record batch from stringified cells, restoring each column's type where the text parses."""
+    arrays, fields = [], []
+    for position, field in enumerate(schema):
+        array = pa.array([row[position] for row in rows], type=pa.string())
+        if not pa.types.is_string(field.type):
+            try:
+                array = array.cast(field.type)
+            except _ARROW_ERRORS:
+                field = field.with_type(pa.string())
+        arrays.append(array)
+        fields.append(field)
+    return pa.RecordBatch.from_arrays(arrays, schema=pa.schema(fields))
+
+
+def encode_chunk(columns: List[Dict[str, str]], rows: List[list], codec: str = RESULT_STORE_CODEC,
+                 text_values: bool = False) -> Tuple[str, Optional[str], bytes]:
+    """
+    Encode a batch of rows as one stored chunk.
+
+    Args:
+        columns: Result columns with their Trino types
+        rows: The rows to encode
+        codec: Arrow IPC compression codec
+        text_values: The rows hold stringified cells (legacy results) to be parsed back into their types
+
+    Returns:
+        (format, codec, payload)
+    """
+    if ARROW_AVAILABLE:
+        try:
+            schema = arrow_schema(columns)
+            batch = _text_batch(schema, rows) if text_values else record_batch(schema, rows)
+            arrow_codec = _arrow_codec(codec)
+            sink = io.BytesIO()
+            with pa.ipc.new_stream(sink, batch.schema, options=pa.ipc.IpcWriteOptions(compression=arrow_codec)) as writer:
+                writer.write_batch(batch)
+            return "arrow", arrow_codec, sink.getvalue()
+        except _ARROW_ERRORS as e:
+            logger.debug(f"Storing result chunk as JSON, Arrow cannot encode it: {e}")
+    payload = json.dumps(rows, default=str, separators=(",", ":")).encode("utf-8")
+    return "json", "zlib", zlib.compress(payload)
+
+
+def decode_chunk(chunk: QueryResultChunk, start: int = 0, stop: Optional[int] = None) -> List[list]:
+    """Decode rows [start, stop) of a stored chunk (Arrow chunks only convert those rows)."""
+    if chunk.format == "arrow":
+        table = pa.ipc.open_stream(chunk.data).read_all()
+        table = table.slice(start, None if stop is None else max(stop - start, 0))
+        return [list(row) for row in zip(*(column.to_pylist() for column in table.columns))]
+    if chunk.format == "json":
+        payload = zlib.decompress(chunk.data) if chunk.codec == "zlib" else chunk.data
+        return json.loads(payload)[start:stop]
+    raise ValueError(f"Unknown result chunk format: {chunk.format}")
+
+
+def _canonical(value: Any) -> bytes:
+    return json.dumps(value, default=str, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+class ResultHasher:
+    """SHA-256 over the normalized column list and row stream; independent of how rows are batched."""
+
+    def __init__(self, columns: List[Dict[str, str]]):
+        self._sha = hashlib.sha256(_canonical([[col.get("name"), col.get("type")] for col in columns]))
+
+    def update(self, rows: Iterable[list]) -> None:
+        for row in rows:
+            self._sha.update(b"\n")
+            self._sha.update(_canonical(row))
+
+    def hexdigest(self) -> str:
+        return self._sha.hexdigest()
+
+
+def content_hash(columns: List[Dict[str, str]], rows: Iterable[list]) -> str:
+    """Return the content address of a result."""
+    hasher = ResultHasher(columns)
+    hasher.update(rows)
+    return hasher.hexdigest()
+
+
+def _acquire_result_set(query_db, digest: str) -> bool:
+    """
+    Reference the result set with this hash, creating it if it does not exist yet.
+
+    Returns:
+        True if it was created (the caller writes its chunks), False if an existing one was referenced
+    """
+    increment = {ResultSet.ref_count: ResultSet.ref_count + 1}
+    if query_db.query(ResultSet).filter(ResultSet.content_hash == digest).update(increment, synchronize_session=False):
+        return False
+    try:
+        with query_db.begin_nested():
+            query_db.add(ResultSet(content_hash=digest, row_count=0, byte_size=0, ref_count=1))
+        return True
+    except IntegrityError:
+        # Another writer stored the same result in the meantime
+        query_db.query(ResultSet).filter(ResultSet.content_hash == digest).update(increment, synchronize_session=False)
+        return False
+
+
+def _release_result_set(query_db, digest: str) -> None:
+    """Drop one reference to a result set, deleting it and its chunks when none are left."""
+    query_db.query(ResultSet).filter(ResultSet.content_hash == digest).update(
+        {ResultSet.ref_count: ResultSet.ref_count - 1}, synchronize_session=False
+    )
+    orphaned = query_db.query(ResultSet.content_hash).filter(
+        ResultSet.content_hash == digest, ResultSet.ref_count <= 0
+    ).first()
+    if orphaned is not None:
+        query_db.query(QueryResultChunk).filter(QueryResultChunk.result_hash == digest).delete()
+        query_db.query(ResultSet).filter(ResultSet.content_hash == digest).delete()
+
+
+def _chunk_owner(query_db, query_id: str):
+    """Filter selecting a query's chunks: those of its shared result set, or its own while being written."""
+    digest = query_db.query(Query.result_hash).filter(Query.id == query_id).scalar()
+    if digest:
+        return QueryResultChunk.result_hash == digest
+    return QueryResultChunk.query_id == query_id
+
+
+class ResultWriter:
+    """Buffers result rows and writes them one chunk at a time on the session's connection (the caller commits)."""
+
+    def __init__(self, query_db, query_id: str, columns: List[Dict[str, str]],
+                 chunk_rows: int = RESULT_STORE_CHUNK_ROWS, codec: str = RESULT_STORE_CODEC,
+                 text_values: bool = False, store_columns: bool = True, result_hash: Optional[str] = None):
+        """
+        Args:
+            columns: Result columns; stored as QueryColumn rows unless store_columns is False
+            text_values: The rows hold stringified cells (see encode_chunk)
+            result_hash: The result's content hash if known up front: chunks are then written
+                straight to its result set, or not at all if that is already stored. Otherwise
+                chunks are written for the query and shared (or dropped as duplicates) on close.
+        """
+        self.query_db = query_db
+        self.query_id = query_id
+        self.columns = [
+            {"name": col.get("name", f"col_{i}"), "type": col.get("type", "unknown")}
+            for i, col in enumerate(columns)
+        ]
+        self.chunk_rows = max(1, chunk_rows)
+        self.codec = codec
+        self.text_values = text_values
+        self.rows_written = 0
+        self.chunks_written = 0
+        self.bytes_written = 0
+        self.result_hash = result_hash
+        self.reused = False  # The result was already stored by another query
+        self._buffer: List[list] = []
+        self._hasher = ResultHasher(self.columns) if result_hash is None else None
+        if result_hash is not None:
+            self.reused = not _acquire_result_set(query_db, result_hash)
+        if store_columns:
+            bulk_insert(query_db, QueryColumn.__table__, [
+                {"query_id": query_id, "column_name": col["name"], "column_type": col["type"], "column_position": i}
+                for i, col in enumerate(self.columns)
+            ])
+
+    def append(self, rows: Iterable[list]) -> int:
+        """Add rows; returns the number of chunks this wrote to the database."""
+        flushed = 0
+        if self.reused:
+            self.rows_written += sum(1 for _ in rows)
+            return flushed
+        rows = list(rows)
+        if self._hasher is not None:
+            self._hasher.update(rows)
+        self._buffer.extend(rows)
+        while len(self._buffer) >= self.chunk_rows:
+            self._flush(self._buffer[:self.chunk_rows])
+            del self._buffer[:self.chunk_rows]
+            flushed += 1
+        return flushed
+
+    def close(self) -> int:
+        """Flush the remaining rows and link the query to its shared result; returns the number of rows."""
+        if self._buffer:
+            self._flush(self._buffer)
+            self._buffer = []
+        if self._hasher is not None:
+            if not self.rows_written:
+                return 0
+            self._share(self._hasher.hexdigest())
+        elif not self.reused:
+            self._record_result_set()
+        self.query_db.query(Query).filter(Query.id == self.query_id).update(
+            {Query.result_hash: self.result_hash}, synchronize_session=False
+        )
+        return self.rows_written
+
+    def _share(self, digest: str) -> None:
+        """Hand the chunks written for the query to the result set, or drop them if it is already stored."""
+        self.result_hash = digest
+        own_chunks = self.query_db.query(QueryResultChunk).filter(QueryResultChunk.query_id == self.query_id)
+        if _acquire_result_set(self.query_db, digest):
+            self._record_result_set()
+            own_chunks.update(
+                {QueryResultChunk.result_hash: digest, QueryResultChunk.query_id: None}, synchronize_session=False
+            )
+        else:
+            self.reused = True
+            own_chunks.delete()
+
+    def _record_result_set(self) -> None:
+        self.query_db.query(ResultSet).filter(ResultSet.content_hash == self.result_hash).update(
+            {ResultSet.row_count: self.rows_written, ResultSet.byte_size: self.bytes_written},
+            synchronize_session=False
+        )
+
+    def _flush(self, rows: List[list]) -> None:
+        data_format, codec, payload = encode_chunk(self.columns, rows, self.codec, self.text_values)
+        shared = self.result_hash is not None
+        bulk_insert(self.query_db, QueryResultChunk.__table__, [{
+            "query_id": None if shared else self.query_id,
+            "result_hash": self.result_hash if shared else None,
+            "chunk_index": self.chunks_written,
+            "first_row": self.rows_written,
+            "row_count": len(rows),
+            "format": data_format,
+            "codec": codec,
+            "byte_size": len(payload),
+            "data": payload
+        }])
+        self.rows_written += len(rows)
+        self.chunks_written += 1
+        self.bytes_written += len(payload)
+
+
+def write_results(query_db, query_id: str, columns: List[Dict[str, str]], data: List[list],
+                  chunk_rows: int = RESULT_STORE_CHUNK_ROWS) -> ResultWriter:
+    """
+    Write a complete result (columns and rows) on the session's connection (the caller commits).
+
+    The rows are hashed first, so a result that is already stored is only referenced, not encoded again.
+    """
+    writer = ResultWriter(query_db, query_id, columns, chunk_rows=chunk_rows, result_hash=content_hash(columns, data))
+    writer.append(data)
+    writer.close()
+    return writer
+
+
+def read_columns(query_db, query_id: str) -> List[Dict[str, str]]:
+    """Return the stored columns of a result, in order."""
+    columns = query_db.query(QueryColumn).filter(
+        QueryColumn.query_id == query_id
+    ).order_by(QueryColumn.column_position).all()
+    return [{"name": col.column_name, "type": col.column_type} for col in columns]
+
+
+def read_rows(query_db, query_id: str, offset: int = 0, limit: Optional[int] = None) -> List[list]:
+    """
+    Return stored result rows [offset, offset + limit), decoding only the chunks that overlap them.
+
+    Both lookups are range scans of the (query_id, first_row) index. Falls back
+    to the legacy per-cell rows for results that have not been migrated.
+    """
+    owner = _chunk_owner(query_db, query_id)
+    # The chunk holding the first requested row starts at or before offset
+    first_chunk_row = query_db.query(QueryResultChunk.first_row).filter(
+        owner,
+        QueryResultChunk.first_row <= offset
+    ).order_by(QueryResultChunk.first_row.desc()).limit(1).scalar()
+    if first_chunk_row is None:
+        return _read_legacy_rows(query_db, query_id, offset, limit)
+
+    stop = None if limit is None else offset + limit
+    chunks = query_db.query(QueryResultChunk).filter(
+        owner,
+        QueryResultChunk.first_row >= first_chunk_row
+    )
+    if stop is not None:
+        chunks = chunks.filter(QueryResultChunk.first_row < stop)
+    rows: List[list] = []
+    for chunk in chunks.order_by(QueryResultChunk.first_row).all():
+        rows.extend(decode_chunk(
+            chunk,
+            start=max(offset - chunk.first_row, 0),
+            stop=None if stop is None else stop - chunk.first_row
+        ))
+    return rows
+
+
+def stored_row_count(query_db, query_id: str) -> int:
+    """
+    Number of rows stored for a query, from chunk metadata (no rows are decoded).
+
+    Uses the shared result set's row count, or the end of the query's last chunk,
+    and falls back to the legacy per-cell rows.
+    """
+    digest = query_db.query(Query.result_hash).filter(Query.id == query_id).scalar()
+    if digest:
+        count = query_db.query(ResultSet.row_count).filter(ResultSet.content_hash == digest).scalar()
+        if count is not None:
+            return count
+    last = query_db.query(QueryResultChunk.first_row, QueryResultChunk.row_count).filter(
+        _chunk_owner(query_db, query_id)
+    ).order_by(QueryResultChunk.first_row.desc()).first()
+    if last is not None:
+        return last.first_row + last.row_count
+    last_row = query_db.query(func.max(QueryResult.row_number)).filter(QueryResult.query_id == query_id).scalar()
+    return 0 if last_row is None else last_row + 1
+
+
+def read_results(query_db, query_id: str) -> Tuple[List[Dict[str, str]], List[list]]:
+    """Return (columns, rows) of a stored result."""
+    return read_columns(query_db, query_id), read_rows(query_db, query_id)
+
+
+def encode_cursor(query_id: str, offset: int, limit: int) -> str:
+    """Encode an opaque page cursor for a query's stored result."""
+    payload = json.dumps({"q": query_id, "o": offset, "l": limit}, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(payload).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, query_id: str) -> Tuple[int, int]:
+    """
+    Decode a page cursor into (offset, limit).
+
+    Raises:
+        ValueError: If the cursor is malformed or belongs to another query
+    """
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        cursor_query_id, offset, limit = payload["q"], int(payload["o"]), int(payload["l"])
+    except (binascii.Error, UnicodeDecodeError, ValueError, TypeError, KeyError) as e:
+        raise ValueError("Invalid cursor") from e
+    if cursor_query_id != query_id:
+        raise ValueError("Cursor belongs to a different query")
+    return offset, limit
+
+
+def page_bounds(query_id: str, offset: Optional[int] = None, limit: Optional[int] = None,
+                cursor: Optional[str] = None) -> Optional[Tuple[int, int]]:
+    """
+    Resolve the requested row window from offset/limit or a cursor.
+
+    An explicit limit overrides the cursor's.
+
+    Returns:
+        (offset, limit), or None if no page was requested (the whole result)
+
+    Raises:
+        ValueError: If the cursor is invalid or offset/limit are out of range
+    """
+    if offset is None and limit is None and cursor is None:
+        return None
+    if cursor is not None:
+        offset, cursor_limit = decode_cursor(cursor, query_id)
+        limit = limit if limit is not None else cursor_limit
+    offset = 0 if offset is None else offset
+    limit = RESULT_PAGE_DEFAULT_ROWS if limit is None else limit
+    if offset < 0:
+        raise ValueError("offset must not be negative")
+    if not 1 <= limit <= RESULT_PAGE_MAX_ROWS:
+        raise ValueError(f"limit must be between 1 and {RESULT_PAGE_MAX_ROWS}")
+    return offset, limit
+
+
+def page_info(query_id: str, offset: int, limit: int, returned: int, total: int) -> Dict[str, Any]:
+    """Describe a returned page, with cursors for its neighbours."""
+    has_more = offset + returned < total
+    return {
+        "offset": offset,
+        "limit": limit,
+        "returned": returned,
+        "total_rows": total,
+        "has_more": has_more,
+        "next_cursor": encode_cursor(query_id, offset + returned, limit) if has_more else None,
+        "prev_cursor": encode_cursor(query_id, max(offset - limit, 0), limit) if offset > 0 else None,
+    }
+
+
+def _read_legacy_rows(query_db, query_id: str, offset: int = 0, limit: Optional[int] = None) -> List[list]:
+    width = query_db.query(QueryColumn).filter(QueryColumn.query_id == query_id).count()
+    cells = query_db.query(QueryResult.row_number, QueryResult.column_position, QueryResult.cell_value).filter(
+        QueryResult.query_id == query_id,
+        QueryResult.row_number >= offset
+    )
+    if limit is not None:
+        cells = cells.filter(QueryResult.row_number < offset + limit)
+    rows: Dict[int, list] = {}
+    for row_number, column_position, cell_value in cells.order_by(QueryResult.row_number, QueryResult.column_position):
+        if column_position < width:
+            rows.setdefault(row_number, [None] * width)[column_position] = cell_value
+    return [rows[row_number] for row_number in sorted(rows)]
+
+
+def has_results(query_db, query_id: str) -> bool:
+    """Whether any result rows are stored for the query (in either store)."""
+    if query_db.query(QueryResultChunk.id).filter(_chunk_owner(query_db, query_id)).first() is not None:
+        return True
+    return query_db.query(QueryResult.id).filter(QueryResult.query_id == query_id).first() is not None
+
+
+def delete_results(query_db, query_id: str) -> None:
+    """Delete a query's stored columns and rows from both stores, releasing its shared result (the caller commits)."""
+    digest = query_db.query(Query.result_hash).filter(Query.id == query_id).scalar()
+    if digest:
+        _release_result_set(query_db, digest)
+        query_db.query(Query).filter(Query.id == query_id).update({Query.result_hash: None}, synchronize_session=False)
+    query_db.query(QueryResultChunk).filter(QueryResultChunk.query_id == query_id).delete()
+    query_db.query(QueryResult).filter(QueryResult.query_id == query_id).delete()
+    query_db.query(QueryColumn).filter(QueryColumn.query_id == query_id).delete()
+
+
+def migrate_legacy_results(query_db, query_id: str, chunk_rows: int = RESULT_STORE_CHUNK_ROWS,
+                           keep_cells: bool = False) -> int:
+    """
+    Convert one query's per-cell results into chunks and commit.
+
+    The cells were stored as text; values are parsed back into their column
+    types where possible and kept as text otherwise.
+
+    Returns:
+        The number of rows migrated (0 if the query has no legacy results or already has chunks)
+    """
+    if query_db.query(QueryResultChunk.id).filter(_chunk_owner(query_db, query_id)).first() is not None:
+        return 0
+    columns = read_columns(query_db, query_id)
+    if not columns:
+        return 0
+    width = len(columns)
+    writer = ResultWriter(query_db, query_id, columns, chunk_rows=chunk_rows, text_values=True, store_columns=False)
+    cells = query_db.query(QueryResult.row_number, QueryResult.column_position, QueryResult.cell_value).filter(
+        QueryResult.query_id == query_id
+    ).order_by(QueryResult.row_number, QueryResult.column_position).yield_per(chunk_rows * width)
+    current_row, row = None, None
+    for row_number, column_position, cell_value in cells:
+        if row_number != current_row:
+            if row is not None:
+                writer.append([row])
+            current_row, row = row_number, [None] * width
+        if column_position < width:
+            row[column_position] = cell_value
+    if row is not None:
+        writer.append([row])
+    migrated = writer.close()
+    if not keep_cells:
+        query_db.query(QueryResult).filter(QueryResult.query_id == query_id).delete()
+    # Results stored before rows_returned was maintained report 0 there
+    query_db.query(Query).filter(Query.id == query_id).update({Query.rows_returned: migrated}, synchronize_session=False)
+    query_db.commit()
+    return migrated
+
+
+def legacy_query_ids(query_db, limit: Optional[int] = None) -> List[str]:
+    """Return ids of queries whose results are only in the per-cell store."""
+    ids = query_db.query(QueryResult.query_id).distinct().filter(
+        ~QueryResult.query_id.in_(query_db.query(QueryResultChunk.query_id).filter(QueryResultChunk.query_id.isnot(None))),
+        ~QueryResult.query_id.in_(query_db.query(Query.id).filter(Query.result_hash.isnot(None)))
+    ).order_by(QueryResult.query_id)
+    if limit is not None:
+        ids = ids.limit(limit)
+    return [query_id for (query_id,) in ids]
+
+
+def result_store_stats(query_db) -> Dict[str, Any]:
+    """Storage saved by sharing results: stored bytes versus the bytes all referencing queries would use."""
+    sets, references, stored, referenced = query_db.query(
+        func.count(ResultSet.content_hash),
+        func.coalesce(func.sum(ResultSet.ref_count), 0),
+        func.coalesce(func.sum(ResultSet.byte_size), 0),
+        func.coalesce(func.sum(ResultSet.byte_size * ResultSet.ref_count), 0),
+    ).one()
+    return {
+        "result_sets": sets,
+        "references": int(references),
+        "stored_bytes": int(stored),
+        "referenced_bytes": int(referenced),
+        "saved_bytes": int(referenced) - int(stored),
+    }
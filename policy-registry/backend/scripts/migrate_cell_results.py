@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+Convert results stored one row per cell (query_results) into the columnar
+chunk store (query_result_chunks), one query at a time. Safe to re-run:
+queries that already have chunks are skipped.
+
+Connects with the same QUERY_DB_* settings as the backend.
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from query_db import get_query_db_sync
+from result_store import RESULT_STORE_CHUNK_ROWS, legacy_query_ids, migrate_legacy_results
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description="Migrate per-cell query results to the columnar result store.")
+    p.add_argument("--limit", type=int, default=None, help="Migrate at most this many queries")
+    p.add_argument("--chunk-rows", type=int, default=RESULT_STORE_CHUNK_ROWS, help="Rows per chunk")
+    p.add_argument("--keep-cells", action="store_true", help="Keep the per-cell rows after migrating")
+    args = p.parse_args()
+
+    query_db = get_query_db_sync()
+    try:
+        query_ids = legacy_query_ids(query_db, limit=args.limit)
+        print(f"{len(query_ids)} queries to migrate")
+        total = 0
+        for query_id in query_ids:
+            try:
+                rows = migrate_legacy_results(query_db, query_id, chunk_rows=args.chunk_rows, keep_cells=args.keep_cells)
+            except Exception as e:
+                query_db.rollback()
+                print(f"{query_id}: failed: {e}", file=sys.stderr)
+                continue
+            total += rows
+            print(f"{query_id}: {rows} rows")
+        print(f"Migrated {total} rows")
+    finally:
+        query_db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+"""
+Unit tests for admission control (concurrency caps and the fair queue).
+"""
+import asyncio
+import threading
+import time
+import pytest
+from admission import AdmissionController, AdmissionRejected
+
+
+def make_controller(**kwargs):
+    kwargs.setdefault("role_limits", {})
+    kwargs.setdefault("role_weights", {})
+    kwargs.setdefault("queue_timeout_seconds", 0.05)
+    return AdmissionController(**kwargs)
+
+
+def admitted_order(controller, tickets):
+    """Release the first running ticket repeatedly and record which queued ticket runs next."""
+    order = []
+    running = [t for t in tickets if t.admitted]
+    waiting = [t for t in tickets if not t.admitted]
+    while waiting:
+        controller.release(running.pop(0))
+        for ticket in list(waiting):
+            if ticket.admitted:
+                order.append(ticket.label)
+                waiting.remove(ticket)
+                running.append(ticket)
+    return order
+
+
+class TestAdmissionController:
+    """Tests for caps, fair-share ordering and rejection."""
+
+    def test_admits_up_to_global_limit(self):
+        controller = make_controller(max_concurrent=2, user_limit=5)
+        tickets = [controller.enqueue(f"u{i}", []) for i in range(3)]
+        assert [t.admitted for t in tickets] == [True, True, False]
+        controller.release(tickets[0])
+        assert tickets[2].admitted
+        assert controller.stats()["running"] == 2
+
+    def test_per_user_limit(self):
+        controller = make_controller(max_concurrent=10, user_limit=1)
+        first = controller.enqueue("alice", [])
+        second = controller.enqueue("alice", [], label="a2")
+        other = controller.enqueue("bob", [])
+        assert first.admitted and other.admitted and not second.admitted
+        assert controller.user_status("alice")["queued"][0]["position"] == 1
+        controller.release(first)
+        assert second.admitted
+
+    def test_per_role_limit(self):
+        controller = make_controller(max_concurrent=10, user_limit=5, role_limits={"restricted_user": 1})
+        first = controller.enqueue("alice", ["restricted_user"])
+        second = controller.enqueue("bob", ["restricted_user"])
+        unrestricted = controller.enqueue("carol", ["analyst"])
+        assert first.admitted and unrestricted.admitted and not second.admitted
+        controller.release(first)
+        assert second.admitted
+
+    def test_fair_share_across_users(self):
+        controller = make_controller(max_concurrent=1, user_limit=10)
+        tickets = [controller.enqueue("heavy", [], label="h0")]
+        tickets += [controller.enqueue("heavy", [], label=f"h{i}") for i in range(1, 4)]
+        tickets.append(controller.enqueue("light", [], label="l1"))
+        # The light user's single query doesn't wait behind the heavy user's backlog
+        assert admitted_order(controller, tickets) == ["l1", "h1", "h2", "h3"]
+
+    def test_weighted_role_gets_priority(self):
+        controller = make_controller(max_concurrent=1, user_limit=10, role_weights={"aml_manager": 4})
+        tickets = [controller.enqueue("blocker", [], label="b0")]
+        tickets += [controller.enqueue("analyst", [], label=f"a{i}") for i in range(2)]
+        tickets += [controller.enqueue("manager", ["aml_manager"], label=f"m{i}") for i in range(3)]
+        assert admitted_order(controller, tickets)[:3] == ["m0", "m1", "m2"]
+
+    def test_full_queue_is_rejected(self):
+        controller = make_controller(max_concurrent=1, max_queue=1)
+        controller.enqueue("alice", [])
+        controller.enqueue("bob", [])
+        with pytest.raises(AdmissionRejected) as raised:
+            controller.enqueue("carol", [])
+        assert raised.value.retry_after >= 1
+        assert raised.value.queue_length == 1
+        assert controller.stats()["rejected"] == 1
+
+    def test_wait_times_out(self):
+        controller = make_controller(max_concurrent=1)
+        holder = controller.acquire("alice", [])
+        with pytest.raises(AdmissionRejected):
+            controller.acquire("bob", [])
+        assert controller.stats()["queue_length"] == 0
+        controller.release(holder)
+        assert controller.stats()["running"] == 0
+
+    def test_blocked_acquire_resumes_on_release(self):
+        controller = make_controller(max_concurrent=1, queue_timeout_seconds=2)
+        holder = controller.acquire("alice", [])
+        threading.Timer(0.05, controller.release, args=(holder,)).start()
+        with controller.admit("bob", []):
+            assert controller.stats()["running"] == 1
+        assert controller.stats()["running"] == 0
+
+    def test_release_is_idempotent(self):
+        controller = make_controller(max_concurrent=1, user_limit=5)
+        first = controller.enqueue("alice", [])
+        second = controller.enqueue("alice", [])
+        controller.release(first)
+        controller.release(first)
+        controller.discard(first)
+        assert second.admitted
+        assert controller.stats()["running"] == 1
+        assert controller.user_status("alice")["running"] == 1
+
+    def test_cancelled_async_wait_leaves_queue(self):
+        controller = make_controller(max_concurrent=1, queue_timeout_seconds=5)
+        controller.acquire("alice", [])
+
+        async def waiter():
+            task = asyncio.ensure_future(controller.acquire_async("bob", []))
+            await asyncio.sleep(0.02)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+
+        asyncio.run(waiter())
+        assert controller.stats()["queue_length"] == 0
+
+    def test_async_wait_wakes_on_release_from_another_thread(self):
+        controller = make_controller(max_concurrent=1, queue_timeout_seconds=5)
+        holder = controller.acquire("alice", [])
+
+        async def waiter():
+            threading.Timer(0.05, controller.release, args=(holder,)).start()
+            started = time.monotonic()
+            ticket = await controller.acquire_async("bob", [])
+            controller.release(ticket)
+            return time.monotonic() - started
+
+        assert asyncio.run(waiter()) < 1
+        assert controller.stats()["running"] == 0
+
+    def test_async_wait_times_out(self):
+        controller = make_controller(max_concurrent=1, queue_timeout_seconds=5)
+        controller.acquire("alice", [])
+
+        async def waiter():
+            await controller.acquire_async("bob", [], timeout=0.05)
+
+        with pytest.raises(AdmissionRejected):
+            asyncio.run(waiter())
+        assert controller.stats()["queue_length"] == 0
+        assert controller.stats()["timeouts"] == 1
+
+    def test_submitted_work_is_called_back_in_fair_order(self):
+        controller = make_controller(max_concurrent=1, user_limit=10, queue_timeout_seconds=5)
+        started = []
+        holder = controller.acquire("blocker", [])
+        for i in range(3):
+            controller.submit("heavy", [], started.append, label=f"h{i}")
+        controller.submit("light", [], started.append, label="l0")
+        assert started == []
+        controller.release(holder)
+        assert [t.label for t in started] == ["h0"]
+        controller.release(started[0])
+        assert [t.label for t in started] == ["h0", "l0"]
+
+    def test_submitted_work_times_out_in_queue(self):
+        controller = make_controller(max_concurrent=1, max_queue=1, queue_timeout_seconds=0.01)
+        expired = []
+        holder = controller.acquire("alice", [])
+        controller.submit("bob", [], lambda ticket: pytest.fail("should not be admitted"), on_timeout=expired.append)
+        time.sleep(0.02)
+        # The expired ticket no longer counts against the queue limit
+        controller.enqueue("carol", [])
+        assert len(expired) == 1
+        controller.release(holder)
+        assert controller.stats()["timeouts"] == 1
+
+    def test_failing_admit_callback_gives_back_the_slot(self):
+        controller = make_controller(max_concurrent=1)
+
+        def broken(ticket):
+            raise RuntimeError("pool is shut down")
+
+        controller.submit("alice", [], broken)
+        assert controller.stats()["running"] == 0
+
+    def test_discard_queued_frees_place_and_fair_share(self):
+        controller = make_controller(max_concurrent=1, user_limit=10, max_queue=2)
+        holder = controller.enqueue("blocker", [], label="b0")
+        controller.enqueue("heavy", [], label="h0")
+        controller.enqueue("heavy", [], label="h1")
+        assert controller.discard_queued("h0") == 1
+        assert controller.discard_queued("b0") == 0
+        light = controller.enqueue("light", [], label="l0")
+        # h1 moved up into h0's place, ahead of the later light query
+        assert [t["label"] for t in controller.user_status("heavy")["queued"]] == ["h1"]
+        assert controller.position("h1") == 1 and controller.position("l0") == 2
+        controller.release(holder)
+        assert not light.admitted
@@ -0,0 +1,81 @@
+"""
+Unit tests for Arrow IPC and Parquet result encoding (skipped without pyarrow).
+"""
+import io
+from datetime import date, datetime, timezone
+from decimal import Decimal
+import pytest
+from arrow_results import (
+    ARROW_AVAILABLE, arrow_stream, arrow_type, encode_arrow_stream, encode_parquet, negotiate_format
+)
+
+pytestmark = pytest.mark.skipif(not ARROW_AVAILABLE, reason="pyarrow not installed")
+
+if ARROW_AVAILABLE:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+COLUMNS = [
+    {"name": "id", "type": "integer"},
+    {"name": "name", "type": "varchar(25)"},
+    {"name": "amount", "type": "decimal(10,2)"},
+    {"name": "opened", "type": "date"},
+    {"name": "seen_at", "type": "timestamp(3) with time zone"},
+    {"name": "tags", "type": "array(varchar)"},
+    {"name": "attrs", "type": "map(varchar, integer)"},
+]
+ROWS = [
+    [1, "alice", Decimal("12.50"), date(2024, 1, 2), datetime(2024, 1, 2, 3, 4, 5, tzinfo=timezone.utc), ["a", "b"], {"x": 1}],
+    [2, None, None, None, None, None, None],
+]
+
+
+class TestArrowTypes:
+    def test_trino_type_mapping(self):
+        assert arrow_type("bigint") == pa.int64()
+        assert arrow_type("decimal(38,4)") == pa.decimal128(38, 4)
+        assert arrow_type("timestamp(6)") == pa.timestamp("us")
+        assert arrow_type("timestamp(3) with time zone") == pa.timestamp("us", tz="UTC")
+        assert arrow_type("array(array(integer))") == pa.list_(pa.list_(pa.int32()))
+        assert arrow_type("array(row(a integer))") == pa.string()
+        assert arrow_type("interval day to second") == pa.string()
+
+    def test_negotiate_format(self):
+        assert negotiate_format("application/vnd.apache.arrow.stream") == "arrow"
+        assert negotiate_format("application/vnd.apache.parquet") == "parquet"
+        assert negotiate_format("application/json, */*") == "json"
+        assert negotiate_format(None) == "json"
+
+
+class TestEncoding:
+    """Round trips through Arrow IPC and Parquet."""
+
+    def test_arrow_stream_round_trip(self):
+        body = encode_arrow_stream(COLUMNS, ROWS, {"query_id": "q1"})
+        table = pa.ipc.open_stream(body).read_all()
+        assert table.schema.metadata[b"query_id"] == b"q1"
+        assert table.column("id").to_pylist() == [1, 2]
+        assert table.column("amount").to_pylist() == [Decimal("12.50"), None]
+        assert table.column("tags").to_pylist() == [["a", "b"], None]
+        assert table.column("attrs").to_pylist() == ['{"x": 1}', None]
+
+    def test_empty_result_keeps_schema(self):
+        table = pa.ipc.open_stream(encode_arrow_stream(COLUMNS, [])).read_all()
+        assert table.num_rows == 0
+        assert table.schema.field("opened").type == pa.date32()
+
+    def test_parquet(self):
+        table = pq.read_table(io.BytesIO(encode_parquet(COLUMNS, ROWS)))
+        assert table.column("opened").to_pylist() == [date(2024, 1, 2), None]
+
+    def test_streamed_batches(self):
+        events = [("columns", COLUMNS[:2]), ("rows", [[1, "a"]]), ("rows", [[2, "b"]]), ("stats", {})]
+        reader = pa.ipc.open_stream(b"".join(arrow_stream(iter(events))))
+        batches = list(reader)
+        assert [batch.num_rows for batch in batches] == [1, 1]
+
+    def test_stream_error_aborts(self):
+        chunks = arrow_stream(iter([("columns", COLUMNS[:1]), ("error", "boom")]))
+        next(chunks)
+        with pytest.raises(RuntimeError):
+            next(chunks)
@@ -0,0 +1,77 @@
+"""
+Unit tests for bulk inserts into the query results database.
+"""
+import pytest
+from bulk_copy import bulk_insert, copy_supported, copy_value
+from conftest import add_query
+from query_models import QueryColumn
+
+
+class FakeCursor:
+    def __init__(self, calls):
+        self.calls = calls
+
+    def copy_expert(self, sql, buffer):
+        self.calls.append((sql, buffer.read()))
+
+    def close(self):
+        pass
+
+
+class FakeSession:
+    """Session stand-in whose connection records COPY statements."""
+
+    def __init__(self):
+        self.calls = []
+        self.flushed = False
+        raw = type("Raw", (), {"cursor": lambda _: FakeCursor(self.calls)})()
+        self._connection = type("Connection", (), {"connection": raw})()
+
+    def flush(self):
+        self.flushed = True
+
+    def connection(self):
+        return self._connection
+
+
+@pytest.fixture
+def session(session):
+    add_query(session, "q1")
+    return session
+
+
+def column_rows(count):
+    return ({"query_id": "q1", "column_name": f"c{i}", "column_type": "varchar", "column_position": i} for i in range(count))
+
+
+class TestCopyValue:
+    def test_text_format(self):
+        assert copy_value(None) == "\\N"
+        assert copy_value(True) == "t"
+        assert copy_value(42) == "42"
+        assert copy_value("a\tb\nc\\d") == "a\\tb\\nc\\\\d"
+        assert copy_value(b"\x00\xff") == "\\\\x00ff"
+
+
+class TestBulkInsert:
+    def test_executemany_fallback_in_batches(self, session):
+        assert not copy_supported(session)
+        assert bulk_insert(session, QueryColumn.__table__, column_rows(7), batch_rows=3) == 7
+        session.commit()
+        positions = [c.column_position for c in session.query(QueryColumn).order_by(QueryColumn.column_position)]
+        assert positions == list(range(7))
+
+    def test_rolls_back_with_session(self, session):
+        session.commit()
+        bulk_insert(session, QueryColumn.__table__, column_rows(2))
+        session.rollback()
+        assert session.query(QueryColumn).count() == 0
+
+    def test_copy_batches(self):
+        fake = FakeSession()
+        assert bulk_insert(fake, QueryColumn.__table__, column_rows(5), batch_rows=2, use_copy=True) == 5
+        assert fake.flushed
+        assert len(fake.calls) == 3
+        sql, data = fake.calls[0]
+        assert sql == 'COPY query_columns ("query_id", "column_name", "column_type", "column_position") FROM STDIN'
+        assert data == "q1\tc0\tvarchar\t0\nq1\tc1\tvarchar\t1\n"
@@ -0,0 +1,199 @@
+"""
+Unit tests for Cerbos principal and resource attribute marshalling.
+"""
+import asyncio
+import pytest
+import cerbos_client
+from cerbos_client import AsyncCerbosAuthz, CerbosAuthz, _query_resource, _to_value, build_resource_attr, sql_features
+from cerbos_resilience import CircuitBreaker
+
+
+class TestBuildResourceAttr:
+    """The Cypher fast path must produce the same Values as the generic conversion."""
+
+    CYPHER_ATTRIBUTES = {
+        "query_type": "cypher",
+        "query": "MATCH (c:Customer)-[:OWNS]->(a:Account) RETURN c, a",
+        "query_pattern": "path",
+        "node_labels": ["Customer", "Account"],
+        "relationship_types": ["OWNS"],
+        "path_variables": [],
+        "max_depth": 1,
+        "estimated_nodes": 20,
+        "estimated_edges": 10,
+        "has_aggregations": False,
+        "has_where_clause": True,
+        "has_order_by": False,
+        "has_limit": False,
+    }
+
+    def test_fast_path_matches_generic_conversion(self):
+        resource_attr = build_resource_attr(self.CYPHER_ATTRIBUTES)
+        assert resource_attr == {key: _to_value(val) for key, val in self.CYPHER_ATTRIBUTES.items()}
+
+    def test_none_values_are_skipped(self):
+        assert build_resource_attr({"query": None, "team": None}) == {}
+
+    def test_unexpected_type_for_known_key_falls_back(self):
+        resource_attr = build_resource_attr({"max_depth": "3", "node_labels": {"Alert"}})
+        assert resource_attr["max_depth"] == _to_value("3")
+        assert resource_attr["node_labels"] == _to_value(["Alert"])
+
+    def test_unknown_keys_use_generic_conversion(self):
+        resource_attr = build_resource_attr({"customer_team": "north", "amount": 10.5})
+        assert resource_attr["customer_team"].string_value == "north"
+        assert resource_attr["amount"].number_value == 10.5
+
+
+class TestPrincipalCache:
+    """Principals are reused per (user, roles, attribute version)."""
+
+    @pytest.fixture
+    def authz(self):
+        return CerbosAuthz("localhost:3593")
+
+    def test_same_version_reuses_principal(self, authz):
+        first = authz._principal("1", "a@example.com", ["analyst"], {"team": "north"}, "v1")
+        second = authz._principal("1", "a@example.com", ["analyst"], {"team": "north"}, "v1")
+        assert first is second
+        assert first.attr["team"].string_value == "north"
+
+    def test_new_version_rebuilds_principal(self, authz):
+        first = authz._principal("1", "a@example.com", ["analyst"], {"team": "north"}, "v1")
+        second = authz._principal("1", "a@example.com", ["analyst"], {"team": "south"}, "v2")
+        assert first is not second
+        assert second.attr["team"].string_value == "south"
+
+    def test_role_order_does_not_matter(self, authz):
+        first = authz._principal("1", "a@example.com", ["analyst", "manager"], {"team": "north"}, "v1")
+        second = authz._principal("1", "a@example.com", ["manager", "analyst"], {"team": "north"}, "v1")
+        assert first is second
+
+    def test_attributes_without_version_are_not_cached(self, authz):
+        first = authz._principal("1", "a@example.com", ["analyst"], {"team": "north"})
+        second = authz._principal("1", "a@example.com", ["analyst"], {"team": "north"})
+        assert first is not second
+        assert len(authz.principal_cache) == 0
+
+    def test_clear_cache_drops_principals(self, authz):
+        authz._principal("1", "a@example.com", ["analyst"], {"team": "north"}, "v1")
+        assert authz.clear_cache() == 1
+
+
+class TestPolicyChangeInvalidation:
+    """Decisions made around a policy write are not cached."""
+
+    @pytest.fixture
+    def authz(self, monkeypatch):
+        monkeypatch.setattr(cerbos_client, "_policy_version", 0)
+        monkeypatch.setattr(cerbos_client, "_policy_changed_at", None)
+        monkeypatch.setattr(cerbos_client, "POLICY_TABLE_MODE", cerbos_client.MODE_OFF)
+        authz = CerbosAuthz("localhost:3593")
+        monkeypatch.setattr(authz, "_local_decision", lambda *args: None)
+        return authz
+
+    def check(self, authz):
+        return authz.check_resource_access("1", "a@example.com", ["analyst"], "case", "42", "view")
+
+    def test_decision_is_cached_between_writes(self, authz, monkeypatch):
+        calls = []
+        monkeypatch.setattr(authz, "_call", lambda *args: calls.append(args) or True)
+        assert self.check(authz)[0] and self.check(authz)[0]
+        assert len(calls) == 1
+
+    def test_decision_in_flight_during_write_is_not_cached(self, authz, monkeypatch):
+        monkeypatch.setattr(cerbos_client, "POLICY_RELOAD_GRACE_SECONDS", 0)
+
+        def call_racing_a_write(*args):
+            cerbos_client.notify_policy_change()
+            return True
+
+        monkeypatch.setattr(authz, "_call", call_racing_a_write)
+        self.check(authz)
+        assert len(authz.decision_cache) == 0
+
+    def test_decisions_right_after_a_write_are_not_cached(self, authz, monkeypatch):
+        monkeypatch.setattr(cerbos_client, "POLICY_RELOAD_GRACE_SECONDS", 60)
+        cerbos_client.notify_policy_change()
+        monkeypatch.setattr(authz, "_call", lambda *args: True)
+        self.check(authz)
+        assert len(authz.decision_cache) == 0
+        monkeypatch.setattr(cerbos_client, "POLICY_RELOAD_GRACE_SECONDS", 0)
+        self.check(authz)
+        assert len(authz.decision_cache) == 1
+
+
+class TestDigestPayload:
+    """Digest mode sends query features instead of the query text."""
+
+    def test_sql_features(self):
+        features = sql_features(
+            'SELECT p.name, p.ssn FROM postgres.public.person p JOIN "iceberg".demo.orders o ON o.id = p.id'
+        )
+        assert features["references_ssn"] is True
+        assert features["references_iceberg"] is False
+        assert features["tables"] == ["iceberg.demo.orders", "postgres.public.person"]
+
+    def test_ssn_pattern_needs_word_boundary(self):
+        assert sql_features("SELECT ssn_number FROM iceberg.demo.x")["references_ssn"] is True
+        assert sql_features("SELECT lessons FROM iceberg.demo.x")["references_ssn"] is False
+
+    def test_full_mode_sends_body(self, monkeypatch):
+        monkeypatch.setattr(cerbos_client, "PAYLOAD_MODE", cerbos_client.PAYLOAD_FULL)
+        kind, _, attributes, version = _query_resource("1", "POST", "/v1/statement", "SELECT 1 FROM iceberg.demo.t")
+        assert kind == "iceberg"
+        assert attributes["body"] == "SELECT 1 FROM iceberg.demo.t"
+        assert version == "default"
+
+    def test_digest_mode_sends_features(self, monkeypatch):
+        monkeypatch.setattr(cerbos_client, "PAYLOAD_MODE", cerbos_client.PAYLOAD_DIGEST)
+        kind, _, attributes, version = _query_resource("1", "POST", "/v1/statement", "SELECT 1 FROM iceberg.demo.t")
+        assert kind == "iceberg"
+        assert "body" not in attributes
+        assert attributes["references_iceberg"] is True
+        assert version == cerbos_client.DIGEST_POLICY_VERSION
+        assert cerbos_client.query_text_attribute("MATCH (n) RETURN n").startswith("sha256:")
+
+
+class TestBreakerProbe:
+    """A half-open probe must be handed back however the call ends."""
+
+    @pytest.fixture
+    def breaker(self, monkeypatch):
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout_seconds=60)
+        breaker.record_failure()
+        breaker._opened_at -= 60
+        monkeypatch.setattr(cerbos_client, "_breaker", breaker)
+        return breaker
+
+    def test_cancelled_async_probe_is_released(self, breaker):
+        authz = object.__new__(AsyncCerbosAuthz)
+        started = asyncio.Event()
+
+        async def hanging_call(method, *args):
+            started.set()
+            await asyncio.sleep(60)
+
+        authz._hedged_call = hanging_call
+
+        async def cancel_probe():
+            task = asyncio.ensure_future(authz._call("check_resources"))
+            await started.wait()
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+
+        asyncio.run(cancel_probe())
+        assert breaker.state == CircuitBreaker.HALF_OPEN
+        assert breaker.allow_request()
+
+    def test_interrupted_sync_probe_is_released(self, breaker):
+        authz = object.__new__(CerbosAuthz)
+
+        def interrupted_call(method, *args):
+            raise KeyboardInterrupt
+
+        authz._hedged_call = interrupted_call
+        with pytest.raises(KeyboardInterrupt):
+            authz._call("check_resources")
+        assert breaker.allow_request()
@@ -0,0 +1,69 @@
+"""
+Unit tests for the Cerbos client pool.
+"""
+import pytest
+from cerbos_pool import ClientPool, LEAST_OUTSTANDING, ROUND_ROBIN, channel_options, parse_endpoints
+
+
+def factory(endpoint, options):
+    return {"endpoint": endpoint, "options": options}
+
+
+class TestParseEndpoints:
+    """Tests for endpoint list parsing."""
+
+    def test_strips_scheme_and_dedups(self):
+        assert parse_endpoints("http://cerbos:3593, https://cerbos-2:3593,cerbos:3593,") == [
+            "cerbos:3593", "cerbos-2:3593"
+        ]
+
+    def test_unix_socket_passthrough(self):
+        assert parse_endpoints("unix:/var/run/cerbos.sock") == ["unix:/var/run/cerbos.sock"]
+
+    def test_empty(self):
+        assert parse_endpoints("") == []
+
+
+class TestClientPool:
+    """Tests for channel construction and client selection."""
+
+    def test_channels_interleave_endpoints(self):
+        pool = ClientPool(["a:1", "b:1"], factory, channels_per_endpoint=2)
+        assert pool.endpoints == ["a:1", "b:1", "a:1", "b:1"]
+        assert all(client["options"]["grpc.use_local_subchannel_pool"] == 1 for client in pool.clients)
+
+    def test_single_channel_shares_subchannels(self):
+        pool = ClientPool(["a:1"], factory)
+        assert "grpc.use_local_subchannel_pool" not in pool.clients[0]["options"]
+        assert pool.clients[0]["options"]["grpc.keepalive_time_ms"] == channel_options()["grpc.keepalive_time_ms"]
+
+    def test_round_robin(self):
+        pool = ClientPool(["a:1", "b:1", "c:1"], factory, policy=ROUND_ROBIN)
+        picked = []
+        for _ in range(6):
+            with pool.lease() as client:
+                picked.append(client["endpoint"])
+        assert picked == ["a:1", "b:1", "c:1", "a:1", "b:1", "c:1"]
+
+    def test_least_outstanding_avoids_busy_channel(self):
+        pool = ClientPool(["a:1", "b:1"], factory, policy=LEAST_OUTSTANDING)
+        with pool.lease() as first:
+            for _ in range(3):
+                with pool.lease() as client:
+                    assert client is not first
+        stats = pool.stats()
+        assert [channel["outstanding"] for channel in stats["channels"]] == [0, 0]
+        assert sum(channel["calls"] for channel in stats["channels"]) == 4
+
+    def test_outstanding_released_on_error(self):
+        pool = ClientPool(["a:1"], factory)
+        with pytest.raises(RuntimeError):
+            with pool.lease():
+                raise RuntimeError("boom")
+        assert pool.stats()["channels"][0]["outstanding"] == 0
+
+    def test_invalid_arguments(self):
+        with pytest.raises(ValueError):
+            ClientPool([], factory)
+        with pytest.raises(ValueError):
+            ClientPool(["a:1"], factory, policy="random")
@@ -0,0 +1,111 @@
+"""
+Unit tests for the Cerbos circuit breaker and latency tracker.
+"""
+import time
+from cerbos_resilience import CircuitBreaker, LatencyTracker
+
+
+class TestCircuitBreaker:
+    """Tests for breaker state transitions."""
+
+    def test_stays_closed_below_threshold(self):
+        breaker = CircuitBreaker(failure_threshold=3, reset_timeout_seconds=60)
+        breaker.record_failure()
+        breaker.record_failure()
+        assert breaker.state == CircuitBreaker.CLOSED
+        assert breaker.allow_request()
+
+    def test_opens_after_consecutive_failures(self):
+        breaker = CircuitBreaker(failure_threshold=3, reset_timeout_seconds=60)
+        for _ in range(3):
+            breaker.record_failure()
+        assert breaker.state == CircuitBreaker.OPEN
+        assert not breaker.allow_request()
+        assert breaker.stats()["rejected"] == 1
+        assert breaker.stats()["times_opened"] == 1
+
+    def test_success_resets_failure_count(self):
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout_seconds=60)
+        breaker.record_failure()
+        breaker.record_success()
+        breaker.record_failure()
+        assert breaker.state == CircuitBreaker.CLOSED
+
+    def test_half_open_allows_single_probe(self):
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout_seconds=0.01)
+        breaker.record_failure()
+        time.sleep(0.02)
+        assert breaker.state == CircuitBreaker.HALF_OPEN
+        assert breaker.allow_request()
+        assert not breaker.allow_request()
+
+    def test_successful_probe_closes(self):
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout_seconds=0.01)
+        breaker.record_failure()
+        time.sleep(0.02)
+        assert breaker.allow_request()
+        breaker.record_success()
+        assert breaker.state == CircuitBreaker.CLOSED
+
+    def test_failed_probe_reopens(self):
+        breaker = CircuitBreaker(failure_threshold=5, reset_timeout_seconds=0.01)
+        for _ in range(5):
+            breaker.record_failure()
+        time.sleep(0.02)
+        assert breaker.allow_request()
+        breaker.record_failure()
+        assert breaker.state == CircuitBreaker.OPEN
+        assert breaker.stats()["times_opened"] == 2
+
+    def test_released_probe_can_be_retried(self):
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout_seconds=60)
+        breaker.record_failure()
+        breaker._opened_at -= 60
+        assert breaker.allow_request()
+        assert not breaker.allow_request()
+        breaker.release_probe()
+        assert breaker.state == CircuitBreaker.HALF_OPEN
+        assert breaker.allow_request()
+
+    def test_stale_probe_times_out(self):
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout_seconds=0.01)
+        breaker.record_failure()
+        time.sleep(0.02)
+        assert breaker.allow_request()
+        time.sleep(0.02)
+        # The probe never reported back; another caller gets to probe
+        assert breaker.allow_request()
+
+    def test_disabled_breaker_never_opens(self):
+        breaker = CircuitBreaker(failure_threshold=0)
+        for _ in range(10):
+            breaker.record_failure()
+        assert breaker.allow_request()
+
+
+class TestLatencyTracker:
+    """Tests for latency percentiles."""
+
+    def test_empty_tracker(self):
+        stats = LatencyTracker().stats()
+        assert stats["calls"] == 0
+        assert stats["p99_ms"] == 0.0
+
+    def test_percentiles(self):
+        tracker = LatencyTracker()
+        for ms in range(1, 101):
+            tracker.record(float(ms))
+        stats = tracker.stats()
+        assert stats["p50_ms"] == 50.0
+        assert stats["p90_ms"] == 90.0
+        assert stats["p99_ms"] == 99.0
+        assert stats["max_ms"] == 100.0
+
+    def test_window_and_errors(self):
+        tracker = LatencyTracker(window=10)
+        for ms in range(20):
+            tracker.record(float(ms), success=ms % 2 == 0)
+        stats = tracker.stats()
+        assert stats["calls"] == 20
+        assert stats["errors"] == 10
+        assert stats["window"] == 10
@@ -0,0 +1,132 @@
+"""
+Unit tests for translating Cerbos query plans into SQL WHERE fragments.
+"""
+import pytest
+from google.protobuf.struct_pb2 import Value, ListValue
+from plan_to_sql import (
+    PlanFilter,
+    plan_to_sql,
+    sql_literal,
+    UnsupportedPlanError,
+    ALWAYS_ALLOWED,
+    ALWAYS_DENIED,
+    CONDITIONAL,
+)
+
+Operand = PlanFilter.Expression.Operand
+Expression = PlanFilter.Expression
+
+CASE_COLUMNS = {
+    "request.resource.id": "CAST(case_id AS VARCHAR)",
+    "owner_user_id": "owner_user_id",
+    "team": "team",
+    "status": "status",
+}
+
+
+def var(name):
+    return Operand(variable=f"request.resource.attr.{name}")
+
+
+def val(value):
+    if value is None:
+        return Operand(value=Value(null_value=0))
+    if isinstance(value, bool):
+        return Operand(value=Value(bool_value=value))
+    if isinstance(value, (int, float)):
+        return Operand(value=Value(number_value=value))
+    if isinstance(value, list):
+        return Operand(value=Value(list_value=ListValue(values=[Value(string_value=v) for v in value])))
+    return Operand(value=Value(string_value=value))
+
+
+def expr(operator, *operands):
+    return Operand(expression=Expression(operator=operator, operands=list(operands)))
+
+
+def conditional(condition):
+    return PlanFilter(kind=PlanFilter.KIND_CONDITIONAL, condition=condition)
+
+
+class TestFilterKinds:
+    """Tests for unconditional plans."""
+    
+    def test_always_allowed(self):
+        assert plan_to_sql(PlanFilter(kind=PlanFilter.KIND_ALWAYS_ALLOWED), CASE_COLUMNS) == (ALWAYS_ALLOWED, None)
+    
+    def test_always_denied(self):
+        assert plan_to_sql(PlanFilter(kind=PlanFilter.KIND_ALWAYS_DENIED), CASE_COLUMNS) == (ALWAYS_DENIED, None)
+    
+    def test_unspecified_kind_is_rejected(self):
+        with pytest.raises(UnsupportedPlanError):
+            plan_to_sql(PlanFilter(), CASE_COLUMNS)
+
+
+class TestConditions:
+    """Tests for conditional plan translation."""
+    
+    def test_owner_equality(self):
+        kind, sql = plan_to_sql(conditional(expr("eq", var("owner_user_id"), val("3"))), CASE_COLUMNS)
+        assert kind == CONDITIONAL
+        assert sql == "(owner_user_id = '3')"
+    
+    def test_and_or_not(self):
+        condition = expr(
+            "or",
+            expr("eq", var("owner_user_id"), val("3")),
+            expr("and", expr("eq", var("team"), val("Team A")), expr("not", expr("eq", var("status"), val("closed")))),
+        )
+        _, sql = plan_to_sql(conditional(condition), CASE_COLUMNS)
+        assert sql == "((owner_user_id = '3') OR ((team = 'Team A') AND (NOT (status = 'closed'))))"
+    
+    def test_null_comparisons(self):
+        _, sql = plan_to_sql(conditional(expr("eq", var("team"), val(None))), CASE_COLUMNS)
+        assert sql == "(team IS NULL)"
+        _, sql = plan_to_sql(conditional(expr("ne", val(None), var("team"))), CASE_COLUMNS)
+        assert sql == "(team IS NOT NULL)"
+    
+    def test_in_list(self):
+        _, sql = plan_to_sql(conditional(expr("in", var("status"), val(["open", "pending"]))), CASE_COLUMNS)
+        assert sql == "(status IN ('open', 'pending'))"
+    
+    def test_empty_in_list_matches_nothing(self):
+        _, sql = plan_to_sql(conditional(expr("in", var("status"), val([]))), CASE_COLUMNS)
+        assert sql == "(1 = 0)"
+    
+    def test_resource_id_variable(self):
+        condition = expr("eq", Operand(variable="request.resource.id"), val("42"))
+        _, sql = plan_to_sql(conditional(condition), CASE_COLUMNS)
+        assert sql == "(CAST(case_id AS VARCHAR) = '42')"
+    
+    def test_string_literals_are_escaped(self):
+        _, sql = plan_to_sql(conditional(expr("eq", var("team"), val("O'Brien"))), CASE_COLUMNS)
+        assert sql == "(team = 'O''Brien')"
+    
+    def test_starts_with(self):
+        _, sql = plan_to_sql(conditional(expr("startsWith", var("team"), val("Team_"))), CASE_COLUMNS)
+        assert sql == "(team LIKE 'Team\\_%' ESCAPE '\\')"
+
+
+class TestUnsupported:
+    """Tests for plans that must fall back to per-row checks."""
+    
+    def test_unmapped_attribute(self):
+        with pytest.raises(UnsupportedPlanError):
+            plan_to_sql(conditional(expr("eq", var("region"), val("EU"))), CASE_COLUMNS)
+    
+    def test_unknown_operator(self):
+        with pytest.raises(UnsupportedPlanError):
+            plan_to_sql(conditional(expr("hasIntersection", var("team"), val(["A"]))), CASE_COLUMNS)
+
+
+class TestLiterals:
+    """Tests for literal rendering."""
+    
+    @pytest.mark.parametrize("value,expected", [
+        (Value(number_value=3), "3"),
+        (Value(number_value=2.5), "2.5"),
+        (Value(bool_value=True), "TRUE"),
+        (Value(null_value=0), "NULL"),
+    ])
+    def test_literals(self, value, expected):
+        assert sql_literal(value) == expected
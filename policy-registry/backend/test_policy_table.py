@@ -0,0 +1,156 @@
+"""
+Unit tests for the local Cerbos decision table.
+"""
+import os
+import pytest
+from policy_table import PolicyTable
+
+
+def resource_policy(kind, rules, **extra):
+    return {"resourcePolicy": {"version": "default", "resource": kind, "rules": rules, **extra}}
+
+
+CONDITION = {"match": {"expr": "R.attr.owner_user_id == P.id"}}
+
+
+class TestPolicyTable:
+    """Tests for which decisions are answered locally."""
+
+    def test_unconditional_allow(self):
+        table = PolicyTable.from_documents([resource_policy("alert", [
+            {"actions": ["view", "escalate"], "effect": "EFFECT_ALLOW", "roles": ["aml_manager"]},
+        ])])
+        assert table.decide("alert", "view", ["aml_manager"]) is True
+        assert table.decide("alert", "escalate", ["aml_manager", "auditor"]) is True
+
+    def test_unmatched_role_goes_to_cerbos(self):
+        table = PolicyTable.from_documents([resource_policy("alert", [
+            {"actions": ["view"], "effect": "EFFECT_ALLOW", "roles": ["aml_manager"]},
+        ])])
+        assert table.decide("alert", "view", ["auditor"]) is None
+        assert table.decide("alert", "close", ["aml_manager"]) is None
+        assert table.decide("unknown_kind", "view", ["aml_manager"]) is None
+
+    def test_conditional_allow_goes_to_cerbos(self):
+        table = PolicyTable.from_documents([resource_policy("case", [
+            {"actions": ["edit"], "effect": "EFFECT_ALLOW", "roles": ["aml_analyst"], "condition": CONDITION},
+        ])])
+        assert table.decide("case", "edit", ["aml_analyst"]) is None
+
+    def test_literal_true_condition_is_unconditional(self):
+        table = PolicyTable.from_documents([resource_policy("case", [
+            {"actions": ["view"], "effect": "EFFECT_ALLOW", "roles": ["auditor"], "condition": {"match": {"expr": "true"}}},
+        ])])
+        assert table.decide("case", "view", ["auditor"]) is True
+
+    def test_unconditional_deny_wins(self):
+        table = PolicyTable.from_documents([resource_policy("iceberg", [
+            {"actions": ["query"], "effect": "EFFECT_ALLOW", "roles": ["admin"]},
+            {"actions": ["query"], "effect": "EFFECT_DENY", "roles": ["postgres_only_user"]},
+        ])])
+        assert table.decide("iceberg", "query", ["postgres_only_user"]) is False
+        assert table.decide("iceberg", "query", ["admin", "postgres_only_user"]) is False
+        assert table.decide("iceberg", "query", ["admin"]) is True
+
+    def test_conditional_deny_blocks_local_allow(self):
+        table = PolicyTable.from_documents([resource_policy("postgres", [
+            {"actions": ["query"], "effect": "EFFECT_ALLOW", "roles": ["admin"]},
+            {"actions": ["query"], "effect": "EFFECT_DENY", "roles": ["restricted_user"], "condition": CONDITION},
+        ])])
+        assert table.decide("postgres", "query", ["admin", "restricted_user"]) is None
+        assert table.decide("postgres", "query", ["admin"]) is True
+
+    def test_wildcard_roles_and_actions(self):
+        table = PolicyTable.from_documents([resource_policy("doc", [
+            {"actions": ["*"], "effect": "EFFECT_ALLOW", "roles": ["admin"]},
+            {"actions": ["read:*"], "effect": "EFFECT_ALLOW", "roles": ["*"]},
+        ])])
+        assert table.decide("doc", "delete", ["admin"]) is True
+        assert table.decide("doc", "read:summary", ["anyone"]) is True
+        assert table.decide("doc", "delete", ["anyone"]) is None
+
+    def test_derived_roles(self):
+        derived = {"derivedRoles": {"name": "graph_query_roles", "definitions": [
+            {"name": "manager_full", "parentRoles": ["aml_manager"], "condition": {"match": {"expr": "true"}}},
+            {"name": "case_assignee", "parentRoles": ["aml_analyst"], "condition": CONDITION},
+        ]}}
+        policy = resource_policy("case", [
+            {"actions": ["assign"], "effect": "EFFECT_ALLOW", "derivedRoles": ["manager_full"]},
+            {"actions": ["edit"], "effect": "EFFECT_ALLOW", "derivedRoles": ["case_assignee"]},
+        ], importDerivedRoles=["graph_query_roles"])
+        table = PolicyTable.from_documents([derived, policy])
+        assert table.decide("case", "assign", ["aml_manager"]) is True
+        assert table.decide("case", "edit", ["aml_analyst"]) is None
+
+    def test_derived_roles_must_be_imported(self):
+        derived = {"derivedRoles": {"name": "graph_query_roles", "definitions": [
+            {"name": "manager_full", "parentRoles": ["aml_manager"]},
+        ]}}
+        policy = resource_policy("case", [
+            {"actions": ["assign"], "effect": "EFFECT_ALLOW", "derivedRoles": ["manager_full"]},
+        ])
+        table = PolicyTable.from_documents([derived, policy])
+        assert table.decide("case", "assign", ["aml_manager"]) is None
+
+    def test_principal_policies_disable_table(self):
+        table = PolicyTable.from_documents([
+            resource_policy("alert", [{"actions": ["view"], "effect": "EFFECT_ALLOW", "roles": ["aml_manager"]}]),
+            {"principalPolicy": {"version": "default", "principal": "aml_manager", "rules": []}},
+        ])
+        assert table.decide("alert", "view", ["aml_manager"]) is None
+
+    def test_scoped_policies_are_ignored(self):
+        table = PolicyTable.from_documents([
+            resource_policy("case", [{"actions": ["view"], "effect": "EFFECT_ALLOW", "roles": ["x"]}], scope="acme"),
+        ])
+        assert table.rules_by_policy == {}
+
+    def test_policy_versions_are_compiled_separately(self):
+        table = PolicyTable.from_documents([
+            resource_policy("alert", [{"actions": ["view"], "effect": "EFFECT_ALLOW", "roles": ["x"]}]),
+            resource_policy("alert", [{"actions": ["view"], "effect": "EFFECT_DENY", "roles": ["x"]}], version="digest"),
+        ])
+        assert table.decide("alert", "view", ["x"]) is True
+        assert table.decide("alert", "view", ["x"], policy_version="digest") is False
+        assert table.decide("alert", "view", ["x"], policy_version="v2") is None
+        assert table.kinds() == ["alert", "alert@digest"]
+
+    def test_shadow_counters(self):
+        table = PolicyTable()
+        table.record_shadow("alert", "view", ["admin"], True, True)
+        table.record_shadow("alert", "view", ["admin"], True, False)
+        stats = table.stats()
+        assert stats["shadow_matches"] == 1
+        assert stats["shadow_mismatches"] == 1
+
+
+POLICIES_DIR = os.path.join(os.path.dirname(__file__), "../../cerbos/policies")
+
+
+@pytest.fixture(scope="module")
+def repository_table():
+    return PolicyTable.from_directory(POLICIES_DIR)
+
+
+@pytest.mark.skipif(not os.path.isdir(POLICIES_DIR), reason="Cerbos policies not available")
+class TestRepositoryPolicies:
+    """The shipped policies compile and answer the expected role-only checks."""
+
+    @pytest.mark.parametrize("kind,action,roles,expected", [
+        ("cypher_query", "execute", ["admin"], True),
+        ("cypher_query", "execute", ["aml_manager"], True),
+        ("cypher_query", "execute", ["aml_analyst"], None),
+        ("alert", "view", ["auditor"], True),
+        ("case", "edit", ["aml_analyst"], None),
+        ("postgres", "query", ["admin"], True),
+        ("iceberg", "query", ["postgres_only_user"], False),
+    ])
+    def test_decisions(self, repository_table, kind, action, roles, expected):
+        assert repository_table.decide(kind, action, roles) is expected
+
+    @pytest.mark.parametrize("kind,action,roles,expected", [
+        ("postgres", "query", ["admin"], True),
+        ("iceberg", "query", ["postgres_only_user"], False),
+    ])
+    def test_digest_decisions(self, repository_table, kind, action, roles, expected):
+        assert repository_table.decide(kind, action, roles, policy_version="digest") is expected
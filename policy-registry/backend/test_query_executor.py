@@ -0,0 +1,134 @@
+"""
+Unit tests for the background query executor (against an in-memory SQLite results database).
+"""
+import time
+import pytest
+import query_executor
+import trino_client
+from admission import AdmissionController
+from query_executor import QueryExecutor, progress_percent
+from conftest import add_query
+from query_models import Query, QueryColumn, QueryResultChunk, QueryStat
+from result_store import read_rows
+
+
+class FakeTrinoClient:
+    def __init__(self, events):
+        self.events = events
+
+    def stream_query(self, user, catalog, schema, query, batch_size=None, on_progress=None, query_id=None, on_start=None, governor=None):
+        if on_start is not None:
+            on_start("trino-1")
+        for event, payload in self.events:
+            if on_progress is not None and event == "rows":
+                on_progress({"progressPercentage": 50.0})
+            yield event, payload
+
+
+@pytest.fixture
+def session_factory(session_factory, monkeypatch):
+    monkeypatch.setattr(query_executor, "get_query_db_sync", session_factory)
+    monkeypatch.setattr(query_executor, "PROGRESS_UPDATE_INTERVAL_SECONDS", 0)
+    return session_factory
+
+
+def queue_query(factory, query_id="q1"):
+    add_query(factory(), query_id, status="QUEUED")
+
+
+def run(monkeypatch, factory, events):
+    monkeypatch.setattr(trino_client, "get_trino_client", lambda: FakeTrinoClient(events))
+    queue_query(factory)
+    executor = QueryExecutor(max_workers=1)
+    executor.submit("q1", "alice", "postgres", "public", "SELECT 1").result()
+    executor.shutdown()
+    return factory()
+
+
+class TestQueryExecutor:
+    """Tests for background execution and persistence."""
+
+    def test_results_are_persisted(self, monkeypatch, session_factory):
+        session = run(monkeypatch, session_factory, [
+            ("columns", [{"name": "id", "type": "integer"}, {"name": "name", "type": "varchar"}]),
+            ("rows", [[1, "a"], [2, None]]),
+            ("rows", [[3, "c"]]),
+            ("stats", {"rows": 3, "trino_query_id": "trino-1", "trino_stats": {"state": "FINISHED", "processedBytes": 42, "cpuTimeMillis": 7}}),
+        ])
+        query = session.get(Query, "q1")
+        assert query.status == "FINISHED"
+        assert query.progress == 100
+        assert query.rows_returned == 3
+        assert query.bytes_processed == 42
+        assert query.cpu_time_ms == 7
+        assert query.trino_query_id == "trino-1"
+        assert session.query(QueryColumn).count() == 2
+        assert read_rows(session, "q1") == [[1, "a"], [2, None], [3, "c"]]
+        assert {s.stat_name for s in session.query(QueryStat).all()} == {"state", "processedBytes", "cpuTimeMillis"}
+
+    def test_error_marks_query_failed_and_drops_partial_results(self, monkeypatch, session_factory):
+        session = run(monkeypatch, session_factory, [
+            ("columns", [{"name": "id", "type": "integer"}]),
+            ("rows", [[1]]),
+            ("error", "Trino query error: boom"),
+        ])
+        query = session.get(Query, "q1")
+        assert query.status == "FAILED"
+        assert query.error_message == "Trino query error: boom"
+        assert session.query(QueryResultChunk).count() == 0
+        assert session.query(QueryColumn).count() == 0
+
+    def test_cancelled_query(self, monkeypatch, session_factory):
+        session = run(monkeypatch, session_factory, [
+            ("columns", [{"name": "id", "type": "integer"}]),
+            ("rows", [[1]]),
+            ("cancelled", "Query was cancelled"),
+        ])
+        query = session.get(Query, "q1")
+        assert query.status == "CANCELLED"
+        assert query.trino_query_id == "trino-1"
+        assert session.query(QueryResultChunk).count() == 0
+
+    def test_query_cancelled_while_queued_is_skipped(self, monkeypatch, session_factory):
+        monkeypatch.setattr(trino_client, "get_trino_client", lambda: pytest.fail("query should not run"))
+        queue_query(session_factory)
+        session = session_factory()
+        session.get(Query, "q1").status = "CANCELLED"
+        session.commit()
+        QueryExecutor(max_workers=1).submit("q1", "alice", "postgres", "public", "SELECT 1").result()
+        assert session_factory().get(Query, "q1").status == "CANCELLED"
+
+    def test_query_waits_for_admission_outside_the_pool(self, monkeypatch, session_factory):
+        controller = AdmissionController(max_concurrent=1, role_limits={}, role_weights={})
+        monkeypatch.setattr(query_executor, "get_admission_controller", lambda: controller)
+        monkeypatch.setattr(trino_client, "get_trino_client", lambda: FakeTrinoClient([("stats", {"rows": 0})]))
+        queue_query(session_factory)
+        holder = controller.acquire("bob", [])
+        future = QueryExecutor(max_workers=1).submit("q1", "alice", "postgres", "public", "SELECT 1")
+        assert controller.position("q1") == 1
+        assert not future.done()
+        controller.release(holder)
+        future.result(timeout=5)
+        assert session_factory().get(Query, "q1").status == "FINISHED"
+        assert controller.stats()["running"] == 0
+
+    def test_query_not_admitted_in_time_fails(self, monkeypatch, session_factory):
+        controller = AdmissionController(max_concurrent=1, role_limits={}, role_weights={})
+        monkeypatch.setattr(query_executor, "get_admission_controller", lambda: controller)
+        monkeypatch.setattr(query_executor, "ADMISSION_WAIT_SECONDS", 0.01)
+        queue_query(session_factory)
+        holder = controller.acquire("bob", [])
+        future = QueryExecutor(max_workers=1).submit("q1", "alice", "postgres", "public", "SELECT 1")
+        time.sleep(0.02)
+        controller.release(holder)
+        future.result(timeout=5)
+        query = session_factory().get(Query, "q1")
+        assert query.status == "FAILED"
+        assert "admission" in query.error_message
+
+
+class TestProgressPercent:
+    def test_missing_and_clamped(self):
+        assert progress_percent({}) is None
+        assert progress_percent({"progressPercentage": 37.25}) == 37.2
+        assert progress_percent({"progressPercentage": 120}) == 100.0
@@ -0,0 +1,75 @@
+"""
+Unit tests for recording and aggregating query execution statistics (in-memory SQLite).
+"""
+from datetime import datetime, timedelta
+import pytest
+from conftest import add_query
+from query_models import QueryStat
+from query_stats import aggregate_stats, record_execution_stats
+
+TRINO_STATS = {
+    "state": "FINISHED",
+    "elapsedTimeMillis": 900,
+    "cpuTimeMillis": 400,
+    "queuedTimeMillis": 20,
+    "processedRows": 1000,
+    "processedBytes": 65536,
+    "peakMemoryBytes": 4096,
+    "progressPercentage": 100.0,
+}
+
+
+def add_stats_query(session, query_id, email, catalog, status="FINISHED", stats=None, submitted_at=None):
+    query = add_query(session, query_id, user_email=email, catalog=catalog, status=status,
+                      submitted_at=submitted_at or datetime.now(), rows_returned=10)
+    if stats is not None:
+        record_execution_stats(session, query, stats, 1000)
+        session.commit()
+    return query
+
+
+class TestRecordExecutionStats:
+    def test_query_row_and_stats(self, session):
+        query = add_stats_query(session, "q1", "a@example.com", "postgres", stats=TRINO_STATS)
+        assert query.execution_time_ms == 1000
+        assert query.cpu_time_ms == 400
+        assert query.queued_time_ms == 20
+        assert query.bytes_processed == 65536
+        assert query.processed_rows == 1000
+        assert query.peak_memory_bytes == 4096
+        stats = {s.stat_name: (s.stat_value, s.stat_type) for s in session.query(QueryStat).all()}
+        assert stats["cpuTimeMillis"] == ("400", "number")
+        assert stats["state"] == ("FINISHED", "string")
+        assert "progressPercentage" not in stats
+
+    def test_missing_trino_stats(self, session):
+        query = add_stats_query(session, "q1", "a@example.com", "postgres", stats={})
+        assert query.execution_time_ms == 1000
+        assert query.bytes_processed == 0
+        assert session.query(QueryStat).count() == 0
+
+
+class TestAggregateStats:
+    """Tests for per-user and per-catalog aggregates."""
+
+    def test_per_user(self, session):
+        add_stats_query(session, "q1", "a@example.com", "postgres", stats=TRINO_STATS)
+        add_stats_query(session, "q2", "a@example.com", "iceberg", stats={**TRINO_STATS, "cpuTimeMillis": 600})
+        add_stats_query(session, "q3", "b@example.com", "postgres", status="FAILED")
+        rows = aggregate_stats(session, "user")
+        assert [row["user"] for row in rows] == ["a@example.com", "b@example.com"]
+        assert rows[0]["queries"] == 2
+        assert rows[0]["total_cpu_time_ms"] == 1000
+        assert rows[0]["total_bytes_processed"] == 131072
+        assert rows[0]["max_peak_memory_bytes"] == 4096
+        assert rows[1]["failed"] == 1
+
+    def test_per_catalog_since(self, session):
+        add_stats_query(session, "q1", "a@example.com", "postgres", stats=TRINO_STATS)
+        add_stats_query(session, "q2", "a@example.com", "iceberg", stats=TRINO_STATS, submitted_at=datetime.now() - timedelta(days=2))
+        rows = aggregate_stats(session, "catalog", since=datetime.now() - timedelta(hours=1))
+        assert [(row["catalog"], row["queries"]) for row in rows] == [("postgres", 1)]
+
+    def test_invalid_group(self, session):
+        with pytest.raises(ValueError):
+            aggregate_stats(session, "schema")
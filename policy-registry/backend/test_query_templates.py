@@ -0,0 +1,98 @@
+"""
+Unit tests for the query template registry and template-level authorization caching.
+"""
+import pytest
+from query_templates import TemplateError, TemplateRegistry
+
+
+class CountingCheck:
+    """Stand-in for CerbosAuthz.check_query_permission that records the SQL it was sent."""
+
+    def __init__(self, allowed=True, reason=None):
+        self.allowed = allowed
+        self.reason = reason
+        self.calls = []
+
+    def __call__(self, query_body):
+        self.calls.append(query_body)
+        return self.allowed, self.reason, "postgres"
+
+
+@pytest.fixture
+def registry():
+    registry = TemplateRegistry()
+    registry.register("orders_by_status", "SELECT * FROM postgres.public.orders WHERE status = {status}")
+    return registry
+
+
+class TestQueryTemplate:
+    """Tests for template validation and rendering."""
+
+    def test_placeholders_are_parsed_at_registration(self, registry):
+        assert registry.get("orders_by_status").placeholders == {"status"}
+
+    def test_invalid_template_is_rejected(self, registry):
+        with pytest.raises(TemplateError):
+            registry.register("bad", "SELECT 1; DROP TABLE users")
+
+    def test_render(self, registry):
+        template = registry.get("orders_by_status")
+        sql = template.render({"status": "shipped", "unused": "x"})
+        assert sql == "SELECT * FROM postgres.public.orders WHERE status = shipped"
+
+    def test_invalid_parameter_is_rejected(self, registry):
+        with pytest.raises(TemplateError):
+            registry.get("orders_by_status").render({"status": "x'; --"})
+
+    def test_adhoc_templates_are_compiled_once(self, registry):
+        first = registry.adhoc("SELECT * FROM postgres.public.orders")
+        assert registry.adhoc("SELECT * FROM postgres.public.orders") is first
+        assert registry.adhoc("SELECT * FROM postgres.public.orders", schema="other") is not first
+
+
+class TestTemplateAuthorization:
+    """Tests for the per-template decision cache."""
+
+    def test_decision_reused_across_parameter_values(self, registry):
+        template = registry.get("orders_by_status")
+        check = CountingCheck()
+        for status in ("shipped", "pending", "cancelled"):
+            allowed, _, _, _ = registry.authorize(template, template.render({"status": status}), ["analyst"], 1, check)
+            assert allowed
+        assert check.calls == [template.sql]
+
+    def test_roles_and_policy_version_are_part_of_the_key(self, registry):
+        template = registry.get("orders_by_status")
+        check = CountingCheck()
+        sql = template.render({"status": "shipped"})
+        registry.authorize(template, sql, ["analyst", "admin"], 1, check)
+        assert registry.authorize(template, sql, ["admin", "analyst"], 1, check)[3] is True
+        assert registry.authorize(template, sql, ["analyst"], 1, check)[3] is False
+        assert registry.authorize(template, sql, ["analyst", "admin"], 2, check)[3] is False
+        assert len(check.calls) == 3
+
+    def test_parameters_that_change_policy_features_are_checked(self, registry):
+        template = registry.get("orders_by_status")
+        check = CountingCheck()
+        sql = template.render({"status": "ssn"})
+        registry.authorize(template, sql, ["restricted_user"], 1, check)
+        registry.authorize(template, sql, ["restricted_user"], 1, check)
+        assert check.calls == [sql, sql]
+
+    def test_unavailable_denials_are_not_cached(self, registry):
+        template = registry.get("orders_by_status")
+        check = CountingCheck(allowed=False, reason="Authorization check failed: unavailable")
+        sql = template.render({"status": "shipped"})
+        registry.authorize(template, sql, ["analyst"], 1, check)
+        registry.authorize(template, sql, ["analyst"], 1, check)
+        assert len(check.calls) == 2
+
+    def test_reregistered_template_is_not_served_old_decision(self, registry):
+        check = CountingCheck()
+        template = registry.get("orders_by_status")
+        registry.authorize(template, template.render({"status": "shipped"}), ["restricted_user"], 1, check)
+        replaced = registry.register("orders_by_status", "SELECT ssn FROM postgres.public.customers WHERE status = {status}")
+        sql = replaced.render({"status": "shipped"})
+        allowed, _, _, cached = registry.authorize(replaced, sql, ["restricted_user"], 1, check)
+        assert cached is False
+        assert check.calls == [template.sql, replaced.sql]
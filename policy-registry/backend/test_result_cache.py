@@ -0,0 +1,99 @@
+"""
+Unit tests for the SQL result cache.
+"""
+import cerbos_client
+from result_cache import ResultCache, iceberg_tables, is_cacheable, normalize_sql
+
+COLUMNS = [{"name": "id", "type": "integer"}]
+
+
+def make_cache(snapshots=None, **kwargs):
+    snapshots = snapshots if snapshots is not None else {}
+    reads = []
+
+    def reader(username, schema, table):
+        reads.append(f"{schema}.{table}")
+        value = snapshots[f"{schema}.{table}"]
+        if isinstance(value, Exception):
+            raise value
+        return value
+
+    return ResultCache(snapshot_reader=reader, **kwargs), reads
+
+
+def cache_query(cache, sql, catalog="postgres", schema="public", roles=("user",), data=([1],)):
+    lookup = cache.lookup(sql, catalog, schema, list(roles), "alice")
+    assert lookup is not None and lookup.entry is None
+    cache.store(lookup, COLUMNS, list(data), "q1", 1)
+    return lookup
+
+
+class TestSqlHelpers:
+    """Tests for normalization and cacheability checks."""
+
+    def test_normalize_keeps_literals(self):
+        assert normalize_sql("SELECT  *\n FROM t WHERE name = 'a  b';") == "SELECT * FROM t WHERE name = 'a  b'"
+        assert normalize_sql("select 1") != normalize_sql("SELECT 1")
+
+    def test_is_cacheable(self):
+        assert is_cacheable("SELECT * FROM t")
+        assert is_cacheable("  with x as (select 1) select * from x")
+        assert not is_cacheable("INSERT INTO t VALUES (1)")
+        assert not is_cacheable("SELECT now()")
+        assert not is_cacheable("SELECT * FROM t ORDER BY random()")
+
+    def test_iceberg_tables(self):
+        assert iceberg_tables("SELECT * FROM person", "postgres", "public") == []
+        assert iceberg_tables("SELECT * FROM iceberg.demo.orders o JOIN customers c ON o.id = c.id", "iceberg", "demo") == [
+            ("demo", "customers"), ("demo", "orders")
+        ]
+        # Quoted names can't be resolved safely, so the query is not cached
+        assert iceberg_tables('SELECT * FROM iceberg.demo."odd table"', "postgres", "public") is None
+
+
+class TestResultCache:
+    """Tests for lookups, keys and Iceberg snapshot validation."""
+
+    def test_hit_after_store(self):
+        cache, _ = make_cache()
+        cache_query(cache, "SELECT * FROM person")
+        lookup = cache.lookup("SELECT *\n  FROM person;", "postgres", "public", ["user"], "bob")
+        assert lookup.entry.data == [[1]]
+        assert lookup.entry.query_id == "q1"
+        assert cache.stats()["hits"] == 1
+
+    def test_key_includes_roles_schema_and_policy_version(self, monkeypatch):
+        cache, _ = make_cache()
+        cache_query(cache, "SELECT * FROM person", roles=("user", "analyst"))
+        assert cache.lookup("SELECT * FROM person", "postgres", "public", ["analyst", "user"], "a").entry is not None
+        assert cache.lookup("SELECT * FROM person", "postgres", "public", ["admin"], "a").entry is None
+        assert cache.lookup("SELECT * FROM person", "postgres", "other", ["user", "analyst"], "a").entry is None
+        monkeypatch.setattr(cerbos_client, "_policy_version", cerbos_client.get_policy_version() + 1)
+        assert cache.lookup("SELECT * FROM person", "postgres", "public", ["user", "analyst"], "a").entry is None
+
+    def test_snapshot_change_invalidates(self):
+        snapshots = {"demo.orders": "100"}
+        cache, reads = make_cache(snapshots)
+        cache_query(cache, "SELECT * FROM iceberg.demo.orders")
+        assert cache.lookup("SELECT * FROM iceberg.demo.orders", "postgres", "public", ["user"], "a").entry is not None
+        snapshots["demo.orders"] = "101"
+        assert cache.lookup("SELECT * FROM iceberg.demo.orders", "postgres", "public", ["user"], "a").entry is None
+        assert cache.stats()["snapshot_invalidations"] == 1
+        assert reads == ["demo.orders"] * 3
+
+    def test_uncacheable_queries(self):
+        cache, _ = make_cache({"demo.orders": RuntimeError("trino down")})
+        assert cache.lookup("SELECT now()", "postgres", "public", ["user"], "a") is None
+        assert cache.lookup("SELECT * FROM iceberg.demo.orders", "postgres", "public", ["user"], "a") is None
+        assert cache.stats()["uncacheable"] == 2
+
+    def test_large_results_are_not_stored(self):
+        cache, _ = make_cache(max_rows=2)
+        lookup = cache.lookup("SELECT * FROM person", "postgres", "public", ["user"], "a")
+        assert not cache.store(lookup, COLUMNS, [[1], [2], [3]], "q1", 1)
+        assert cache.lookup("SELECT * FROM person", "postgres", "public", ["user"], "a").entry is None
+        assert cache.stats()["too_large"] == 1
+
+    def test_disabled(self):
+        cache, _ = make_cache(max_entries=0)
+        assert cache.lookup("SELECT * FROM person", "postgres", "public", ["user"], "a") is None
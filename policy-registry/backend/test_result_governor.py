@@ -0,0 +1,83 @@
+"""
+Unit tests for the result size governor.
+"""
+from result_governor import ResultBudget, ResultGovernor, budget_for_roles, inject_limit
+
+ROLE_BUDGETS = {
+    "admin": ResultBudget(10 ** 6, 10 ** 8),
+    "analyst": ResultBudget(10 ** 5, 10 ** 9),
+}
+
+
+class TestBudgetForRoles:
+    def test_most_generous_role_wins(self):
+        assert budget_for_roles(["admin", "analyst"], ROLE_BUDGETS) == ResultBudget(10 ** 6, 10 ** 9)
+
+    def test_default_applies_without_role_budget(self):
+        default = budget_for_roles([], {})
+        assert budget_for_roles(["restricted_user"], ROLE_BUDGETS) == default
+
+
+class TestInjectLimit:
+    """Tests for automatic LIMIT injection."""
+
+    def test_limit_added_when_absent(self):
+        assert inject_limit("SELECT * FROM t;", 100) == "SELECT * FROM t\nLIMIT 101"
+        assert inject_limit("SELECT * FROM t -- all rows", 5) == "SELECT * FROM t\nLIMIT 6"
+        assert inject_limit("SELECT * FROM t; /* all\nrows */", 5) == "SELECT * FROM t\nLIMIT 6"
+        assert inject_limit("SELECT '--' AS dash FROM t", 5) == "SELECT '--' AS dash FROM t\nLIMIT 6"
+
+    def test_leading_comments_are_skipped(self):
+        assert inject_limit("-- report\nSELECT * FROM t", 5) == "-- report\nSELECT * FROM t\nLIMIT 6"
+        assert inject_limit("/* hint */ SELECT * FROM t", 5) == "/* hint */ SELECT * FROM t\nLIMIT 6"
+        assert inject_limit("  -- a\n/* b */\n-- c\nWITH x AS (SELECT 1) SELECT * FROM x", 5).endswith("\nLIMIT 6")
+        assert inject_limit("-- report\nSELECT * FROM t LIMIT 5", 100) is None
+        assert inject_limit("/* hint */ INSERT INTO t SELECT * FROM u", 100) is None
+
+    def test_limit_behind_comment_is_kept(self):
+        assert inject_limit("SELECT * FROM t LIMIT 5 -- first five", 100) is None
+        assert inject_limit("SELECT * FROM t LIMIT 5 /* first five */ -- really", 100) is None
+        assert inject_limit("SELECT * FROM t ORDER BY id FETCH FIRST 5 ROWS WITH TIES", 100) is None
+
+    def test_unterminated_comment_is_not_limited(self):
+        assert inject_limit("SELECT * FROM t /* LIMIT 5", 100) is None
+        assert inject_limit("SELECT 'it''s FROM t", 100) is None
+
+    def test_existing_limit_is_kept(self):
+        assert inject_limit("SELECT * FROM t LIMIT 10", 100) is None
+        assert inject_limit("SELECT * FROM t ORDER BY id FETCH FIRST 10 ROWS ONLY", 100) is None
+        # A LIMIT inside a subquery doesn't bound the outer query
+        assert inject_limit("SELECT * FROM (SELECT * FROM t LIMIT 5) s JOIN u ON s.id = u.id", 100) is not None
+
+    def test_statements_are_not_limited(self):
+        assert inject_limit("SHOW TABLES", 100) is None
+        assert inject_limit("INSERT INTO t SELECT * FROM u", 100) is None
+
+
+class TestResultGovernor:
+    """Tests for row and byte budgets."""
+
+    def test_row_budget(self):
+        governor = ResultGovernor(ResultBudget(max_rows=3, max_bytes=1000))
+        assert governor.admit([[1], [2]]) == [[1], [2]]
+        assert not governor.truncated
+        assert governor.admit([[3], [4]]) == [[3]]
+        assert governor.truncated
+        assert governor.admit([[5]]) == []
+        assert governor.to_dict()["rows"] == 3
+
+    def test_exact_fit_is_not_truncated(self):
+        governor = ResultGovernor(ResultBudget(max_rows=2, max_bytes=1000))
+        assert governor.admit([[1], [2]]) == [[1], [2]]
+        assert not governor.truncated
+
+    def test_byte_budget(self):
+        governor = ResultGovernor(ResultBudget(max_rows=100, max_bytes=10))
+        assert governor.admit([["abcd", None], ["efgh"], ["ijkl"]]) == [["abcd", None], ["efgh"]]
+        assert governor.truncated
+        assert governor.bytes == 8
+
+    def test_prepare_records_injection(self):
+        governor = ResultGovernor(ResultBudget(max_rows=10, max_bytes=1000))
+        assert governor.prepare("SELECT 1") == "SELECT 1\nLIMIT 11"
+        assert governor.limit_injected
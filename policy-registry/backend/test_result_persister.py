@@ -0,0 +1,104 @@
+"""
+Unit tests for write-behind result persistence (against an in-memory SQLite results database).
+"""
+import threading
+import result_persister
+from conftest import add_query
+from query_models import Query, QueryColumn, QueryResultChunk
+from result_persister import ResultPersister
+from result_store import read_rows
+
+COLUMNS = [{"name": "id", "type": "integer"}]
+
+
+def add_pending_query(factory, query_id="q1"):
+    add_query(factory(), query_id, persist_status="PENDING")
+
+
+def make_persister(factory, **kwargs):
+    kwargs.setdefault("retry_delay_seconds", 0)
+    return ResultPersister(session_factory=factory, **kwargs)
+
+
+class TestResultPersister:
+    """Tests for background writes, retries and backpressure."""
+
+    def test_results_written_in_background(self, session_factory):
+        add_pending_query(session_factory)
+        persister = make_persister(session_factory)
+        assert persister.submit("q1", COLUMNS, [[1], [2]])
+        assert persister.flush(timeout=5)
+        session = session_factory()
+        assert session.get(Query, "q1").persist_status == "PERSISTED"
+        assert read_rows(session, "q1") == [[1], [2]]
+        assert persister.stats()["persisted"] == 1
+        persister.shutdown()
+
+    def test_retries_then_succeeds(self, session_factory, monkeypatch):
+        add_pending_query(session_factory)
+        attempts = []
+        original = result_persister.write_results
+
+        def flaky_write(*args, **kwargs):
+            attempts.append(1)
+            if len(attempts) == 1:
+                raise RuntimeError("connection reset")
+            return original(*args, **kwargs)
+
+        monkeypatch.setattr(result_persister, "write_results", flaky_write)
+        persister = make_persister(session_factory)
+        persister.submit("q1", COLUMNS, [[1]])
+        persister.flush(timeout=5)
+        assert len(attempts) == 2
+        assert session_factory().get(Query, "q1").persist_status == "PERSISTED"
+        assert persister.stats()["retries"] == 1
+
+    def test_marks_failed_after_max_attempts(self, session_factory, monkeypatch):
+        add_pending_query(session_factory)
+
+        def failing_write(query_db, query_id, columns, data):
+            query_db.add(QueryColumn(query_id=query_id, column_name="id", column_type="integer", column_position=0))
+            query_db.flush()
+            raise RuntimeError("disk full")
+
+        monkeypatch.setattr(result_persister, "write_results", failing_write)
+        persister = make_persister(session_factory, max_attempts=2)
+        persister.submit("q1", COLUMNS, [[1]])
+        persister.flush(timeout=5)
+        session = session_factory()
+        assert session.get(Query, "q1").persist_status == "FAILED"
+        assert session.query(QueryColumn).count() == 0
+        assert persister.stats()["failed"] == 1
+
+    def test_full_queue_writes_inline(self, session_factory, monkeypatch):
+        for query_id in ("q1", "q2", "q3"):
+            add_pending_query(session_factory, query_id)
+        started, release = threading.Event(), threading.Event()
+        original = result_persister.write_results
+
+        def blocking_write(query_db, query_id, columns, data):
+            if query_id == "q1":
+                started.set()
+                release.wait(5)
+            return original(query_db, query_id, columns, data)
+
+        monkeypatch.setattr(result_persister, "write_results", blocking_write)
+        persister = make_persister(session_factory, workers=1, max_pending=1, submit_timeout_seconds=0.01)
+        assert persister.submit("q1", COLUMNS, [[1]])
+        assert started.wait(5)
+        assert persister.submit("q2", COLUMNS, [[2]])
+        # The worker is busy and the queue is full: the caller writes q3 itself
+        assert not persister.submit("q3", COLUMNS, [[3]])
+        session = session_factory()
+        assert session.get(Query, "q3").persist_status == "PERSISTED"
+        assert persister.stats()["inline"] == 1
+        release.set()
+        assert persister.flush(timeout=5)
+        session.expire_all()
+        assert session.query(Query).filter(Query.persist_status == "PERSISTED").count() == 3
+
+    def test_deleted_query_is_skipped(self, session_factory):
+        persister = make_persister(session_factory)
+        persister.submit("missing", COLUMNS, [[1]])
+        persister.flush(timeout=5)
+        assert session_factory().query(QueryResultChunk).count() == 0
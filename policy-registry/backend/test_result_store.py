@@ -0,0 +1,233 @@
+"""
+Unit tests for the columnar result store (against an in-memory SQLite results database).
+"""
+from datetime import date
+from decimal import Decimal
+import pytest
+import result_store
+from conftest import add_query
+from query_models import Query, QueryColumn, QueryResult, QueryResultChunk, ResultSet
+from result_store import (
+    ResultWriter, content_hash, decode_chunk, decode_cursor, delete_results, encode_cursor, has_results,
+    legacy_query_ids, migrate_legacy_results, page_bounds, page_info, read_results, read_rows,
+    result_store_stats, stored_row_count, write_results
+)
+
+COLUMNS = [
+    {"name": "id", "type": "bigint"},
+    {"name": "amount", "type": "decimal(10,2)"},
+    {"name": "day", "type": "date"},
+    {"name": "name", "type": "varchar"},
+]
+
+
+def make_rows(count):
+    return [[i, Decimal(f"{i}.50"), date(2024, 1, 1 + i % 28), None if i % 5 == 0 else f"name-{i}"] for i in range(count)]
+
+
+@pytest.fixture
+def session(session):
+    add_query(session, "q1")
+    return session
+
+
+def store_legacy_cells(session, rows):
+    for i, col in enumerate(COLUMNS):
+        session.add(QueryColumn(query_id="q1", column_name=col["name"], column_type=col["type"], column_position=i))
+    for row_number, row in enumerate(rows):
+        for position, value in enumerate(row):
+            session.add(QueryResult(query_id="q1", row_number=row_number, column_position=position,
+                                    cell_value=str(value) if value is not None else None))
+    session.commit()
+
+
+class TestResultStore:
+    """Tests for writing, reading and deleting chunked results."""
+
+    def test_round_trip_keeps_types(self, session):
+        rows = make_rows(25)
+        writer = write_results(session, "q1", COLUMNS, rows, chunk_rows=10)
+        session.commit()
+        assert writer.chunks_written == 3
+        chunks = session.query(QueryResultChunk).order_by(QueryResultChunk.chunk_index).all()
+        assert [(c.first_row, c.row_count) for c in chunks] == [(0, 10), (10, 10), (20, 5)]
+        columns, data = read_results(session, "q1")
+        assert columns == COLUMNS
+        assert data == rows
+
+    def test_reads_only_overlapping_chunks(self, session, monkeypatch):
+        write_results(session, "q1", COLUMNS, make_rows(30), chunk_rows=10)
+        session.commit()
+        decoded = []
+        original = result_store.decode_chunk
+        monkeypatch.setattr(result_store, "decode_chunk",
+                            lambda chunk, **kwargs: decoded.append(chunk.chunk_index) or original(chunk, **kwargs))
+        rows = read_rows(session, "q1", offset=12, limit=5)
+        assert [row[0] for row in rows] == [12, 13, 14, 15, 16]
+        assert decoded == [1]
+        assert [row[0] for row in read_rows(session, "q1", offset=18, limit=4)] == [18, 19, 20, 21]
+        assert read_rows(session, "q1", offset=100) == []
+
+    def test_writer_flushes_full_chunks(self, session):
+        writer = ResultWriter(session, "q1", COLUMNS, chunk_rows=4)
+        assert writer.append(make_rows(3)) == 0
+        assert writer.append(make_rows(6)) == 2
+        assert writer.close() == 9
+        session.commit()
+        assert session.query(QueryResultChunk).count() == 3
+
+    def test_json_fallback_without_arrow(self, session, monkeypatch):
+        monkeypatch.setattr(result_store, "ARROW_AVAILABLE", False)
+        write_results(session, "q1", [{"name": "id", "type": "integer"}], [[1], [None]])
+        session.commit()
+        chunk = session.query(QueryResultChunk).one()
+        assert (chunk.format, chunk.codec) == ("json", "zlib")
+        assert decode_chunk(chunk) == [[1], [None]]
+
+    def test_delete_results(self, session):
+        write_results(session, "q1", COLUMNS, make_rows(3))
+        session.commit()
+        assert has_results(session, "q1")
+        delete_results(session, "q1")
+        session.commit()
+        assert not has_results(session, "q1")
+        assert session.query(QueryColumn).count() == 0
+
+
+class TestContentAddressedResults:
+    """Tests for sharing identical results between queries."""
+
+    def test_hash_covers_rows_and_types(self):
+        rows = make_rows(6)
+        assert content_hash(COLUMNS, iter(rows)) == content_hash(COLUMNS, rows)
+        assert content_hash(COLUMNS, rows[:5]) != content_hash(COLUMNS, rows)
+        assert content_hash([{"name": "id", "type": "varchar"}], [["1"]]) != content_hash([{"name": "id", "type": "integer"}], [[1]])
+
+    def test_identical_results_are_stored_once(self, session):
+        add_query(session, "q2", user_id=2)
+        rows = make_rows(25)
+        write_results(session, "q1", COLUMNS, rows, chunk_rows=10)
+        session.commit()
+        second = write_results(session, "q2", COLUMNS, rows, chunk_rows=10)
+        session.commit()
+        assert second.reused
+        assert session.query(QueryResultChunk).count() == 3
+        assert session.query(ResultSet).one().ref_count == 2
+        assert read_rows(session, "q2", offset=20) == rows[20:]
+        assert read_results(session, "q2")[0] == COLUMNS
+
+    def test_streamed_duplicate_drops_its_chunks(self, session):
+        add_query(session, "q2")
+        rows = make_rows(12)
+        write_results(session, "q1", COLUMNS, rows, chunk_rows=5)
+        session.commit()
+        writer = ResultWriter(session, "q2", COLUMNS, chunk_rows=5)
+        writer.append(rows[:7])
+        writer.append(rows[7:])
+        writer.close()
+        session.commit()
+        assert writer.reused
+        assert session.query(QueryResultChunk).filter(QueryResultChunk.query_id == "q2").count() == 0
+        assert session.get(Query, "q2").result_hash == session.get(Query, "q1").result_hash
+        assert read_rows(session, "q2") == rows
+
+    def test_streamed_new_result_becomes_shared(self, session):
+        writer = ResultWriter(session, "q1", COLUMNS, chunk_rows=5)
+        writer.append(make_rows(8))
+        writer.close()
+        session.commit()
+        result_set = session.query(ResultSet).one()
+        assert (result_set.row_count, result_set.byte_size) == (8, writer.bytes_written)
+        assert session.query(QueryResultChunk).filter(QueryResultChunk.result_hash == result_set.content_hash).count() == 2
+
+    def test_last_reference_deletes_chunks(self, session):
+        add_query(session, "q2")
+        for query_id in ("q1", "q2"):
+            write_results(session, query_id, COLUMNS, make_rows(3))
+            session.commit()
+        stats = result_store_stats(session)
+        assert stats["references"] == 2 and stats["saved_bytes"] == stats["stored_bytes"]
+        delete_results(session, "q1")
+        session.commit()
+        assert not has_results(session, "q1")
+        assert read_rows(session, "q2") == make_rows(3)
+        delete_results(session, "q2")
+        session.commit()
+        assert session.query(ResultSet).count() == 0
+        assert session.query(QueryResultChunk).count() == 0
+
+
+class TestPagination:
+    """Tests for page bounds and cursors."""
+
+    def test_no_page_requested(self):
+        assert page_bounds("q1") is None
+
+    def test_defaults_and_validation(self):
+        assert page_bounds("q1", offset=20) == (20, result_store.RESULT_PAGE_DEFAULT_ROWS)
+        with pytest.raises(ValueError):
+            page_bounds("q1", offset=-1)
+        with pytest.raises(ValueError):
+            page_bounds("q1", limit=result_store.RESULT_PAGE_MAX_ROWS + 1)
+
+    def test_cursor_round_trip(self):
+        cursor = encode_cursor("q1", 200, 50)
+        assert decode_cursor(cursor, "q1") == (200, 50)
+        assert page_bounds("q1", cursor=cursor, limit=10) == (200, 10)
+        with pytest.raises(ValueError):
+            decode_cursor(cursor, "q2")
+        with pytest.raises(ValueError):
+            decode_cursor("not-a-cursor", "q1")
+
+    def test_page_info_cursors(self):
+        first = page_info("q1", 0, 50, 50, 120)
+        assert first["has_more"] and first["prev_cursor"] is None
+        assert decode_cursor(first["next_cursor"], "q1") == (50, 50)
+        last = page_info("q1", 100, 50, 20, 120)
+        assert not last["has_more"] and last["next_cursor"] is None
+        assert decode_cursor(last["prev_cursor"], "q1") == (50, 50)
+
+
+class TestLegacyResults:
+    """Tests for reading and migrating per-cell results."""
+
+    def test_legacy_cells_are_readable(self, session):
+        store_legacy_cells(session, make_rows(3))
+        assert has_results(session, "q1")
+        assert read_rows(session, "q1", offset=1, limit=1) == [["1", "1.50", "2024-01-02", "name-1"]]
+
+    def test_legacy_listing_ignores_shared_chunks(self, session):
+        add_query(session, "q2")
+        write_results(session, "q2", COLUMNS, make_rows(2))
+        session.commit()
+        store_legacy_cells(session, make_rows(2))
+        assert legacy_query_ids(session) == ["q1"]
+
+    def test_migration_restores_types(self, session):
+        rows = make_rows(12)
+        store_legacy_cells(session, rows)
+        assert legacy_query_ids(session) == ["q1"]
+        assert migrate_legacy_results(session, "q1", chunk_rows=5) == 12
+        assert session.query(QueryResult).count() == 0
+        assert session.query(QueryResultChunk).count() == 3
+        assert read_rows(session, "q1") == rows
+        assert legacy_query_ids(session) == []
+        assert migrate_legacy_results(session, "q1") == 0
+
+    def test_migrated_result_pages_to_the_end(self, session):
+        rows = make_rows(12)
+        store_legacy_cells(session, rows)
+        # Results stored before rows_returned was maintained
+        assert session.get(Query, "q1").rows_returned in (None, 0)
+        assert stored_row_count(session, "q1") == 12
+        migrate_legacy_results(session, "q1", chunk_rows=5)
+        assert session.get(Query, "q1").rows_returned == 12
+        paged, page = [], page_bounds("q1", limit=5)
+        while page is not None:
+            offset, limit = page
+            data = read_rows(session, "q1", offset, limit)
+            info = page_info("q1", offset, limit, len(data), stored_row_count(session, "q1"))
+            assert info["total_rows"] == 12
+            paged.extend(data)
+            page = page_bounds("q1", cursor=info["next_cursor"]) if info["has_more"] else None
+        assert paged == rows
@@ -0,0 +1,131 @@
+"""
+Unit tests for streaming query results from the Trino client.
+"""
+import pytest
+import trino_client
+from result_governor import ResultBudget, ResultGovernor
+from trino_client import TrinoClientManager
+
+
+class FakeCursor:
+    def __init__(self, rows, fail_after=None):
+        self.rows = rows
+        self.position = 0
+        self.fail_after = fail_after
+        self.description = None
+        self.cancelled = False
+        self.query_id = "20250101_000000_00000_abcde"
+        self.stats = {"state": "FINISHED"}
+
+    def execute(self, query):
+        self.executed = query
+        self.description = [("id", "integer"), ("name", "varchar")]
+
+    def fetchmany(self, size):
+        if self.fail_after is not None and self.position >= self.fail_after:
+            raise RuntimeError("connection reset")
+        batch = self.rows[self.position:self.position + size]
+        self.position += len(batch)
+        return batch
+
+    def cancel(self):
+        self.cancelled = True
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self, cursor):
+        self._cursor = cursor
+        self.closed = False
+
+    def cursor(self):
+        return self._cursor
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def manager(monkeypatch):
+    def install(rows, fail_after=None):
+        cursor = FakeCursor(rows, fail_after)
+        monkeypatch.setattr(trino_client, "connect", lambda **kwargs: FakeConnection(cursor))
+        return TrinoClientManager(), cursor
+    return install
+
+
+class TestStreamQuery:
+    """Tests for TrinoClientManager.stream_query."""
+
+    def test_events_in_order(self, manager):
+        client, _ = manager([[i, f"row{i}"] for i in range(5)])
+        events = list(client.stream_query("alice", "postgres", "public", "SELECT 1", batch_size=2))
+        assert [event for event, _ in events] == ["columns", "rows", "rows", "rows", "stats"]
+        assert events[0][1] == [{"name": "id", "type": "integer"}, {"name": "name", "type": "varchar"}]
+        assert [len(rows) for event, rows in events if event == "rows"] == [2, 2, 1]
+        stats = events[-1][1]
+        assert stats["rows"] == 5
+        assert stats["batches"] == 3
+        assert stats["trino_query_id"] == "20250101_000000_00000_abcde"
+        assert client.pool_stats()["idle"] == 1
+
+    def test_error_mid_stream(self, manager):
+        client, _ = manager([[i, "x"] for i in range(5)], fail_after=2)
+        events = list(client.stream_query("alice", "postgres", "public", "SELECT 1", batch_size=2))
+        assert [event for event, _ in events] == ["columns", "rows", "error"]
+        # Connection in an unknown state is not reused
+        assert client.pool_stats()["size"] == 0
+
+    def test_early_close_cancels_query(self, manager):
+        client, cursor = manager([[i, "x"] for i in range(10)])
+        events = client.stream_query("alice", "postgres", "public", "SELECT 1", batch_size=2)
+        next(events)
+        next(events)
+        events.close()
+        assert cursor.cancelled
+        assert client.pool_stats()["in_use"] == 0
+
+    def test_cancel_query(self, manager):
+        client, cursor = manager([[i, "x"] for i in range(10)])
+        original_fetchmany = cursor.fetchmany
+
+        def fetchmany(size):
+            if cursor.cancelled:
+                raise trino_client.TrinoUserError({"message": "Query was cancelled"}, "q")
+            return original_fetchmany(size)
+
+        cursor.fetchmany = fetchmany
+        events = client.stream_query("alice", "postgres", "public", "SELECT 1", batch_size=2, query_id="q1")
+        assert next(events)[0] == "columns"
+        assert client.cancel_query("q1")
+        assert [event for event, _ in events] == ["rows", "cancelled"]
+        assert not client.cancel_query("q1")
+
+    def test_governor_truncates_stream(self, manager):
+        client, cursor = manager([[i, "x"] for i in range(10)])
+        governor = ResultGovernor(ResultBudget(max_rows=3, max_bytes=1000))
+        events = list(client.stream_query("alice", "postgres", "public", "SELECT * FROM t", batch_size=2, governor=governor))
+        assert [len(rows) for event, rows in events if event == "rows"] == [2, 1]
+        assert events[-1][1]["governor"]["truncated"]
+        assert cursor.executed == "SELECT * FROM t\nLIMIT 4"
+        assert cursor.cancelled
+        assert client.pool_stats()["idle"] == 1
+
+
+class TestExecuteQuery:
+    """Tests for TrinoClientManager.execute_query."""
+
+    def test_governor_stops_fetching(self, manager):
+        client, cursor = manager([[i, "x"] for i in range(10)])
+        governor = ResultGovernor(ResultBudget(max_rows=100, max_bytes=8))
+        execution = {}
+        with client.execute_query("alice", "postgres", "public", "SELECT * FROM t LIMIT 50", governor=governor,
+                                  on_stats=execution.update) as (success, data, columns, error):
+            assert success
+            assert data == [[0, "x"], [1, "x"], [2, "x"], [3, "x"]]
+        assert governor.truncated and governor.bytes == 8
+        assert cursor.executed == "SELECT * FROM t LIMIT 50"
+        assert cursor.cancelled
+        assert execution == {"trino_query_id": "20250101_000000_00000_abcde", "trino_stats": {"state": "FINISHED"}}
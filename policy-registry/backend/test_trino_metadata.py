@@ -0,0 +1,109 @@
+"""
+Unit tests for the Trino metadata index and cache.
+"""
+import time
+import pytest
+from trino_metadata import MetadataCache, MetadataIndex
+
+CATALOGS = {
+    "iceberg": (["demo", "empty"], [
+        ("demo", "orders", "order_id", "bigint"),
+        ("demo", "orders", "customer_id", "bigint"),
+        ("demo", "customers", "customer_id", "bigint"),
+    ]),
+    "postgres": (["public"], [
+        ("public", "person", "ssn", "varchar"),
+    ]),
+}
+
+
+@pytest.fixture
+def index():
+    return MetadataIndex(CATALOGS)
+
+
+class TestMetadataIndex:
+    """Tests for listings and prefix search."""
+
+    def test_listings(self, index):
+        assert index.catalogs() == ["iceberg", "postgres"]
+        assert index.schemas("iceberg") == ["demo", "empty"]
+        assert index.tables("iceberg", "demo") == ["customers", "orders"]
+        assert index.columns("iceberg", "demo", "orders") == [
+            {"name": "order_id", "type": "bigint"}, {"name": "customer_id", "type": "bigint"}
+        ]
+        assert index.tables("iceberg", "missing") is None
+        assert index.counts() == {"catalog": 2, "schema": 3, "table": 3, "column": 4}
+
+    def test_search_by_name(self, index):
+        names = [(m["kind"], m["qualified_name"]) for m in index.search("CUST")]
+        assert names == [
+            ("column", "iceberg.demo.customers.customer_id"),
+            ("column", "iceberg.demo.orders.customer_id"),
+            ("table", "iceberg.demo.customers"),
+        ]
+        assert index.search("cust", kinds=["table"]) == [
+            {"kind": "table", "name": "customers", "qualified_name": "iceberg.demo.customers"}
+        ]
+        assert index.search("ssn")[0]["type"] == "varchar"
+
+    def test_search_by_qualified_name(self, index):
+        assert [m["qualified_name"] for m in index.search("iceberg.demo.o")] == [
+            "iceberg.demo.orders", "iceberg.demo.orders.customer_id", "iceberg.demo.orders.order_id"
+        ]
+        assert index.search("iceberg.demo.orders.", kinds=["column"], limit=1) == [
+            {"kind": "column", "name": "customer_id", "qualified_name": "iceberg.demo.orders.customer_id", "type": "bigint"}
+        ]
+        assert index.search("nothing") == []
+
+    def test_large_index(self):
+        columns = [("s", f"table_{i:05d}", "id", "bigint") for i in range(20000)]
+        index = MetadataIndex({"iceberg": (["s"], columns)})
+        matches = index.search("table_1234", kinds=["table"], limit=50)
+        assert [m["name"] for m in matches] == [f"table_1234{i}" for i in range(10)]
+
+
+class TestMetadataCache:
+    """Tests for TTL, background refresh and eviction."""
+
+    def make_cache(self, **kwargs):
+        loads = []
+
+        def loader(user):
+            loads.append(user)
+            return MetadataIndex(CATALOGS)
+
+        return MetadataCache(loader=loader, **kwargs), loads
+
+    def test_fresh_snapshot_is_reused(self):
+        cache, loads = self.make_cache(ttl_seconds=60)
+        first = cache.get("alice")
+        assert cache.get("alice") is first
+        cache.get("bob")
+        assert loads == ["alice", "bob"]
+        assert cache.stats()["hits"] == 1
+
+    def test_stale_snapshot_is_served_and_refreshed_in_background(self):
+        cache, loads = self.make_cache(ttl_seconds=0.01, max_stale_seconds=60)
+        first = cache.get("alice")
+        time.sleep(0.02)
+        assert cache.get("alice") is first
+        deadline = time.monotonic() + 2
+        while len(loads) < 2 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert loads == ["alice", "alice"]
+        assert cache.stats()["stale_hits"] == 1
+
+    def test_expired_snapshot_is_reloaded(self):
+        cache, loads = self.make_cache(ttl_seconds=0, max_stale_seconds=0)
+        first = cache.get("alice")
+        assert cache.get("alice") is not first
+        assert len(loads) == 2
+
+    def test_least_recently_used_user_is_evicted(self):
+        cache, loads = self.make_cache(max_users=1)
+        cache.get("alice")
+        cache.get("bob")
+        cache.get("alice")
+        assert loads == ["alice", "bob", "alice"]
+        assert cache.invalidate() == 1
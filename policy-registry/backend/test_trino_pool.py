@@ -0,0 +1,117 @@
+"""
+Unit tests for the Trino connection pool.
+"""
+import threading
+import time
+import pytest
+from trino_pool import ConnectionPool, PoolTimeoutError
+
+
+class FakeConnection:
+    def __init__(self, key):
+        self.key = key
+        self.closed = False
+        self.alive = True
+
+
+def make_pool(**kwargs):
+    opened = []
+
+    def factory(key):
+        connection = FakeConnection(key)
+        opened.append(connection)
+        return connection
+
+    kwargs.setdefault("checkout_timeout_seconds", 0.05)
+    pool = ConnectionPool(
+        factory,
+        validate=lambda connection: connection.alive,
+        close=lambda connection: setattr(connection, "closed", True),
+        **kwargs
+    )
+    return pool, opened
+
+
+class TestConnectionPool:
+    """Tests for checkout/checkin, limits and eviction."""
+
+    def test_connection_is_reused(self):
+        pool, opened = make_pool()
+        with pool.connection("a") as first:
+            pass
+        with pool.connection("a") as second:
+            assert second is first
+        assert len(opened) == 1
+        assert pool.stats()["hits"] == 1
+
+    def test_concurrent_checkouts_get_distinct_connections(self):
+        pool, opened = make_pool()
+        with pool.connection("a") as first:
+            with pool.connection("a") as second:
+                assert second is not first
+        assert pool.stats()["idle"] == 2
+
+    def test_per_key_limit_times_out(self):
+        pool, _ = make_pool(max_per_key=1)
+        with pool.connection("a"):
+            with pytest.raises(PoolTimeoutError):
+                pool.checkout("a")
+            with pool.connection("b"):
+                pass
+        stats = pool.stats()
+        assert stats["timeouts"] == 1
+        assert stats["waits"] == 1
+
+    def test_waiter_gets_returned_connection(self):
+        pool, opened = make_pool(max_per_key=1, checkout_timeout_seconds=2)
+        entry = pool.checkout("a")
+        threading.Timer(0.05, pool.checkin, args=("a", entry)).start()
+        with pool.connection("a") as connection:
+            assert connection is entry.connection
+        assert len(opened) == 1
+
+    def test_total_limit_evicts_least_recently_used_key(self):
+        pool, opened = make_pool(max_total=2)
+        for key in ("a", "b", "c"):
+            with pool.connection(key):
+                pass
+        assert opened[0].closed
+        assert not opened[1].closed
+        stats = pool.stats()
+        assert stats["size"] == 2
+        assert stats["evictions"] == 1
+
+    def test_idle_connections_expire(self):
+        pool, opened = make_pool(idle_timeout_seconds=0.01)
+        with pool.connection("a"):
+            pass
+        time.sleep(0.02)
+        with pool.connection("b"):
+            pass
+        assert opened[0].closed
+        assert pool.stats()["expirations"] == 1
+
+    def test_dead_connection_is_replaced(self):
+        pool, opened = make_pool(health_check_after_seconds=0)
+        with pool.connection("a"):
+            pass
+        opened[0].alive = False
+        with pool.connection("a") as connection:
+            assert connection is opened[1]
+        assert opened[0].closed
+        assert pool.stats()["health_failures"] == 1
+
+    def test_connection_discarded_when_block_raises(self):
+        pool, opened = make_pool()
+        with pytest.raises(RuntimeError):
+            with pool.connection("a"):
+                raise RuntimeError("boom")
+        assert opened[0].closed
+        assert pool.stats()["size"] == 0
+
+    def test_factory_error_releases_slot(self):
+        pool = ConnectionPool(lambda key: 1 / 0, max_per_key=1, checkout_timeout_seconds=0.01)
+        for _ in range(2):
+            with pytest.raises(ZeroDivisionError):
+                pool.checkout("a")
+        assert pool.stats()["size"] == 0
@@ -0,0 +1,99 @@
+"""
+Unit tests for the TTL cache and Cerbos decision cache keys.
+"""
+import time
+import pytest
+from ttl_cache import TTLCache
+from cerbos_client import decision_cache_key
+
+
+class TestTTLCache:
+    """Tests for TTL expiry, LRU eviction and stats."""
+    
+    def test_get_and_set(self):
+        cache = TTLCache(max_size=10, ttl_seconds=60)
+        cache.set("a", True)
+        assert cache.get("a") is True
+        assert cache.get("missing") is None
+    
+    def test_false_values_are_cached(self):
+        cache = TTLCache(max_size=10, ttl_seconds=60)
+        cache.set("deny", False)
+        assert cache.get("deny") is False
+    
+    def test_entries_expire(self):
+        cache = TTLCache(max_size=10, ttl_seconds=0.01)
+        cache.set("a", 1)
+        time.sleep(0.02)
+        assert cache.get("a") is None
+        assert cache.stats()["expirations"] == 1
+    
+    def test_lru_eviction(self):
+        cache = TTLCache(max_size=2, ttl_seconds=60)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")  # "b" is now least recently used
+        cache.set("c", 3)
+        assert cache.get("b") is None
+        assert cache.get("a") == 1
+        assert cache.get("c") == 3
+        assert cache.stats()["evictions"] == 1
+    
+    def test_clear(self):
+        cache = TTLCache(max_size=10, ttl_seconds=60)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        assert cache.clear() == 2
+        assert len(cache) == 0
+    
+    def test_hit_miss_stats(self):
+        cache = TTLCache(max_size=10, ttl_seconds=60)
+        cache.set("a", 1)
+        cache.get("a")
+        cache.get("b")
+        stats = cache.stats()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 1
+        assert stats["hit_rate"] == 0.5
+    
+    def test_disabled_cache(self):
+        cache = TTLCache(max_size=0, ttl_seconds=60)
+        cache.set("a", 1)
+        assert cache.get("a") is None
+        assert not cache.enabled
+
+
+class TestDecisionCacheKey:
+    """Tests for canonical decision digests."""
+    
+    def _key(self, **overrides):
+        args = {
+            "principal_id": "3",
+            "roles": ["aml_analyst", "aml_analyst_junior"],
+            "principal_attr": {"email": "a@x.com", "team": "Team A"},
+            "resource_kind": "case",
+            "resource_id": "42",
+            "resource_attr": {"owner_user_id": "3", "status": "open"},
+            "action": "view",
+        }
+        args.update(overrides)
+        return decision_cache_key(**args)
+    
+    def test_role_order_does_not_matter(self):
+        assert self._key() == self._key(roles=["aml_analyst_junior", "aml_analyst"])
+    
+    def test_none_attributes_are_ignored(self):
+        assert self._key() == self._key(principal_attr={"email": "a@x.com", "team": "Team A", "region": None})
+    
+    def test_set_and_list_attributes_match(self):
+        assert self._key(resource_attr={"labels": {"B", "A"}}) == self._key(resource_attr={"labels": {"A", "B"}})
+    
+    @pytest.mark.parametrize("field,value", [
+        ("principal_id", "4"),
+        ("action", "close"),
+        ("resource_kind", "alert"),
+        ("resource_attr", {"owner_user_id": "4", "status": "open"}),
+        ("principal_attr", {"email": "a@x.com", "team": "Team B"}),
+    ])
+    def test_any_input_change_changes_key(self, field, value):
+        assert self._key() != self._key(**{field: value})
@@ -5,69 +5,132 @@ Handles all Trino operations using the official Python client
 
 from trino.dbapi import connect
 from trino.exceptions import TrinoQueryError, TrinoUserError, TrinoDataError
-from typing import Dict, List, Any, Optional, Tuple
+from typing import Callable, Dict, Iterator, List, Any, Optional, Tuple
+import os
+import time
 import logging
+import threading
+import requests
 from contextlib import contextmanager
+from trino_pool import ConnectionPool
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Connection pool limits; a connection is only ever used by one request at a time
+POOL_MAX_PER_KEY = int(os.getenv("TRINO_POOL_MAX_PER_KEY", "4"))
+POOL_MAX_TOTAL = int(os.getenv("TRINO_POOL_MAX_TOTAL", "64"))
+POOL_IDLE_TIMEOUT_SECONDS = float(os.getenv("TRINO_POOL_IDLE_TIMEOUT_SECS", "300"))
+POOL_HEALTH_CHECK_SECONDS = float(os.getenv("TRINO_POOL_HEALTH_CHECK_SECS", "60"))
+POOL_CHECKOUT_TIMEOUT_SECONDS = float(os.getenv("TRINO_POOL_CHECKOUT_TIMEOUT_SECS", "30"))
+
+# Rows fetched per fetchmany() call when streaming results
+STREAM_BATCH_SIZE = int(os.getenv("TRINO_STREAM_BATCH_SIZE", "1000"))
+
+
+def _connection_alive(connection) -> bool:
+    """Liveness check for an idle pooled connection."""
+    cursor = connection.cursor()
+    try:
+        cursor.execute("SELECT 1")
+        return cursor.fetchall() == [[1]]
+    finally:
+        cursor.close()
+
 class TrinoClientManager:
     """Manages Trino connections and operations using the official Python client."""
     
     def __init__(self, host: str = "trino-coordinator", port: int = 8080):
         self.host = host
         self.port = port
-        self._connection_pool = {}
+        # Cursors of queries running in this process, by application query id
+        self._running: Dict[str, Any] = {}
+        self._cancelled = set()
+        self._running_lock = threading.Lock()
+        self._connection_pool = ConnectionPool(
+            self._connect,
+            max_per_key=POOL_MAX_PER_KEY,
+            max_total=POOL_MAX_TOTAL,
+            idle_timeout_seconds=POOL_IDLE_TIMEOUT_SECONDS,
+            health_check_after_seconds=POOL_HEALTH_CHECK_SECONDS,
+            checkout_timeout_seconds=POOL_CHECKOUT_TIMEOUT_SECONDS,
+            validate=_connection_alive,
+            close=lambda connection: connection.close(),
+            name="trino"
+        )
+    
+    def _connect(self, connection_key: Tuple[str, str, str]):
+        """Open a new Trino connection for a (user, catalog, schema) key."""
+        user, catalog, schema = connection_key
+        logger.info(f"Creating new Trino connection for {user}_{catalog}_{schema}")
+        return connect(
+            host=self.host,
+            port=self.port,
+            user=user,
+            catalog=catalog,
+            schema=schema,
+            http_scheme="http",
+            verify=False,  # For development - enable SSL verification in production
+            request_timeout=30
+        )
     
     def get_connection(self, user: str, catalog: str = "postgres", schema: str = "public"):
-        """Get or create a Trino connection for the specified user and catalog."""
-        connection_key = f"{user}_{catalog}_{schema}"
-        
-        if connection_key not in self._connection_pool:
-            logger.info(f"Creating new Trino connection for {connection_key}")
-            connection = connect(
-                host=self.host,
-                port=self.port,
-                user=user,
-                catalog=catalog,
-                schema=schema,
-                http_scheme="http",
-                verify=False,  # For development - enable SSL verification in production
-                request_timeout=30
-            )
-            self._connection_pool[connection_key] = connection
-        else:
-            logger.debug(f"Reusing existing Trino connection for {connection_key}")
+        """
+        Check out a pooled Trino connection for the specified user and catalog.
         
-        return self._connection_pool[connection_key]
+        Use as a context manager; the connection goes back to the pool when the
+        block exits (or is discarded if the block raises).
+        """
+        return self._connection_pool.connection((user, catalog, schema))
+    
+    def pool_stats(self) -> Dict[str, Any]:
+        """Return connection pool size, hit and wait counters."""
+        return self._connection_pool.stats()
     
     @contextmanager
-    def execute_query(self, user: str, catalog: str, schema: str, query: str):
+    def execute_query(self, user: str, catalog: str, schema: str, query: str, governor=None,
+                      on_stats: Optional[Callable[[Dict[str, Any]], None]] = None):
         """
         Execute a query using the Trino client with automatic result handling.
         
+        Args:
+            governor: Optional ResultGovernor; the query is limited to its budget
+                and fetching stops (and the query is cancelled) once it is used up
+            on_stats: Called after a successful execution with {"trino_query_id",
+                "trino_stats"} (Trino's cursor stats: wall/CPU/queued time, rows, bytes, memory)
+        
         Yields:
             Tuple of (success: bool, data: List, columns: List, error: str)
         """
-        connection = None
+        connection_key = (user, catalog, schema)
+        entry = None
+        cursor = None
+        healthy = True
         try:
             # Get connection
-            connection = self.get_connection(user, catalog, schema)
+            entry = self._connection_pool.checkout(connection_key)
+            connection = entry.connection
             
             # Execute query
             logger.info(f"Executing query for user {user} on {catalog}.{schema}")
             logger.debug(f"Query: {query}")
             
             cursor = connection.cursor()
-            cursor.execute(query)
+            cursor.execute(governor.prepare(query) if governor is not None else query)
             
             # Get results
             if cursor.description:
                 # Query returned data
                 columns = [{"name": desc[0], "type": str(desc[1])} for desc in cursor.description]
-                data = cursor.fetchall()
+                if governor is not None:
+                    data = governor.fetch(cursor, STREAM_BATCH_SIZE)
+                    if governor.truncated:
+                        self._cancel_cursor(cursor)
+                else:
+                    data = cursor.fetchall()
+                if on_stats is not None:
+                    on_stats(self._cursor_stats(cursor))
                 
                 logger.info(f"Query completed successfully. Rows: {len(data)}, Columns: {len(columns)}")
                 yield True, data, columns, None
@@ -75,6 +138,8 @@ class TrinoClientManager:
             else:
                 # DDL/DML query (CREATE, INSERT, UPDATE, DELETE, etc.)
                 logger.info("DDL/DML query completed successfully")
+                if on_stats is not None:
+                    on_stats(self._cursor_stats(cursor))
                 yield True, [], [], None
                 
         except TrinoQueryError as e:
@@ -95,14 +160,202 @@ class TrinoClientManager:
         except Exception as e:
             error_msg = f"Unexpected error executing query: {str(e)}"
             logger.error(error_msg)
+            # Don't hand a connection in an unknown state to the next request
+            healthy = False
             yield False, [], [], error_msg
             
         finally:
-            if connection:
+            if cursor is not None:
                 try:
                     cursor.close()
                 except:
                     pass
+            if entry is not None:
+                self._connection_pool.checkin(connection_key, entry, healthy)
+    
+    def stream_query(
+        self,
+        user: str,
+        catalog: str,
+        schema: str,
+        query: str,
+        batch_size: Optional[int] = None,
+        on_progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+        query_id: Optional[str] = None,
+        on_start: Optional[Callable[[str], None]] = None,
+        governor=None
+    ) -> Iterator[Tuple[str, Any]]:
+        """
+        Execute a query and yield its results in batches, without holding them all in memory.
+        
+        Yields (event, payload) tuples, in order:
+            ("columns", [{"name", "type"}, ...]) once the result shape is known,
+            ("rows", [row, ...]) for each fetchmany() batch,
+            ("stats", {...}) at the end (rows, batches, elapsed_ms, Trino query stats),
+        or ("error", message) if the query fails, or ("cancelled", message) if it was
+        cancelled with cancel_query(); no further events follow either.
+        
+        Closing the generator early (e.g. the client disconnected) cancels the query.
+        
+        Args:
+            on_progress: Called with the Trino query stats (state, progressPercentage, ...)
+                after the query is submitted and after every batch
+            query_id: Application query id under which cancel_query() can find this query
+            on_start: Called with Trino's query id once the query has been submitted
+            governor: Optional ResultGovernor; streaming stops once its budget is
+                used up and the final stats report the truncation
+        """
+        batch_size = batch_size or STREAM_BATCH_SIZE
+        connection_key = (user, catalog, schema)
+        started = time.monotonic()
+        entry = None
+        cursor = None
+        healthy = True
+        finished = False
+        try:
+            entry = self._connection_pool.checkout(connection_key)
+            logger.info(f"Streaming query for user {user} on {catalog}.{schema}")
+            logger.debug(f"Query: {query}")
+            
+            cursor = entry.connection.cursor()
+            if query_id is not None:
+                with self._running_lock:
+                    self._running[query_id] = cursor
+            cursor.execute(governor.prepare(query) if governor is not None else query)
+            if query_id is not None and self._is_cancelled(query_id):
+                # cancel_query() arrived before Trino had accepted the query
+                cursor.cancel()
+            if on_start is not None and getattr(cursor, "query_id", None):
+                on_start(cursor.query_id)
+            if on_progress is not None:
+                on_progress(getattr(cursor, "stats", None) or {})
+            # Fetch the first batch before reading the description; Trino only knows
+            # the columns once the first result page has arrived
+            batch = cursor.fetchmany(batch_size)
+            columns = [{"name": desc[0], "type": str(desc[1])} for desc in cursor.description or []]
+            yield "columns", columns
+            
+            rows = 0
+            batches = 0
+            while batch:
+                if governor is not None:
+                    batch = governor.admit(batch)
+                if batch:
+                    rows += len(batch)
+                    batches += 1
+                    yield "rows", batch
+                if governor is not None and governor.truncated:
+                    self._cancel_cursor(cursor)
+                    break
+                if on_progress is not None:
+                    on_progress(getattr(cursor, "stats", None) or {})
+                batch = cursor.fetchmany(batch_size)
+            finished = True
+            
+            logger.info(f"Streamed query completed successfully. Rows: {rows}, Batches: {batches}")
+            stats = {
+                "rows": rows,
+                "batches": batches,
+                "elapsed_ms": round((time.monotonic() - started) * 1000, 2),
+                "trino_query_id": getattr(cursor, "query_id", None),
+                "trino_stats": getattr(cursor, "stats", None),
+            }
+            if governor is not None:
+                stats["governor"] = governor.to_dict()
+            yield "stats", stats
+        
+        except Exception as e:
+            finished = True
+            if query_id is not None and self._is_cancelled(query_id):
+                logger.info(f"Streamed query {query_id} was cancelled")
+                yield "cancelled", "Query was cancelled"
+            elif isinstance(e, (TrinoQueryError, TrinoUserError, TrinoDataError)):
+                error_msg = f"Trino query error: {str(e)}"
+                logger.error(error_msg)
+                yield "error", error_msg
+            else:
+                healthy = False
+                error_msg = f"Unexpected error executing query: {str(e)}"
+                logger.error(error_msg)
+                yield "error", error_msg
+        
+        finally:
+            if query_id is not None:
+                with self._running_lock:
+                    self._running.pop(query_id, None)
+                    self._cancelled.discard(query_id)
+            if cursor is not None:
+                if not finished:
+                    # The consumer stopped early; don't leave the query running on Trino
+                    try:
+                        cursor.cancel()
+                    except Exception as e:
+                        logger.warning(f"Failed to cancel streamed query: {e}")
+                        healthy = False
+                try:
+                    cursor.close()
+                except:
+                    pass
+            if entry is not None:
+                self._connection_pool.checkin(connection_key, entry, healthy)
+    
+    @staticmethod
+    def _cursor_stats(cursor) -> Dict[str, Any]:
+        return {"trino_query_id": getattr(cursor, "query_id", None), "trino_stats": getattr(cursor, "stats", None)}
+    
+    @staticmethod
+    def _cancel_cursor(cursor) -> None:
+        # The result budget is used up; stop Trino from producing rows nobody reads
+        try:
+            cursor.cancel()
+        except Exception as e:
+            logger.warning(f"Failed to cancel truncated query: {e}")
+    
+    def _is_cancelled(self, query_id: str) -> bool:
+        with self._running_lock:
+            return query_id in self._cancelled
+    
+    def cancel_query(self, query_id: str) -> bool:
+        """
+        Cancel a query started with stream_query(query_id=...) in this process.
+        
+        Returns:
+            True if the query was running here (it will end with a "cancelled" event)
+        """
+        with self._running_lock:
+            cursor = self._running.get(query_id)
+            if cursor is None:
+                return False
+            self._cancelled.add(query_id)
+        try:
+            cursor.cancel()
+        except Exception as e:
+            # Not submitted yet (stream_query cancels it right after submission) or already done
+            logger.debug(f"Cursor cancel for {query_id} failed: {e}")
+        logger.info(f"Cancelled query {query_id}")
+        return True
+    
+    def cancel_trino_query(self, user: str, trino_query_id: Optional[str] = None, next_uri: Optional[str] = None) -> bool:
+        """
+        Cancel a query that is not running in this process through Trino's REST API.
+        
+        Uses the query's next URI if known, otherwise kills it by Trino query id.
+        
+        Returns:
+            True if Trino accepted the cancellation
+        """
+        if next_uri:
+            url = next_uri
+        elif trino_query_id:
+            url = f"http://{self.host}:{self.port}/v1/query/{trino_query_id}"
+        else:
+            return False
+        try:
+            response = requests.delete(url, headers={"X-Trino-User": user}, timeout=10)
+            return response.status_code in (200, 204)
+        except requests.RequestException as e:
+            logger.error(f"Failed to cancel Trino query {trino_query_id or next_uri}: {e}")
+            return False
     
     def test_connection(self, user: str = "admin", catalog: str = "postgres", schema: str = "public") -> bool:
         """Test if we can connect to Trino and execute a simple query."""
@@ -145,6 +398,21 @@ class TrinoClientManager:
         except Exception as e:
             logger.error(f"Failed to get tables for {catalog}.{schema}: {e}")
             return []
+    
+    def get_columns(self, user: str, catalog: str) -> List[Tuple[str, str, str, str]]:
+        """Get (schema, table, column, type) for every column of a catalog in one query."""
+        query = (
+            f"SELECT table_schema, table_name, column_name, data_type FROM {catalog}.information_schema.columns "
+            f"WHERE table_schema <> 'information_schema' ORDER BY table_schema, table_name, ordinal_position"
+        )
+        try:
+            with self.execute_query(user, catalog, "information_schema", query) as (success, data, columns, error):
+                if success:
+                    return [tuple(row) for row in data]
+                return []
+        except Exception as e:
+            logger.error(f"Failed to get columns for {catalog}: {e}")
+            return []
 
 # Global Trino client manager instance
 trino_client = TrinoClientManager()
@@ -0,0 +1,226 @@
+"""
+Trino Metadata Cache
+
+This module caches Trino catalogs, schemas, tables and columns per user and
+serves them to the query editor: listings per level and prefix-search
+autocomplete. Each catalog is loaded with one information_schema query (instead
+of a SHOW query per schema and table) into a MetadataIndex, whose sorted keys
+are searched with bisect, so lookups stay well under a millisecond even with
+tens of thousands of tables.
+
+Snapshots are fresh for METADATA_CACHE_TTL seconds. After that a lookup still
+returns the cached snapshot but refreshes it in a background thread. Only
+snapshots older than METADATA_CACHE_MAX_STALE seconds are reloaded while the
+caller waits.
+"""
+import os
+import time
+import logging
+import threading
+from bisect import bisect_left
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+METADATA_CACHE_TTL_SECONDS = float(os.getenv("METADATA_CACHE_TTL", "300"))
+METADATA_CACHE_MAX_STALE_SECONDS = float(os.getenv("METADATA_CACHE_MAX_STALE", "3600"))
+METADATA_CACHE_MAX_USERS = int(os.getenv("METADATA_CACHE_MAX_USERS", "100"))
+
+# Catalogs not offered to the editor
+EXCLUDED_CATALOGS = {"system"}
+
+KINDS = ("catalog", "schema", "table", "column")
+
+
+class MetadataIndex:
+    """Immutable catalog/schema/table/column tree with sorted prefix indexes."""
+
+    def __init__(self, catalogs: Dict[str, Tuple[List[str], List[Tuple[str, str, str, str]]]]):
+        """
+        Args:
+            catalogs: catalog -> (schema names, [(schema, table, column, type), ...])
+        """
+        self.tree: Dict[str, Dict[str, Dict[str, List[Dict[str, str]]]]] = {}
+        entries: List[Tuple[str, str, str, Optional[str]]] = []
+        for catalog, (schemas, columns) in catalogs.items():
+            catalog_tree = self.tree.setdefault(catalog, {})
+            entries.append(("catalog", catalog, catalog, None))
+            for schema in schemas:
+                if schema != "information_schema":
+                    catalog_tree.setdefault(schema, {})
+            for schema, table, column, data_type in columns:
+                catalog_tree.setdefault(schema, {}).setdefault(table, []).append({"name": column, "type": data_type})
+                entries.append(("column", f"{catalog}.{schema}.{table}.{column}", column, data_type))
+            for schema, tables in catalog_tree.items():
+                entries.append(("schema", f"{catalog}.{schema}", schema, None))
+                for table in tables:
+                    entries.append(("table", f"{catalog}.{schema}.{table}", table, None))
+        self.entries = entries
+        self.by_name = self._sorted_index(lambda entry: entry[2])
+        self.by_qualified_name = self._sorted_index(lambda entry: entry[1])
+        self.built_at = time.time()
+
+    def _sorted_index(self, key: Callable) -> Tuple[List[str], List[int]]:
+        order = sorted(
+            range(len(self.entries)),
+            key=lambda i: (key(self.entries[i]).lower(), KINDS.index(self.entries[i][0]), self.entries[i][1])
+        )
+        return [key(self.entries[i]).lower() for i in order], order
+
+    def search(self, prefix: str, kinds: Optional[Iterable[str]] = None, limit: int = 20) -> List[Dict[str, Any]]:
+        """
+        Find entries whose name starts with the prefix (case-insensitive).
+
+        A prefix containing a dot is matched against qualified names
+        (catalog.schema.table.column), otherwise against plain names.
+        """
+        prefix = prefix.lower()
+        keys, order = self.by_qualified_name if "." in prefix else self.by_name
+        kinds = set(kinds) if kinds else None
+        matches = []
+        position = bisect_left(keys, prefix)
+        while position < len(keys) and len(matches) < limit and keys[position].startswith(prefix):
+            kind, qualified, name, data_type = self.entries[order[position]]
+            if kinds is None or kind in kinds:
+                match = {"kind": kind, "name": name, "qualified_name": qualified}
+                if data_type is not None:
+                    match["type"] = data_type
+                matches.append(match)
+            position += 1
+        return matches
+
+    def catalogs(self) -> List[str]:
+        return sorted(self.tree)
+
+    def schemas(self, catalog: str) -> Optional[List[str]]:
+        schemas = self.tree.get(catalog)
+        return sorted(schemas) if schemas is not None else None
+
+    def tables(self, catalog: str, schema: str) -> Optional[List[str]]:
+        tables = self.tree.get(catalog, {}).get(schema)
+        return sorted(tables) if tables is not None else None
+
+    def columns(self, catalog: str, schema: str, table: str) -> Optional[List[Dict[str, str]]]:
+        return self.tree.get(catalog, {}).get(schema, {}).get(table)
+
+    def counts(self) -> Dict[str, int]:
+        counts = dict.fromkeys(KINDS, 0)
+        for entry in self.entries:
+            counts[entry[0]] += 1
+        return counts
+
+
+def load_metadata(user: str) -> MetadataIndex:
+    """Load all catalogs visible to a Trino user (one schema and one column query per catalog)."""
+    from trino_client import get_trino_client
+
+    client = get_trino_client()
+    catalogs = {}
+    for catalog in client.get_catalogs(user):
+        if catalog in EXCLUDED_CATALOGS:
+            continue
+        catalogs[catalog] = (client.get_schemas(user, catalog), client.get_columns(user, catalog))
+    return MetadataIndex(catalogs)
+
+
+class MetadataCache:
+    """Per-user MetadataIndex snapshots with TTL and background refresh."""
+
+    def __init__(
+        self,
+        loader: Callable[[str], MetadataIndex] = load_metadata,
+        ttl_seconds: float = METADATA_CACHE_TTL_SECONDS,
+        max_stale_seconds: float = METADATA_CACHE_MAX_STALE_SECONDS,
+        max_users: int = METADATA_CACHE_MAX_USERS
+    ):
+        self.loader = loader
+        self.ttl_seconds = ttl_seconds
+        self.max_stale_seconds = max_stale_seconds
+        self.max_users = max_users
+        self._snapshots: "OrderedDict[str, Tuple[float, MetadataIndex]]" = OrderedDict()
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._stale_hits = 0
+        self._loads = 0
+        self._refresh_failures = 0
+
+    def get(self, user: str) -> MetadataIndex:
+        """Return the user's metadata, loading or refreshing it as needed."""
+        now = time.monotonic()
+        with self._lock:
+            cached = self._snapshots.get(user)
+            if cached is not None:
+                self._snapshots.move_to_end(user)
+                loaded_at, index = cached
+                age = now - loaded_at
+                if age < self.ttl_seconds:
+                    self._hits += 1
+                    return index
+                if age < self.max_stale_seconds:
+                    self._stale_hits += 1
+                    if user not in self._refreshing:
+                        self._refreshing.add(user)
+                        threading.Thread(target=self._background_refresh, args=(user,), daemon=True,
+                                         name="metadata-refresh").start()
+                    return index
+        return self.refresh(user)
+
+    def refresh(self, user: str) -> MetadataIndex:
+        """Load the user's metadata now and cache it."""
+        index = self.loader(user)
+        with self._lock:
+            self._loads += 1
+            self._snapshots[user] = (time.monotonic(), index)
+            self._snapshots.move_to_end(user)
+            while len(self._snapshots) > self.max_users:
+                self._snapshots.popitem(last=False)
+        return index
+
+    def _background_refresh(self, user: str) -> None:
+        try:
+            self.refresh(user)
+        except Exception as e:
+            # Keep serving the stale snapshot; the next lookup retries
+            logger.warning(f"Background metadata refresh for {user} failed: {e}")
+            with self._lock:
+                self._refresh_failures += 1
+        finally:
+            with self._lock:
+                self._refreshing.discard(user)
+
+    def invalidate(self, user: Optional[str] = None) -> int:
+        """Drop one user's snapshot, or all snapshots."""
+        with self._lock:
+            if user is None:
+                removed = len(self._snapshots)
+                self._snapshots.clear()
+                return removed
+            return 1 if self._snapshots.pop(user, None) is not None else 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "users": len(self._snapshots),
+                "max_users": self.max_users,
+                "ttl_seconds": self.ttl_seconds,
+                "max_stale_seconds": self.max_stale_seconds,
+                "hits": self._hits,
+                "stale_hits": self._stale_hits,
+                "loads": self._loads,
+                "refreshing": len(self._refreshing),
+                "refresh_failures": self._refresh_failures,
+            }
+
+
+# Global instance (will be initialized on first use)
+_metadata_cache: Optional[MetadataCache] = None
+
+
+def get_metadata_cache() -> MetadataCache:
+    """Get or create the global metadata cache."""
+    global _metadata_cache
+    if _metadata_cache is None:
+        _metadata_cache = MetadataCache()
+    return _metadata_cache
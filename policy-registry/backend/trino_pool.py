@@ -0,0 +1,263 @@
+"""
+Trino Connection Pool
+
+This module provides a bounded, thread-safe pool of DB-API connections keyed
+by (user, catalog, schema). Each connection is checked out by one request at
+a time, idle connections are closed after a timeout (least recently used keys
+are evicted first when the pool is full), and connections that have been idle
+for a while are health-checked before they are handed out again.
+"""
+import threading
+import time
+import logging
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Hashable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class PoolTimeoutError(RuntimeError):
+    """Raised when no connection becomes available within the checkout timeout."""
+
+
+class _Entry:
+    """A pooled connection and its bookkeeping."""
+
+    __slots__ = ("connection", "created_at", "last_used")
+
+    def __init__(self, connection: Any):
+        self.connection = connection
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+
+
+class ConnectionPool:
+    """Per-key bounded connection pool with LRU idle eviction and health checks."""
+
+    def __init__(
+        self,
+        factory: Callable[[Hashable], Any],
+        max_per_key: int = 4,
+        max_total: int = 64,
+        idle_timeout_seconds: float = 300.0,
+        health_check_after_seconds: float = 60.0,
+        checkout_timeout_seconds: float = 30.0,
+        validate: Optional[Callable[[Any], bool]] = None,
+        close: Optional[Callable[[Any], None]] = None,
+        name: str = "pool"
+    ):
+        """
+        Initialize the pool.
+
+        Args:
+            factory: Called with the key to open a new connection
+            max_per_key: Maximum connections (idle and in use) per key
+            max_total: Maximum connections (idle and in use) across all keys
+            idle_timeout_seconds: Idle connections older than this are closed
+            health_check_after_seconds: Connections idle longer than this are validated on checkout
+            checkout_timeout_seconds: How long checkout waits for a free slot
+            validate: Returns False for a dead connection (no health checks if None)
+            close: Closes a connection (errors are ignored)
+            name: Name reported in stats
+        """
+        self.name = name
+        self.factory = factory
+        self.max_per_key = max(1, max_per_key)
+        self.max_total = max(1, max_total)
+        self.idle_timeout_seconds = idle_timeout_seconds
+        self.health_check_after_seconds = health_check_after_seconds
+        self.checkout_timeout_seconds = checkout_timeout_seconds
+        self.validate = validate
+        self.close = close
+        self._cond = threading.Condition()
+        # key -> idle entries (most recently returned last); keys in LRU order
+        self._idle: "OrderedDict[Hashable, List[_Entry]]" = OrderedDict()
+        self._in_use: Dict[Hashable, int] = {}
+        self._total = 0
+        self._hits = 0
+        self._misses = 0
+        self._waits = 0
+        self._timeouts = 0
+        self._evictions = 0
+        self._expirations = 0
+        self._health_failures = 0
+
+    def _close(self, entries: List[_Entry]) -> None:
+        # Called without the lock held; closing may do network I/O
+        for entry in entries:
+            if self.close is not None:
+                try:
+                    self.close(entry.connection)
+                except Exception as e:
+                    logger.debug(f"Error closing pooled connection: {e}")
+
+    def _release_slot(self, key: Hashable) -> None:
+        # Caller holds the lock
+        self._in_use[key] -= 1
+        if not self._in_use[key]:
+            del self._in_use[key]
+        self._total -= 1
+        self._cond.notify_all()
+
+    def _expire_idle(self, now: float, closing: List[_Entry]) -> None:
+        # Caller holds the lock; the idle set is bounded by max_total, so a full sweep is cheap
+        for key in list(self._idle):
+            entries = self._idle[key]
+            fresh = [e for e in entries if now - e.last_used < self.idle_timeout_seconds]
+            expired = len(entries) - len(fresh)
+            if not expired:
+                continue
+            closing.extend(e for e in entries if now - e.last_used >= self.idle_timeout_seconds)
+            self._expirations += expired
+            self._total -= expired
+            if fresh:
+                self._idle[key] = fresh
+            else:
+                del self._idle[key]
+        if closing:
+            self._cond.notify_all()
+
+    def _evict_lru(self, closing: List[_Entry]) -> bool:
+        # Caller holds the lock; drops the oldest idle connection of the least recently used key
+        if not self._idle:
+            return False
+        key, entries = next(iter(self._idle.items()))
+        closing.append(entries.pop(0))
+        if not entries:
+            del self._idle[key]
+        self._total -= 1
+        self._evictions += 1
+        return True
+
+    def checkout(self, key: Hashable) -> Any:
+        """
+        Take a connection for key out of the pool, opening one if allowed.
+
+        Raises:
+            PoolTimeoutError: If the per-key or total limit is reached for longer
+                than checkout_timeout_seconds
+        """
+        deadline = time.monotonic() + self.checkout_timeout_seconds
+        waited = False
+        while True:
+            closing: List[_Entry] = []
+            entry = None
+            with self._cond:
+                while True:
+                    now = time.monotonic()
+                    self._expire_idle(now, closing)
+                    idle = self._idle.get(key)
+                    if idle:
+                        entry = idle.pop()
+                        if not idle:
+                            del self._idle[key]
+                        self._in_use[key] = self._in_use.get(key, 0) + 1
+                        self._hits += 1
+                        break
+                    if self._in_use.get(key, 0) < self.max_per_key:
+                        if self._total < self.max_total or self._evict_lru(closing):
+                            # Reserve a slot, the connection is opened outside the lock
+                            self._in_use[key] = self._in_use.get(key, 0) + 1
+                            self._total += 1
+                            self._misses += 1
+                            break
+                    if not waited:
+                        waited = True
+                        self._waits += 1
+                    remaining = deadline - now
+                    if remaining <= 0:
+                        self._timeouts += 1
+                        raise PoolTimeoutError(
+                            f"No {self.name} connection available for {key} within {self.checkout_timeout_seconds}s"
+                        )
+                    self._cond.wait(remaining)
+            self._close(closing)
+
+            if entry is None:
+                try:
+                    return _Entry(self.factory(key))
+                except Exception:
+                    with self._cond:
+                        self._release_slot(key)
+                    raise
+
+            if (
+                self.validate is None
+                or time.monotonic() - entry.last_used < self.health_check_after_seconds
+                or self._is_alive(entry)
+            ):
+                return entry
+            logger.info(f"Discarding dead {self.name} connection for {key}")
+            with self._cond:
+                self._health_failures += 1
+                self._release_slot(key)
+            self._close([entry])
+
+    def _is_alive(self, entry: _Entry) -> bool:
+        try:
+            return bool(self.validate(entry.connection))
+        except Exception:
+            return False
+
+    def checkin(self, key: Hashable, entry: _Entry, healthy: bool = True) -> None:
+        """Return a connection; unhealthy connections are closed instead of reused."""
+        with self._cond:
+            if not healthy:
+                self._release_slot(key)
+            else:
+                self._in_use[key] -= 1
+                if not self._in_use[key]:
+                    del self._in_use[key]
+                entry.last_used = time.monotonic()
+                self._idle.setdefault(key, []).append(entry)
+                self._idle.move_to_end(key)
+                self._cond.notify_all()
+        if not healthy:
+            self._close([entry])
+
+    @contextmanager
+    def connection(self, key: Hashable):
+        """Check out a connection for the duration of the block. It is discarded if the block raises."""
+        entry = self.checkout(key)
+        healthy = True
+        try:
+            yield entry.connection
+        except BaseException:
+            healthy = False
+            raise
+        finally:
+            self.checkin(key, entry, healthy)
+
+    def clear(self) -> int:
+        """Close every idle connection. Returns the number closed."""
+        with self._cond:
+            closing = [entry for entries in self._idle.values() for entry in entries]
+            self._idle.clear()
+            self._total -= len(closing)
+            self._cond.notify_all()
+        self._close(closing)
+        return len(closing)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return pool size and counters for monitoring endpoints."""
+        with self._cond:
+            idle = sum(len(entries) for entries in self._idle.values())
+            lookups = self._hits + self._misses
+            return {
+                "name": self.name,
+                "size": self._total,
+                "idle": idle,
+                "in_use": self._total - idle,
+                "keys": len(set(self._idle) | set(self._in_use)),
+                "max_per_key": self.max_per_key,
+                "max_total": self.max_total,
+                "hits": self._hits,
+                "misses": self._misses,
+                "waits": self._waits,
+                "timeouts": self._timeouts,
+                "evictions": self._evictions,
+                "expirations": self._expirations,
+                "health_failures": self._health_failures,
+                "hit_rate": round(self._hits / lookups, 4) if lookups else 0.0,
+            }
@@ -24,9 +24,27 @@ CREATE TABLE IF NOT EXISTS queries (
     rows_returned INTEGER DEFAULT 0,
     bytes_processed BIGINT DEFAULT 0,
     trino_next_uri TEXT,
-    trino_info_uri TEXT
+    trino_info_uri TEXT,
+    trino_query_id VARCHAR(100),
+    progress REAL DEFAULT 0,
+    processed_rows BIGINT,
+    cpu_time_ms BIGINT,
+    queued_time_ms BIGINT,
+    peak_memory_bytes BIGINT,
+    persist_status VARCHAR(20),
+    result_hash VARCHAR(64)
 );
 
+-- Columns added after the initial schema (for databases created before them)
+ALTER TABLE queries ADD COLUMN IF NOT EXISTS trino_query_id VARCHAR(100);
+ALTER TABLE queries ADD COLUMN IF NOT EXISTS progress REAL DEFAULT 0;
+ALTER TABLE queries ADD COLUMN IF NOT EXISTS processed_rows BIGINT;
+ALTER TABLE queries ADD COLUMN IF NOT EXISTS cpu_time_ms BIGINT;
+ALTER TABLE queries ADD COLUMN IF NOT EXISTS queued_time_ms BIGINT;
+ALTER TABLE queries ADD COLUMN IF NOT EXISTS peak_memory_bytes BIGINT;
+ALTER TABLE queries ADD COLUMN IF NOT EXISTS persist_status VARCHAR(20);
+ALTER TABLE queries ADD COLUMN IF NOT EXISTS result_hash VARCHAR(64);
+
 -- Table to store query result columns
 CREATE TABLE IF NOT EXISTS query_columns (
     id SERIAL PRIMARY KEY,
@@ -47,6 +65,35 @@ CREATE TABLE IF NOT EXISTS query_results (
     UNIQUE(query_id, row_number, column_position)
 );
 
+-- Content-addressed results: identical results are stored once and
+-- reference-counted by the queries (queries.result_hash) that returned them
+CREATE TABLE IF NOT EXISTS result_sets (
+    content_hash VARCHAR(64) PRIMARY KEY,
+    row_count INTEGER NOT NULL,
+    byte_size BIGINT NOT NULL,
+    ref_count INTEGER NOT NULL DEFAULT 1,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Table to store query result data as compressed columnar chunks
+-- (replaces query_results; see policy-registry/backend/result_store.py and
+-- scripts/migrate_cell_results.py for converting existing rows).
+-- Chunks of shared results belong to a result set instead of a query.
+CREATE TABLE IF NOT EXISTS query_result_chunks (
+    id SERIAL PRIMARY KEY,
+    query_id VARCHAR(100) REFERENCES queries(id) ON DELETE CASCADE,
+    result_hash VARCHAR(64) REFERENCES result_sets(content_hash) ON DELETE CASCADE,
+    chunk_index INTEGER NOT NULL,
+    first_row INTEGER NOT NULL,
+    row_count INTEGER NOT NULL,
+    format VARCHAR(20) NOT NULL,
+    codec VARCHAR(20),
+    byte_size INTEGER NOT NULL,
+    data BYTEA NOT NULL,
+    UNIQUE(query_id, chunk_index),
+    UNIQUE(result_hash, chunk_index)
+);
+
 -- Table to store query statistics
 CREATE TABLE IF NOT EXISTS query_stats (
     id SERIAL PRIMARY KEY,
@@ -61,7 +108,11 @@ CREATE TABLE IF NOT EXISTS query_stats (
 CREATE INDEX IF NOT EXISTS idx_queries_user_id ON queries(user_id);
 CREATE INDEX IF NOT EXISTS idx_queries_status ON queries(status);
 CREATE INDEX IF NOT EXISTS idx_queries_submitted_at ON queries(submitted_at);
+CREATE INDEX IF NOT EXISTS idx_queries_catalog ON queries(catalog);
 CREATE INDEX IF NOT EXISTS idx_query_results_query_id ON query_results(query_id);
+-- Row-window reads (result pagination) are range scans of this index
+CREATE INDEX IF NOT EXISTS idx_query_result_chunks_rows ON query_result_chunks(query_id, first_row);
+CREATE INDEX IF NOT EXISTS idx_query_result_chunks_result_rows ON query_result_chunks(result_hash, first_row);
 CREATE INDEX IF NOT EXISTS idx_query_columns_query_id ON query_columns(query_id);
 
 -- Function to clean up old queries (older than 24 hours)
@@ -70,10 +121,23 @@ RETURNS INTEGER AS $$
 DECLARE
     deleted_count INTEGER;
 BEGIN
+    -- Release the shared results referenced by the queries being removed
+    UPDATE result_sets rs
+    SET ref_count = rs.ref_count - expired.refs
+    FROM (
+        SELECT result_hash, COUNT(*) AS refs FROM queries
+        WHERE submitted_at < CURRENT_TIMESTAMP - INTERVAL '24 hours' AND result_hash IS NOT NULL
+        GROUP BY result_hash
+    ) expired
+    WHERE rs.content_hash = expired.result_hash;
+    
     DELETE FROM queries 
     WHERE submitted_at < CURRENT_TIMESTAMP - INTERVAL '24 hours';
     
     GET DIAGNOSTICS deleted_count = ROW_COUNT;
+    
+    -- Unreferenced results (and their chunks, by cascade) go too
+    DELETE FROM result_sets WHERE ref_count <= 0;
     RETURN deleted_count;
 END;
 $$ LANGUAGE plpgsql;